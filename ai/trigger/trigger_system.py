@@ -11,10 +11,10 @@ import asyncio
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from enum import Enum
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, deque
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -78,10 +78,12 @@ class TriggerThresholds:
 class TriggerCooldown:
     """冷却机制管理器"""
     
-    def __init__(self):
+    def __init__(self, clock: Optional[Callable[[], datetime]] = None):
+        self.clock = clock or datetime.now  # 回测时注入模拟时钟
         self.cooldowns: Dict[str, datetime] = {}
-        self.trigger_history: Dict[str, List[datetime]] = defaultdict(list)
-        self.api_calls: List[datetime] = []
+        # 按时间追加的触发记录，过期记录从队首弹出
+        self.trigger_history: Dict[str, deque] = defaultdict(deque)
+        self.api_calls: deque = deque()
         
         # 冷却时间配置（秒）
         self.same_signal_cooldown = 300  # 5分钟
@@ -93,13 +95,12 @@ class TriggerCooldown:
         检查是否可以触发
         返回: (是否可以触发, 原因)
         """
-        now = datetime.now()
+        now = self.clock()
         
         # 检查API调用限制
-        hour_ago = now - timedelta(hours=1)
-        recent_calls = [t for t in self.api_calls if t > hour_ago]
-        if len(recent_calls) >= self.api_rate_limit:
-            return False, f"API rate limit reached ({len(recent_calls)}/{self.api_rate_limit})"
+        self._expire(self.api_calls, now - timedelta(hours=1))
+        if len(self.api_calls) >= self.api_rate_limit:
+            return False, f"API rate limit reached ({len(self.api_calls)}/{self.api_rate_limit})"
         
         # 检查相同信号冷却
         signal_key = f"{symbol}:{signal_type}"
@@ -121,7 +122,7 @@ class TriggerCooldown:
     
     def record_trigger(self, symbol: str, signal_type: str):
         """记录触发事件"""
-        now = datetime.now()
+        now = self.clock()
         signal_key = f"{symbol}:{signal_type}"
         
         self.cooldowns[signal_key] = now
@@ -134,23 +135,28 @@ class TriggerCooldown:
     
     def _cleanup_old_records(self):
         """清理超过1小时的记录"""
-        cutoff = datetime.now() - timedelta(hours=1)
-        self.api_calls = [t for t in self.api_calls if t > cutoff]
+        cutoff = self.clock() - timedelta(hours=1)
+        self._expire(self.api_calls, cutoff)
         
         for symbol in list(self.trigger_history.keys()):
-            self.trigger_history[symbol] = [
-                t for t in self.trigger_history[symbol] if t > cutoff
-            ]
+            self._expire(self.trigger_history[symbol], cutoff)
             if not self.trigger_history[symbol]:
                 del self.trigger_history[symbol]
+    
+    @staticmethod
+    def _expire(records: deque, cutoff: datetime):
+        """弹出不晚于cutoff的记录"""
+        while records and records[0] <= cutoff:
+            records.popleft()
 
 
 class TriggerSystem:
     """多级触发机制核心系统"""
     
-    def __init__(self):
+    def __init__(self, clock: Optional[Callable[[], datetime]] = None):
+        self.clock = clock or datetime.now
         self.thresholds = TriggerThresholds()
-        self.cooldown = TriggerCooldown()
+        self.cooldown = TriggerCooldown(self.clock)
         self.trigger_queue: List[TriggerSignal] = []
         self.processing = False
         
@@ -264,6 +270,7 @@ class TriggerSystem:
             trigger_type=self._determine_trigger_type(market_data),
             trigger_reason="; ".join(trigger_reasons),
             data=market_data,
+            timestamp=self.clock(),
             priority=priority,
             confidence=min(trigger_score / 100, 1.0)
         )
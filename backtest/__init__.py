@@ -0,0 +1,17 @@
+"""
+回测模块
+用历史K线回放触发、机会扫描、仓位和止损组件
+"""
+
+from .data import load_csv, load_history_dir, load_market_data
+from .engine import BacktestConfig, BacktestEngine, BacktestResult, benchmark_backtest
+
+__all__ = [
+    'BacktestConfig',
+    'BacktestEngine',
+    'BacktestResult',
+    'benchmark_backtest',
+    'load_csv',
+    'load_history_dir',
+    'load_market_data'
+]
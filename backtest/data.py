@@ -0,0 +1,106 @@
+"""
+回测数据加载
+读取 download_history_data.py 下载的K线CSV，或从 market_data 表按行情快照聚合K线，
+统一为 timestamp/open/high/low/close/volume 格式的DataFrame
+"""
+
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+# OKX: BTC-USDT_1m_30days.csv；币安: binance_BTCUSDT_1m_30days.csv
+HISTORY_FILE_PATTERN = re.compile(r"^(?:binance_)?(?P<symbol>.+?)_(?P<interval>\d+[smhdw])_\d+days\.csv$")
+
+
+def load_csv(path: Union[str, Path]) -> pd.DataFrame:
+    """读取单个K线CSV，按时间升序并去重"""
+    df = pd.read_csv(path, usecols=OHLCV_COLUMNS, parse_dates=["timestamp"])
+    df = df.drop_duplicates("timestamp").sort_values("timestamp", ignore_index=True)
+    return df
+
+
+def load_history_dir(directory: Union[str, Path] = "data/history",
+                     interval: str = "1m",
+                     symbols: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    读取历史数据目录下指定周期的全部K线文件
+
+    同一币种有多个文件（不同天数）时取最大的一个
+
+    Returns:
+        {币种: K线DataFrame}
+    """
+    wanted = set(symbols) if symbols is not None else None
+    files: Dict[str, Path] = {}
+    for path in Path(directory).glob(f"*_{interval}_*days.csv"):
+        match = HISTORY_FILE_PATTERN.match(path.name)
+        if not match or match.group("interval") != interval:
+            continue
+        symbol = match.group("symbol")
+        if wanted is not None and symbol not in wanted:
+            continue
+        if symbol not in files or path.stat().st_size > files[symbol].stat().st_size:
+            files[symbol] = path
+
+    data = {}
+    for symbol, path in sorted(files.items()):
+        data[symbol] = load_csv(path)
+        logger.info(f"Loaded {len(data[symbol])} bars for {symbol} from {path.name}")
+    return data
+
+
+def load_market_data(conn,
+                     symbols: Iterable[str],
+                     start=None,
+                     end=None,
+                     exchange: Optional[str] = None,
+                     interval: str = "1min") -> Dict[str, pd.DataFrame]:
+    """
+    从 market_data 表读取行情快照并聚合为K线
+
+    Args:
+        conn: PostgreSQL连接（如 DatabasePool.sync_pool.getconn()）
+        symbols: 币种列表
+        start: 起始时间（含）
+        end: 结束时间（不含）
+        exchange: 交易所，None表示不限
+        interval: K线周期（pandas频率字符串）
+
+    open/high/low/close由每个周期内的price聚合，volume取周期内最后一个快照值
+    """
+    conditions = ["symbol = ANY(%s)"]
+    params = [list(symbols)]
+    if start is not None:
+        conditions.append("timestamp >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("timestamp < %s")
+        params.append(end)
+    if exchange is not None:
+        conditions.append("exchange = %s")
+        params.append(exchange)
+
+    query = f"""
+        SELECT timestamp, symbol, price, volume
+        FROM market_data
+        WHERE {' AND '.join(conditions)}
+        ORDER BY symbol, timestamp
+    """
+    snapshots = pd.read_sql_query(query, conn, params=params, parse_dates=["timestamp"])
+    snapshots[["price", "volume"]] = snapshots[["price", "volume"]].astype(float)
+
+    data = {}
+    for symbol, group in snapshots.groupby("symbol", sort=True):
+        series = group.set_index("timestamp")
+        bars = series["price"].resample(interval).ohlc()
+        bars["volume"] = series["volume"].resample(interval).last()
+        bars = bars.dropna().reset_index()
+        data[symbol] = bars[OHLCV_COLUMNS]
+    return data
@@ -0,0 +1,621 @@
+"""
+事件驱动回测引擎
+把历史K线按时间顺序回放给线上同一套组件：
+TriggerSystem.evaluate_trigger -> OpportunityScanner.scan_market -> PositionManager.calculate_position_size，
+持仓由 StopLossSystem.get_combined_stop 管理
+
+指标按币种一次性向量化计算；只有可能触发信号的K线才进入事件循环，
+持仓期间按固定间隔重算综合止损，间隔内的止损/止盈用数组扫描判定，
+最后按成交记录向量化生成资金曲线
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ai.trigger.trigger_system import TriggerSignal, TriggerSystem
+from analysis.indicators.momentum import MomentumIndicators
+from analysis.indicators.volatility import VolatilityIndicators
+from risk.opportunity.opportunity_scanner import OpportunityScanner, OpportunitySignal, OpportunityType
+from risk.position.position_manager import PositionManager
+from risk.stoploss.stoploss_system import Position, StopLossSystem
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# 候选事件携带的指标列（顺序即事件循环中解包的顺序）
+EVENT_COLUMNS = (
+    "close", "price_change_24h", "volume_ratio", "rsi", "volatility",
+    "support", "resistance", "atr", "support_test_count", "volume_decreasing", "downtrend", "scan"
+)
+
+
+@dataclass
+class BacktestConfig:
+    """回测参数"""
+    initial_capital: float = 100_000.0
+    fee_rate: float = 0.001              # 单边手续费率
+    slippage: float = 0.0005             # 市价成交滑点
+    stop_check_bars: int = 60            # 持仓期间每隔多少根K线重算综合止损
+    rsi_period: int = 14
+    atr_period: int = 14
+    volume_window: int = 20              # 量比基准窗口
+    support_window: Optional[int] = None  # 支撑/阻力窗口，默认一天的K线数
+    support_touch: float = 0.005         # 低点距支撑位此比例内记为一次测试
+    min_trigger_level: int = 2           # 仅凭触发信号开仓所需的最低级别
+    high_volatility: float = 0.05        # 日波动率高于此值视为高波动
+    prefilter: bool = True               # 只把可能触发信号的K线送入组件
+
+
+@dataclass
+class SymbolBars:
+    """单个币种的K线数组和候选事件"""
+    symbol: str
+    ts: np.ndarray       # epoch秒（UTC）
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    events: Dict[str, np.ndarray] = field(default_factory=dict)  # idx/ts + EVENT_COLUMNS，只含候选K线
+
+
+@dataclass
+class BacktestResult:
+    """回测结果"""
+    trades: pd.DataFrame
+    equity: pd.Series
+    stats: Dict
+
+
+class SimulatedClock:
+    """模拟时钟，注入各组件替代datetime.now"""
+
+    def __init__(self):
+        self.now = _EPOCH
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def set(self, ts: int):
+        self.now = _EPOCH + timedelta(seconds=ts)
+
+
+def to_epoch_seconds(timestamps) -> np.ndarray:
+    """时间列转为UTC epoch秒"""
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.values.astype("datetime64[s]").astype(np.int64)
+
+
+def compute_indicators(frame: pd.DataFrame, config: BacktestConfig) -> Dict[str, np.ndarray]:
+    """
+    计算组件所需的全部指标数组
+
+    24小时涨跌幅、日波动率按K线间隔换算；RSI/ATR使用analysis.indicators中的实现。
+    价格类列保持float64，其余指标用float32存放（候选判断与送入组件的是同一份数值）
+    """
+    ts = to_epoch_seconds(frame["timestamp"])
+    close = frame["close"].astype(float)
+    high = frame["high"].astype(float)
+    low = frame["low"].astype(float)
+    volume = frame["volume"].astype(float)
+
+    step = float(np.median(np.diff(ts))) if len(ts) > 1 else 86400.0
+    bars_per_day = max(1, int(round(86400 / step)))
+    support_window = config.support_window or max(bars_per_day, config.volume_window)
+
+    change = (close / close.shift(bars_per_day) - 1) * 100
+    volume_mean = volume.rolling(config.volume_window).mean().shift(1)
+    volume_ratio = volume / volume_mean.where(volume_mean > 0)
+    volatility = close.pct_change().rolling(bars_per_day).std() * math.sqrt(bars_per_day)
+
+    support = low.rolling(support_window).min().shift(1)
+    resistance = high.rolling(support_window).max().shift(1)
+    touches = (low <= support * (1 + config.support_touch)).astype(np.int32)
+    short_volume = volume.rolling(max(2, config.volume_window // 4)).mean()
+    trend_ma = close.rolling(bars_per_day).mean()
+
+    return {
+        "ts": ts,
+        "close": close.to_numpy(),
+        "price_change_24h": change.fillna(0).to_numpy(np.float32),
+        "volume_ratio": volume_ratio.fillna(1).to_numpy(np.float32),
+        "rsi": MomentumIndicators.rsi(close, config.rsi_period).fillna(50).to_numpy(np.float32),
+        "volatility": volatility.fillna(0).to_numpy(np.float32),
+        "support": support.to_numpy(),
+        "resistance": resistance.to_numpy(),
+        "atr": VolatilityIndicators.atr(high, low, close, config.atr_period).fillna(0).to_numpy(np.float32),
+        "support_test_count": touches.rolling(support_window, min_periods=1).sum().to_numpy(np.float32),
+        "volume_decreasing": (short_volume < volume_mean).to_numpy(),
+        "downtrend": (close < trend_ma).to_numpy(),
+        "warmup": max(support_window, bars_per_day),
+    }
+
+
+@contextmanager
+def _quiet(*components):
+    """回测期间屏蔽组件逐笔的INFO日志"""
+    loggers = [logging.getLogger(type(component).__module__) for component in components]
+    levels = [log.level for log in loggers]
+    for log in loggers:
+        log.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        for log, level in zip(loggers, levels):
+            log.setLevel(level)
+
+
+@dataclass
+class _OpenTrade:
+    symbol: str
+    entry_ts: int
+    entry_price: float
+    quantity: float
+    size: float
+    entry_fee: float
+    reason: str
+    exit_ts: int = 0
+    exit_index: int = 0
+    exit_price: float = 0.0
+    exit_reason: str = ""
+    bars_held: int = 0
+
+
+class BacktestEngine:
+    """回测引擎"""
+
+    def __init__(self, config: Optional[BacktestConfig] = None):
+        self.config = config or BacktestConfig()
+        self.clock = SimulatedClock()
+
+        self.trigger_system = TriggerSystem(clock=self.clock)
+        self.scanner = OpportunityScanner()
+        self.stoploss = StopLossSystem(clock=self.clock)
+        self.position_manager = PositionManager()
+
+        self.bars: Dict[str, SymbolBars] = {}
+        self.cash = self.config.initial_capital
+        self.open_trades: Dict[str, _OpenTrade] = {}
+        self.closed_trades: List[_OpenTrade] = []
+        self._exits: List[Tuple[int, int, _OpenTrade]] = []  # (离场时间, 序号, 持仓)
+        self._seq = 0
+
+    def add_symbol(self, symbol: str, frame: pd.DataFrame) -> int:
+        """
+        加入一个币种的K线并预计算指标，只保留K线数组和候选事件，返回候选事件数
+
+        frame需包含 timestamp/open/high/low/close/volume 列，按时间升序
+        """
+        indicators = compute_indicators(frame, self.config)
+        mask, indicators["scan"] = self._candidate_mask(indicators)
+        mask[:indicators["warmup"]] = False
+        index = np.flatnonzero(mask)
+
+        events = {"idx": index.astype(np.int32), "ts": indicators["ts"][index]}
+        for name in EVENT_COLUMNS:
+            events[name] = indicators[name][index]
+
+        self.bars[symbol] = SymbolBars(
+            symbol=symbol,
+            ts=indicators["ts"],
+            open=frame["open"].to_numpy(dtype=float),
+            high=frame["high"].to_numpy(dtype=float),
+            low=frame["low"].to_numpy(dtype=float),
+            close=indicators["close"],
+            events=events
+        )
+        return len(index)
+
+    def _candidate_mask(self, ind: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        可能产生信号的K线
+
+        与 TriggerSystem 的Level 1条件（Level 2/3的价格、量比条件均被其包含）
+        以及 OpportunityScanner 中可由K线数据满足的两类机会条件一致，其余K线调用组件也不会出信号
+
+        Returns:
+            (候选K线, 可能扫描出机会的K线)
+        """
+        n = len(ind["ts"])
+        if not self.config.prefilter:
+            return np.ones(n, dtype=bool), np.ones(n, dtype=bool)
+
+        th = self.trigger_system.thresholds
+        change, ratio, rsi = ind["price_change_24h"], ind["volume_ratio"], ind["rsi"]
+        trigger = (
+            (np.abs(change) >= th.price_change_level_1) |
+            (ratio >= th.volume_spike_level_1) |
+            (rsi <= th.rsi_oversold) |
+            (rsi >= th.rsi_overbought)
+        )
+
+        oversold = self.scanner.triggers[OpportunityType.EXTREME_OVERSOLD]
+        extreme = (
+            (rsi < oversold["rsi"]["threshold"]) &
+            (-change / 100 > oversold["price_drop"]["threshold"]) &
+            (ratio > oversold["volume"]["multiplier"])
+        )
+
+        bounce = self.scanner.triggers[OpportunityType.SUPPORT_BOUNCE]
+        support = ind["support"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distance = np.abs(ind["close"] - support) / support
+        near_support = (
+            (support > 0) &
+            (distance < bounce["support_distance"]["threshold"]) &
+            (ind["support_test_count"] >= bounce["test_count"]["threshold"]) &
+            ind["volume_decreasing"]
+        )
+        scan = extreme | near_support
+        return trigger | scan, scan
+
+    def run(self) -> BacktestResult:
+        """按时间顺序回放全部币种"""
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> BacktestResult:
+        start = time.perf_counter()
+        symbols = list(self.bars)
+        self.position_manager.total_capital = self.config.initial_capital
+        self.cash = self.config.initial_capital
+        self.open_trades = {}
+        self.closed_trades = []
+        self._exits = []
+        self._seq = 0
+
+        cooldown = self.trigger_system.cooldown
+        with _quiet(self.trigger_system, self.scanner, self.stoploss, self.position_manager):
+            for rows in self._event_blocks(symbols):
+                for (ts, k, i, price, change, ratio, rsi, volatility,
+                     support, resistance, atr, tests, volume_decreasing, downtrend, scan) in rows:
+                    self._settle(ts)
+                    self.clock.set(ts)
+                    symbol = symbols[k]
+                    holding = symbol in self.open_trades
+
+                    # 限频或币种冷却中evaluate_trigger必然返回None且不改变状态，直接跳过
+                    can_trigger, _ = cooldown.can_trigger(symbol, "")
+                    if not can_trigger and (holding or not scan):
+                        continue
+
+                    market_data = {
+                        "symbol": symbol,
+                        "price": price,
+                        "price_change_24h": change,
+                        "price_drop_24h": max(0.0, -change / 100),
+                        "volume_ratio": ratio,
+                        "rsi": rsi,
+                        "volatility": volatility,
+                        "support_level": support,
+                        "support_test_count": tests,
+                        "volume_trend": "decreasing" if volume_decreasing else "increasing",
+                        "trend": "down" if downtrend else "up",
+                    }
+                    signal = await self.trigger_system.evaluate_trigger(market_data) if can_trigger else None
+                    if holding:
+                        continue
+
+                    opportunities = self.scanner.scan_market(market_data) if scan else []
+                    entry = self._entry_signal(signal, opportunities, market_data)
+                    if entry:
+                        self._open(self.bars[symbol], i, entry, market_data, atr, support, resistance)
+
+            self._settle(None)
+
+        trades, equity = self._build_results(symbols)
+        stats = self._statistics(trades, equity)
+        stats["events"] = int(sum(len(self.bars[s].events["ts"]) for s in symbols))
+        stats["bars"] = int(sum(len(self.bars[s].ts) for s in symbols))
+        stats["elapsed_s"] = round(time.perf_counter() - start, 2)
+        return BacktestResult(trades=trades, equity=equity, stats=stats)
+
+    def _event_blocks(self, symbols: List[str], block_seconds: int = 7 * 86400):
+        """
+        按时间窗口合并各币种的候选事件，窗口内按(时间, 币种)排序
+
+        逐窗口合并避免一次性拼接全部事件列，内存只与窗口大小有关
+
+        Yields:
+            窗口内事件行的迭代器，每行为 (ts, 币种序号, K线序号, *EVENT_COLUMNS)
+        """
+        events = [self.bars[s].events for s in symbols]
+        bounds = [e["ts"][[0, -1]] for e in events if len(e["ts"])]
+        if not bounds:
+            return
+
+        first = min(b[0] for b in bounds)
+        last = max(b[1] for b in bounds)
+        for block_start in range(int(first), int(last) + 1, block_seconds):
+            block_end = block_start + block_seconds
+            parts = []
+            for k, e in enumerate(events):
+                lo, hi = np.searchsorted(e["ts"], [block_start, block_end])
+                if hi > lo:
+                    parts.append((k, lo, hi))
+            if not parts:
+                continue
+
+            columns = [
+                np.concatenate([events[k]["ts"][lo:hi] for k, lo, hi in parts]),
+                np.concatenate([np.full(hi - lo, k, dtype=np.int32) for k, lo, hi in parts]),
+                np.concatenate([events[k]["idx"][lo:hi] for k, lo, hi in parts]),
+            ]
+            columns += [np.concatenate([events[k][name][lo:hi] for k, lo, hi in parts]) for name in EVENT_COLUMNS]
+            order = np.lexsort((columns[1], columns[0]))
+            yield zip(*[column[order].tolist() for column in columns])
+
+    def _entry_signal(self,
+                      signal: Optional[TriggerSignal],
+                      opportunities: List[OpportunitySignal],
+                      market_data: Dict) -> Optional[Tuple[float, float, str, Optional[float]]]:
+        """
+        开仓判断：优先采用扫描出的机会；否则在下跌中出现足够级别的触发信号时开仓
+
+        Returns:
+            (信号强度0-10, 风险评分0-30, 开仓原因, 止盈价) 或 None
+        """
+        if opportunities:
+            best = opportunities[0]
+            return best.confidence, best.risk_score * 3, f"opportunity:{best.type.value}", best.targets[0]
+
+        if (signal and signal.level.value >= self.config.min_trigger_level
+                and market_data["price_change_24h"] < 0):
+            risk_score = self.scanner._calculate_risk_score(market_data) * 3
+            return signal.confidence * 10, risk_score, f"trigger:{signal.trigger_type}", None
+
+        return None
+
+    def _open(self, bars: SymbolBars, i: int, entry: Tuple, market_data: Dict,
+              atr: float, support: float, resistance: float):
+        """按PositionManager给出的仓位比例在当前K线收盘价开仓"""
+        strength, risk_score, reason, target = entry
+        conditions = {
+            "trend": "downtrend" if market_data["trend"] == "down" else "uptrend",
+            "volatility": "high" if market_data["volatility"] > self.config.high_volatility else "normal"
+        }
+        size, _ = self.position_manager.calculate_position_size(strength, conditions, risk_score)
+        if size <= 0:
+            return
+
+        fee_rate = self.config.fee_rate
+        notional = min(size * self._equity(bars.ts[i]), self.cash / (1 + fee_rate))
+        if notional <= 0:
+            return
+
+        price = bars.close[i] * (1 + self.config.slippage)
+        trade = _OpenTrade(
+            symbol=bars.symbol,
+            entry_ts=int(bars.ts[i]),
+            entry_price=price,
+            quantity=notional / price,
+            size=size,
+            entry_fee=notional * fee_rate,
+            reason=reason
+        )
+        self.cash -= notional + trade.entry_fee
+        self.position_manager.update_position(bars.symbol, size, "open")
+
+        position = Position(
+            symbol=bars.symbol,
+            entry_price=price,
+            current_price=bars.close[i],
+            quantity=trade.quantity,
+            entry_time=self.clock(),
+            unrealized_pnl=0.0,
+            atr=atr,
+            support_level=support,
+            resistance_level=resistance
+        )
+        self._simulate_exit(bars, i, position, trade, target)
+
+        self.open_trades[bars.symbol] = trade
+        self._seq += 1
+        heapq.heappush(self._exits, (trade.exit_ts, self._seq, trade))
+
+    def _simulate_exit(self, bars: SymbolBars, i: int, position: Position,
+                       trade: _OpenTrade, target: Optional[float]):
+        """
+        向前推演持仓直到离场
+
+        每stop_check_bars根K线按收盘价调用一次get_combined_stop（止损只上移），
+        区间内最低价触及止损按止损价（跳空时按开盘价）成交，最高价触及止盈价按限价成交；
+        同一根K线两者都触及时按止损处理
+        """
+        n = len(bars.close)
+        step = max(1, self.config.stop_check_bars)
+        slippage = self.config.slippage
+        highest = position.entry_price
+
+        decision = self._check_stop(bars, i, position, highest)
+        exit_index, exit_price, exit_reason = n - 1, bars.close[-1] * (1 - slippage), "end_of_data"
+
+        if decision["triggered"]:
+            exit_index, exit_price, exit_reason = i, bars.close[i] * (1 - slippage), decision["stop_type"]
+        else:
+            stop = self.stoploss.active_stops[bars.symbol]
+            j = i + 1
+            while j < n:
+                k = min(j + step, n)
+                stop_hits = np.flatnonzero(bars.low[j:k] <= stop["stop_price"])
+                target_hits = np.flatnonzero(bars.high[j:k] >= target) if target is not None else stop_hits[:0]
+                if len(stop_hits) and (not len(target_hits) or stop_hits[0] <= target_hits[0]):
+                    m = j + stop_hits[0]
+                    exit_index, exit_reason = m, stop["stop_type"]
+                    exit_price = min(bars.open[m], stop["stop_price"]) * (1 - slippage)
+                    break
+                if len(target_hits):
+                    m = j + target_hits[0]
+                    exit_index, exit_price, exit_reason = m, max(bars.open[m], target), "target"
+                    break
+
+                highest = max(highest, bars.high[j:k].max())
+                decision = self._check_stop(bars, k - 1, position, highest)
+                if decision["triggered"]:
+                    exit_index, exit_reason = k - 1, decision["stop_type"]
+                    exit_price = bars.close[k - 1] * (1 - slippage)
+                    break
+                stop = self.stoploss.active_stops[bars.symbol]
+                j = k
+
+        self.stoploss.remove_stop(bars.symbol)
+        trade.exit_index = int(exit_index)
+        trade.exit_ts = int(bars.ts[exit_index])
+        trade.exit_price = float(exit_price)
+        trade.exit_reason = exit_reason
+        trade.bars_held = int(exit_index - i)
+
+    def _check_stop(self, bars: SymbolBars, j: int, position: Position, highest: float) -> Dict:
+        """按第j根K线收盘价计算综合止损并更新活跃止损"""
+        self.clock.set(int(bars.ts[j]))
+        position.current_price = bars.close[j]
+        position.unrealized_pnl = (position.current_price - position.entry_price) * position.quantity
+        decision = self.stoploss.get_combined_stop(position, highest)
+        self.stoploss.update_stop(position.symbol, decision)
+        return decision
+
+    def _settle(self, ts: Optional[int]):
+        """结算离场时间不晚于ts的持仓（ts为None时结算全部）"""
+        while self._exits and (ts is None or self._exits[0][0] <= ts):
+            _, _, trade = heapq.heappop(self._exits)
+            proceeds = trade.quantity * trade.exit_price
+            self.cash += proceeds * (1 - self.config.fee_rate)
+            del self.open_trades[trade.symbol]
+            self.position_manager.update_position(trade.symbol, 0.0, "close")
+            self.closed_trades.append(trade)
+
+    def _equity(self, ts: int) -> float:
+        """现金加持仓按最近收盘价的市值"""
+        equity = self.cash
+        for trade in self.open_trades.values():
+            bars = self.bars[trade.symbol]
+            j = max(0, int(np.searchsorted(bars.ts, ts, side="right")) - 1)
+            equity += trade.quantity * bars.close[j]
+        return equity
+
+    def _build_results(self, symbols: List[str]) -> Tuple[pd.DataFrame, pd.Series]:
+        """生成成交记录，并在全部币种K线时间的并集上计算资金曲线"""
+        fee_rate = self.config.fee_rate
+        records = []
+        for trade in self.closed_trades:
+            cost = trade.quantity * trade.entry_price
+            proceeds = trade.quantity * trade.exit_price
+            fees = trade.entry_fee + proceeds * fee_rate
+            records.append({
+                "symbol": trade.symbol,
+                "entry_time": trade.entry_ts,
+                "exit_time": trade.exit_ts,
+                "entry_price": trade.entry_price,
+                "exit_price": trade.exit_price,
+                "quantity": trade.quantity,
+                "size": trade.size,
+                "fees": fees,
+                "pnl": proceeds - cost - fees,
+                "return": (proceeds - cost - fees) / cost,
+                "bars_held": trade.bars_held,
+                "entry_reason": trade.reason,
+                "exit_reason": trade.exit_reason,
+            })
+        trades = pd.DataFrame(records, columns=[
+            "symbol", "entry_time", "exit_time", "entry_price", "exit_price", "quantity", "size",
+            "fees", "pnl", "return", "bars_held", "entry_reason", "exit_reason"
+        ])
+        trades["entry_time"] = pd.to_datetime(trades["entry_time"], unit="s")
+        trades["exit_time"] = pd.to_datetime(trades["exit_time"], unit="s")
+
+        grid = np.unique(np.concatenate([self.bars[s].ts for s in symbols])) if symbols else np.array([], np.int64)
+        cash_delta = np.zeros(len(grid) + 1)
+        holdings = np.zeros(len(grid))
+        for trade in self.closed_trades:
+            bars = self.bars[trade.symbol]
+            lo = np.searchsorted(grid, trade.entry_ts)
+            hi = np.searchsorted(grid, trade.exit_ts)
+            cash_delta[lo] -= trade.quantity * trade.entry_price + trade.entry_fee
+            cash_delta[hi] += trade.quantity * trade.exit_price * (1 - fee_rate)
+            bar_index = np.searchsorted(bars.ts, grid[lo:hi], side="right") - 1
+            holdings[lo:hi] += trade.quantity * bars.close[bar_index]
+
+        equity = self.config.initial_capital + np.cumsum(cash_delta[:-1]) + holdings
+        return trades, pd.Series(equity, index=pd.to_datetime(grid, unit="s"), name="equity")
+
+    def _statistics(self, trades: pd.DataFrame, equity: pd.Series) -> Dict:
+        """汇总收益、回撤和交易统计"""
+        if equity.empty:
+            return {"total_trades": 0}
+
+        values = equity.to_numpy()
+        drawdown = values / np.maximum.accumulate(values) - 1
+        daily = equity.resample("1D").last().dropna().pct_change().dropna()
+        wins = trades["pnl"] > 0
+        losses = -trades.loc[trades["pnl"] < 0, "pnl"].sum()
+
+        return {
+            "initial_capital": self.config.initial_capital,
+            "final_equity": float(values[-1]),
+            "total_return": float(values[-1] / self.config.initial_capital - 1),
+            "max_drawdown": float(drawdown.min()),
+            "sharpe": float(daily.mean() / daily.std() * math.sqrt(365)) if daily.std() > 0 else 0.0,
+            "total_trades": len(trades),
+            "win_rate": float(wins.mean()) if len(trades) else 0.0,
+            "profit_factor": float(trades.loc[wins, "pnl"].sum() / losses) if losses > 0 else float("inf"),
+            "fees": float(trades["fees"].sum()),
+            "exit_reasons": trades["exit_reason"].value_counts().to_dict(),
+        }
+
+
+def _synthetic_bars(n_bars: int, interval_s: int, seed: int) -> pd.DataFrame:
+    """带跳跃和放量的随机游走K线"""
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_t(3, n_bars) * 0.0008
+    jumps = rng.random(n_bars) < 2e-4
+    returns[jumps] -= rng.exponential(0.03, jumps.sum())
+    close = 100 * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0005, n_bars)) * close
+    volume = rng.lognormal(3, 0.5, n_bars) * (1 + 4 * jumps)
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(1_672_531_200 + np.arange(n_bars) * interval_s, unit="s"),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": volume,
+    })
+
+
+def benchmark_backtest(n_symbols: int = 50, days: int = 365, interval_s: int = 60,
+                       config: Optional[BacktestConfig] = None) -> Dict:
+    """合成数据上的回测耗时：n_symbols个币种 × days天的K线"""
+    engine = BacktestEngine(config)
+    n_bars = days * 86400 // interval_s
+
+    start = time.perf_counter()
+    for k in range(n_symbols):
+        engine.add_symbol(f"SYM{k:02d}", _synthetic_bars(n_bars, interval_s, seed=k))
+    prepare_s = time.perf_counter() - start
+
+    result = engine.run()
+    stats = result.stats
+    report = {
+        "symbols": n_symbols,
+        "bars": stats["bars"],
+        "events": stats["events"],
+        "trades": stats["total_trades"],
+        "prepare_s": round(prepare_s, 2),
+        "run_s": stats["elapsed_s"],
+        "bars_per_sec": round(stats["bars"] / (prepare_s + stats["elapsed_s"])),
+    }
+    print(f"{n_symbols}个币种 × {n_bars}根K线: 预计算 {report['prepare_s']}s, "
+          f"回放 {report['run_s']}s ({report['events']} 个事件, {report['trades']} 笔交易)")
+    return report
@@ -0,0 +1,185 @@
+"""
+回测引擎单元测试
+"""
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "ai"))  # ai包内部按顶层模块名导入prompts等
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import BacktestConfig, BacktestEngine, _synthetic_bars
+
+START = 1_700_000_000
+
+
+def hand_built(bars):
+    """由 (open, high, low, close) 列表构造1小时K线"""
+    opens, highs, lows, closes = (np.array(column, dtype=float) for column in zip(*bars))
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(START + np.arange(len(bars)) * 3600, unit="s"),
+        "open": opens,
+        "high": highs,
+        "low": lows,
+        "close": closes,
+        "volume": np.full(len(bars), 10.0),
+    })
+
+
+class TestPrefilter(unittest.TestCase):
+    """测试候选K线预过滤不改变回测结果"""
+
+    def run_backtest(self, prefilter: bool):
+        engine = BacktestEngine(BacktestConfig(prefilter=prefilter))
+        for k in range(3):
+            engine.add_symbol(f"SYM{k}", _synthetic_bars(30 * 96, 900, seed=k))
+        return engine.run()
+
+    def test_prefilter_matches_full_replay(self):
+        """测试预过滤与逐根K线回放的成交和资金曲线完全一致"""
+        filtered = self.run_backtest(prefilter=True)
+        full = self.run_backtest(prefilter=False)
+
+        self.assertGreater(len(filtered.trades), 0)
+        self.assertLess(filtered.stats["events"], full.stats["events"])
+        pd.testing.assert_frame_equal(filtered.trades, full.trades)
+        pd.testing.assert_series_equal(filtered.equity, full.equity)
+
+
+class TestFills(unittest.TestCase):
+    """在手工K线上测试开平仓成交价、手续费和资金曲线"""
+
+    FEE = 0.001
+    SLIPPAGE = 0.0005
+    CAPITAL = 100_000.0
+    SIZE = 0.1
+
+    def setUp(self):
+        self.engine = BacktestEngine(BacktestConfig(
+            initial_capital=self.CAPITAL, fee_rate=self.FEE, slippage=self.SLIPPAGE, stop_check_bars=2))
+
+    def open_position(self, bars, stop_price: float, target=None, entry_index: int = 1):
+        """在entry_index收盘开仓，止损固定为stop_price，推演到离场并结算"""
+        engine = self.engine
+        engine.add_symbol("TEST", hand_built(bars))
+        symbol_bars = engine.bars["TEST"]
+        checks = []
+
+        def fixed_stop(bars, j, position, highest):
+            checks.append(j)
+            decision = {"triggered": False, "stop_type": "fixed", "stop_price": stop_price}
+            engine.stoploss.update_stop(position.symbol, decision)
+            return decision
+
+        engine.clock.set(int(symbol_bars.ts[entry_index]))
+        with patch.object(engine, "_check_stop", side_effect=fixed_stop), \
+                patch.object(engine.position_manager, "calculate_position_size", return_value=(self.SIZE, {})):
+            engine._open(symbol_bars, entry_index, (8.0, 10.0, "test", target),
+                         {"trend": "up", "volatility": 0.01}, atr=1.0, support=90.0, resistance=120.0)
+
+        trade = engine.open_trades["TEST"]
+        engine._settle(None)
+        trades, equity = engine._build_results(["TEST"])
+        return trade, trades.iloc[0], equity, checks
+
+    def test_fees_and_slippage(self):
+        """测试滑点计入开仓价、双边手续费和资金曲线"""
+        bars = [(99, 101, 98, 100), (100, 101, 99, 100), (101, 104, 99, 103),
+                (103, 108, 102, 107), (107, 112, 106, 111), (111, 112, 110, 111)]
+        trade, row, equity, _ = self.open_position(bars, stop_price=90.0, target=110.0)
+
+        entry_price = 100 * (1 + self.SLIPPAGE)
+        notional = self.SIZE * self.CAPITAL
+        quantity = notional / entry_price
+        proceeds = quantity * 110.0
+        fees = notional * self.FEE + proceeds * self.FEE
+
+        self.assertAlmostEqual(row["entry_price"], entry_price)
+        self.assertAlmostEqual(row["quantity"], quantity)
+        self.assertAlmostEqual(row["exit_price"], 110.0)
+        self.assertAlmostEqual(row["fees"], fees)
+        self.assertAlmostEqual(row["pnl"], proceeds - notional - fees)
+        self.assertAlmostEqual(row["return"], (proceeds - notional - fees) / notional)
+
+        final_cash = self.CAPITAL - notional * (1 + self.FEE) + proceeds * (1 - self.FEE)
+        self.assertAlmostEqual(self.engine.cash, final_cash)
+        self.assertAlmostEqual(self.engine.cash - self.CAPITAL, row["pnl"])
+
+        # 开仓前为初始资金，持仓期间按收盘价计市值，离场后等于现金
+        values = equity.to_numpy()
+        self.assertEqual(values[0], self.CAPITAL)
+        self.assertAlmostEqual(values[1], self.CAPITAL - notional * (1 + self.FEE) + quantity * 100)
+        self.assertAlmostEqual(values[3], self.CAPITAL - notional * (1 + self.FEE) + quantity * 107)
+        self.assertAlmostEqual(values[4], final_cash)
+        self.assertAlmostEqual(values[-1], final_cash)
+
+    def test_target_fill(self):
+        """测试触及止盈价按限价成交（不计滑点）"""
+        bars = [(99, 101, 98, 100), (100, 101, 99, 100), (101, 104, 99, 103),
+                (103, 111, 102, 108), (108, 109, 107, 108)]
+        trade, row, _, _ = self.open_position(bars, stop_price=95.0, target=110.0)
+
+        self.assertEqual(row["exit_reason"], "target")
+        self.assertAlmostEqual(row["exit_price"], 110.0)
+        self.assertEqual(row["bars_held"], 2)
+        self.assertEqual(trade.exit_ts, START + 3 * 3600)
+
+    def test_target_gap_fills_at_open(self):
+        """测试跳空高开越过止盈价时按开盘价成交"""
+        bars = [(99, 101, 98, 100), (100, 101, 99, 100), (112, 113, 111, 112), (112, 113, 111, 112)]
+        _, row, _, _ = self.open_position(bars, stop_price=95.0, target=110.0)
+
+        self.assertEqual(row["exit_reason"], "target")
+        self.assertAlmostEqual(row["exit_price"], 112.0)
+
+    def test_stop_fill(self):
+        """测试盘中触及止损按止损价减滑点成交"""
+        bars = [(99, 101, 98, 100), (100, 101, 99, 100), (99, 100, 94, 96), (96, 97, 95, 96)]
+        _, row, _, _ = self.open_position(bars, stop_price=95.0, target=110.0)
+
+        self.assertEqual(row["exit_reason"], "fixed")
+        self.assertAlmostEqual(row["exit_price"], 95.0 * (1 - self.SLIPPAGE))
+        self.assertEqual(row["bars_held"], 1)
+
+    def test_stop_gap_fills_at_open(self):
+        """测试跳空低开穿过止损价时按开盘价成交"""
+        bars = [(99, 101, 98, 100), (100, 101, 99, 100), (90, 91, 88, 89), (89, 90, 88, 89)]
+        _, row, _, _ = self.open_position(bars, stop_price=95.0, target=110.0)
+
+        self.assertEqual(row["exit_reason"], "fixed")
+        self.assertAlmostEqual(row["exit_price"], 90.0 * (1 - self.SLIPPAGE))
+
+    def test_stop_before_target_in_same_bar(self):
+        """测试同一根K线同时触及止损和止盈时按止损处理"""
+        bars = [(99, 101, 98, 100), (100, 101, 99, 100), (100, 111, 94, 100), (100, 101, 99, 100)]
+        _, row, _, _ = self.open_position(bars, stop_price=95.0, target=110.0)
+
+        self.assertEqual(row["exit_reason"], "fixed")
+        self.assertAlmostEqual(row["exit_price"], 95.0 * (1 - self.SLIPPAGE))
+
+    def test_stop_rechecked_every_block(self):
+        """测试每stop_check_bars根K线重算止损，之后的区间按新止损判定"""
+        bars = [(99, 101, 98, 100)] * 2 + [(100, 102, 99, 101)] * 4 + [(100, 101, 93, 95), (95, 96, 94, 95)]
+        trade, row, _, checks = self.open_position(bars, stop_price=95.0)
+
+        # 入场K线一次，之后每2根K线在区间末尾一次，第6根K线在止损区间内触发
+        self.assertEqual(checks, [1, 3, 5])
+        self.assertEqual(row["exit_reason"], "fixed")
+        self.assertEqual(trade.exit_index, 6)
+
+    def test_end_of_data(self):
+        """测试未触及止损止盈时按最后收盘价减滑点离场"""
+        bars = [(99, 101, 98, 100), (100, 101, 99, 100), (100, 102, 99, 101), (101, 103, 100, 102)]
+        _, row, _, _ = self.open_position(bars, stop_price=90.0, target=120.0)
+
+        self.assertEqual(row["exit_reason"], "end_of_data")
+        self.assertAlmostEqual(row["exit_price"], 102.0 * (1 - self.SLIPPAGE))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
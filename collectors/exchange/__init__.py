@@ -5,7 +5,9 @@ Tiger系统 - 交易所数据采集模块
 from .okx_collector import OKXCollector
 from .binance_collector import BinanceCollector
 from .normalizer import DataNormalizer
+from .fast_normalizer import FastNormalizer
 from .detector import AnomalyDetector
+from .batch_detector import BatchAnomalyDetector
 from .validator import DataValidator
 from .alert_manager import AlertManager
 
@@ -13,7 +15,9 @@ __all__ = [
     'OKXCollector',
     'BinanceCollector',
     'DataNormalizer',
+    'FastNormalizer',
     'AnomalyDetector',
+    'BatchAnomalyDetector',
     'DataValidator',
     'AlertManager'
 ]
\ No newline at end of file
@@ -3,8 +3,10 @@
 配合高频监控，实时触发预警
 """
 import asyncio
+import time
+from collections import OrderedDict, deque
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import logging
@@ -38,11 +40,12 @@ class AlertManager:
     
     def __init__(self, config: Dict = None):
         self.config = config or self._get_default_config()
-        self.active_alerts = {}  # 活跃预警
-        self.alert_history = []  # 历史预警
+        self.active_alerts = {}  # 活跃预警（按触发顺序）
+        self.alert_history = deque()  # 历史预警（按触发顺序）
         self.alert_callbacks = []  # 预警回调
         self.alert_counters = {}  # 预警计数器
-        self.rate_limiter = {}  # 速率限制
+        self.last_fired: "OrderedDict[Tuple[str, str], float]" = OrderedDict()  # (类型, 币种) -> 最近触发时间
+        self.rate_limiter = deque()  # 滑动窗口内的预警触发时间
         
     def _get_default_config(self) -> Dict:
         """获取默认配置"""
@@ -281,6 +284,7 @@ class AlertManager:
         # 存储预警
         self.active_alerts[alert_id] = alert
         self.alert_history.append(alert)
+        self._mark_fired(type, symbol)
         
         # 更新计数器
         self._update_counters(type, symbol)
@@ -295,30 +299,38 @@ class AlertManager:
     
     def _is_duplicate(self, type: str, symbol: str) -> bool:
         """检查是否重复预警"""
-        key = f"{type}_{symbol}"
-        now = datetime.now(timezone.utc)
-        
-        # 检查去重窗口内是否有相同预警
-        for alert in self.alert_history[-100:]:  # 只检查最近100条
-            if alert.type == type and alert.symbol == symbol:
-                time_diff = (now - alert.triggered_at).total_seconds()
-                if time_diff < self.config["dedup_window"]:
-                    return True
+        now = time.monotonic()
+        self._expire_fired(now)
         
-        return False
+        # 过期条目已被清除，索引中仍存在即处于去重窗口内
+        return (type, symbol) in self.last_fired
+    
+    def _mark_fired(self, type: str, symbol: str):
+        """更新去重索引"""
+        key = (type, symbol)
+        self.last_fired[key] = time.monotonic()
+        self.last_fired.move_to_end(key)
+    
+    def _expire_fired(self, now: float):
+        """从最旧的一端清除超出去重窗口的索引条目"""
+        window = self.config["dedup_window"]
+        while self.last_fired:
+            key, fired_at = next(iter(self.last_fired.items()))
+            if now - fired_at < window:
+                break
+            self.last_fired.popitem(last=False)
     
     def _check_rate_limit(self) -> bool:
-        """检查速率限制"""
-        now = datetime.now(timezone.utc)
-        minute_key = now.strftime("%Y%m%d%H%M")
+        """检查速率限制（60秒滑动窗口）"""
+        now = time.monotonic()
         
-        if minute_key not in self.rate_limiter:
-            self.rate_limiter = {minute_key: 0}  # 清理旧数据
+        while self.rate_limiter and now - self.rate_limiter[0] >= 60:
+            self.rate_limiter.popleft()
         
-        if self.rate_limiter[minute_key] >= self.config["max_alerts_per_minute"]:
+        if len(self.rate_limiter) >= self.config["max_alerts_per_minute"]:
             return False
         
-        self.rate_limiter[minute_key] += 1
+        self.rate_limiter.append(now)
         return True
     
     def _update_counters(self, type: str, symbol: str):
@@ -383,7 +395,10 @@ class AlertManager:
             "active_alerts": len(self.active_alerts),
             "total_alerts": len(self.alert_history),
             "counters": self.alert_counters,
-            "rate_limit_status": self.rate_limiter
+            "rate_limit_status": {
+                "alerts_last_minute": len(self.rate_limiter),
+                "max_alerts_per_minute": self.config["max_alerts_per_minute"]
+            }
         }
     
     def clear_old_alerts(self):
@@ -391,20 +406,21 @@ class AlertManager:
         now = datetime.now(timezone.utc)
         ttl = timedelta(seconds=self.config["alert_ttl"])
         
-        # 清理活跃预警
+        # 活跃预警按触发顺序存放，遇到第一个未过期的即可停止
         expired = []
         for alert_id, alert in self.active_alerts.items():
-            if now - alert.triggered_at > ttl:
-                expired.append(alert_id)
+            if now - alert.triggered_at <= ttl:
+                break
+            expired.append(alert_id)
         
         for alert_id in expired:
             self.resolve_alert(alert_id)
         
         # 清理历史记录
-        self.alert_history = [
-            a for a in self.alert_history
-            if now - a.triggered_at <= ttl
-        ]
+        while self.alert_history and now - self.alert_history[0].triggered_at > ttl:
+            self.alert_history.popleft()
+        
+        self._expire_fired(time.monotonic())
         
         logger.info(f"清理过期预警: {len(expired)}个")
 
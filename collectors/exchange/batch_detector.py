@@ -0,0 +1,230 @@
+"""
+横截面批量异常检测
+将所有币种的特征快照组织成 币种 × 特征 矩阵，
+一次NumPy运算评估AnomalyDetector和AlertManager的全部阈值规则，只输出命中项
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from .detector import AnomalyDetector
+from .alert_manager import AlertManager, AlertLevel
+
+logger = logging.getLogger(__name__)
+
+# 快照特征列（缺失值用NaN表示，NaN不会命中任何规则）
+FEATURES = ("price_change", "volume_multiple", "funding_rate", "cross_spread")
+PRICE_CHANGE, VOLUME_MULTIPLE, FUNDING_RATE, CROSS_SPREAD = range(len(FEATURES))
+
+# 与AnomalyDetector._calculate_severity一致的严重程度分档
+SEVERITY_BOUNDS = np.array([1.5, 3.0, 5.0])
+SEVERITY_LABELS = np.array(["low", "medium", "high", "critical"])
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    """阈值规则"""
+    source: str  # detector / alert_manager
+    type: str
+    feature: int
+    threshold: float
+    use_abs: bool = True
+    inclusive: bool = False  # True: >=，False: >
+    level_bounds: Tuple[float, ...] = ()  # 预警分级下界（升序）
+    levels: Tuple[AlertLevel, ...] = ()
+
+
+class BatchAnomalyDetector:
+    """横截面批量异常检测器"""
+
+    def __init__(self, detector: AnomalyDetector = None,
+                 alert_manager: AlertManager = None,
+                 alert_thresholds: Dict = None):
+        self.detector = detector or AnomalyDetector()
+        self.alert_manager = alert_manager
+        self.alert_thresholds = {**self._get_default_alert_thresholds(), **(alert_thresholds or {})}
+
+        self.rules = self._build_rules()
+        self._compile_rules()
+
+    def _get_default_alert_thresholds(self) -> Dict:
+        """AlertManager各检查方法的默认阈值"""
+        return {
+            "price_change": 0.01,
+            "volume_multiplier": 3.0,
+            "funding_rate": 0.0005,
+            "arbitrage": 0.003
+        }
+
+    def _build_rules(self) -> List[ThresholdRule]:
+        """从两个检测器的配置生成规则表"""
+        config = self.detector.config
+        thresholds = self.alert_thresholds
+
+        return [
+            # AnomalyDetector规则（严格大于）
+            ThresholdRule("detector", "price_anomaly", PRICE_CHANGE,
+                          config["price_change_threshold"]),
+            ThresholdRule("detector", "volume_anomaly", VOLUME_MULTIPLE,
+                          config["volume_multiplier"], use_abs=False),
+            ThresholdRule("detector", "funding_rate_anomaly", FUNDING_RATE,
+                          config["funding_rate_threshold"]),
+            ThresholdRule("detector", "cross_exchange_anomaly", CROSS_SPREAD, 0.005),
+            # AlertManager规则（大于等于，带分级）
+            ThresholdRule("alert_manager", "price_change", PRICE_CHANGE,
+                          thresholds["price_change"], inclusive=True,
+                          level_bounds=(thresholds["price_change"], 0.02, 0.03, 0.05),
+                          levels=(AlertLevel.LOW, AlertLevel.MEDIUM,
+                                  AlertLevel.HIGH, AlertLevel.CRITICAL)),
+            ThresholdRule("alert_manager", "volume_spike", VOLUME_MULTIPLE,
+                          thresholds["volume_multiplier"], use_abs=False, inclusive=True,
+                          level_bounds=(thresholds["volume_multiplier"], 5.0),
+                          levels=(AlertLevel.MEDIUM, AlertLevel.HIGH)),
+            ThresholdRule("alert_manager", "funding_rate", FUNDING_RATE,
+                          thresholds["funding_rate"], inclusive=True,
+                          level_bounds=(thresholds["funding_rate"], 0.001),
+                          levels=(AlertLevel.MEDIUM, AlertLevel.HIGH)),
+            ThresholdRule("alert_manager", "arbitrage_opportunity", CROSS_SPREAD,
+                          thresholds["arbitrage"], inclusive=True,
+                          level_bounds=(thresholds["arbitrage"],),
+                          levels=(AlertLevel.HIGH,)),
+        ]
+
+    def _compile_rules(self):
+        """把规则表展开成按列对齐的数组"""
+        self._features = np.array([r.feature for r in self.rules], dtype=np.intp)
+        self._thresholds = np.array([r.threshold for r in self.rules], dtype=np.float64)
+        self._use_abs = np.array([r.use_abs for r in self.rules], dtype=bool)
+        self._inclusive = np.array([r.inclusive for r in self.rules], dtype=bool)
+
+    @staticmethod
+    def build_snapshot(rows: Dict[str, Dict[str, float]]) -> Tuple[List[str], np.ndarray]:
+        """把 symbol -> {特征: 值} 的字典转换为特征矩阵"""
+        symbols = list(rows.keys())
+        matrix = np.full((len(symbols), len(FEATURES)), np.nan)
+
+        for i, symbol in enumerate(symbols):
+            features = rows[symbol]
+            for j, name in enumerate(FEATURES):
+                value = features.get(name)
+                if value is not None:
+                    matrix[i, j] = value
+
+        return symbols, matrix
+
+    def evaluate(self, symbols: Sequence[str], matrix: np.ndarray) -> List[Dict]:
+        """一次性评估全部规则，只返回命中项"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[1] != len(FEATURES):
+            raise ValueError(f"快照矩阵形状错误: {matrix.shape}, 需要(n, {len(FEATURES)})")
+        if matrix.shape[0] != len(symbols):
+            raise ValueError(f"币种数量与快照行数不一致: {len(symbols)} != {matrix.shape[0]}")
+
+        # n × R：每个币种在每条规则对应特征上的取值
+        raw = matrix[:, self._features]
+        values = np.where(self._use_abs, np.abs(raw), raw)
+
+        # NaN参与比较结果为False，缺失特征自然不会命中
+        with np.errstate(invalid="ignore"):
+            mask = np.where(self._inclusive, values >= self._thresholds, values > self._thresholds)
+
+        rows, cols = np.nonzero(mask)
+        if rows.size == 0:
+            return []
+
+        hit_values = values[rows, cols]
+        hit_raw = raw[rows, cols]
+        ratios = hit_values / self._thresholds[cols]
+        severities = SEVERITY_LABELS[np.searchsorted(SEVERITY_BOUNDS, ratios, side="right")]
+
+        # 预警分级：规则数量固定且很少，按规则分组计算
+        levels = np.empty(rows.size, dtype=object)
+        for rule_index in np.unique(cols):
+            rule = self.rules[rule_index]
+            if not rule.levels:
+                continue
+            selected = cols == rule_index
+            positions = np.searchsorted(rule.level_bounds, hit_values[selected], side="right") - 1
+            levels[selected] = [rule.levels[p] for p in np.clip(positions, 0, None)]
+
+        timestamp = datetime.now(timezone.utc)
+        hits = []
+        for k in range(rows.size):
+            rule = self.rules[cols[k]]
+            hits.append({
+                "type": rule.type,
+                "source": rule.source,
+                "symbol": symbols[rows[k]],
+                "feature": FEATURES[rule.feature],
+                "value": float(hit_raw[k]),
+                "threshold": rule.threshold,
+                "direction": "positive" if hit_raw[k] > 0 else "negative",
+                "severity": str(severities[k]),
+                "level": levels[k],
+                "timestamp": timestamp
+            })
+
+        return hits
+
+    async def detect(self, symbols: Sequence[str], matrix: np.ndarray) -> List[Dict]:
+        """评估快照并分发命中项"""
+        hits = self.evaluate(symbols, matrix)
+
+        for hit in hits:
+            if hit["source"] == "detector":
+                await self.detector._trigger_anomaly(hit)
+            elif self.alert_manager is not None:
+                await self.alert_manager._create_alert(
+                    type=hit["type"],
+                    level=hit["level"],
+                    symbol=hit["symbol"],
+                    message=self._format_message(hit),
+                    data={
+                        "feature": hit["feature"],
+                        "value": hit["value"],
+                        "threshold": hit["threshold"]
+                    }
+                )
+
+        return hits
+
+    @staticmethod
+    def _format_message(hit: Dict) -> str:
+        """生成预警消息"""
+        symbol = hit["symbol"]
+        value = hit["value"]
+
+        if hit["type"] == "price_change":
+            direction = "暴涨" if value > 0 else "暴跌"
+            return f"{symbol}{direction}{abs(value) * 100:.2f}%"
+        elif hit["type"] == "volume_spike":
+            return f"{symbol}成交量激增{value:.1f}倍"
+        elif hit["type"] == "funding_rate":
+            direction = "正向" if value > 0 else "负向"
+            return f"{symbol}资金费率异常{direction}: {value:.4%}"
+        else:
+            return f"套利机会 {symbol}: 价差{abs(value) * 100:.2f}%"
+
+
+# 测试函数
+async def test_batch_detector():
+    """测试横截面批量检测"""
+    batch = BatchAnomalyDetector(alert_manager=AlertManager())
+
+    symbols, matrix = batch.build_snapshot({
+        "BTCUSDT": {"price_change": 0.001, "volume_multiple": 1.2, "cross_spread": 0.0002},
+        "ETHUSDT": {"price_change": -0.045, "volume_multiple": 6.5},
+        "SOLUSDT": {"funding_rate": 0.0015, "cross_spread": 0.006},
+    })
+
+    hits = await batch.detect(symbols, matrix)
+    for hit in hits:
+        print(f"[{hit['source']}] {hit['type']} {hit['symbol']} {hit['value']:.4f} {hit['severity']}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(test_batch_detector())
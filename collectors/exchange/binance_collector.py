@@ -3,7 +3,6 @@ Binance交易所数据采集器
 实现REST API和WebSocket数据采集
 """
 import asyncio
-import json
 import time
 import hmac
 import hashlib
@@ -14,6 +13,9 @@ import websockets
 from dataclasses import dataclass
 import logging
 
+from . import codec
+from .codec import MessageCapture
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -26,6 +28,7 @@ class BinanceConfig:
     futures_rest_url: str = "https://fapi.binance.com"
     futures_ws_url: str = "wss://fstream.binance.com/ws"
     demo_mode: bool = True  # 模拟模式
+    capture_path: str = ""  # 原始WebSocket消息抓包文件（用于回放测试）
 
 class BinanceCollector:
     """Binance数据采集器"""
@@ -37,6 +40,8 @@ class BinanceCollector:
         self.futures_ws_conn = None
         self.running = False
         self.subscriptions = set()
+        self.capture = MessageCapture(self.config.capture_path) if self.config.capture_path else None
+        self.decoder = codec.PushDecoder("Binance")
         self.rate_limiter = BinanceRateLimiter()
         
     async def initialize(self):
@@ -53,6 +58,8 @@ class BinanceCollector:
             await self.futures_ws_conn.close()
         if self.session:
             await self.session.close()
+        if self.capture:
+            self.capture.close()
         logger.info("Binance采集器已关闭")
     
     # REST API 方法
@@ -173,10 +180,10 @@ class BinanceCollector:
                 
             if method == "GET":
                 async with self.session.get(url, params=params, headers=headers) as response:
-                    return await response.json()
+                    return codec.loads(await response.read())
             else:
                 async with self.session.request(method, url, json=body, headers=headers) as response:
-                    return await response.json()
+                    return codec.loads(await response.read())
                     
         except Exception as e:
             logger.error(f"请求失败 {url}: {e}")
@@ -242,7 +249,7 @@ class BinanceCollector:
             "id": int(time.time())
         }
         
-        await self.ws_conn.send(json.dumps(msg))
+        await self.ws_conn.send(codec.dumps(msg))
         self.subscriptions.update(streams)
         logger.info(f"已订阅: {streams}")
     
@@ -251,9 +258,11 @@ class BinanceCollector:
         while self.running:
             try:
                 msg = await asyncio.wait_for(ws.recv(), timeout=30)
-                data = json.loads(msg)
+                if self.capture:
+                    self.capture.write(msg)
+                data = self.decoder.decode(msg)
                 
-                if "result" in data:
+                if isinstance(data, dict) and "result" in data:
                     # 订阅响应
                     if data["result"] is None:
                         logger.info(f"订阅成功: {data.get('id')}")
@@ -264,35 +273,38 @@ class BinanceCollector:
             except asyncio.TimeoutError:
                 # 发送ping
                 pong_msg = {"method": "ping"}
-                await ws.send(json.dumps(pong_msg))
+                await ws.send(codec.dumps(pong_msg))
             except Exception as e:
                 logger.error(f"处理{ws_type} WebSocket消息失败: {e}")
                 await self._reconnect_ws(ws_type)
                 break
     
-    async def _process_ws_data(self, data: Dict, ws_type: str):
-        """处理WebSocket推送数据"""
-        if "stream" in data:
-            stream = data["stream"]
-            stream_data = data["data"]
+    async def _process_ws_data(self, data: Any, ws_type: str):
+        """处理WebSocket推送数据（类型化结构或字典）"""
+        if not isinstance(data, dict):
+            stream, stream_data = data.stream, data.data
+        elif "stream" in data:
+            stream, stream_data = data["stream"], data["data"]
+        else:
+            return
+        
+        # 解析stream类型
+        parts = stream.split("@")
+        if len(parts) == 2:
+            symbol = parts[0].upper()
+            stream_type = parts[1]
             
-            # 解析stream类型
-            parts = stream.split("@")
-            if len(parts) == 2:
-                symbol = parts[0].upper()
-                stream_type = parts[1]
-                
-                processed_data = {
-                    "source": "Binance",
-                    "type": ws_type,
-                    "symbol": symbol,
-                    "stream_type": stream_type,
-                    "data": stream_data,
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                }
-                
-                # TODO: 发送到消息队列
-                logger.debug(f"收到{stream_type}数据: {symbol}")
+            processed_data = {
+                "source": "Binance",
+                "type": ws_type,
+                "symbol": symbol,
+                "stream_type": stream_type,
+                "data": stream_data,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+            
+            # TODO: 发送到消息队列
+            logger.debug(f"收到{stream_type}数据: {symbol}")
     
     async def _reconnect_ws(self, ws_type: str):
         """重连WebSocket"""
@@ -312,7 +324,7 @@ class BinanceCollector:
                 "id": int(time.time())
             }
             ws = self.ws_conn if ws_type == "spot" else self.futures_ws_conn
-            await ws.send(json.dumps(msg))
+            await ws.send(codec.dumps(msg))
 
 class BinanceRateLimiter:
     """Binance速率限制器"""
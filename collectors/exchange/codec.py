@@ -0,0 +1,363 @@
+"""
+JSON编解码层
+优先使用orjson/msgspec，未安装时回退到标准库json；
+msgspec可用时行情、成交、深度推送按频道解码为类型化结构（PushDecoder）
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+# 后端名称 -> (loads, dumps)，dumps统一返回str以便直接通过WebSocket发送
+BACKENDS: Dict[str, Tuple[Callable, Callable]] = {
+    "json": (json.loads, json.dumps)
+}
+
+if orjson is not None:
+    BACKENDS["orjson"] = (orjson.loads, lambda obj: orjson.dumps(obj).decode())
+
+if msgspec is not None:
+    _msgspec_decoder = msgspec.json.Decoder()
+    _msgspec_encoder = msgspec.json.Encoder()
+    BACKENDS["msgspec"] = (_msgspec_decoder.decode, lambda obj: _msgspec_encoder.encode(obj).decode())
+
+# 无类型解码orjson最快，其次msgspec
+BACKEND_PRIORITY = ("orjson", "msgspec", "json")
+
+backend = "json"
+loads, dumps = BACKENDS["json"]
+
+
+def set_backend(name: str = None) -> str:
+    """切换JSON后端，未指定时按优先级选择已安装的后端"""
+    global backend, loads, dumps
+
+    if name is None:
+        name = next(n for n in BACKEND_PRIORITY if n in BACKENDS)
+    elif name not in BACKENDS:
+        raise ValueError(f"JSON后端不可用: {name}, 可用: {list(BACKENDS)}")
+
+    backend = name
+    loads, dumps = BACKENDS[name]
+    logger.debug(f"JSON后端: {name}")
+    return name
+
+
+set_backend(os.getenv("TIGER_JSON_BACKEND") or None)
+
+
+# 类型化消息结构（需要msgspec），字段名与交易所原始字段一致
+MESSAGE_TYPES: Dict[Tuple[str, str], Any] = {}
+
+if msgspec is not None:
+
+    class OKXArg(msgspec.Struct):
+        """OKX推送频道参数"""
+        channel: str
+        instId: str = ""
+
+    class OKXTicker(msgspec.Struct):
+        """OKX行情"""
+        instId: str
+        last: str
+        bidPx: str = "0"
+        bidSz: str = "0"
+        askPx: str = "0"
+        askSz: str = "0"
+        open24h: str = "0"
+        high24h: str = "0"
+        low24h: str = "0"
+        vol24h: str = "0"
+        volCcy24h: str = "0"
+        ts: str = ""
+
+    class OKXTrade(msgspec.Struct):
+        """OKX成交"""
+        instId: str
+        tradeId: str
+        px: str
+        sz: str
+        side: str
+        ts: str = ""
+
+    class OKXBook(msgspec.Struct):
+        """OKX深度"""
+        asks: List[List[str]]
+        bids: List[List[str]]
+        ts: str = ""
+
+    class OKXTickerPush(msgspec.Struct):
+        arg: OKXArg
+        data: List[OKXTicker]
+
+    class OKXTradePush(msgspec.Struct):
+        arg: OKXArg
+        data: List[OKXTrade]
+
+    class OKXBookPush(msgspec.Struct):
+        arg: OKXArg
+        data: List[OKXBook]
+
+    class BinanceTicker(msgspec.Struct):
+        """Binance 24hrTicker推送"""
+        s: str
+        c: str
+        b: str = "0"
+        B: str = "0"
+        a: str = "0"
+        A: str = "0"
+        o: str = "0"
+        h: str = "0"
+        l: str = "0"
+        v: str = "0"
+        q: str = "0"
+        E: int = 0
+
+    class BinanceTrade(msgspec.Struct):
+        """Binance trade推送"""
+        s: str
+        t: int
+        p: str
+        q: str
+        T: int
+        m: bool
+
+    class BinanceDepth(msgspec.Struct):
+        """Binance有限档深度推送"""
+        lastUpdateId: int
+        bids: List[List[str]]
+        asks: List[List[str]]
+
+    class BinanceTickerStream(msgspec.Struct):
+        stream: str
+        data: BinanceTicker
+
+    class BinanceTradeStream(msgspec.Struct):
+        stream: str
+        data: BinanceTrade
+
+    class BinanceDepthStream(msgspec.Struct):
+        stream: str
+        data: BinanceDepth
+
+    MESSAGE_TYPES.update({
+        ("OKX", "ticker"): OKXTickerPush,
+        ("OKX", "trade"): OKXTradePush,
+        ("OKX", "depth"): OKXBookPush,
+        ("Binance", "ticker"): BinanceTickerStream,
+        ("Binance", "trade"): BinanceTradeStream,
+        ("Binance", "depth"): BinanceDepthStream,
+    })
+
+
+class TypedDecoder:
+    """按(交易所, 消息类型)解码推送消息，msgspec不可用时回退为字典"""
+
+    def __init__(self, exchange: str, shape: str):
+        message_type = MESSAGE_TYPES.get((exchange, shape))
+        self.typed = message_type is not None
+
+        if self.typed:
+            self._decode = msgspec.json.Decoder(message_type).decode
+        else:
+            self._decode = loads
+
+    def decode(self, payload: Union[str, bytes]) -> Any:
+        """解码单条消息"""
+        return self._decode(payload)
+
+
+def _okx_shape(channel: str) -> Optional[Tuple[str, str]]:
+    if channel == "tickers":
+        return ("OKX", "ticker")
+    if channel == "trades":
+        return ("OKX", "trade")
+    if channel.startswith("books"):
+        return ("OKX", "depth")
+    return None
+
+
+def _binance_shape(stream: str) -> Optional[Tuple[str, str]]:
+    stream_type = stream.split("@", 1)[-1]
+    if stream_type == "ticker":
+        return ("Binance", "ticker")
+    if stream_type == "trade":
+        return ("Binance", "trade")
+    if stream_type.startswith("depth"):
+        return ("Binance", "depth")
+    return None
+
+
+def classify_message(message: Dict) -> Optional[Tuple[str, str]]:
+    """根据已解码消息判断(交易所, 消息类型)"""
+    if "arg" in message and "data" in message:
+        return _okx_shape(message["arg"].get("channel", ""))
+    elif "stream" in message:
+        return _binance_shape(message["stream"])
+    return None
+
+
+def _field_value(frame: Union[str, bytes], marker: str) -> Optional[str]:
+    """原始消息中第一个marker之后、下一个引号之前的字符串"""
+    if isinstance(frame, (bytes, bytearray)):
+        start = frame.find(marker.encode())
+        if start < 0:
+            return None
+        start += len(marker)
+        end = frame.find(b'"', start)
+        return frame[start:end].decode() if end > start else None
+    start = frame.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    end = frame.find('"', start)
+    return frame[start:end] if end > start else None
+
+
+def classify_frame(frame: Union[str, bytes]) -> Optional[Tuple[str, str]]:
+    """不解码，按原始消息中的channel/stream字段判断(交易所, 消息类型)"""
+    channel = _field_value(frame, '"channel":"')
+    if channel is not None:
+        return _okx_shape(channel)
+    stream = _field_value(frame, '"stream":"')
+    if stream is not None:
+        return _binance_shape(stream)
+    return None
+
+
+class PushDecoder:
+    """
+    线上WebSocket消息解码
+    
+    行情、成交、深度推送按频道选择TypedDecoder解码为类型化结构；
+    订阅响应等其他消息（以及结构不符的推送）解码为字典
+    """
+
+    def __init__(self, exchange: str):
+        self.decoders = {shape: TypedDecoder(*shape) for shape in MESSAGE_TYPES if shape[0] == exchange}
+
+    def decode(self, payload: Union[str, bytes]) -> Any:
+        """解码单条消息"""
+        decoder = self.decoders.get(classify_frame(payload)) if self.decoders else None
+        if decoder is not None:
+            try:
+                return decoder.decode(payload)
+            except msgspec.ValidationError:
+                pass  # 如带channel的订阅响应
+        return loads(payload)
+
+
+class MessageCapture:
+    """把原始WebSocket消息逐行写入文件，供回放测试使用"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+
+    def write(self, message: Union[str, bytes]):
+        """记录一条原始消息"""
+        if isinstance(message, str):
+            message = message.encode()
+        self._file.write(message.rstrip(b"\n") + b"\n")
+
+    def close(self):
+        """关闭文件"""
+        self._file.close()
+
+
+# 性能测试
+def load_capture(paths: List[str]) -> List[bytes]:
+    """读取抓包文件（每行一条原始消息）"""
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.extend(line.rstrip(b"\n") for line in f if line.strip())
+    return frames
+
+
+def _synthetic_frames(count: int) -> List[bytes]:
+    """没有抓包文件时生成与线上结构一致的消息"""
+    now = int(time.time() * 1000)
+    levels = [[f"{67500 - i:.1f}", "1.25", "0", "3"] for i in range(20)]
+    templates = [
+        {"arg": {"channel": "tickers", "instId": "BTC-USDT"},
+         "data": [{"instId": "BTC-USDT", "last": "67500.5", "bidPx": "67500.0", "bidSz": "2.0",
+                   "askPx": "67501.0", "askSz": "1.5", "open24h": "67000.0", "high24h": "68000.0",
+                   "low24h": "66500.0", "vol24h": "5432.1", "volCcy24h": "365000000", "ts": str(now)}]},
+        {"arg": {"channel": "trades", "instId": "BTC-USDT"},
+         "data": [{"instId": "BTC-USDT", "tradeId": "130639474", "px": "67500.1", "sz": "0.012",
+                   "side": "buy", "ts": str(now)}]},
+        {"arg": {"channel": "books", "instId": "BTC-USDT"},
+         "data": [{"asks": levels, "bids": levels, "ts": str(now)}]},
+        {"stream": "btcusdt@trade",
+         "data": {"e": "trade", "E": now, "s": "BTCUSDT", "t": 12345, "p": "67500.10",
+                  "q": "0.012", "T": now, "m": True}},
+        {"stream": "btcusdt@depth20@100ms",
+         "data": {"lastUpdateId": 160, "bids": [lv[:2] for lv in levels], "asks": [lv[:2] for lv in levels]}},
+    ]
+    encoded = [json.dumps(t).encode() for t in templates]
+    return [encoded[i % len(encoded)] for i in range(count)]
+
+
+def benchmark_replay(paths: List[str] = None, count: int = 50000) -> Dict:
+    """回放抓包消息，对比各JSON后端及类型化解码的吞吐量"""
+    frames = load_capture(paths) if paths else _synthetic_frames(count)
+    total_bytes = sum(len(f) for f in frames)
+    results = {}
+
+    for name, (decode, _) in BACKENDS.items():
+        start = time.perf_counter()
+        for frame in frames:
+            decode(frame)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "msgs_per_sec": round(len(frames) / elapsed),
+            "mb_per_sec": round(total_bytes / elapsed / 1e6, 1)
+        }
+
+    if MESSAGE_TYPES:
+        # 预先按消息类型分组（不计时），再用对应的类型化解码器解码
+        groups: Dict[Tuple[str, str], List[bytes]] = {}
+        for frame in frames:
+            shape = classify_message(json.loads(frame))
+            if shape in MESSAGE_TYPES:
+                groups.setdefault(shape, []).append(frame)
+
+        typed_count = sum(len(g) for g in groups.values())
+        if typed_count:
+            decoders = {shape: TypedDecoder(*shape) for shape in groups}
+            start = time.perf_counter()
+            for shape, group in groups.items():
+                decode = decoders[shape].decode
+                for frame in group:
+                    decode(frame)
+            elapsed = time.perf_counter() - start
+            results["msgspec_typed"] = {
+                "msgs_per_sec": round(typed_count / elapsed),
+                "mb_per_sec": round(sum(len(f) for g in groups.values() for f in g) / elapsed / 1e6, 1)
+            }
+
+    for name, result in results.items():
+        print(f"{name:>14}: {result['msgs_per_sec']:>10,} msg/s  {result['mb_per_sec']:>7} MB/s")
+
+    return results
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    benchmark_replay(sys.argv[1:] or None)
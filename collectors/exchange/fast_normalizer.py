@@ -0,0 +1,352 @@
+"""
+快速数据标准化模块
+按(交易所, 数据类型)预编译字段映射，直接从解析后的JSON生成紧凑记录或NumPy结构化数组
+"""
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _ts_ms(ts) -> int:
+    """把交易所时间戳统一为毫秒整数"""
+    if ts is None:
+        return int(time.time() * 1000)
+    try:
+        ts = float(ts)
+    except (TypeError, ValueError):
+        return int(time.time() * 1000)
+    return int(ts) if ts > 1e10 else int(ts * 1000)
+
+
+def _ms_to_datetime(ms: int) -> datetime:
+    """毫秒时间戳转UTC时间"""
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+@dataclass
+class TickerRecord:
+    """行情记录"""
+    __slots__ = ("symbol", "last_price", "bid_price", "bid_size", "ask_price", "ask_size",
+                 "open_24h", "high_24h", "low_24h", "volume_24h", "volume_quote_24h",
+                 "timestamp", "source")
+    symbol: str
+    last_price: float
+    bid_price: float
+    bid_size: float
+    ask_price: float
+    ask_size: float
+    open_24h: float
+    high_24h: float
+    low_24h: float
+    volume_24h: float
+    volume_quote_24h: float
+    timestamp: int  # 毫秒
+    source: str
+
+    def to_dict(self) -> Dict:
+        """转换为DataNormalizer兼容的字典"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["timestamp"] = _ms_to_datetime(self.timestamp)
+        return data
+
+
+@dataclass
+class TradeRecord:
+    """成交记录"""
+    __slots__ = ("symbol", "trade_id", "price", "size", "side", "timestamp", "source")
+    symbol: str
+    trade_id: str
+    price: float
+    size: float
+    side: str
+    timestamp: int  # 毫秒
+    source: str
+
+    def to_dict(self) -> Dict:
+        """转换为DataNormalizer兼容的字典"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["timestamp"] = _ms_to_datetime(self.timestamp)
+        return data
+
+
+@dataclass
+class DepthRecord:
+    """深度记录，bids/asks为 n×2 的(价格, 数量)数组"""
+    __slots__ = ("symbol", "bids", "asks", "timestamp", "source")
+    symbol: str
+    bids: np.ndarray
+    asks: np.ndarray
+    timestamp: int  # 毫秒
+    source: str
+
+    def to_dict(self) -> Dict:
+        """转换为DataNormalizer兼容的字典（不含订单数）"""
+        return {
+            "symbol": self.symbol,
+            "bids": [{"price": p, "size": s, "orders": 0} for p, s in self.bids.tolist()],
+            "asks": [{"price": p, "size": s, "orders": 0} for p, s in self.asks.tolist()],
+            "timestamp": _ms_to_datetime(self.timestamp),
+            "source": self.source
+        }
+
+
+TICKER_DTYPE = np.dtype([
+    ("symbol", "U24"), ("last_price", "f8"), ("bid_price", "f8"), ("bid_size", "f8"),
+    ("ask_price", "f8"), ("ask_size", "f8"), ("open_24h", "f8"), ("high_24h", "f8"),
+    ("low_24h", "f8"), ("volume_24h", "f8"), ("volume_quote_24h", "f8"),
+    ("timestamp", "i8"), ("source", "U8")
+])
+
+TRADE_DTYPE = np.dtype([
+    ("symbol", "U24"), ("trade_id", "U24"), ("price", "f8"), ("size", "f8"),
+    ("side", "U4"), ("timestamp", "i8"), ("source", "U8")
+])
+
+# 字段映射: (输出字段, 源字段（元组表示按顺序回退）, 转换类型)
+# 转换类型: float / str / symbol(去掉"-") / lower / ts(毫秒) / maker_side(Binance买方挂单即卖出) / const
+SCHEMAS: Dict[Tuple[str, str], Tuple] = {
+    ("OKX", "ticker"): (
+        ("symbol", "instId", "symbol"),
+        ("last_price", "last", "float"),
+        ("bid_price", "bidPx", "float"),
+        ("bid_size", "bidSz", "float"),
+        ("ask_price", "askPx", "float"),
+        ("ask_size", "askSz", "float"),
+        ("open_24h", "open24h", "float"),
+        ("high_24h", "high24h", "float"),
+        ("low_24h", "low24h", "float"),
+        ("volume_24h", "vol24h", "float"),
+        ("volume_quote_24h", "volCcy24h", "float"),
+        ("timestamp", "ts", "ts"),
+        ("source", "OKX", "const"),
+    ),
+    ("Binance", "ticker"): (
+        ("symbol", "symbol", "str"),
+        ("last_price", "lastPrice", "float"),
+        ("bid_price", "bidPrice", "float"),
+        ("bid_size", "bidQty", "float"),
+        ("ask_price", "askPrice", "float"),
+        ("ask_size", "askQty", "float"),
+        ("open_24h", "openPrice", "float"),
+        ("high_24h", "highPrice", "float"),
+        ("low_24h", "lowPrice", "float"),
+        ("volume_24h", "volume", "float"),
+        ("volume_quote_24h", "quoteVolume", "float"),
+        ("timestamp", "closeTime", "ts"),
+        ("source", "Binance", "const"),
+    ),
+    ("OKX", "trade"): (
+        ("symbol", "instId", "symbol"),
+        ("trade_id", "tradeId", "str"),
+        ("price", "px", "float"),
+        ("size", "sz", "float"),
+        ("side", "side", "lower"),
+        ("timestamp", "ts", "ts"),
+        ("source", "OKX", "const"),
+    ),
+    ("Binance", "trade"): (
+        ("symbol", "s", "str"),
+        ("trade_id", ("id", "a"), "str"),
+        ("price", ("price", "p"), "float"),
+        ("size", ("qty", "q"), "float"),
+        ("side", ("isBuyerMaker", "m"), "maker_side"),
+        ("timestamp", ("time", "T"), "ts"),
+        ("source", "Binance", "const"),
+    ),
+}
+
+RECORD_TYPES = {"ticker": TickerRecord, "trade": TradeRecord}
+ARRAY_DTYPES = {"ticker": TICKER_DTYPE, "trade": TRADE_DTYPE}
+
+
+def _source_expr(source) -> str:
+    """生成读取源字段的表达式，多个源字段按顺序回退"""
+    keys = source if isinstance(source, tuple) else (source,)
+    return "(" + " or ".join(f"get({key!r})" for key in keys) + ")"
+
+
+def _field_expr(name: str, source, kind: str) -> str:
+    """生成单个字段的转换表达式"""
+    if kind == "const":
+        return repr(source)
+
+    raw = _source_expr(source)
+    if kind == "float":
+        expr = f"float({raw} or 0)"
+    elif kind == "str":
+        expr = f"str({raw} or '')"
+    elif kind == "symbol":
+        expr = f"({raw} or '').replace('-', '')"
+    elif kind == "lower":
+        expr = f"({raw} or '').lower()"
+    elif kind == "ts":
+        expr = f"_ts_ms({raw})"
+    elif kind == "maker_side":
+        expr = f"('sell' if {raw} else 'buy')"
+    else:
+        raise ValueError(f"未知的字段类型: {kind}")
+
+    # 调用方传入的symbol优先（与DataNormalizer.normalize_trade一致）
+    if name == "symbol":
+        expr = f"(symbol.replace('-', '') if symbol else {expr})"
+    return expr
+
+
+def compile_schema(exchange: str, data_type: str) -> Tuple[Callable, Callable]:
+    """编译字段映射，返回(记录构造函数, 元组构造函数)"""
+    schema = SCHEMAS.get((exchange, data_type))
+    if schema is None:
+        raise ValueError(f"不支持的数据源: {exchange} {data_type}")
+
+    record_type = RECORD_TYPES[data_type]
+    if [name for name, _, _ in schema] != [f.name for f in fields(record_type)]:
+        raise ValueError(f"字段映射与{record_type.__name__}不一致: {exchange} {data_type}")
+
+    body = ", ".join(_field_expr(name, source, kind) for name, source, kind in schema)
+    source_code = (
+        "def to_record(data, symbol=None):\n"
+        "    get = data.get\n"
+        f"    return Record({body})\n"
+        "def to_tuple(data, symbol=None):\n"
+        "    get = data.get\n"
+        f"    return ({body},)\n"
+    )
+
+    namespace = {"Record": record_type, "_ts_ms": _ts_ms}
+    exec(compile(source_code, f"<schema {exchange}:{data_type}>", "exec"), namespace)
+    return namespace["to_record"], namespace["to_tuple"]
+
+
+class FastNormalizer:
+    """基于预编译字段映射的快速标准化器"""
+
+    def __init__(self):
+        self._compiled: Dict[Tuple[str, str], Tuple[Callable, Callable]] = {}
+
+    def _get_compiled(self, exchange: str, data_type: str) -> Tuple[Callable, Callable]:
+        """获取（必要时编译）字段映射"""
+        key = (exchange, data_type)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compiled[key] = compile_schema(exchange, data_type)
+        return compiled
+
+    def normalize_ticker(self, data: Dict, source: str) -> TickerRecord:
+        """标准化行情数据"""
+        return self._get_compiled(source, "ticker")[0](data)
+
+    def normalize_trade(self, data: Dict, source: str, symbol: str = None) -> TradeRecord:
+        """标准化成交数据"""
+        return self._get_compiled(source, "trade")[0](data, symbol)
+
+    @staticmethod
+    def normalize_depth(data: Dict, source: str, symbol: str = None) -> DepthRecord:
+        """标准化深度数据，价格档位直接转为数组"""
+        if source not in ("OKX", "Binance"):
+            raise ValueError(f"不支持的数据源: {source}")
+
+        return DepthRecord(
+            symbol=symbol.replace("-", "") if symbol else "",
+            bids=FastNormalizer._levels_to_array(data.get("bids")),
+            asks=FastNormalizer._levels_to_array(data.get("asks")),
+            timestamp=_ts_ms(data.get("ts")),
+            source=source
+        )
+
+    @staticmethod
+    def _levels_to_array(levels: Optional[List]) -> np.ndarray:
+        """把[[价格, 数量, ...], ...]转换为 n×2 浮点数组"""
+        if not levels:
+            return np.empty((0, 2))
+        return np.array([level[:2] for level in levels], dtype=np.float64)
+
+    def normalize_batch(self, data_list: List[Dict], data_type: str, source: str,
+                        symbol: str = None) -> List:
+        """批量标准化为记录列表（适用于WebSocket突发推送）"""
+        to_record = self._get_compiled(source, data_type)[0]
+
+        try:
+            return [to_record(data, symbol) for data in data_list]
+        except Exception:
+            # 快速路径失败时逐条处理，跳过坏数据
+            records = []
+            for data in data_list:
+                try:
+                    records.append(to_record(data, symbol))
+                except Exception as e:
+                    logger.error(f"标准化数据失败: {e}")
+            return records
+
+    def normalize_batch_array(self, data_list: List[Dict], data_type: str, source: str,
+                              symbol: str = None) -> np.ndarray:
+        """批量标准化为NumPy结构化数组"""
+        to_tuple = self._get_compiled(source, data_type)[1]
+        dtype = ARRAY_DTYPES[data_type]
+
+        try:
+            rows = [to_tuple(data, symbol) for data in data_list]
+        except Exception:
+            rows = []
+            for data in data_list:
+                try:
+                    rows.append(to_tuple(data, symbol))
+                except Exception as e:
+                    logger.error(f"标准化数据失败: {e}")
+
+        return np.array(rows, dtype=dtype)
+
+
+# 性能测试
+def benchmark_normalizer(count: int = 100000):
+    """对比DataNormalizer与FastNormalizer的吞吐量"""
+    from .normalizer import DataNormalizer
+
+    okx_ticker = {
+        "instId": "BTC-USDT", "last": "67500.5", "bidPx": "67500.0", "bidSz": "2.0",
+        "askPx": "67501.0", "askSz": "1.5", "open24h": "67000.0", "high24h": "68000.0",
+        "low24h": "66500.0", "vol24h": "5432.1", "volCcy24h": "365000000",
+        "ts": "1704067200000"
+    }
+    binance_trade = {"e": "trade", "s": "BTCUSDT", "t": 12345, "p": "67500.10",
+                     "q": "0.012", "T": 1704067200000, "m": True}
+
+    cases = [
+        ("ticker", "OKX", [dict(okx_ticker) for _ in range(count)]),
+        ("trade", "Binance", [dict(binance_trade) for _ in range(count)]),
+    ]
+
+    fast = FastNormalizer()
+    results = {}
+    for data_type, source, batch in cases:
+        start = time.perf_counter()
+        DataNormalizer.batch_normalize(batch, data_type, source)
+        baseline = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fast.normalize_batch(batch, data_type, source)
+        records = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fast.normalize_batch_array(batch, data_type, source)
+        arrays = count / (time.perf_counter() - start)
+
+        results[f"{source}_{data_type}"] = {
+            "baseline_per_sec": round(baseline),
+            "records_per_sec": round(records),
+            "array_per_sec": round(arrays),
+            "speedup": round(records / baseline, 2)
+        }
+        print(f"{source} {data_type}: 原始 {baseline:,.0f}/s, 记录 {records:,.0f}/s, "
+              f"结构化数组 {arrays:,.0f}/s (x{records / baseline:.2f})")
+
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    benchmark_normalizer()
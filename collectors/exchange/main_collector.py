@@ -5,6 +5,7 @@
 import asyncio
 import yaml
 import logging
+from collections import deque
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 from pathlib import Path
@@ -13,6 +14,8 @@ from .okx_collector import OKXCollector, OKXConfig
 from .binance_collector import BinanceCollector, BinanceConfig
 from .normalizer import DataNormalizer
 from .detector import AnomalyDetector
+from .batch_detector import BatchAnomalyDetector
+from .alert_manager import AlertManager
 from .validator import DataValidator
 
 logger = logging.getLogger(__name__)
@@ -31,9 +34,14 @@ class ExchangeDataCollector:
         self.normalizer = DataNormalizer()
         self.detector = AnomalyDetector(self.config.get("anomaly_detection"))
         self.validator = DataValidator(self.config.get("validation"))
+        self.alert_manager = AlertManager()
+        self.batch_detector = BatchAnomalyDetector(self.detector, self.alert_manager)
         
         # 数据缓存
         self.latest_data = {}
+        self.price_snapshots = deque(maxlen=12)  # 最近1分钟的价格快照（5秒一次）
+        self.last_volumes = {}  # ticker -> 上一次快照的24h成交量
+        self.volume_increments = {}  # ticker -> 最近5分钟每个快照间隔内的成交量
         
         # 运行状态
         self.running = False
@@ -96,8 +104,9 @@ class ExchangeDataCollector:
         self.binance_collector = BinanceCollector(binance_config)
         await self.binance_collector.initialize()
         
-        # 注册异常检测回调
+        # 注册异常检测和预警回调
         self.detector.register_callback(self._handle_anomaly)
+        self.alert_manager.register_callback(self._handle_anomaly)
         
         logger.info("交易所数据采集器初始化完成")
     
@@ -355,16 +364,10 @@ class ExchangeDataCollector:
         """监控异常"""
         while self.running:
             try:
-                # 交叉验证价格
-                btc_okx = self.latest_data.get("ticker", {}).get("BTC-USDT")
-                btc_binance = self.latest_data.get("ticker", {}).get("BTCUSDT")
-                
-                if btc_okx and btc_binance:
-                    await self.detector.detect_cross_exchange_anomaly(
-                        "BTCUSDT",
-                        btc_okx.get("last_price", 0),
-                        btc_binance.get("last_price", 0)
-                    )
+                # 所有币种的横截面快照一次性检测
+                symbols, matrix = self.batch_detector.build_snapshot(self._build_anomaly_snapshot())
+                if symbols:
+                    await self.batch_detector.detect(symbols, matrix)
                 
                 await asyncio.sleep(5)
                 
@@ -372,6 +375,74 @@ class ExchangeDataCollector:
                 logger.error(f"异常监控失败: {e}")
                 await asyncio.sleep(5)
     
+    def _build_anomaly_snapshot(self) -> Dict[str, Dict[str, float]]:
+        """从最新数据缓存构建 symbol -> 特征 快照"""
+        okx_prices = {}
+        binance_prices = {}
+        for symbol, ticker in self.latest_data.get("ticker", {}).items():
+            price = ticker.get("last_price", 0)
+            if price <= 0:
+                continue
+            if ticker.get("source") == "OKX":
+                okx_prices[symbol.replace("-", "")] = price
+            else:
+                binance_prices[symbol] = price
+        
+        # 价格变化相对于约1分钟前的快照计算
+        current_prices = {**okx_prices, **binance_prices}
+        previous_prices = self.price_snapshots[0] if self.price_snapshots else {}
+        self.price_snapshots.append(current_prices)
+        
+        rows = {}
+        for symbol, price in current_prices.items():
+            row = rows.setdefault(symbol, {})
+            old_price = previous_prices.get(symbol)
+            if old_price:
+                row["price_change"] = (price - old_price) / old_price
+            if symbol in okx_prices and symbol in binance_prices:
+                okx_price, binance_price = okx_prices[symbol], binance_prices[symbol]
+                row["cross_spread"] = abs(okx_price - binance_price) / min(okx_price, binance_price)
+        
+        # 两个交易所的成交量倍数取较大者
+        for symbol, multiple in self._volume_multiples().items():
+            row = rows.setdefault(symbol, {})
+            row["volume_multiple"] = max(multiple, row.get("volume_multiple", 0.0))
+        
+        for symbol, funding in self.latest_data.get("funding_rate", {}).items():
+            key = symbol.replace("-SWAP", "").replace("-", "")  # BTC-USDT-SWAP -> BTCUSDT
+            rows.setdefault(key, {})["funding_rate"] = funding.get("funding_rate")
+        
+        return rows
+    
+    def _volume_multiples(self) -> Dict[str, float]:
+        """
+        由ticker的24h成交量计算成交量倍数
+        
+        相邻两次快照的24h成交量之差近似为该间隔内的成交量，
+        倍数 = 本次间隔成交量 / 最近5分钟各间隔的平均成交量，不足5个历史间隔时不计算
+        """
+        multiples = {}
+        for key, ticker in self.latest_data.get("ticker", {}).items():
+            volume = ticker.get("volume_24h")
+            if volume is None:
+                continue
+            previous = self.last_volumes.get(key)
+            self.last_volumes[key] = volume
+            if previous is None:
+                continue
+            
+            # 24h窗口滚动时累计量可能回落，按0计
+            increment = max(volume - previous, 0.0)
+            history = self.volume_increments.setdefault(key, deque(maxlen=60))
+            if len(history) >= 5:
+                average = sum(history) / len(history)
+                if average > 0:
+                    symbol = key.replace("-", "") if ticker.get("source") == "OKX" else key
+                    multiples[symbol] = max(increment / average, multiples.get(symbol, 0.0))
+            history.append(increment)
+        
+        return multiples
+    
     async def _health_check(self):
         """健康检查"""
         while self.running:
@@ -382,6 +453,7 @@ class ExchangeDataCollector:
                 
                 stats = {
                     "detector_stats": self.detector.get_statistics(),
+                    "alert_stats": self.alert_manager.get_statistics(),
                     "validator_stats": self.validator.get_stats(),
                     "latest_data_count": len(self.latest_data)
                 }
@@ -301,19 +301,22 @@ class DataNormalizer:
     @staticmethod
     def batch_normalize(data_list: List[Dict], data_type: str, source: str) -> List[Dict]:
         """批量标准化数据"""
+        # 数据类型分发在循环外解析一次
+        handlers = {
+            "ticker": DataNormalizer.normalize_ticker,
+            "trade": DataNormalizer.normalize_trade,
+            "funding_rate": DataNormalizer.normalize_funding_rate,
+            "open_interest": DataNormalizer.normalize_open_interest
+        }
+        handler = handlers.get(data_type)
+        if handler is None:
+            logger.warning(f"未知的数据类型: {data_type}")
+            return []
+        
         normalized = []
         for data in data_list:
             try:
-                if data_type == "ticker":
-                    normalized.append(DataNormalizer.normalize_ticker(data, source))
-                elif data_type == "trade":
-                    normalized.append(DataNormalizer.normalize_trade(data, source))
-                elif data_type == "funding_rate":
-                    normalized.append(DataNormalizer.normalize_funding_rate(data, source))
-                elif data_type == "open_interest":
-                    normalized.append(DataNormalizer.normalize_open_interest(data, source))
-                else:
-                    logger.warning(f"未知的数据类型: {data_type}")
+                normalized.append(handler(data, source))
             except Exception as e:
                 logger.error(f"标准化数据失败: {e}")
                 continue
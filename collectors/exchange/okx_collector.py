@@ -3,7 +3,6 @@ OKX交易所数据采集器
 实现REST API和WebSocket数据采集
 """
 import asyncio
-import json
 import time
 import hmac
 import base64
@@ -15,6 +14,9 @@ import websockets
 from dataclasses import dataclass
 import logging
 
+from . import codec
+from .codec import MessageCapture
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -27,6 +29,7 @@ class OKXConfig:
     ws_public: str = "wss://ws.okx.com:8443/ws/v5/public"
     ws_private: str = "wss://ws.okx.com:8443/ws/v5/private"
     demo_mode: bool = True  # 模拟模式，用于开发测试
+    capture_path: str = ""  # 原始WebSocket消息抓包文件（用于回放测试）
 
 class OKXCollector:
     """OKX数据采集器"""
@@ -38,6 +41,8 @@ class OKXCollector:
         self.ws_private_conn = None
         self.running = False
         self.subscriptions = set()
+        self.capture = MessageCapture(self.config.capture_path) if self.config.capture_path else None
+        self.decoder = codec.PushDecoder("OKX")
         self.rate_limiter = RateLimiter(max_requests=20, window=2)  # 20次/2秒
         
     async def initialize(self):
@@ -54,6 +59,8 @@ class OKXCollector:
             await self.ws_private_conn.close()
         if self.session:
             await self.session.close()
+        if self.capture:
+            self.capture.close()
         logger.info("OKX采集器已关闭")
     
     # REST API 方法
@@ -151,11 +158,11 @@ class OKXCollector:
         try:
             if method == "GET":
                 async with self.session.get(url, params=params) as response:
-                    data = await response.json()
+                    data = codec.loads(await response.read())
             else:
                 headers = self._get_auth_headers(method, endpoint, body)
                 async with self.session.request(method, url, json=body, headers=headers) as response:
-                    data = await response.json()
+                    data = codec.loads(await response.read())
             
             if data.get("code") != "0":
                 raise Exception(f"OKX API错误: {data.get('msg')}")
@@ -207,7 +214,7 @@ class OKXCollector:
             "args": args
         }
         
-        await self.ws_public_conn.send(json.dumps(msg))
+        await self.ws_public_conn.send(codec.dumps(msg))
         self.subscriptions.update(str(arg) for arg in args)
         logger.info(f"已订阅: {args}")
     
@@ -216,9 +223,11 @@ class OKXCollector:
         while self.running:
             try:
                 msg = await asyncio.wait_for(ws.recv(), timeout=30)
-                data = json.loads(msg)
+                if self.capture:
+                    self.capture.write(msg)
+                data = self.decoder.decode(msg)
                 
-                if "event" in data:
+                if isinstance(data, dict) and "event" in data:
                     if data["event"] == "subscribe":
                         logger.info(f"订阅成功: {data.get('arg')}")
                     elif data["event"] == "error":
@@ -234,24 +243,27 @@ class OKXCollector:
                 await self._reconnect_ws(ws_type)
                 break
     
-    async def _process_ws_data(self, data: Dict):
-        """处理WebSocket推送数据"""
-        if "arg" in data and "data" in data:
-            channel = data["arg"].get("channel")
-            inst_id = data["arg"].get("instId")
-            
-            for item in data["data"]:
-                # 这里可以将数据发送到消息队列或直接存储到数据库
-                processed_data = {
-                    "source": "OKX",
-                    "channel": channel,
-                    "inst_id": inst_id,
-                    "data": item,
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                }
-                
-                # TODO: 发送到消息队列
-                logger.debug(f"收到{channel}数据: {inst_id}")
+    async def _process_ws_data(self, data: Any):
+        """处理WebSocket推送数据（类型化结构或字典）"""
+        if not isinstance(data, dict):
+            channel, inst_id, items = data.arg.channel, data.arg.instId, data.data
+        elif "arg" in data and "data" in data:
+            channel, inst_id, items = data["arg"].get("channel"), data["arg"].get("instId"), data["data"]
+        else:
+            return
+        
+        for item in items:
+            # 这里可以将数据发送到消息队列或直接存储到数据库
+            processed_data = {
+                "source": "OKX",
+                "channel": channel,
+                "inst_id": inst_id,
+                "data": item,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+
+            # TODO: 发送到消息队列
+            logger.debug(f"收到{channel}数据: {inst_id}")
     
     async def _keep_alive(self, ws):
         """保持WebSocket连接"""
@@ -13,8 +13,13 @@ from unittest.mock import Mock, patch, AsyncMock
 from collectors.exchange.okx_collector import OKXCollector, OKXConfig
 from collectors.exchange.binance_collector import BinanceCollector, BinanceConfig
 from collectors.exchange.normalizer import DataNormalizer
+from collectors.exchange.fast_normalizer import FastNormalizer, TickerRecord
+from collectors.exchange import codec
 from collectors.exchange.detector import AnomalyDetector
-from collectors.exchange.validator import DataValidator
+from collectors.exchange.batch_detector import BatchAnomalyDetector
+from collectors.exchange.alert_manager import AlertManager, AlertLevel
+from collectors.exchange.validator import DataValidator, ValidationReason
+from collectors.exchange.main_collector import ExchangeDataCollector
 
 
 class TestOKXCollector(unittest.TestCase):
@@ -166,6 +171,134 @@ class TestDataNormalizer(unittest.TestCase):
         self.assertEqual(result, "BTC-USDT")
 
 
+class TestFastNormalizer(unittest.TestCase):
+    """测试预编译快速标准化"""
+    
+    def setUp(self):
+        self.fast = FastNormalizer()
+        self.okx_ticker = {
+            "instId": "BTC-USDT",
+            "last": "67500.5",
+            "bidPx": "67500.0",
+            "bidSz": "2.0",
+            "askPx": "67501.0",
+            "askSz": "1.5",
+            "open24h": "67000.0",
+            "high24h": "68000.0",
+            "low24h": "66500.0",
+            "vol24h": "5432.1",
+            "volCcy24h": "365000000",
+            "ts": "1704067200000"
+        }
+    
+    def test_matches_data_normalizer(self):
+        """测试与DataNormalizer输出一致"""
+        record = self.fast.normalize_ticker(self.okx_ticker, "OKX")
+        
+        self.assertIsInstance(record, TickerRecord)
+        self.assertEqual(record.to_dict(), DataNormalizer.normalize_ticker(self.okx_ticker, "OKX"))
+        
+        trade = {"s": "BTCUSDT", "a": 42, "p": "67500.1", "q": "0.5", "T": 1704067200000, "m": True}
+        self.assertEqual(
+            self.fast.normalize_trade(trade, "Binance").to_dict(),
+            DataNormalizer.normalize_trade(trade, "Binance")
+        )
+    
+    def test_batch_array(self):
+        """测试批量生成结构化数组"""
+        array = self.fast.normalize_batch_array([self.okx_ticker] * 3, "ticker", "OKX")
+        
+        self.assertEqual(array.shape, (3,))
+        self.assertEqual(array["symbol"][0], "BTCUSDT")
+        self.assertEqual(array["last_price"].sum(), 67500.5 * 3)
+        self.assertEqual(array["timestamp"][0], 1704067200000)
+    
+    def test_depth_levels(self):
+        """测试深度档位转为数组"""
+        depth = {"bids": [["67500.0", "2.0", "0", "3"]], "asks": [["67501.0", "1.5", "0", "1"]], "ts": "1704067200000"}
+        
+        record = self.fast.normalize_depth(depth, "OKX", "BTC-USDT")
+        
+        self.assertEqual(record.symbol, "BTCUSDT")
+        self.assertEqual(record.bids.tolist(), [[67500.0, 2.0]])
+        self.assertEqual(record.asks[0, 0], 67501.0)
+    
+    def test_unsupported_source(self):
+        """测试不支持的数据源"""
+        with self.assertRaises(ValueError):
+            self.fast.normalize_ticker(self.okx_ticker, "Kraken")
+
+
+class TestCodec(unittest.TestCase):
+    """测试JSON编解码层"""
+    
+    def setUp(self):
+        self.backend = codec.backend
+        self.push = b'{"arg":{"channel":"trades","instId":"BTC-USDT"},"data":[{"instId":"BTC-USDT","tradeId":"1","px":"67500.1","sz":"0.5","side":"buy","ts":"1704067200000"}]}'
+    
+    def tearDown(self):
+        codec.set_backend(self.backend)
+    
+    def test_backends_agree(self):
+        """测试各后端解码结果一致"""
+        expected = codec.BACKENDS["json"][0](self.push)
+        
+        for name in codec.BACKENDS:
+            codec.set_backend(name)
+            self.assertEqual(codec.loads(self.push), expected)
+            self.assertEqual(codec.loads(codec.dumps(expected)), expected)
+    
+    def test_unknown_backend(self):
+        """测试不可用的后端"""
+        with self.assertRaises(ValueError):
+            codec.set_backend("ujson-not-installed")
+    
+    def test_typed_decoder(self):
+        """测试类型化解码（无msgspec时回退为字典）"""
+        self.assertEqual(codec.classify_message(codec.loads(self.push)), ("OKX", "trade"))
+        
+        decoder = codec.TypedDecoder("OKX", "trade")
+        message = decoder.decode(self.push)
+        
+        if decoder.typed:
+            self.assertEqual(message.data[0].px, "67500.1")
+            self.assertEqual(message.arg.instId, "BTC-USDT")
+        else:
+            self.assertEqual(message["data"][0]["px"], "67500.1")
+
+
+    def test_push_decoder(self):
+        """测试线上路径按频道解码推送，订阅响应仍为字典"""
+        decoder = codec.PushDecoder("OKX")
+        subscribed = b'{"event":"subscribe","arg":{"channel":"trades","instId":"BTC-USDT"}}'
+        
+        self.assertEqual(codec.classify_frame(self.push), ("OKX", "trade"))
+        self.assertEqual(codec.classify_frame(self.push.decode()), ("OKX", "trade"))
+        self.assertEqual(decoder.decode(subscribed)["event"], "subscribe")
+        
+        message = decoder.decode(self.push)
+        if codec.MESSAGE_TYPES:
+            self.assertNotIsInstance(message, dict)
+            self.assertEqual(message.data[0].px, "67500.1")
+        else:
+            self.assertEqual(message["data"][0]["px"], "67500.1")
+        
+        # 采集器处理类型化结构和字典两种形式
+        collector = OKXCollector(OKXConfig(demo_mode=True))
+        asyncio.run(collector._process_ws_data(message))
+        asyncio.run(collector._process_ws_data(codec.loads(self.push)))
+    
+    def test_binance_push_decoder(self):
+        """测试Binance组合stream推送的类型化解码"""
+        frame = b'{"stream":"btcusdt@trade","data":{"e":"trade","E":1,"s":"BTCUSDT","t":12345,"p":"67500.10","q":"0.012","T":1,"m":true}}'
+        
+        self.assertEqual(codec.classify_frame(frame), ("Binance", "trade"))
+        message = codec.PushDecoder("Binance").decode(frame)
+        if codec.MESSAGE_TYPES:
+            self.assertEqual((message.stream, message.data.p), ("btcusdt@trade", "67500.10"))
+        self.assertIsNone(codec.classify_frame(b'{"result":null,"id":1}'))
+
+
 class TestAnomalyDetector(unittest.TestCase):
     """测试异常检测"""
     
@@ -230,6 +363,166 @@ class TestAnomalyDetector(unittest.TestCase):
         asyncio.run(self.async_test_large_trade())
 
 
+class TestBatchAnomalyDetector(unittest.TestCase):
+    """测试横截面批量异常检测"""
+    
+    def setUp(self):
+        self.batch = BatchAnomalyDetector()
+    
+    def test_only_hits_emitted(self):
+        """测试只输出命中的规则"""
+        symbols, matrix = self.batch.build_snapshot({
+            "BTCUSDT": {"price_change": 0.001, "volume_multiple": 1.2},
+            "ETHUSDT": {"price_change": -0.045},
+            "SOLUSDT": {"cross_spread": 0.006}
+        })
+        
+        hits = self.batch.evaluate(symbols, matrix)
+        found = {(h["source"], h["type"], h["symbol"]) for h in hits}
+        
+        self.assertEqual(found, {
+            ("detector", "price_anomaly", "ETHUSDT"),
+            ("alert_manager", "price_change", "ETHUSDT"),
+            ("detector", "cross_exchange_anomaly", "SOLUSDT"),
+            ("alert_manager", "arbitrage_opportunity", "SOLUSDT")
+        })
+    
+    def test_matches_scalar_rules(self):
+        """测试与逐个检测的阈值和分级一致"""
+        symbols, matrix = self.batch.build_snapshot({
+            "ETHUSDT": {"price_change": -0.045, "volume_multiple": 6.0},
+            "BNBUSDT": {"funding_rate": 0.0007}
+        })
+        
+        hits = {(h["type"], h["symbol"]): h for h in self.batch.evaluate(symbols, matrix)}
+        
+        price = hits[("price_anomaly", "ETHUSDT")]
+        self.assertEqual(price["direction"], "negative")
+        self.assertEqual(price["severity"], self.batch.detector._calculate_severity(0.045, 0.03))
+        self.assertEqual(hits[("price_change", "ETHUSDT")]["level"], AlertLevel.HIGH)
+        self.assertEqual(hits[("volume_spike", "ETHUSDT")]["level"], AlertLevel.HIGH)
+        self.assertEqual(hits[("funding_rate", "BNBUSDT")]["level"], AlertLevel.MEDIUM)
+        # 0.07%未超过AnomalyDetector的0.1%阈值
+        self.assertNotIn(("funding_rate_anomaly", "BNBUSDT"), hits)
+    
+    def test_detect_triggers_callbacks(self):
+        """测试命中项触发异常回调"""
+        received = []
+        self.batch.detector.register_callback(received.append)
+        symbols, matrix = self.batch.build_snapshot({"XRPUSDT": {"volume_multiple": 8.0}})
+        
+        asyncio.run(self.batch.detect(symbols, matrix))
+        
+        self.assertEqual([a["type"] for a in received], ["volume_anomaly"])
+
+
+class TestAnomalyMonitor(unittest.TestCase):
+    """测试采集器的异常监控循环"""
+    
+    def setUp(self):
+        self.collector = ExchangeDataCollector()
+        self.anomalies = []
+        self.collector.detector.register_callback(self.anomalies.append)
+    
+    def _set_tickers(self, okx_price: float, binance_price: float, volume: float):
+        now = datetime.now(timezone.utc)
+        self.collector.latest_data["ticker"] = {
+            "BTC-USDT": {"source": "OKX", "last_price": okx_price, "volume_24h": volume, "timestamp": now},
+            "BTCUSDT": {"source": "Binance", "last_price": binance_price, "volume_24h": volume, "timestamp": now}
+        }
+    
+    def _run_monitor_once(self):
+        """执行一轮_monitor_anomalies"""
+        async def stop(_):
+            self.collector.running = False
+        
+        self.collector.running = True
+        with patch("collectors.exchange.main_collector.asyncio.sleep", side_effect=stop):
+            asyncio.run(self.collector._monitor_anomalies())
+    
+    def test_volume_multiple_from_ticker_history(self):
+        """测试由24h成交量的增量计算成交量倍数"""
+        # 首个快照只记录基准，之后不足5个历史间隔时不计算倍数
+        for i in range(6):
+            self._set_tickers(100.0, 100.0, 1000.0 + 100 * i)
+            rows = self.collector._build_anomaly_snapshot()
+            self.assertNotIn("volume_multiple", rows["BTCUSDT"])
+        
+        self._set_tickers(100.0, 100.0, 1600.0)
+        rows = self.collector._build_anomaly_snapshot()
+        self.assertAlmostEqual(rows["BTCUSDT"]["volume_multiple"], 1.0)
+        
+        self._set_tickers(100.0, 100.0, 1600.0 + 300)
+        rows = self.collector._build_anomaly_snapshot()
+        self.assertAlmostEqual(rows["BTCUSDT"]["volume_multiple"], 3.0)
+    
+    def test_monitor_dispatches_detector_and_alerts(self):
+        """测试一轮监控同时触发AnomalyDetector异常和AlertManager预警"""
+        for i in range(7):
+            self._set_tickers(100.0, 100.0, 1000.0 + 100 * i)
+            self.collector._build_anomaly_snapshot()
+        
+        # 价格上涨4%、两所价差约1%、本次间隔成交量为平均的10倍
+        self._set_tickers(105.0, 104.0, 1600.0 + 1000)
+        self._run_monitor_once()
+        
+        self.assertEqual({a["type"] for a in self.anomalies},
+                         {"price_anomaly", "volume_anomaly", "cross_exchange_anomaly"})
+        alerts = {a.type: a for a in self.collector.alert_manager.active_alerts.values()}
+        self.assertEqual(set(alerts), {"price_change", "volume_spike", "arbitrage_opportunity"})
+        self.assertEqual(alerts["price_change"].level, AlertLevel.HIGH)
+        self.assertEqual(alerts["volume_spike"].level, AlertLevel.HIGH)
+        self.assertTrue(all(a.symbol == "BTCUSDT" for a in alerts.values()))
+
+
+class TestAlertManager(unittest.TestCase):
+    """测试预警管理器"""
+    
+    def setUp(self):
+        self.manager = AlertManager()
+    
+    def test_dedup_index(self):
+        """测试去重索引"""
+        first = asyncio.run(self.manager.check_volume_alert("BTCUSDT", 400, 100))
+        duplicate = asyncio.run(self.manager.check_volume_alert("BTCUSDT", 500, 100))
+        other = asyncio.run(self.manager.check_volume_alert("ETHUSDT", 400, 100))
+        
+        self.assertIsNotNone(first)
+        self.assertIsNone(duplicate)
+        self.assertIsNotNone(other)
+        
+        # 超出去重窗口后索引条目过期
+        self.manager.last_fired[("volume_spike", "BTCUSDT")] -= self.manager.config["dedup_window"]
+        self.assertFalse(self.manager._is_duplicate("volume_spike", "BTCUSDT"))
+        self.assertNotIn(("volume_spike", "BTCUSDT"), self.manager.last_fired)
+    
+    def test_sliding_window_rate_limit(self):
+        """测试滑动窗口速率限制在分钟边界不会重置"""
+        limit = self.manager.config["max_alerts_per_minute"]
+        
+        with patch("collectors.exchange.alert_manager.time.monotonic", return_value=1000.0):
+            results = [self.manager._check_rate_limit() for _ in range(limit + 1)]
+        self.assertEqual(results.count(True), limit)
+        self.assertFalse(results[-1])
+        
+        with patch("collectors.exchange.alert_manager.time.monotonic", return_value=1059.0):
+            self.assertFalse(self.manager._check_rate_limit())
+        with patch("collectors.exchange.alert_manager.time.monotonic", return_value=1060.0):
+            self.assertTrue(self.manager._check_rate_limit())
+    
+    def test_clear_old_alerts(self):
+        """测试清理过期预警"""
+        asyncio.run(self.manager.check_volume_alert("BTCUSDT", 400, 100))
+        asyncio.run(self.manager.check_volume_alert("ETHUSDT", 400, 100))
+        
+        oldest = next(iter(self.manager.active_alerts.values()))
+        oldest.triggered_at -= timedelta(seconds=self.manager.config["alert_ttl"] + 1)
+        self.manager.clear_old_alerts()
+        
+        self.assertEqual([a.symbol for a in self.manager.active_alerts.values()], ["ETHUSDT"])
+        self.assertEqual([a.symbol for a in self.manager.alert_history], ["ETHUSDT"])
+
+
 class TestDataValidator(unittest.TestCase):
     """测试数据验证"""
     
@@ -293,6 +586,45 @@ class TestDataValidator(unittest.TestCase):
         self.assertTrue(valid)
         self.assertIsNone(error)
     
+    def test_validate_batch_columnar(self):
+        """测试列式批量验证"""
+        now = datetime.now(timezone.utc)
+        tickers = [
+            {"symbol": "BTCUSDT", "last_price": 67500.5, "bid_price": 67500.0,
+             "ask_price": 67501.0, "volume_24h": 5432.1, "timestamp": now},
+            {"symbol": "BTCUSDT", "last_price": 67500.5, "bid_price": 68000.0,
+             "ask_price": 67501.0, "volume_24h": 5432.1, "timestamp": now},
+            {"symbol": "BTCUSDT", "last_price": 67500.5, "timestamp": now - timedelta(minutes=1)},
+            {"symbol": "BTCUSDT", "timestamp": now}
+        ]
+        
+        valid, reasons = self.validator.validate_batch_columnar(tickers, "ticker")
+        
+        self.assertEqual(valid.tolist(), [True, False, False, False])
+        self.assertEqual(reasons.tolist(), [
+            ValidationReason.OK, ValidationReason.CROSSED_BOOK,
+            ValidationReason.TIMESTAMP, ValidationReason.MISSING_FIELD
+        ])
+        # 与逐条验证结果一致
+        self.assertEqual(valid.tolist(), [self.validator.validate_ticker(t)[0] for t in tickers])
+    
+    def test_validate_batch_columnar_arrays(self):
+        """测试列式验证直接接收数组"""
+        now_ms = datetime.now(timezone.utc).timestamp() * 1000
+        trades = {
+            "price": [67500.5, -1.0, 67500.0],
+            "size": [0.5, 0.5, 0.5],
+            "side": ["buy", "sell", "hold"],
+            "timestamp": [now_ms, now_ms, now_ms]
+        }
+        
+        valid, reasons = self.validator.validate_batch_columnar(trades, "trade", now_ms=now_ms)
+        
+        self.assertEqual(reasons.tolist(), [
+            ValidationReason.OK, ValidationReason.PRICE_RANGE, ValidationReason.INVALID_SIDE
+        ])
+        self.assertEqual(self.validator.get_stats()["failures_by_type"]["trade"], 2)
+    
     def test_cross_validation(self):
         """测试交叉验证"""
         okx_data = {
@@ -3,11 +3,35 @@
 确保数据质量和完整性
 """
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from enum import IntEnum
+from typing import Dict, List, Optional, Any, Tuple, Union
+import time
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+class ValidationReason(IntEnum):
+    """批量验证原因码（按单条验证的检查顺序，只记录第一个失败原因）"""
+    OK = 0
+    MISSING_FIELD = 1
+    PRICE_RANGE = 2
+    VOLUME_RANGE = 3
+    TIMESTAMP = 4
+    CROSSED_BOOK = 5
+    SPREAD_TOO_WIDE = 6
+    INVALID_SIDE = 7
+    EMPTY_BOOK = 8
+    UNKNOWN_TYPE = 9
+
+# 各数据类型的列及在记录字典中的来源
+COLUMNAR_FIELDS = {
+    "ticker": ("last_price", "bid_price", "ask_price", "volume_24h", "timestamp"),
+    "trade": ("price", "size", "timestamp"),
+    "depth": ("best_bid", "best_ask", "timestamp")
+}
+
 class DataValidator:
     """数据验证器"""
     
@@ -254,6 +278,147 @@ class DataValidator:
         
         return results
     
+    def validate_batch_columnar(self, data: Union[List[Dict], np.ndarray, Dict[str, np.ndarray]],
+                                data_type: str, now_ms: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """列式批量验证，返回(通过掩码, 原因码数组)
+        
+        data可以是记录字典列表、FastNormalizer生成的结构化数组或列名到数组的映射；
+        深度数据只校验买一/卖一（best_bid/best_ask），不检查各档排序
+        """
+        if data_type not in COLUMNAR_FIELDS:
+            count = len(next(iter(data.values()), [])) if isinstance(data, dict) else len(data)
+            reasons = np.full(count, ValidationReason.UNKNOWN_TYPE, dtype=np.int8)
+            return np.zeros(count, dtype=bool), reasons
+        
+        columns = self._to_columns(data, data_type)
+        count = len(columns["timestamp"])
+        now_ms = now_ms if now_ms is not None else time.time() * 1000
+        
+        reasons = np.zeros(count, dtype=np.int8)
+        
+        def fail(mask: np.ndarray, reason: ValidationReason):
+            # 只记录第一个失败原因
+            reasons[(reasons == ValidationReason.OK) & mask] = reason
+        
+        # NaN表示缺失字段，且不参与后续比较
+        missing = np.zeros(count, dtype=bool)
+        for field in COLUMNAR_FIELDS[data_type]:
+            if data_type == "ticker" and field in ("bid_price", "ask_price", "volume_24h"):
+                continue  # 行情的买卖价和成交量为可选字段
+            missing |= np.isnan(columns[field])
+        if "empty" in columns:
+            missing &= ~columns["empty"]  # 空深度单独报告
+        fail(missing, ValidationReason.MISSING_FIELD)
+        
+        min_price, max_price = self.config["min_price"], self.config["max_price"]
+        min_volume, max_volume = self.config["min_volume"], self.config["max_volume"]
+        
+        with np.errstate(invalid="ignore"):
+            timestamp_bad = ~(np.abs(now_ms - columns["timestamp"]) <= self.config["max_time_delay"])
+            
+            if data_type == "ticker":
+                price = columns["last_price"]
+                bid = np.nan_to_num(columns["bid_price"])
+                ask = np.nan_to_num(columns["ask_price"])
+                volume = np.nan_to_num(columns["volume_24h"])
+                quoted = (bid > 0) & (ask > 0)
+                
+                fail(~((price >= min_price) & (price <= max_price)), ValidationReason.PRICE_RANGE)
+                fail(timestamp_bad, ValidationReason.TIMESTAMP)
+                fail(quoted & (bid > ask), ValidationReason.CROSSED_BOOK)
+                fail(quoted & ((ask - bid) > 0.1 * bid), ValidationReason.SPREAD_TOO_WIDE)
+                fail(~((volume >= min_volume) & (volume <= max_volume)), ValidationReason.VOLUME_RANGE)
+            
+            elif data_type == "trade":
+                price, size = columns["price"], columns["size"]
+                
+                fail(~((price >= min_price) & (price <= max_price)), ValidationReason.PRICE_RANGE)
+                fail(~((size >= min_volume) & (size <= max_volume)), ValidationReason.VOLUME_RANGE)
+                fail(timestamp_bad, ValidationReason.TIMESTAMP)
+                if "side" in columns:
+                    side = np.char.lower(columns["side"].astype(str))
+                    fail(~np.isin(side, ["buy", "sell", ""]), ValidationReason.INVALID_SIDE)
+            
+            else:
+                best_bid, best_ask = columns["best_bid"], columns["best_ask"]
+                
+                fail(timestamp_bad, ValidationReason.TIMESTAMP)
+                fail(columns.get("empty", np.zeros(count, dtype=bool)), ValidationReason.EMPTY_BOOK)
+                fail(~((best_bid >= min_price) & (best_bid <= max_price) &
+                       (best_ask >= min_price) & (best_ask <= max_price)), ValidationReason.PRICE_RANGE)
+                fail(best_bid >= best_ask, ValidationReason.CROSSED_BOOK)
+        
+        valid = reasons == ValidationReason.OK
+        self._record_batch_validation(valid, data_type)
+        return valid, reasons
+    
+    def _to_columns(self, data: Union[List[Dict], np.ndarray, Dict[str, np.ndarray]],
+                    data_type: str) -> Dict[str, np.ndarray]:
+        """把输入统一转换为浮点列（时间戳为毫秒）"""
+        fields = COLUMNAR_FIELDS[data_type]
+        
+        if isinstance(data, np.ndarray) and data.dtype.names:
+            columns = {f: data[f].astype(np.float64) for f in fields if f in data.dtype.names}
+            if data_type == "trade" and "side" in data.dtype.names:
+                columns["side"] = data["side"]
+            for field in fields:
+                columns.setdefault(field, np.full(len(data), np.nan))
+            return columns
+        
+        if isinstance(data, dict):
+            columns = {f: np.asarray(data[f], dtype=np.float64) for f in fields if f in data}
+            count = len(next(iter(columns.values()))) if columns else 0
+            for field in fields:
+                columns.setdefault(field, np.full(count, np.nan))
+            if "side" in data:
+                columns["side"] = np.asarray(data["side"])
+            return columns
+        
+        if data_type == "depth":
+            return self._depth_columns(data)
+        
+        count = len(data)
+        columns = {f: np.full(count, np.nan) for f in fields}
+        for i, record in enumerate(data):
+            for field in fields:
+                value = record.get(field)
+                if value is None:
+                    continue
+                if field == "timestamp":
+                    value = self._timestamp_ms(value)
+                columns[field][i] = value
+        
+        if data_type == "trade":
+            columns["side"] = np.array([record.get("side", "") for record in data])
+        return columns
+    
+    def _depth_columns(self, data: List[Dict]) -> Dict[str, np.ndarray]:
+        """从深度记录提取买一/卖一"""
+        count = len(data)
+        columns = {f: np.full(count, np.nan) for f in COLUMNAR_FIELDS["depth"]}
+        columns["empty"] = np.zeros(count, dtype=bool)
+        
+        for i, record in enumerate(data):
+            bids, asks = record.get("bids"), record.get("asks")
+            if record.get("timestamp") is not None:
+                columns["timestamp"][i] = self._timestamp_ms(record["timestamp"])
+            if bids is None or asks is None:
+                continue
+            if len(bids) == 0 or len(asks) == 0:
+                columns["empty"][i] = True
+                continue
+            columns["best_bid"][i] = bids[0]["price"] if isinstance(bids[0], dict) else bids[0][0]
+            columns["best_ask"][i] = asks[0]["price"] if isinstance(asks[0], dict) else asks[0][0]
+        
+        return columns
+    
+    @staticmethod
+    def _timestamp_ms(timestamp: Any) -> float:
+        """时间戳统一为毫秒"""
+        if isinstance(timestamp, datetime):
+            return timestamp.timestamp() * 1000
+        return float(timestamp)
+    
     def _validate_price(self, price: float) -> bool:
         """验证价格合理性"""
         return self.config["min_price"] <= price <= self.config["max_price"]
@@ -296,6 +461,19 @@ class DataValidator:
                 self.validation_stats["failures_by_type"][data_type] = 0
             self.validation_stats["failures_by_type"][data_type] += 1
     
+    def _record_batch_validation(self, valid: np.ndarray, data_type: str):
+        """批量记录验证统计"""
+        passed = int(valid.sum())
+        failed = len(valid) - passed
+        
+        self.validation_stats["total_validated"] += len(valid)
+        self.validation_stats["passed"] += passed
+        self.validation_stats["failed"] += failed
+        
+        if failed:
+            failures = self.validation_stats["failures_by_type"]
+            failures[data_type] = failures.get(data_type, 0) + failed
+    
     def get_stats(self) -> Dict:
         """获取验证统计"""
         stats = self.validation_stats.copy()
@@ -0,0 +1,181 @@
+"""
+交易绩效的增量统计
+每笔平仓交易O(1)更新：Welford均值/方差、盈亏计数与求和、权益峰值与回撤，
+可选滚动窗口版本只统计最近N笔
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional
+
+
+class RunningStats:
+    """交易绩效累加器"""
+
+    def __init__(self, window: Optional[int] = None, ddof: int = 1):
+        """
+        Args:
+            window: 滚动窗口笔数，None表示统计全部交易
+            ddof: 方差自由度修正，1为样本方差，0为总体方差
+        """
+        self.window = window
+        self.ddof = ddof
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        self.wins = 0
+        self.losses = 0
+        self.win_sum = 0.0
+        self.loss_sum = 0.0  # 亏损绝对值之和
+        self.total_pnl = 0.0
+
+        # 累计盈亏（权益）及其峰值、回撤
+        self.equity = 0.0
+        self.peak: Optional[float] = None
+        self.drawdown = 0.0
+        self._max_drawdown = 0.0
+
+        # 滚动窗口：(收益, 盈亏, 序号, 累计盈亏)；峰值用单调队列维护
+        self._entries = deque()
+        self._peaks = deque()
+        self._seq = 0
+
+    def update(self, pnl: float, ret: Optional[float] = None):
+        """
+        记录一笔平仓交易
+
+        Args:
+            pnl: 盈亏金额，用于胜负统计和权益曲线
+            ret: 计算均值/方差（夏普）所用的收益，默认等于pnl
+        """
+        value = pnl if ret is None else ret
+        self._add(value, pnl)
+        self.equity += pnl
+
+        if self.window is None:
+            if self.peak is None or self.equity > self.peak:
+                self.peak = self.equity
+            self.drawdown = (self.peak - self.equity) / self.peak if self.peak > 0 else 0.0
+            self._max_drawdown = max(self._max_drawdown, self.drawdown)
+            return
+
+        self._entries.append((value, pnl, self._seq, self.equity))
+        while self._peaks and self._peaks[-1][1] <= self.equity:
+            self._peaks.pop()
+        self._peaks.append((self._seq, self.equity))
+        self._seq += 1
+
+        if len(self._entries) > self.window:
+            old_value, old_pnl, old_seq, _ = self._entries.popleft()
+            self._remove(old_value, old_pnl)
+            if self._peaks[0][0] == old_seq:
+                self._peaks.popleft()
+
+        self.peak = self._peaks[0][1]
+        self.drawdown = (self.peak - self.equity) / self.peak if self.peak > 0 else 0.0
+
+    def _add(self, value: float, pnl: float):
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+        self.total_pnl += pnl
+        if pnl > 0:
+            self.wins += 1
+            self.win_sum += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.loss_sum -= pnl
+
+    def _remove(self, value: float, pnl: float):
+        if self.count <= 1:
+            self.count, self._mean, self._m2 = 0, 0.0, 0.0
+        else:
+            old_mean = self._mean
+            self.count -= 1
+            self._mean = old_mean - (value - old_mean) / self.count
+            self._m2 = max(0.0, self._m2 - (value - old_mean) * (value - self._mean))
+
+        self.total_pnl -= pnl
+        if pnl > 0:
+            self.wins -= 1
+            self.win_sum -= pnl
+        elif pnl < 0:
+            self.losses -= 1
+            self.loss_sum += pnl
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - self.ddof) if self.count > self.ddof else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def sharpe(self, periods: int = 252, risk_free: float = 0.0) -> float:
+        """年化夏普比率，不足两笔或波动为0时返回0"""
+        std = self.std
+        if self.count < 2 or std == 0:
+            return 0.0
+        return (self.mean - risk_free) / std * math.sqrt(periods)
+
+    @property
+    def max_drawdown(self) -> float:
+        """
+        最大回撤（相对峰值的比例，峰值不为正时记为0）
+
+        滚动窗口下按窗口内的权益重新计算，耗时O(窗口)
+        """
+        if self.window is None:
+            return self._max_drawdown
+
+        peak, max_dd = None, 0.0
+        for _, _, _, equity in self._entries:
+            if peak is None or equity > peak:
+                peak = equity
+            if peak > 0:
+                max_dd = max(max_dd, (peak - equity) / peak)
+        return max_dd
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.count if self.count else 0.0
+
+    @property
+    def avg_win(self) -> float:
+        return self.win_sum / self.wins if self.wins else 0.0
+
+    @property
+    def avg_loss(self) -> float:
+        return self.loss_sum / self.losses if self.losses else 0.0
+
+    @property
+    def profit_factor(self) -> float:
+        """总盈利/总亏损，无亏损时为inf"""
+        return self.win_sum / self.loss_sum if self.loss_sum > 0 else float('inf')
+
+    def snapshot(self, periods: int = 252) -> Dict[str, float]:
+        """当前统计值"""
+        return {
+            "total_trades": self.count,
+            "winning_trades": self.wins,
+            "losing_trades": self.losses,
+            "win_rate": self.win_rate,
+            "total_pnl": self.total_pnl,
+            "avg_win": self.avg_win,
+            "avg_loss": self.avg_loss,
+            "profit_factor": self.profit_factor,
+            "sharpe_ratio": self.sharpe(periods),
+            "max_drawdown": self.max_drawdown,
+            "current_drawdown": self.drawdown
+        }
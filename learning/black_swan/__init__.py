@@ -1,9 +1,12 @@
 """黑天鹅学习模块"""
 
 from .black_swan_learning import BlackSwanLearning, BlackSwanEvent, AlertRecord
+from .streaming import OnlineCrisisFeatures, StreamingCrisisScorer
 
 __all__ = [
     "BlackSwanLearning",
     "BlackSwanEvent", 
-    "AlertRecord"
+    "AlertRecord",
+    "OnlineCrisisFeatures",
+    "StreamingCrisisScorer"
 ]
\ No newline at end of file
@@ -5,6 +5,7 @@
 
 import json
 import logging
+import pickle
 import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
@@ -17,6 +18,8 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from ..config.config import BLACK_SWAN_CONFIG, DATABASE_CONFIG, LOG_DIR
+from ..storage.database import get_database
+from .streaming import CRISIS_FEATURES, StreamingCrisisScorer
 
 # 配置日志
 logging.basicConfig(
@@ -67,6 +70,7 @@ class BlackSwanLearning:
     def __init__(self):
         self.config = BLACK_SWAN_CONFIG
         self.db_path = DATABASE_CONFIG["patterns"]["path"].parent / "black_swan.db"
+        self.db = get_database(self.db_path)
         
         # 初始化数据库
         self._init_database()
@@ -77,6 +81,8 @@ class BlackSwanLearning:
         # 初始化异常检测模型
         self.anomaly_detector = None
         self.scaler = StandardScaler()
+        self.detector_path = self.config["detector_path"]
+        self._load_detector()
         
         # 预警阈值
         self.alert_thresholds = self.config["alert_levels"]
@@ -85,7 +91,7 @@ class BlackSwanLearning:
     
     def _init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 历史事件表
@@ -358,7 +364,7 @@ class BlackSwanLearning:
         )
         
         # 保存到数据库
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -388,7 +394,7 @@ class BlackSwanLearning:
                            actual_outcome: str,
                            was_correct: bool):
         """更新预警结果"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -404,7 +410,7 @@ class BlackSwanLearning:
     
     def optimize_response_strategy(self) -> Dict[str, Any]:
         """优化响应策略"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -501,6 +507,7 @@ class BlackSwanLearning:
             random_state=42
         )
         self.anomaly_detector.fit(scaled_features)
+        self._save_detector()
         
         # 评估模型
         anomaly_scores = self.anomaly_detector.score_samples(scaled_features)
@@ -515,7 +522,8 @@ class BlackSwanLearning:
             "training_samples": len(features),
             "anomaly_rate": anomaly_rate,
             "anomaly_count": n_anomalies,
-            "score_threshold": np.percentile(anomaly_scores, 10)
+            "score_threshold": np.percentile(anomaly_scores, 10),
+            "model_path": str(self.detector_path)
         }
         
         logger.info(f"Pattern recognition model trained: {n_anomalies} anomalies detected")
@@ -555,6 +563,29 @@ class BlackSwanLearning:
         
         return features.dropna()
     
+    def _save_detector(self):
+        """保存标准化器和异常检测模型"""
+        self.detector_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.detector_path, 'wb') as f:
+            pickle.dump({"scaler": self.scaler, "detector": self.anomaly_detector}, f)
+        logger.info(f"Crisis detector saved to {self.detector_path}")
+    
+    def _load_detector(self) -> bool:
+        """加载已保存的模型，初始化时调用一次，之后常驻内存"""
+        if not self.detector_path.exists():
+            return False
+        
+        try:
+            with open(self.detector_path, 'rb') as f:
+                saved = pickle.load(f)
+            self.scaler = saved["scaler"]
+            self.anomaly_detector = saved["detector"]
+            logger.info(f"Crisis detector loaded from {self.detector_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load crisis detector: {e}")
+            return False
+    
     def predict_crisis_probability(self, 
                                   current_indicators: Dict[str, float]) -> float:
         """预测危机概率"""
@@ -562,25 +593,38 @@ class BlackSwanLearning:
             logger.warning("Model not trained yet")
             return 0.0
         
-        # 准备特征
-        features = pd.DataFrame([current_indicators])
-        
-        # 确保特征顺序一致
-        expected_features = self.scaler.feature_names_in_ if hasattr(self.scaler, 'feature_names_in_') else features.columns
-        features = features.reindex(columns=expected_features, fill_value=0)
+        # 按训练时的特征顺序组装，缺失特征记为0
+        expected_features = getattr(self.scaler, 'feature_names_in_', list(current_indicators))
+        features = np.array([[current_indicators.get(name, 0) for name in expected_features]], dtype=float)
         
         # 标准化
-        scaled_features = self.scaler.transform(features)
+        scaled_features = (features - self.scaler.mean_) / self.scaler.scale_
         
         # 预测
-        anomaly_score = self.anomaly_detector.score_samples(scaled_features)[0]
+        anomaly_score = self.anomaly_detector.score_samples(scaled_features)
         
         # 转换为概率（越低的分数表示越可能是异常）
         # 使用sigmoid函数将分数映射到0-1之间
-        crisis_probability = 1 / (1 + np.exp(anomaly_score * 10))
+        crisis_probability = StreamingCrisisScorer.probability(anomaly_score)[0]
         
         return crisis_probability
     
+    def create_stream_scorer(self) -> Optional[StreamingCrisisScorer]:
+        """
+        创建多币种流式评分器，共用当前内存中的模型
+        
+        模型需在完整OHLCV特征（CRISIS_FEATURES）上训练
+        """
+        if self.anomaly_detector is None:
+            logger.warning("Model not trained yet")
+            return None
+        
+        if list(getattr(self.scaler, 'feature_names_in_', [])) != CRISIS_FEATURES:
+            logger.warning("Model was not trained on the full crisis feature set, streaming disabled")
+            return None
+        
+        return StreamingCrisisScorer(self.scaler, self.anomaly_detector)
+    
     def get_recommended_action(self, 
                               crisis_probability: float,
                               current_position: float) -> Dict[str, Any]:
@@ -648,7 +692,7 @@ class BlackSwanLearning:
     
     def _extract_patterns_from_event(self, event: BlackSwanEvent):
         """从事件中提取模式"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 提取信号模式
@@ -670,7 +714,7 @@ class BlackSwanLearning:
     
     def _save_historical_event(self, event: BlackSwanEvent):
         """保存历史事件"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -700,7 +744,7 @@ class BlackSwanLearning:
     
     def get_crisis_patterns(self) -> List[Dict]:
         """获取危机模式"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -767,4 +811,5 @@ class BlackSwanLearning:
     
     def cleanup(self):
         """清理资源"""
+        self.db.release()
         logger.info("BlackSwanLearning cleanup completed")
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+黑天鹅流式评分
+逐根K线O(1)更新危机特征（滚动标准差/最大值/均值、RSI），
+每根K线把所有币种的特征拼成一个小批次，用常驻内存的标准化器和IsolationForest一次打分
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 与 BlackSwanLearning._extract_crisis_features 的列顺序一致
+CRISIS_FEATURES = [
+    "price_change",
+    "price_volatility",
+    "price_drawdown",
+    "volume_spike",
+    "volume_change",
+    "rsi",
+    "ma_deviation",
+    "price_range"
+]
+
+
+class RollingWindow:
+    """
+    定长滚动窗口：Welford均值/样本方差，单调队列维护最大值，每次更新均摊O(1)
+
+    移出旧值的增减会累积舍入误差（价格量级大、K线多时明显），
+    每推入size个值按窗口内的值重算一次均值和平方和，摊销后仍为O(1)
+    """
+
+    __slots__ = ("size", "values", "count", "mean", "m2", "_maxima", "_seq")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._maxima = deque()  # (序号, 值)，值单调递减
+        self._seq = 0
+
+    def push(self, value: float):
+        self.values.append(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        while self._maxima and self._maxima[-1][1] <= value:
+            self._maxima.pop()
+        self._maxima.append((self._seq, value))
+
+        if self.count > self.size:
+            old = self.values.popleft()
+            old_mean = self.mean
+            self.count -= 1
+            self.mean = old_mean - (old - old_mean) / self.count
+            self.m2 = max(0.0, self.m2 - (old - old_mean) * (old - self.mean))
+            if self._maxima[0][0] == self._seq - self.size:
+                self._maxima.popleft()
+        self._seq += 1
+        if self._seq % self.size == 0:
+            self._resync()
+
+    def _resync(self):
+        """按窗口内的值精确重算均值和平方和，消除累积误差"""
+        self.mean = math.fsum(self.values) / self.count
+        self.m2 = math.fsum((value - self.mean) ** 2 for value in self.values)
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def max(self) -> float:
+        return self._maxima[0][1]
+
+
+class OnlineCrisisFeatures:
+    """单个币种的在线危机特征，与 _extract_crisis_features 在同一根K线上的取值一致（差别在浮点舍入量级）"""
+
+    def __init__(self):
+        self.close_24 = RollingWindow(24)
+        self.close_50 = RollingWindow(50)
+        self.volume_24 = RollingWindow(24)
+        # RSI：14期涨幅/跌幅的滚动和，另计窗口内跌幅非零的个数以便准确判断无下跌
+        self._deltas = deque()
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._loss_count = 0
+        self._delta_seq = 0
+        self.prev_close: Optional[float] = None
+        self.prev_volume: Optional[float] = None
+
+    def update(self, close: float, volume: float, high: float, low: float) -> Optional[np.ndarray]:
+        """
+        追加一根K线
+
+        Returns:
+            特征向量（按CRISIS_FEATURES顺序），窗口未填满或特征无效时返回None
+        """
+        prev_close, prev_volume = self.prev_close, self.prev_volume
+        self.prev_close, self.prev_volume = close, volume
+        self.close_24.push(close)
+        self.close_50.push(close)
+        self.volume_24.push(volume)
+
+        if prev_close is None:
+            return None
+
+        delta = close - prev_close
+        self._deltas.append(delta)
+        self._delta_seq += 1
+        self._gain_sum += max(delta, 0.0)
+        if delta < 0:
+            self._loss_sum -= delta
+            self._loss_count += 1
+        if len(self._deltas) > 14:
+            old = self._deltas.popleft()
+            self._gain_sum -= max(old, 0.0)
+            if old < 0:
+                self._loss_sum += old
+                self._loss_count -= 1
+            if self._delta_seq % 14 == 0:
+                # 与RollingWindow相同，定期重算滚动和
+                self._gain_sum = math.fsum(d for d in self._deltas if d > 0)
+                self._loss_sum = -math.fsum(d for d in self._deltas if d < 0)
+
+        if not (self.close_50.full and len(self._deltas) == 14):
+            return None
+
+        if self._loss_count == 0:
+            if self._gain_sum <= 0:
+                return None  # 0/0，与pandas一致视为缺失
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + self._gain_sum / self._loss_sum)
+
+        return np.array([
+            close / prev_close - 1,
+            self.close_24.std,
+            close / self.close_24.max - 1,
+            volume / self.volume_24.mean,
+            volume / prev_volume - 1,
+            rsi,
+            close / self.close_50.mean - 1,
+            (high - low) / close
+        ])
+
+
+class StreamingCrisisScorer:
+    """多币种流式黑天鹅评分"""
+
+    def __init__(self, scaler, detector):
+        """
+        Args:
+            scaler: 已拟合的StandardScaler
+            detector: 已拟合的IsolationForest（在标准化后的特征上训练）
+        """
+        self.mean = np.asarray(scaler.mean_, dtype=float)
+        self.scale = np.asarray(scaler.scale_, dtype=float)
+        self.detector = detector
+        self.features: Dict[str, OnlineCrisisFeatures] = {}
+        self.latest: Dict[str, float] = {}  # 各币种最近一次的危机概率
+
+    @staticmethod
+    def probability(anomaly_scores: np.ndarray) -> np.ndarray:
+        """异常分数转危机概率（分数越低越异常），与 predict_crisis_probability 相同"""
+        return 1 / (1 + np.exp(anomaly_scores * 10))
+
+    def score(self, matrix: np.ndarray) -> np.ndarray:
+        """对特征矩阵（行=样本，列=CRISIS_FEATURES）批量打分"""
+        return self.probability(self.detector.score_samples((matrix - self.mean) / self.scale))
+
+    def update(self, bars: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """
+        推入一根K线（所有币种）并打分
+
+        Args:
+            bars: {币种: {"close", "volume", "high", "low"}}
+
+        Returns:
+            本次特征可用的币种的危机概率
+        """
+        symbols: List[str] = []
+        rows: List[np.ndarray] = []
+        for symbol, bar in bars.items():
+            state = self.features.get(symbol)
+            if state is None:
+                state = self.features[symbol] = OnlineCrisisFeatures()
+            row = state.update(bar["close"], bar["volume"], bar["high"], bar["low"])
+            if row is not None and np.isfinite(row).all():
+                symbols.append(symbol)
+                rows.append(row)
+
+        if not rows:
+            return {}
+
+        probabilities = self.score(np.vstack(rows))
+        scores = dict(zip(symbols, probabilities.tolist()))
+        self.latest.update(scores)
+        return scores
@@ -20,7 +20,10 @@ DATABASE_CONFIG = {
     "trade_records": {
         "path": DATA_DIR / "trade_records.db",
         "backup_path": DATA_DIR / "backups",
-        "retention_days": 365 * 3  # 保留3年
+        "retention_days": 365 * 3,  # 保留3年
+        "archive_path": DATA_DIR / "trade_archive",  # year/month/symbol分区的Parquet归档
+        "archive_compression": "zstd",
+        "archive_query_days": 90  # 超过该天数的分析查询从归档读取
     },
     "patterns": {
         "path": DATA_DIR / "patterns.db",
@@ -28,6 +31,18 @@ DATABASE_CONFIG = {
     },
     "knowledge": {
         "path": DATA_DIR / "knowledge_base.db"
+    },
+    # 所有learning数据库共用的SQLite连接设置
+    "sqlite": {
+        "pragmas": {
+            "journal_mode": "WAL",  # 读写互不阻塞
+            "synchronous": "NORMAL",  # WAL下仅检查点时fsync
+            "cache_size": -65536,  # 64MB页缓存
+            "mmap_size": 268435456,  # 256MB内存映射
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000
+        },
+        "cached_statements": 256
     }
 }
 
@@ -38,12 +53,14 @@ ML_CONFIG = {
             "type": "LSTM",
             "epochs": 100,
             "batch_size": 32,
-            "learning_rate": 0.001
+            "learning_rate": 0.001,
+            "feature_set": "technical"
         },
         "trend_classification": {
             "type": "XGBoost",
             "n_estimators": 100,
-            "max_depth": 6
+            "max_depth": 6,
+            "feature_set": "technical"
         },
         "signal_quality": {
             "type": "RandomForest",
@@ -53,12 +70,25 @@ ML_CONFIG = {
     "training": {
         "test_split": 0.2,
         "validation_split": 0.1,
-        "random_state": 42
+        "random_state": 42,
+        "n_jobs": -1,  # 进程池大小，-1为全部CPU
+        "walk_forward_splits": 5,
+        "min_train_size": 100,
+        # 增量更新：在最近update_window行上warm start追加树，最多保留max_estimators棵
+        "update_trees": 20,
+        "update_window": 2000,
+        "max_estimators": 300
     },
     "performance": {
         "min_accuracy": 0.7,
         "max_training_time": 3600,  # 1小时
         "prediction_latency": 0.1  # 100ms
+    },
+    # 特征存储：按(symbol, timeframe, 特征集)保存的内存映射特征矩阵
+    "feature_store": {
+        "path": MODEL_DIR / "feature_store",
+        "dtype": "float32",
+        "initial_capacity": 4096  # 初始行数，满了翻倍
     }
 }
 
@@ -67,12 +97,17 @@ OPTIMIZATION_CONFIG = {
     "methods": {
         "grid_search": {
             "enabled": True,
-            "n_jobs": -1
+            "n_jobs": -1,      # 打分函数不可pickle时退回当前进程执行
+            "chunk_size": 16,  # 每个进程任务评估的组合数
+            "halving_eta": 3,  # 逐级淘汰时每级保留前1/eta
+            "resume": True     # 从检查点续跑中断的扫描
         },
         "bayesian": {
             "enabled": True,
             "n_initial_points": 10,
-            "n_calls": 50
+            "n_calls": 50,
+            "batch_size": 4,  # 每轮并行评估的参数点数
+            "n_jobs": -1      # 打分函数不可pickle时退回当前进程执行
         },
         "genetic": {
             "enabled": False,
@@ -95,7 +130,8 @@ PATTERN_CONFIG = {
     },
     "association": {
         "min_support": 0.1,
-        "min_confidence": 0.6
+        "min_confidence": 0.6,
+        "max_len": 4  # 增量计数的最大项集长度（每笔交易最多4个物品）
     },
     "success_threshold": 0.6,  # 60%胜率以上算成功模式
     "failure_threshold": 0.4   # 40%胜率以下算失败模式
@@ -114,7 +150,8 @@ BLACK_SWAN_CONFIG = {
         "level_2": {"threshold": 0.6, "action": "reduce"},
         "level_3": {"threshold": 0.8, "action": "exit"}
     },
-    "learning_rate": 0.1
+    "learning_rate": 0.1,
+    "detector_path": MODEL_DIR / "black_swan_detector.pkl"  # 标准化器+IsolationForest
 }
 
 # 提示词进化配置
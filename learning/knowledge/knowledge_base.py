@@ -11,6 +11,7 @@ from typing import Dict, List, Optional
 from collections import defaultdict
 
 from ..config.config import DATABASE_CONFIG, LOG_DIR
+from ..storage.database import get_database
 
 # 配置日志
 logging.basicConfig(
@@ -29,12 +30,13 @@ class KnowledgeBase:
     
     def __init__(self):
         self.db_path = DATABASE_CONFIG["knowledge"]["path"]
+        self.db = get_database(self.db_path)
         self._init_database()
         logger.info("KnowledgeBase initialized")
     
     def _init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 市场知识表
@@ -84,7 +86,7 @@ class KnowledgeBase:
     
     def add_market_knowledge(self, knowledge_type: str, title: str, content: str, tags: List[str] = None):
         """添加市场知识"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -100,7 +102,7 @@ class KnowledgeBase:
     
     def add_trading_rule(self, rule_name: str, rule_type: str, condition: str, action: str, priority: int = 0):
         """添加交易规则"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -116,7 +118,7 @@ class KnowledgeBase:
     
     def search_knowledge(self, query: str, knowledge_type: Optional[str] = None) -> List[Dict]:
         """搜索知识"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -150,7 +152,7 @@ class KnowledgeBase:
     
     def get_applicable_rules(self, context: Dict) -> List[Dict]:
         """获取适用的规则"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -185,4 +187,5 @@ class KnowledgeBase:
     
     def cleanup(self):
         """清理资源"""
+        self.db.release()
         logger.info("KnowledgeBase cleanup completed")
\ No newline at end of file
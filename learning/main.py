@@ -113,12 +113,15 @@ class LearningSystem:
         """分析交易模式"""
         logger.info(f"Analyzing patterns for last {days} days...")
         
+        # 入场条件/市场状态/时间/机会四项分析共用一次聚合扫描
+        grouped = self.pattern_learner.analyze_closed_trades(days)
+        
         results = {
-            "entry_conditions": self.pattern_learner.analyze_entry_conditions(days),
+            "entry_conditions": grouped["entry_conditions"],
             "indicator_combos": self.pattern_learner.analyze_indicator_combinations(days),
-            "market_states": self.pattern_learner.analyze_market_states(days),
-            "time_patterns": self.pattern_learner.analyze_time_patterns(days),
-            "opportunity_patterns": self.pattern_learner.analyze_opportunity_patterns(days),
+            "market_states": grouped["market_states"],
+            "time_patterns": grouped["time_patterns"],
+            "opportunity_patterns": grouped["opportunity_patterns"],
             "common_mistakes": self.pattern_learner.identify_common_mistakes(days),
             "association_rules": self.pattern_learner.mine_association_rules(days)
         }
@@ -1,5 +1,6 @@
 """机器学习模型模块"""
 
 from .ml_models import MLModels
+from .feature_store import FeatureStore, FeatureSet, FEATURE_SETS
 
-__all__ = ["MLModels"]
\ No newline at end of file
+__all__ = ["MLModels", "FeatureStore", "FeatureSet", "FEATURE_SETS"]
\ No newline at end of file
@@ -0,0 +1,413 @@
+"""
+特征存储
+按 (symbol, timeframe, 特征集) 持久化float32特征矩阵为内存映射.npy文件，
+新K线到达时只计算增量部分，预测时直接切片读取
+"""
+
+import json
+import logging
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ..config.config import ML_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def _pct_change(x: np.ndarray) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    out[1:] = x[1:] / x[:-1] - 1
+    return out
+
+
+def _rolling(x: np.ndarray, window: int, func: str) -> np.ndarray:
+    """与pandas rolling(window)一致：窗口未满或含NaN时为NaN"""
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        windows = sliding_window_view(x, window)
+        out[window - 1:] = windows.mean(axis=1) if func == "mean" else windows.std(axis=1, ddof=1)
+    return out
+
+
+# 特征函数只使用numpy，批量计算和逐根增量计算共用同一实现
+def _technical_features(data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """技术指标特征"""
+    features = {}
+
+    if 'close' in data:
+        close = data['close']
+        features['returns'] = _pct_change(close)
+        features['ma_ratio'] = close / _rolling(close, 20, "mean")
+        features['volatility'] = _rolling(close, 20, "std")
+
+    if 'volume' in data:
+        features['volume_ratio'] = data['volume'] / _rolling(data['volume'], 20, "mean")
+
+    return features
+
+
+def _market_features(data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """市场微观特征"""
+    features = {}
+
+    if 'bid' in data and 'ask' in data:
+        features['spread'] = data['ask'] - data['bid']
+        features['mid_price'] = (data['bid'] + data['ask']) / 2
+
+    return features
+
+
+@dataclass(frozen=True)
+class FeatureSet:
+    """特征集定义，计算逻辑变化时提升version使旧文件失效"""
+    name: str
+    version: int
+    inputs: Tuple[str, ...]  # 使用的原始列
+    warmup: int  # 计算一行特征需要的历史K线数
+    compute: Callable[[Dict[str, np.ndarray]], Dict[str, np.ndarray]]
+    carry: Tuple[str, ...] = ()  # 与特征行对齐保存的原始列（用于生成标签）
+
+
+FEATURE_SETS: Dict[str, FeatureSet] = {
+    "technical": FeatureSet("technical", 1, ("close", "volume"), 20, _technical_features, ("close",)),
+    "market": FeatureSet("market", 1, ("bid", "ask"), 0, _market_features),
+}
+
+
+def compute_features(data: pd.DataFrame, feature_type: str) -> pd.DataFrame:
+    """一次性计算特征（不落盘），未知特征集返回空表"""
+    feature_set = FEATURE_SETS.get(feature_type)
+    if feature_set is None:
+        return pd.DataFrame()
+    inputs = {c: data[c].to_numpy(dtype=np.float64) for c in feature_set.inputs if c in data.columns}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = feature_set.compute(inputs)
+    return pd.DataFrame(features, index=data.index).dropna()
+
+
+def _bar_timestamps(bars: pd.DataFrame) -> np.ndarray:
+    """K线时间戳：优先使用timestamp列，否则使用索引；datetime统一为纳秒"""
+    values = bars['timestamp'] if 'timestamp' in bars.columns else bars.index
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.DatetimeIndex(values).as_unit('ns').asi8
+    return np.asarray(values, dtype=np.int64)
+
+
+class _GrowableArray:
+    """
+    可追加的.npy内存映射数组
+
+    文件按容量预分配、满了翻倍扩容，有效行数保存在元数据中
+    """
+
+    def __init__(self, path: Path, dtype, width: int, rows: int, capacity: int):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.rows = rows
+        if not path.exists():
+            self._allocate(max(capacity, 1))
+        self._array = np.load(path, mmap_mode='r+')
+
+    @property
+    def capacity(self) -> int:
+        return self._array.shape[0]
+
+    def _allocate(self, capacity: int, keep: Optional[np.ndarray] = None):
+        shape = (capacity, self.width) if self.width else (capacity,)
+        tmp_path = self.path.with_suffix('.tmp.npy')
+        array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=self.dtype, shape=shape)
+        if keep is not None:
+            array[:len(keep)] = keep
+        array.flush()
+        del array
+        tmp_path.replace(self.path)
+
+    def append(self, values: np.ndarray):
+        needed = self.rows + len(values)
+        if needed > self.capacity:
+            capacity = self.capacity
+            while capacity < needed:
+                capacity *= 2
+            keep = np.array(self._array[:self.rows])
+            self._array = None
+            self._allocate(capacity, keep)
+            self._array = np.load(self.path, mmap_mode='r+')
+
+        self._array[self.rows:needed] = values
+        self.rows = needed
+
+    def flush(self):
+        self._array.flush()
+
+    def view(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """只读切片（不复制）"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        view = self._array[start:stop]
+        view.flags.writeable = False
+        return view
+
+
+class FeatureStore:
+    """特征存储"""
+
+    def __init__(self, root: Optional[Path] = None):
+        config = ML_CONFIG["feature_store"]
+        self.root = Path(root) if root else config["path"]
+        self.dtype = np.dtype(config["dtype"])
+        self.initial_capacity = config["initial_capacity"]
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self._entries: Dict[Tuple[str, str, str], Dict] = {}
+        self._lock = threading.RLock()
+
+    def _key_dir(self, symbol: str, timeframe: str, feature_set: FeatureSet) -> Path:
+        safe_symbol = symbol.replace('/', '_')
+        return self.root / safe_symbol / timeframe / f"{feature_set.name}_v{feature_set.version}"
+
+    def _entry(self, symbol: str, timeframe: str, feature_type: str) -> Optional[Dict]:
+        """打开已有条目（元数据+内存映射数组），不存在返回None"""
+        key = (symbol, timeframe, feature_type)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        feature_set = FEATURE_SETS[feature_type]
+        key_dir = self._key_dir(symbol, timeframe, feature_set)
+        meta_path = key_dir / "meta.json"
+        if not meta_path.exists():
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        entry = self._open(key_dir, meta)
+        self._entries[key] = entry
+        return entry
+
+    def _open(self, key_dir: Path, meta: Dict) -> Dict:
+        rows = meta["rows"]
+        return {
+            "dir": key_dir,
+            "meta": meta,
+            "features": _GrowableArray(key_dir / "features.npy", self.dtype, len(meta["columns"]),
+                                       rows, self.initial_capacity),
+            "index": _GrowableArray(key_dir / "index.npy", np.int64, 0, rows, self.initial_capacity),
+            "carry": _GrowableArray(key_dir / "carry.npy", np.float64, len(meta["carry"]),
+                                    rows, self.initial_capacity) if meta["carry"] else None,
+        }
+
+    def _create(self, symbol: str, timeframe: str, feature_set: FeatureSet, bars: pd.DataFrame) -> Dict:
+        """按首批数据可用的输入列创建条目"""
+        key_dir = self._key_dir(symbol, timeframe, feature_set)
+        if key_dir.exists():
+            shutil.rmtree(key_dir)
+        key_dir.mkdir(parents=True)
+
+        inputs = [c for c in feature_set.inputs if c in bars.columns]
+        sample = feature_set.compute({c: np.zeros(0) for c in inputs})
+        meta = {
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "feature_set": feature_set.name,
+            "version": feature_set.version,
+            "inputs": inputs,
+            "columns": list(sample),
+            "carry": [c for c in feature_set.carry if c in inputs],
+            "rows": 0,
+            "last_ts": None,
+            "tail": []  # 最近warmup根原始K线
+        }
+        entry = self._open(key_dir, meta)
+        self._entries[(symbol, timeframe, feature_set.name)] = entry
+        return entry
+
+    def update(self, symbol: str, timeframe: str, feature_type: str, bars: pd.DataFrame) -> int:
+        """
+        写入K线并增量计算特征
+
+        Args:
+            bars: 按时间升序的K线，时间戳来自timestamp列或索引；
+                  已经写入过的K线（时间戳不晚于上次）会被跳过
+
+        Returns:
+            新增的特征行数
+        """
+        feature_set = FEATURE_SETS[feature_type]
+
+        with self._lock:
+            entry = self._entry(symbol, timeframe, feature_type)
+            if entry is not None and any(c not in bars.columns for c in entry["meta"]["inputs"]):
+                logger.warning(f"Input columns changed for {symbol} {timeframe} {feature_type}, rebuilding")
+                entry = None
+            if entry is None:
+                entry = self._create(symbol, timeframe, feature_set, bars)
+
+            meta = entry["meta"]
+            inputs = meta["inputs"]
+            if not meta["columns"]:
+                return 0
+            timestamps = _bar_timestamps(bars)
+            raw = np.column_stack([bars[c].to_numpy(dtype=np.float64) for c in inputs])
+            if meta["last_ts"] is not None:
+                new = timestamps > meta["last_ts"]
+                raw, timestamps = raw[new], timestamps[new]
+            if len(raw) == 0:
+                return 0
+
+            # 用保存的尾部K线补足计算窗口
+            tail = np.asarray(meta["tail"], dtype=np.float64).reshape(-1, len(inputs))
+            frame = np.vstack([tail, raw])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                computed = feature_set.compute({c: frame[:, i] for i, c in enumerate(inputs)})
+            values = np.column_stack([computed[c] for c in meta["columns"]])[len(tail):].astype(self.dtype)
+            valid = ~np.isnan(values).any(axis=1)
+
+            entry["features"].append(values[valid])
+            entry["index"].append(timestamps[valid])
+            if entry["carry"] is not None:
+                carry = [inputs.index(c) for c in meta["carry"]]
+                entry["carry"].append(frame[len(tail):, carry][valid])
+
+            meta["tail"] = frame[-feature_set.warmup:].tolist() if feature_set.warmup else []
+            meta["rows"] = entry["features"].rows
+            meta["last_ts"] = int(timestamps[-1])
+            self._flush(entry)
+
+            return int(valid.sum())
+
+    def _flush(self, entry: Dict, sync: bool = False):
+        """
+        写元数据
+
+        数组写入内存映射后即进入页缓存，进程崩溃不会丢失；
+        sync=True时先msync数组再写元数据（关闭时）
+        """
+        if sync:
+            for name in ("features", "index", "carry"):
+                if entry[name] is not None:
+                    entry[name].flush()
+        meta_path = entry["dir"] / "meta.json"
+        tmp_path = meta_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(entry["meta"]))
+        tmp_path.replace(meta_path)
+
+    def columns(self, symbol: str, timeframe: str, feature_type: str) -> List[str]:
+        """特征列名"""
+        entry = self._entry(symbol, timeframe, feature_type)
+        return list(entry["meta"]["columns"]) if entry else []
+
+    def get(self,
+            symbol: str,
+            timeframe: str,
+            feature_type: str,
+            start: Optional[int] = None,
+            end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        按时间范围切片 [start, end)
+
+        Returns:
+            (时间戳, 特征矩阵, 对齐的原始列)，均为只读内存映射视图
+        """
+        with self._lock:
+            entry = self._entry(symbol, timeframe, feature_type)
+            if entry is None:
+                empty = np.empty((0,), dtype=np.int64)
+                return empty, np.empty((0, 0), dtype=self.dtype), None
+
+            index = entry["index"].view()
+            lo = 0 if start is None else int(np.searchsorted(index, start, side='left'))
+            hi = len(index) if end is None else int(np.searchsorted(index, end, side='left'))
+            carry = entry["carry"].view(lo, hi) if entry["carry"] is not None else None
+            return index[lo:hi], entry["features"].view(lo, hi), carry
+
+    def latest(self, symbol: str, timeframe: str, feature_type: str, n: int = 1) -> np.ndarray:
+        """最近n行特征"""
+        with self._lock:
+            entry = self._entry(symbol, timeframe, feature_type)
+            if entry is None:
+                return np.empty((0, 0), dtype=self.dtype)
+            rows = entry["features"].rows
+            return entry["features"].view(max(0, rows - n), rows)
+
+    def close(self):
+        """落盘并释放内存映射"""
+        with self._lock:
+            for entry in self._entries.values():
+                self._flush(entry, sync=True)
+            self._entries.clear()
+
+
+# 性能测试
+def benchmark_feature_store(n_bars: int = 200_000, window: int = 500, n_predictions: int = 200,
+                            root: Optional[str] = None) -> Dict:
+    """对比每次预测都重算特征与特征存储增量更新+切片读取的耗时"""
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(42)
+    index = pd.date_range("2020-01-01", periods=n_bars + n_predictions, freq="min")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(index))))
+    volume = rng.lognormal(10, 1, len(index))
+    bars = pd.DataFrame({"close": close, "volume": volume}, index=index)
+    history, live = bars.iloc[:n_bars], bars.iloc[n_bars:]
+
+    def legacy_features(data: pd.DataFrame) -> pd.DataFrame:
+        # 原MLModels.prepare_features的pandas实现
+        features = pd.DataFrame()
+        features['returns'] = data['close'].pct_change()
+        features['ma_ratio'] = data['close'] / data['close'].rolling(20).mean()
+        features['volatility'] = data['close'].rolling(20).std()
+        features['volume_ratio'] = data['volume'] / data['volume'].rolling(20).mean()
+        return features.dropna()
+
+    results = {"bars": n_bars}
+    with tempfile.TemporaryDirectory(dir=root) as tmp:
+        store = FeatureStore(Path(tmp))
+
+        start = time.perf_counter()
+        store.update("BENCH/USDT", "1m", "technical", history)
+        results["initial_build_s"] = round(time.perf_counter() - start, 3)
+
+        # 旧方式：每次预测对最近window根K线重算特征
+        start = time.perf_counter()
+        for i in range(n_predictions):
+            recent = bars.iloc[n_bars + i + 1 - window:n_bars + i + 1]
+            legacy_features(recent).iloc[-1:].to_numpy(dtype=np.float32)
+        results["recompute_ms"] = round((time.perf_counter() - start) / n_predictions * 1000, 3)
+
+        # 新方式：追加一根K线后切片
+        start = time.perf_counter()
+        for i in range(n_predictions):
+            store.update("BENCH/USDT", "1m", "technical", live.iloc[i:i + 1])
+            row = store.latest("BENCH/USDT", "1m", "technical")
+        results["incremental_ms"] = round((time.perf_counter() - start) / n_predictions * 1000, 3)
+
+        # 切片读取
+        start = time.perf_counter()
+        for _ in range(n_predictions):
+            store.latest("BENCH/USDT", "1m", "technical")
+        results["lookup_ms"] = round((time.perf_counter() - start) / n_predictions * 1000, 4)
+
+        # 与整段计算结果一致
+        expected = legacy_features(bars).to_numpy(dtype=np.float32)
+        _, stored, _ = store.get("BENCH/USDT", "1m", "technical")
+        results["max_abs_diff"] = float(np.abs(expected - stored).max())
+        store.close()
+
+    print(f"{n_bars:,}根K线，首次构建 {results['initial_build_s']}s")
+    print(f"  每次重算: {results['recompute_ms']}ms  增量更新+切片: {results['incremental_ms']}ms  "
+          f"仅切片: {results['lookup_ms']}ms  最大误差: {results['max_abs_diff']:.2e}")
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_feature_store()
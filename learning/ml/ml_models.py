@@ -6,18 +6,20 @@
 import json
 import logging
 import pickle
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.model_selection import cross_val_score
 from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
 from ..config.config import ML_CONFIG, MODEL_DIR, LOG_DIR
+from .feature_store import FeatureStore, compute_features
+from .training import build_estimator, build_xy, peak_rss_mb, run_tasks, walk_forward_splits
 
 # 配置日志
 logging.basicConfig(
@@ -34,11 +36,12 @@ logger = logging.getLogger(__name__)
 class MLModels:
     """机器学习模型管理器"""
     
-    def __init__(self):
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
         self.config = ML_CONFIG
         self.models = {}
         self.scalers = {}
         self.model_dir = MODEL_DIR
+        self.feature_store = feature_store or FeatureStore()
         
         # 确保模型目录存在
         self.model_dir.mkdir(parents=True, exist_ok=True)
@@ -46,47 +49,57 @@ class MLModels:
         logger.info("MLModels initialized")
     
     def prepare_features(self, data: pd.DataFrame, feature_type: str) -> pd.DataFrame:
-        """准备特征"""
-        features = pd.DataFrame()
-        
-        if feature_type == "technical":
-            # 技术指标特征
-            if 'close' in data.columns:
-                features['returns'] = data['close'].pct_change()
-                features['ma_ratio'] = data['close'] / data['close'].rolling(20).mean()
-                features['volatility'] = data['close'].rolling(20).std()
-            
-            if 'volume' in data.columns:
-                features['volume_ratio'] = data['volume'] / data['volume'].rolling(20).mean()
-        
-        elif feature_type == "market":
-            # 市场微观特征
-            if 'bid' in data.columns and 'ask' in data.columns:
-                features['spread'] = data['ask'] - data['bid']
-                features['mid_price'] = (data['bid'] + data['ask']) / 2
-        
-        return features.dropna()
+        """准备特征（一次性计算，不写入特征存储）"""
+        return compute_features(data, feature_type)
     
-    def train_price_prediction(self, data: pd.DataFrame) -> Dict:
-        """训练价格预测模型"""
+    def _training_data(self,
+                       model_name: str,
+                       data: Optional[pd.DataFrame],
+                       symbol: Optional[str],
+                       timeframe: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        训练用特征矩阵和对齐的收盘价
+        
+        指定symbol时先把data增量写入特征存储，再直接使用内存映射矩阵
+        """
+        feature_type = self.config["models"][model_name]["feature_set"]
+        
+        if symbol is None:
+            features = self.prepare_features(data, feature_type)
+            close = data['close'].reindex(features.index).to_numpy()
+            return features.to_numpy(dtype=np.float32), close, list(features.columns)
+        
+        if data is not None:
+            self.feature_store.update(symbol, timeframe, feature_type, data)
+        _, X, carry = self.feature_store.get(symbol, timeframe, feature_type)
+        close = carry[:, 0] if carry is not None else np.empty(0)
+        return X, close, self.feature_store.columns(symbol, timeframe, feature_type)
+    
+    def train_price_prediction(self,
+                               data: Optional[pd.DataFrame] = None,
+                               symbol: Optional[str] = None,
+                               timeframe: str = "1h") -> Dict:
+        """
+        训练价格预测模型
+        
+        Args:
+            data: K线数据；指定symbol时只需传入新增K线，可为None
+            symbol: 指定后使用特征存储
+        """
         logger.info("Training price prediction model...")
         
         # 准备特征
-        features = self.prepare_features(data, "technical")
+        features, close, columns = self._training_data("price_prediction", data, symbol, timeframe)
         
         if len(features) < 100:
             logger.warning("Insufficient data for training")
             return {"status": "failed", "reason": "insufficient_data"}
         
         # 准备标签（预测下一个时间点的价格）
-        y = data['close'].shift(-1).dropna()
-        X = features[:-1]  # 对齐特征和标签
+        X, y = build_xy("price_prediction", features, close)
         
-        # 分割数据
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=self.config["training"]["test_split"],
-            random_state=self.config["training"]["random_state"]
-        )
+        # 按时间顺序分割，测试集在训练集之后
+        X_train, X_test, y_train, y_test = self._chronological_split(X, y)
         
         # 标准化
         scaler = StandardScaler()
@@ -94,12 +107,7 @@ class MLModels:
         X_test_scaled = scaler.transform(X_test)
         
         # 训练模型
-        model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
-        )
-        
+        model = build_estimator("price_prediction", n_jobs=self.config["training"]["n_jobs"])
         model.fit(X_train_scaled, y_train)
         
         # 评估
@@ -117,31 +125,27 @@ class MLModels:
             "status": "success",
             "train_score": train_score,
             "test_score": test_score,
-            "feature_importance": dict(zip(X.columns, model.feature_importances_))
+            "feature_importance": dict(zip(columns, model.feature_importances_))
         }
     
-    def train_trend_classification(self, data: pd.DataFrame) -> Dict:
-        """训练趋势分类模型"""
+    def train_trend_classification(self,
+                                   data: Optional[pd.DataFrame] = None,
+                                   symbol: Optional[str] = None,
+                                   timeframe: str = "1h") -> Dict:
+        """训练趋势分类模型（参数同train_price_prediction）"""
         logger.info("Training trend classification model...")
         
         # 准备特征
-        features = self.prepare_features(data, "technical")
+        features, close, _ = self._training_data("trend_classification", data, symbol, timeframe)
         
         if len(features) < 100:
             return {"status": "failed", "reason": "insufficient_data"}
         
         # 创建标签（上涨/下跌/横盘）
-        returns = data['close'].pct_change().shift(-1).dropna()
-        y = pd.cut(returns, bins=[-np.inf, -0.01, 0.01, np.inf], labels=['down', 'neutral', 'up'])
+        X, y = build_xy("trend_classification", features, close)
         
-        X = features[:-1]
-        y = y[:-1]
-        
-        # 分割数据
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=self.config["training"]["test_split"],
-            random_state=self.config["training"]["random_state"]
-        )
+        # 按时间顺序分割
+        X_train, X_test, y_train, y_test = self._chronological_split(X, y)
         
         # 标准化
         scaler = StandardScaler()
@@ -149,12 +153,7 @@ class MLModels:
         X_test_scaled = scaler.transform(X_test)
         
         # 训练模型
-        model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
-        )
-        
+        model = build_estimator("trend_classification", n_jobs=self.config["training"]["n_jobs"])
         model.fit(X_train_scaled, y_train)
         
         # 评估
@@ -175,6 +174,161 @@ class MLModels:
             "classes": model.classes_.tolist()
         }
     
+    def _chronological_split(self, X: np.ndarray, y: np.ndarray, gap: int = 1) -> Tuple:
+        """最后test_split比例作为测试集，中间留gap行避免标签重叠"""
+        split = int(len(X) * (1 - self.config["training"]["test_split"]))
+        return X[:split - gap], X[split:], y[:split - gap], y[split:]
+    
+    @staticmethod
+    def model_key(model_name: str, symbol: Optional[str] = None) -> str:
+        """模型保存名，按币种训练的模型带币种后缀"""
+        if symbol is None:
+            return model_name
+        return f"{model_name}@{symbol.replace('/', '_')}"
+    
+    def train_walk_forward(self,
+                           model_name: str,
+                           symbols: List[str],
+                           timeframe: str = "1h",
+                           data: Optional[Dict[str, pd.DataFrame]] = None,
+                           n_splits: Optional[int] = None,
+                           n_jobs: Optional[int] = None) -> Dict:
+        """
+        按币种walk-forward评估并全量训练
+        
+        每个币种的各折与全量训练作为独立任务提交到进程池，
+        任务只传特征存储的位置，由子进程自行内存映射读取
+        
+        Args:
+            model_name: price_prediction 或 trend_classification
+            symbols: 币种列表，每个币种训练一个模型
+            data: 新增K线 {symbol: DataFrame}，先写入特征存储
+            n_splits: walk-forward折数
+            n_jobs: 进程数，-1为全部CPU
+        
+        Returns:
+            每个币种的折得分、全量训练得分，以及整次运行的耗时和峰值内存
+        """
+        training = self.config["training"]
+        n_splits = n_splits or training["walk_forward_splits"]
+        n_jobs = training["n_jobs"] if n_jobs is None else n_jobs
+        feature_type = self.config["models"][model_name]["feature_set"]
+        start = time.perf_counter()
+        
+        tasks = []
+        for symbol in symbols:
+            if data and symbol in data:
+                self.feature_store.update(symbol, timeframe, feature_type, data[symbol])
+            n_samples = len(self.feature_store.get(symbol, timeframe, feature_type)[1]) - 1
+            if n_samples < training["min_train_size"]:
+                logger.warning(f"Insufficient data for {model_name} {symbol}")
+                continue
+            
+            source = {
+                "root": str(self.feature_store.root),
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "feature_type": feature_type
+            }
+            base = {"model_name": model_name, "symbol": symbol, "source": source}
+            for train_end, test_start, test_end in walk_forward_splits(
+                    n_samples, n_splits, training["min_train_size"]):
+                tasks.append({**base, "kind": "fold", "train_end": train_end,
+                              "test_start": test_start, "test_end": test_end})
+            tasks.append({**base, "kind": "final"})
+        
+        if not tasks:
+            return {"status": "failed", "reason": "insufficient_data"}
+        
+        results = run_tasks(tasks, n_jobs)
+        
+        report = {}
+        for result in results:
+            symbol = result["symbol"]
+            entry = report.setdefault(symbol, {"folds": []})
+            if result["kind"] == "fold":
+                entry["folds"].append({k: result[k] for k in
+                                       ("train_size", "test_size", "train_score", "test_score", "wall_s")})
+                continue
+            
+            key = self.model_key(model_name, symbol)
+            self.models[key] = result["model"]
+            self.scalers[key] = result["scaler"]
+            self._save_model(key, result["model"], result["scaler"])
+            entry["final"] = {k: result[k] for k in ("train_size", "train_score", "wall_s")}
+        
+        for entry in report.values():
+            scores = [fold["test_score"] for fold in entry["folds"]]
+            entry["mean_test_score"] = float(np.mean(scores)) if scores else None
+        
+        wall_s = round(time.perf_counter() - start, 3)
+        peak = max([peak_rss_mb()] + [r["peak_rss_mb"] for r in results])
+        logger.info(f"Walk-forward training of {model_name} on {len(report)} symbols "
+                    f"took {wall_s}s, peak RSS {peak}MB")
+        
+        return {
+            "status": "success",
+            "symbols": report,
+            "tasks": len(tasks),
+            "n_jobs": n_jobs,
+            "wall_s": wall_s,
+            "peak_rss_mb": peak
+        }
+    
+    def update_model(self,
+                     model_name: str,
+                     symbol: str,
+                     timeframe: str = "1h",
+                     bars: Optional[pd.DataFrame] = None,
+                     new_trees: Optional[int] = None) -> Dict:
+        """
+        增量更新（每日）：在最近update_window行上warm start追加树
+        
+        沿用原标准化参数；树数量超过max_estimators时丢弃最早的树
+        """
+        training = self.config["training"]
+        feature_type = self.config["models"][model_name]["feature_set"]
+        key = self.model_key(model_name, symbol)
+        start = time.perf_counter()
+        
+        if key not in self.models and not self._load_model(key):
+            return {"status": "failed", "reason": "model_not_found"}
+        model = self.models[key]
+        scaler = self.scalers[key]
+        
+        if bars is not None:
+            self.feature_store.update(symbol, timeframe, feature_type, bars)
+        _, features, carry = self.feature_store.get(symbol, timeframe, feature_type)
+        if carry is None or len(features) < 2:
+            return {"status": "failed", "reason": "insufficient_data"}
+        
+        X, y = build_xy(model_name, features[-(training["update_window"] + 1):],
+                        carry[-(training["update_window"] + 1):, 0])
+        
+        # 分类模型的新树必须覆盖相同的类别，否则概率无法合并
+        if hasattr(model, 'classes_') and set(np.unique(y)) != set(model.classes_):
+            logger.warning(f"Skip updating {key}: recent window lacks some classes")
+            return {"status": "failed", "reason": "class_mismatch"}
+        
+        new_trees = new_trees or training["update_trees"]
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+        model.fit(scaler.transform(X), y)
+        model.set_params(warm_start=False)
+        
+        if len(model.estimators_) > training["max_estimators"]:
+            model.estimators_ = model.estimators_[-training["max_estimators"]:]
+            model.set_params(n_estimators=training["max_estimators"])
+        
+        self._save_model(key, model, scaler)
+        
+        return {
+            "status": "success",
+            "n_estimators": len(model.estimators_),
+            "update_size": len(X),
+            "wall_s": round(time.perf_counter() - start, 3),
+            "peak_rss_mb": peak_rss_mb()
+        }
+    
     def predict(self, model_name: str, features: pd.DataFrame) -> np.ndarray:
         """使用模型预测"""
         if model_name not in self.models:
@@ -215,6 +369,37 @@ class MLModels:
         
         return probabilities
     
+    def predict_latest(self,
+                       model_name: str,
+                       symbol: str,
+                       timeframe: str = "1h",
+                       bars: Optional[pd.DataFrame] = None,
+                       n: int = 1,
+                       proba: bool = False) -> np.ndarray:
+        """
+        使用特征存储中最近n行特征预测
+        
+        Args:
+            bars: 新到达的K线，先增量写入特征存储
+            proba: 返回概率
+        """
+        feature_type = self.config["models"][model_name]["feature_set"]
+        if bars is not None:
+            self.feature_store.update(symbol, timeframe, feature_type, bars)
+        
+        features = self.feature_store.latest(symbol, timeframe, feature_type, n)
+        if len(features) == 0:
+            return np.array([])
+        
+        # 优先使用该币种单独训练的模型
+        key = self.model_key(model_name, symbol)
+        if key not in self.models and not self._load_model(key):
+            key = model_name
+        
+        if proba:
+            return self.predict_proba(key, features)
+        return self.predict(key, features)
+    
     def evaluate_model(self, model_name: str, X_test: pd.DataFrame, y_test) -> Dict:
         """评估模型"""
         if model_name not in self.models:
@@ -297,4 +482,5 @@ class MLModels:
         """清理资源"""
         self.models.clear()
         self.scalers.clear()
+        self.feature_store.close()
         logger.info("MLModels cleanup completed")
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+模型训练流水线
+按时间顺序的walk-forward切分评估模型，折和币种在进程池中并行训练，
+记录每次运行的耗时和峰值内存
+"""
+
+import logging
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from ..config.config import ML_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def build_xy(model_name: str, features: np.ndarray, close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """特征与下一根K线标签对齐：price_prediction预测收盘价，trend_classification预测涨跌类别"""
+    X = features[:-1]
+    if model_name == "trend_classification":
+        returns = close[1:] / close[:-1] - 1
+        y = np.asarray(pd.cut(returns, bins=[-np.inf, -0.01, 0.01, np.inf], labels=['down', 'neutral', 'up']))
+    else:
+        y = np.asarray(close[1:])
+    return X, y
+
+
+def build_estimator(model_name: str, n_jobs: int = 1, **params):
+    """按模型名创建随机森林"""
+    estimator = RandomForestClassifier if model_name == "trend_classification" else RandomForestRegressor
+    defaults = {
+        "n_estimators": 100,
+        "max_depth": 10,
+        "random_state": ML_CONFIG["training"]["random_state"],
+        "n_jobs": n_jobs
+    }
+    defaults.update(params)
+    return estimator(**defaults)
+
+
+def walk_forward_splits(n_samples: int,
+                        n_splits: int,
+                        min_train: int = 100,
+                        gap: int = 1) -> List[Tuple[int, int, int]]:
+    """
+    扩展窗口的walk-forward切分
+
+    标签使用下一根K线，训练集末尾留出gap行，避免标签跨进测试区间
+
+    Returns:
+        [(训练集结束, 测试集开始, 测试集结束), ...]，均为行号
+    """
+    test_size = (n_samples - min_train) // n_splits
+    if test_size <= gap:
+        return []
+
+    splits = []
+    for k in range(n_splits):
+        test_start = n_samples - (n_splits - k) * test_size
+        splits.append((test_start - gap, test_start, test_start + test_size))
+    return splits
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB）"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _load_source(source: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """任务数据：特征存储中的内存映射（只传路径）或直接传入的数组"""
+    if "arrays" in source:
+        return source["arrays"]
+
+    from .feature_store import FeatureStore
+    store = FeatureStore(Path(source["root"]))
+    _, features, carry = store.get(source["symbol"], source["timeframe"], source["feature_type"])
+    return features, carry[:, 0]
+
+
+def run_training_task(task: Dict) -> Dict:
+    """
+    进程池任务：训练一折（kind="fold"，返回测试得分）或全量训练（kind="final"，返回模型）
+    """
+    start = time.perf_counter()
+    features, close = _load_source(task["source"])
+    X, y = build_xy(task["model_name"], features, close)
+
+    train_end = task.get("train_end", len(X))
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X[:train_end])
+    model = build_estimator(task["model_name"], n_jobs=task.get("n_jobs", 1))
+    model.fit(X_train, y[:train_end])
+
+    result = {
+        "symbol": task["symbol"],
+        "kind": task["kind"],
+        "train_size": int(train_end),
+        "train_score": float(model.score(X_train, y[:train_end]))
+    }
+    if task["kind"] == "fold":
+        test_start, test_end = task["test_start"], task["test_end"]
+        result["test_size"] = int(test_end - test_start)
+        result["test_score"] = float(model.score(scaler.transform(X[test_start:test_end]), y[test_start:test_end]))
+    else:
+        result["model"] = model
+        result["scaler"] = scaler
+
+    result["wall_s"] = round(time.perf_counter() - start, 3)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_tasks(tasks: List[Dict], n_jobs: int) -> List[Dict]:
+    """执行训练任务；n_jobs<=1时在当前进程顺序执行，-1表示使用全部CPU"""
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs <= 1 or len(tasks) <= 1:
+        return [run_training_task(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+        return list(executor.map(run_training_task, tasks))
@@ -1,5 +1,7 @@
 """策略优化器模块"""
 
 from .strategy_optimizer import StrategyOptimizer
+from .sweep import GridSweep
+from .batch_bayes import BatchBayesSearch
 
-__all__ = ["StrategyOptimizer"]
\ No newline at end of file
+__all__ = ["StrategyOptimizer", "GridSweep", "BatchBayesSearch"]
@@ -7,7 +7,7 @@ import json
 import logging
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 import numpy as np
 import pandas as pd
 from scipy import stats
@@ -17,8 +17,12 @@ from skopt.space import Real, Integer, Categorical
 import warnings
 warnings.filterwarnings('ignore')
 
+from core.running_stats import RunningStats
 from ..config.config import OPTIMIZATION_CONFIG, DATABASE_CONFIG, LOG_DIR
+from ..storage.database import get_database
 from ..records.trade_recorder import TradeRecorder
+from .batch_bayes import BatchBayesSearch
+from .sweep import GridSweep
 
 # 配置日志
 logging.basicConfig(
@@ -41,6 +45,7 @@ class StrategyOptimizer:
         
         # 初始化数据库
         self.db_path = DATABASE_CONFIG["patterns"]["path"].parent / "optimizer.db"
+        self.db = get_database(self.db_path)
         self._init_database()
         
         # 策略权重缓存
@@ -50,7 +55,7 @@ class StrategyOptimizer:
     
     def _init_database(self):
         """初始化优化器数据库"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 策略权重表
@@ -102,7 +107,7 @@ class StrategyOptimizer:
                          days: int = 30) -> Dict[str, float]:
         """评估策略表现"""
         # 获取该策略的交易记录
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        trades = self.trade_recorder.get_closed_trades(days)
         
         # 筛选特定策略的交易（假设交易记录中有strategy_id字段）
         strategy_trades = [t for t in trades if t.get('strategy_id') == strategy_id]
@@ -117,28 +122,16 @@ class StrategyOptimizer:
                 "recovery_factor": 0
             }
         
-        # 计算胜率
-        wins = sum(1 for t in strategy_trades if t.get('exit_pnl', 0) > 0)
-        win_rate = wins / len(strategy_trades)
+        # 一次遍历累计胜率、盈亏比、夏普和回撤
+        trade_stats = self._trade_stats(t.get('exit_pnl', 0) for t in strategy_trades)
         
-        # 计算盈亏比
-        profits = [t['exit_pnl'] for t in strategy_trades if t.get('exit_pnl', 0) > 0]
-        losses = [abs(t['exit_pnl']) for t in strategy_trades if t.get('exit_pnl', 0) < 0]
-        
-        profit_factor = sum(profits) / sum(losses) if losses else float('inf')
-        
-        # 计算夏普比率
-        returns = [t.get('exit_pnl', 0) for t in strategy_trades]
-        if len(returns) > 1:
-            sharpe_ratio = self._calculate_sharpe_ratio(returns)
-        else:
-            sharpe_ratio = 0
-        
-        # 计算最大回撤
-        max_drawdown = self._calculate_max_drawdown(returns)
+        win_rate = trade_stats.win_rate
+        profit_factor = trade_stats.profit_factor
+        sharpe_ratio = trade_stats.sharpe(365)
+        max_drawdown = trade_stats.max_drawdown
         
         # 计算恢复系数
-        recovery_factor = self._calculate_recovery_factor(returns, max_drawdown)
+        recovery_factor = self._calculate_recovery_factor(trade_stats.total_pnl, max_drawdown)
         
         metrics = {
             "win_rate": win_rate,
@@ -153,37 +146,24 @@ class StrategyOptimizer:
         
         return metrics
     
+    @staticmethod
+    def _trade_stats(returns) -> RunningStats:
+        """逐笔累计交易统计（总体标准差，与np.std一致）"""
+        trade_stats = RunningStats(ddof=0)
+        for value in returns:
+            trade_stats.update(value)
+        return trade_stats
+    
     def _calculate_sharpe_ratio(self, returns: List[float], risk_free_rate: float = 0.0) -> float:
-        """计算夏普比率"""
-        returns_array = np.array(returns)
-        excess_returns = returns_array - risk_free_rate
-        
-        if len(excess_returns) < 2:
-            return 0
-        
-        mean_excess_return = np.mean(excess_returns)
-        std_excess_return = np.std(excess_returns)
-        
-        if std_excess_return == 0:
-            return 0
-        
-        # 年化夏普比率（假设每天交易）
-        sharpe_ratio = (mean_excess_return / std_excess_return) * np.sqrt(365)
-        
-        return sharpe_ratio
+        """计算夏普比率（年化，假设每天交易）"""
+        return self._trade_stats(returns).sharpe(365, risk_free_rate)
     
     def _calculate_max_drawdown(self, returns: List[float]) -> float:
-        """计算最大回撤"""
-        cumulative_returns = np.cumsum(returns)
-        running_max = np.maximum.accumulate(cumulative_returns)
-        drawdown = (cumulative_returns - running_max) / (running_max + 1e-8)
-        
-        return abs(np.min(drawdown))
+        """计算最大回撤（相对累计收益峰值，峰值不为正时不计回撤）"""
+        return self._trade_stats(returns).max_drawdown
     
-    def _calculate_recovery_factor(self, returns: List[float], max_drawdown: float) -> float:
+    def _calculate_recovery_factor(self, total_profit: float, max_drawdown: float) -> float:
         """计算恢复系数"""
-        total_profit = sum(returns)
-        
         if max_drawdown == 0:
             return float('inf')
         
@@ -287,35 +267,55 @@ class StrategyOptimizer:
     def optimize_parameters_grid(self,
                                 strategy_id: str,
                                 param_grid: Dict[str, List],
-                                scoring_func: callable) -> Dict[str, Any]:
-        """网格搜索优化参数"""
-        if not self.optimization_config["methods"]["grid_search"]["enabled"]:
+                                scoring_func: callable,
+                                budgets: Optional[List] = None,
+                                n_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """
+        网格搜索优化参数
+
+        组合惰性生成并在进程池中分块评估，得分写入检查点，相同定义的扫描中断后从断点继续。
+        给出budgets时按预算逐级淘汰：scoring_func(params, budget)，每级保留前1/eta
+        """
+        grid_config = self.optimization_config["methods"]["grid_search"]
+        if not grid_config["enabled"]:
             logger.info("Grid search is disabled")
             return {}
         
         logger.info(f"Starting grid search for {strategy_id}")
         
-        # 生成参数组合
-        param_combinations = self._generate_param_combinations(param_grid)
-        
-        best_score = float('-inf')
-        best_params = {}
+        eta = grid_config["halving_eta"]
+        sweep = GridSweep(
+            self.db,
+            GridSweep.make_id(strategy_id, param_grid, budgets, eta),
+            param_grid,
+            scoring_func,
+            budgets=budgets,
+            eta=eta,
+            n_jobs=grid_config["n_jobs"] if n_jobs is None else n_jobs,
+            chunk_size=grid_config["chunk_size"]
+        )
+        if not grid_config["resume"]:
+            sweep.clear()
         
-        for params in param_combinations:
-            score = scoring_func(params)
-            if score > best_score:
-                best_score = score
-                best_params = params
+        result = sweep.run()
+        best_params = result["best_params"]
+        best_score = result["best_score"]
         
         # 保存优化结果
         self._save_optimization_result(
             strategy_id,
             best_params,
-            {"score": best_score},
+            {
+                "score": best_score,
+                "evaluations": result["evaluations"],
+                "resumed": result["resumed"],
+                "evals_per_sec": result["evals_per_sec"]
+            },
             "grid_search"
         )
         
-        logger.info(f"Grid search completed. Best params: {best_params}, Score: {best_score}")
+        logger.info(f"Grid search completed. Best params: {best_params}, Score: {best_score} "
+                    f"({result['evaluations']} evaluations, {result['evals_per_sec']}/s)")
         
         return best_params
     
@@ -323,9 +323,16 @@ class StrategyOptimizer:
                                    strategy_id: str,
                                    search_space: Dict[str, Any],
                                    scoring_func: callable,
-                                   n_calls: int = 50) -> Dict[str, Any]:
-        """贝叶斯优化参数"""
-        if not self.optimization_config["methods"]["bayesian"]["enabled"]:
+                                   n_calls: int = 50,
+                                   batch_size: Optional[int] = None,
+                                   n_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """
+        贝叶斯优化参数
+
+        每轮提出batch_size个参数点并行评估（ask/tell），重复的参数点直接使用缓存得分
+        """
+        bayes_config = self.optimization_config["methods"]["bayesian"]
+        if not bayes_config["enabled"]:
             logger.info("Bayesian optimization is disabled")
             return {}
         
@@ -346,47 +353,46 @@ class StrategyOptimizer:
                 dimensions.append(Categorical(param_range))
         
         # 执行优化
-        from skopt import gp_minimize
-        
-        def objective(params):
-            param_dict = dict(zip(param_names, params))
-            return -scoring_func(param_dict)  # 最小化负分数
-        
-        result = gp_minimize(
-            func=objective,
-            dimensions=dimensions,
+        search = BatchBayesSearch(
+            dimensions,
+            param_names,
+            scoring_func,
             n_calls=n_calls,
-            n_initial_points=self.optimization_config["methods"]["bayesian"]["n_initial_points"],
+            batch_size=bayes_config["batch_size"] if batch_size is None else batch_size,
+            n_jobs=bayes_config["n_jobs"] if n_jobs is None else n_jobs,
+            n_initial_points=bayes_config["n_initial_points"],
             random_state=42
         )
+        result = search.run()
         
-        best_params = dict(zip(param_names, result.x))
-        best_score = -result.fun
+        best_params = result["best_params"]
+        best_score = result["best_score"]
         
         # 保存优化结果
         self._save_optimization_result(
             strategy_id,
             best_params,
-            {"score": best_score},
+            {
+                "score": best_score,
+                "evaluations": result["evaluations"],
+                "cache_hits": result["cache_hits"],
+                "convergence": result["trace"]
+            },
             "bayesian"
         )
         
-        logger.info(f"Bayesian optimization completed. Best params: {best_params}, Score: {best_score}")
+        logger.info(f"Bayesian optimization completed. Best params: {best_params}, Score: {best_score} "
+                    f"({result['evaluations']} evaluations in {result['elapsed_s']}s)")
         
         return best_params
     
-    def _generate_param_combinations(self, param_grid: Dict[str, List]) -> List[Dict]:
-        """生成参数组合"""
+    def _generate_param_combinations(self, param_grid: Dict[str, List]) -> Iterator[Dict]:
+        """惰性生成参数组合"""
         import itertools
         
-        keys = param_grid.keys()
-        values = param_grid.values()
-        
-        combinations = []
-        for combination in itertools.product(*values):
-            combinations.append(dict(zip(keys, combination)))
-        
-        return combinations
+        keys = list(param_grid.keys())
+        for combination in itertools.product(*param_grid.values()):
+            yield dict(zip(keys, combination))
     
     def run_ab_test(self,
                    test_name: str,
@@ -460,7 +466,7 @@ class StrategyOptimizer:
     
     def _get_strategy_trades(self, strategy_id: str, days: int) -> List[Dict]:
         """获取策略的交易记录"""
-        all_trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        all_trades = self.trade_recorder.get_closed_trades(days)
         return [t for t in all_trades if t.get('strategy_id') == strategy_id]
     
     def _calculate_ab_metrics(self, trades: List[Dict]) -> Dict[str, float]:
@@ -492,7 +498,7 @@ class StrategyOptimizer:
                         min_weight: float = 0.1) -> float:
         """应用时间衰减"""
         # 获取策略最后更新时间
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -523,7 +529,7 @@ class StrategyOptimizer:
     
     def get_optimal_weights(self, strategies: List[str]) -> Dict[str, float]:
         """获取最优权重组合"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -560,7 +566,7 @@ class StrategyOptimizer:
                             performance_score: Optional[float] = None,
                             market_condition: Optional[str] = None):
         """保存策略权重"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -582,7 +588,7 @@ class StrategyOptimizer:
     
     def _save_evaluation_metrics(self, strategy_id: str, metrics: Dict[str, float]):
         """保存评估指标"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -605,7 +611,7 @@ class StrategyOptimizer:
                                  metrics: Dict,
                                  method: str):
         """保存优化结果"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -624,7 +630,7 @@ class StrategyOptimizer:
     
     def _save_ab_test_result(self, result: Dict):
         """保存A/B测试结果"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -651,4 +657,5 @@ class StrategyOptimizer:
     def cleanup(self):
         """清理资源"""
         self.strategy_weights.clear()
+        self.db.release()
         logger.info("StrategyOptimizer cleanup completed")
\ No newline at end of file
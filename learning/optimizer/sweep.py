@@ -0,0 +1,299 @@
+"""
+参数网格扫描
+参数组合按序号惰性生成，分块提交到进程池评估；
+可按预算逐级淘汰（successive halving），每完成一块就把得分写入SQLite，中断后可续跑，
+完整跑完后清除检查点，之后相同定义的扫描重新评估
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..storage.database import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+
+def combination_count(param_grid: Dict[str, Sequence]) -> int:
+    """参数组合总数"""
+    return math.prod(len(values) for values in param_grid.values())
+
+
+def combination_at(param_grid: Dict[str, Sequence], index: int) -> Dict[str, Any]:
+    """第index个参数组合，顺序与itertools.product一致（最后一个参数变化最快）"""
+    params = {}
+    for key, values in reversed(list(param_grid.items())):
+        index, position = divmod(index, len(values))
+        params[key] = values[position]
+    return dict(reversed(list(params.items())))
+
+
+def resolve_n_jobs(n_jobs: int, func: Callable) -> int:
+    """
+    实际使用的进程数：-1表示全部CPU；
+    打分函数无法pickle（lambda、闭包、绑定方法等）时提示并退回当前进程执行
+    """
+    n_jobs = (os.cpu_count() or 1) if n_jobs < 0 else n_jobs
+    if n_jobs > 1:
+        try:
+            pickle.dumps(func)
+        except Exception as e:
+            logger.warning(f"Scoring function {func!r} cannot be pickled ({e}), running in-process")
+            return 1
+    return n_jobs
+
+
+def _evaluate_chunk(task: Tuple) -> List[Tuple[int, float]]:
+    """进程池任务：评估一块参数组合，返回[(组合序号, 得分)]"""
+    scoring_func, param_grid, indices, budget = task
+    results = []
+    for index in indices:
+        params = combination_at(param_grid, index)
+        try:
+            score = scoring_func(params) if budget is None else scoring_func(params, budget)
+            score = float(score)
+        except Exception as e:
+            logger.warning(f"Scoring failed for {params}: {e}")
+            score = float('-inf')
+        results.append((index, score if not math.isnan(score) else float('-inf')))
+    return results
+
+
+class GridSweep:
+    """可续跑的并行网格扫描"""
+
+    def __init__(self,
+                 db: SQLiteDatabase,
+                 sweep_id: str,
+                 param_grid: Dict[str, Sequence],
+                 scoring_func: Callable,
+                 budgets: Optional[Sequence] = None,
+                 eta: int = 3,
+                 n_jobs: int = 1,
+                 chunk_size: int = 16):
+        """
+        Args:
+            db: 保存检查点的数据库
+            sweep_id: 扫描标识，相同标识的扫描共享检查点（只在中断后续跑时复用）
+            param_grid: {参数名: 候选值列表}
+            scoring_func: 打分函数，越大越好；使用进程池时需可被pickle（模块级函数），否则在当前进程执行
+            budgets: 逐级递增的预算（如回测天数），给出时以 scoring_func(params, budget) 调用，
+                每一级只保留得分前1/eta的组合进入下一级
+            eta: 淘汰比例
+            n_jobs: 进程数，-1表示全部CPU，<=1时在当前进程执行
+            chunk_size: 每个进程任务包含的组合数
+        """
+        self.db = db
+        self.sweep_id = sweep_id
+        self.param_grid = {key: list(values) for key, values in param_grid.items()}
+        self.scoring_func = scoring_func
+        self.budgets = list(budgets) if budgets else [None]
+        self.eta = max(2, int(eta))
+        self.n_jobs = resolve_n_jobs(n_jobs, scoring_func)
+        self.chunk_size = max(1, int(chunk_size))
+        self._init_table()
+
+    @staticmethod
+    def make_id(strategy_id: str, param_grid: Dict, budgets: Optional[Sequence], eta: int) -> str:
+        """由扫描定义生成稳定的标识"""
+        definition = json.dumps(
+            {"strategy": strategy_id, "grid": param_grid, "budgets": budgets, "eta": eta},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha1(definition.encode()).hexdigest()[:16]
+
+    def _init_table(self):
+        conn = self.db.connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sweep_results (
+                sweep_id TEXT NOT NULL,
+                rung INTEGER NOT NULL,
+                combo INTEGER NOT NULL,
+                score REAL,
+                PRIMARY KEY (sweep_id, rung, combo)
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _load_checkpoint(self, rung: int) -> Dict[int, float]:
+        conn = self.db.connect()
+        rows = conn.execute(
+            'SELECT combo, score FROM sweep_results WHERE sweep_id = ? AND rung = ?',
+            (self.sweep_id, rung)
+        ).fetchall()
+        conn.close()
+        return {combo: score if score is not None else float('-inf') for combo, score in rows}
+
+    def _save_checkpoint(self, rung: int, results: List[Tuple[int, float]]):
+        conn = self.db.connect()
+        conn.executemany(
+            'INSERT OR REPLACE INTO sweep_results (sweep_id, rung, combo, score) VALUES (?, ?, ?, ?)',
+            [(self.sweep_id, rung, index, score) for index, score in results]
+        )
+        conn.commit()
+        conn.close()
+
+    def clear(self):
+        """删除本扫描的检查点"""
+        conn = self.db.connect()
+        conn.execute('DELETE FROM sweep_results WHERE sweep_id = ?', (self.sweep_id,))
+        conn.commit()
+        conn.close()
+
+    def _chunks(self, candidates, done: Dict[int, float]) -> Iterator[Sequence[int]]:
+        """惰性切分待评估的组合序号，跳过检查点中已有的"""
+        if isinstance(candidates, range):
+            for start in range(candidates.start, candidates.stop, self.chunk_size):
+                chunk = range(start, min(start + self.chunk_size, candidates.stop))
+                if done:
+                    chunk = [index for index in chunk if index not in done]
+                if chunk:
+                    yield chunk
+        else:
+            todo = [index for index in candidates if index not in done]
+            for start in range(0, len(todo), self.chunk_size):
+                yield todo[start:start + self.chunk_size]
+
+    def _evaluate(self, executor, rung: int, chunks: Iterator[Sequence[int]]) -> Iterator[List[Tuple[int, float]]]:
+        """评估全部分块，同时在途的任务数有上限，保证组合按需生成"""
+        budget = self.budgets[rung]
+        if executor is None:
+            for chunk in chunks:
+                results = _evaluate_chunk((self.scoring_func, self.param_grid, chunk, budget))
+                self._save_checkpoint(rung, results)
+                yield results
+            return
+
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(_evaluate_chunk, (self.scoring_func, self.param_grid, chunk, budget)))
+            if len(pending) >= 2 * self.n_jobs:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results = future.result()
+                    self._save_checkpoint(rung, results)
+                    yield results
+        for future in pending:
+            results = future.result()
+            self._save_checkpoint(rung, results)
+            yield results
+
+    def run(self) -> Dict[str, Any]:
+        """
+        执行扫描
+
+        Returns:
+            最优参数、得分、各级淘汰情况和吞吐
+        """
+        start = time.perf_counter()
+        candidates = range(combination_count(self.param_grid))
+        evaluated = resumed = 0
+        rungs = []
+        top: List[Tuple[float, int]] = []
+
+        executor = ProcessPoolExecutor(max_workers=self.n_jobs) if self.n_jobs > 1 else None
+        try:
+            for rung, budget in enumerate(self.budgets):
+                last = rung == len(self.budgets) - 1
+                keep = 1 if last else max(1, math.ceil(len(candidates) / self.eta))
+
+                # 只保留前keep名：(得分, -序号)的小顶堆，同分时序号小者优先
+                top = []
+                done = self._load_checkpoint(rung)
+                if not isinstance(candidates, range):
+                    done = {index: done[index] for index in candidates if index in done}
+                resumed += len(done)
+
+                def offer(results):
+                    for index, score in results:
+                        item = (score, -index)
+                        if len(top) < keep:
+                            heapq.heappush(top, item)
+                        elif item > top[0]:
+                            heapq.heapreplace(top, item)
+
+                offer(done.items())
+                count = 0
+                for results in self._evaluate(executor, rung, self._chunks(candidates, done)):
+                    offer(results)
+                    count += len(results)
+                evaluated += count
+
+                rungs.append({
+                    "budget": budget,
+                    "candidates": len(candidates),
+                    "evaluated": count,
+                    "resumed": len(done),
+                    "kept": len(top)
+                })
+                candidates = sorted(-index for _, index in top)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # 跑完后检查点不再需要，避免之后的扫描直接复用旧得分
+        self.clear()
+
+        elapsed = time.perf_counter() - start
+        best_score, best_index = max(top) if top else (float('-inf'), 0)
+        return {
+            "sweep_id": self.sweep_id,
+            "best_params": combination_at(self.param_grid, -best_index) if top else {},
+            "best_score": best_score,
+            "combinations": combination_count(self.param_grid),
+            "evaluations": evaluated,
+            "resumed": resumed,
+            "rungs": rungs,
+            "elapsed_s": round(elapsed, 3),
+            "evals_per_sec": round(evaluated / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+
+def _benchmark_score(params: Dict, budget: Optional[int] = None) -> float:
+    """基准测试用的打分函数：在合成收益序列上计算均线策略的夏普比率"""
+    import numpy as np
+
+    rng = np.random.default_rng(params["seed"])
+    returns = rng.normal(0.0002, 0.01, budget or 20000)
+    prices = np.cumprod(1 + returns)
+    fast = np.convolve(prices, np.ones(params["fast"]) / params["fast"], mode="same")
+    slow = np.convolve(prices, np.ones(params["slow"]) / params["slow"], mode="same")
+    strategy = np.where(fast[:-1] > slow[:-1], returns[1:], 0.0)
+    std = strategy.std()
+    return float(strategy.mean() / std * np.sqrt(365)) if std > 0 else 0.0
+
+
+def benchmark_sweep(max_jobs: Optional[int] = None,
+                    db_dir: Optional[str] = None,
+                    chunk_size: int = 8) -> List[Dict]:
+    """1到max_jobs个进程下网格扫描的评估吞吐（evaluations/sec）"""
+    import tempfile
+    from pathlib import Path
+
+    max_jobs = max_jobs or os.cpu_count() or 1
+    param_grid = {"fast": list(range(5, 50, 5)), "slow": list(range(60, 260, 20)), "seed": [0, 1]}
+
+    report = []
+    with tempfile.TemporaryDirectory(dir=db_dir) as tmp:
+        db = SQLiteDatabase(Path(tmp) / "sweep.db")
+        for n_jobs in range(1, max_jobs + 1):
+            sweep = GridSweep(db, f"benchmark_{n_jobs}", param_grid, _benchmark_score,
+                              n_jobs=n_jobs, chunk_size=chunk_size)
+            result = sweep.run()
+            report.append({"n_jobs": n_jobs, "evaluations": result["evaluations"],
+                           "elapsed_s": result["elapsed_s"], "evals_per_sec": result["evals_per_sec"]})
+        db.close()
+
+    base = report[0]["evals_per_sec"] or 1
+    for row in report:
+        row["speedup"] = round(row["evals_per_sec"] / base, 2)
+        print(f"n_jobs={row['n_jobs']:>2}: {row['evals_per_sec']:>8} evals/s  加速比 {row['speedup']}x")
+    return report
@@ -0,0 +1,127 @@
+"""
+增量关联规则挖掘
+交易按物品编号编码为位集（int位掩码），对每笔交易的全部子项集计数；
+新增/移出交易只更新其子项集的计数，频繁项集和规则直接由计数得出，无需稠密one-hot矩阵和重新挖掘
+"""
+
+from itertools import combinations
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class IncrementalRuleMiner:
+    """可增删交易的频繁项集与关联规则挖掘"""
+
+    def __init__(self, max_len: int = 4):
+        """
+        Args:
+            max_len: 计数的最大项集长度；交易不超过max_len个物品时结果与Apriori/FP-growth完全一致
+        """
+        self.max_len = max_len
+        self.item_ids: Dict[str, int] = {}
+        self.items: List[str] = []
+        self.counts: Dict[int, int] = {}  # 项集位掩码 -> 出现次数
+        self.transactions: Dict[Hashable, int] = {}  # 交易键 -> 交易位掩码
+
+    def _encode(self, transaction: Iterable[str]) -> int:
+        mask = 0
+        for item in transaction:
+            item_id = self.item_ids.get(item)
+            if item_id is None:
+                item_id = self.item_ids[item] = len(self.items)
+                self.items.append(item)
+            mask |= 1 << item_id
+        return mask
+
+    def _subsets(self, mask: int) -> Iterable[int]:
+        bits = [1 << i for i in range(mask.bit_length()) if mask >> i & 1]
+        for size in range(1, min(len(bits), self.max_len) + 1):
+            for combo in combinations(bits, size):
+                yield sum(combo)
+
+    def add(self, key: Hashable, transaction: Iterable[str]):
+        """加入一笔交易；同一键重复加入时先移除旧交易"""
+        if key in self.transactions:
+            self.remove(key)
+        mask = self._encode(transaction)
+        self.transactions[key] = mask
+        for subset in self._subsets(mask):
+            self.counts[subset] = self.counts.get(subset, 0) + 1
+
+    def remove(self, key: Hashable):
+        """移出一笔交易"""
+        mask = self.transactions.pop(key, None)
+        if mask is None:
+            return
+        for subset in self._subsets(mask):
+            count = self.counts[subset] - 1
+            if count:
+                self.counts[subset] = count
+            else:
+                del self.counts[subset]
+
+    def sync(self, records: Dict[Hashable, Any], to_transaction: Callable[[Any], Iterable[str]]) -> Tuple[int, int]:
+        """
+        让交易集合与给定的 {键: 记录} 一致：只对新出现的键调用to_transaction编码并加入，移出已不存在的键
+
+        Returns:
+            (新增数, 移出数)
+        """
+        removed = [key for key in self.transactions if key not in records]
+        for key in removed:
+            self.remove(key)
+        added = 0
+        for key, record in records.items():
+            if key not in self.transactions:
+                self.add(key, to_transaction(record))
+                added += 1
+        return added, len(removed)
+
+    def _names(self, mask: int) -> List[str]:
+        return [self.items[i] for i in range(mask.bit_length()) if mask >> i & 1]
+
+    def frequent_itemsets(self, min_support: float) -> Dict[int, float]:
+        """{项集位掩码: 支持度}"""
+        n = len(self.transactions)
+        if n == 0:
+            return {}
+        min_count = min_support * n
+        return {mask: count / n for mask, count in self.counts.items() if count >= min_count}
+
+    def rules(self,
+              min_support: float,
+              min_confidence: float,
+              consequent: Optional[str] = None) -> List[Dict]:
+        """
+        由频繁项集生成关联规则，指标定义与mlxtend.association_rules相同
+
+        Args:
+            consequent: 只保留结论中包含该物品的规则
+
+        Returns:
+            [{"conditions", "result", "confidence", "support", "lift"}]
+        """
+        if consequent is not None and consequent not in self.item_ids:
+            return []
+        required = 1 << self.item_ids[consequent] if consequent is not None else 0
+        frequent = self.frequent_itemsets(min_support)
+
+        rules = []
+        for mask, support in frequent.items():
+            if mask & (mask - 1) == 0:
+                continue  # 单个物品
+            # 枚举所有非空真子集作为前件
+            antecedent = (mask - 1) & mask
+            while antecedent:
+                result = mask ^ antecedent
+                if required & result == required:
+                    confidence = support / frequent[antecedent]
+                    if confidence >= min_confidence:
+                        rules.append({
+                            "conditions": self._names(antecedent),
+                            "result": self._names(result),
+                            "confidence": confidence,
+                            "support": support,
+                            "lift": confidence / frequent[result]
+                        })
+                antecedent = (antecedent - 1) & mask
+        return rules
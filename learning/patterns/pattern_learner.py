@@ -12,11 +12,12 @@ import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-from mlxtend.frequent_patterns import apriori, association_rules
 import sqlite3
 
 from ..config.config import DATABASE_CONFIG, PATTERN_CONFIG, LOG_DIR
+from ..storage.database import get_database
 from ..records.trade_recorder import TradeRecorder
+from .itemsets import IncrementalRuleMiner
 
 # 配置日志
 logging.basicConfig(
@@ -36,6 +37,7 @@ class PatternLearner:
     def __init__(self, trade_recorder: TradeRecorder):
         self.trade_recorder = trade_recorder
         self.db_path = DATABASE_CONFIG["patterns"]["path"]
+        self.db = get_database(self.db_path)
         self.cache_size = DATABASE_CONFIG["patterns"]["cache_size"]
         
         # 模式识别配置
@@ -50,11 +52,14 @@ class PatternLearner:
         # 缓存
         self.pattern_cache = {}
         
+        # 关联规则的项集计数，随交易增量更新
+        self.rule_miner = IncrementalRuleMiner(self.association_config.get("max_len", 4))
+        
         logger.info("PatternLearner initialized")
     
     def _init_database(self):
         """初始化模式数据库"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 成功模式表
@@ -115,39 +120,54 @@ class PatternLearner:
         conn.commit()
         conn.close()
     
-    def analyze_entry_conditions(self, days: int = 30) -> Dict[str, Any]:
-        """分析入场条件的成功率"""
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+    def analyze_closed_trades(self, days: int = 30) -> Dict[str, Dict[str, Any]]:
+        """一次聚合扫描完成入场条件、市场状态、时间和机会四项分析"""
+        groups = self.trade_recorder.aggregate_closed_trades(days)
+        return {
+            "entry_conditions": self.analyze_entry_conditions(days, groups),
+            "market_states": self.analyze_market_states(days, groups),
+            "time_patterns": self.analyze_time_patterns(days, groups),
+            "opportunity_patterns": self.analyze_opportunity_patterns(days, groups)
+        }
+    
+    @staticmethod
+    def _group_key(value):
+        """分组键中的缺失值还原为None"""
+        return None if pd.isna(value) else value
+    
+    @staticmethod
+    def _sum_by(groups: pd.DataFrame, labels, columns: List[str]) -> pd.DataFrame:
+        return groups.groupby(labels, dropna=False, sort=False)[columns].sum()
+    
+    def analyze_entry_conditions(self, days: int = 30, groups: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """
+        分析入场条件的成功率
         
-        if not trades:
+        Args:
+            groups: aggregate_closed_trades的分组结果，多项分析共用时传入以免重复扫描
+        """
+        if groups is None:
+            groups = self.trade_recorder.aggregate_closed_trades(days)
+        
+        if groups.empty:
             logger.warning("No closed trades found for analysis")
             return {}
         
-        # 按入场原因分组
-        entry_stats = defaultdict(lambda: {"wins": 0, "losses": 0, "total_pnl": 0})
-        
-        for trade in trades:
-            entry_reason = trade.get('entry_reason', 'unknown')
-            pnl = trade.get('exit_pnl', 0)
-            
-            if pnl > 0:
-                entry_stats[entry_reason]["wins"] += 1
-            else:
-                entry_stats[entry_reason]["losses"] += 1
-            
-            entry_stats[entry_reason]["total_pnl"] += pnl
+        # 按入场原因汇总
+        entry_stats = self._sum_by(groups, "entry_reason", ["trades", "wins", "total_pnl"])
         
         # 计算成功率
         patterns = {}
-        for reason, stats in entry_stats.items():
-            total = stats["wins"] + stats["losses"]
-            success_rate = stats["wins"] / total if total > 0 else 0
+        for reason, stats in entry_stats.iterrows():
+            reason = self._group_key(reason)
+            total = int(stats["trades"])
+            success_rate = stats["wins"] / total
             
             patterns[reason] = {
                 "success_rate": success_rate,
                 "total_trades": total,
                 "total_pnl": stats["total_pnl"],
-                "avg_pnl": stats["total_pnl"] / total if total > 0 else 0
+                "avg_pnl": stats["total_pnl"] / total
             }
             
             # 保存成功模式
@@ -174,7 +194,7 @@ class PatternLearner:
     
     def analyze_indicator_combinations(self, days: int = 30) -> Dict[str, Any]:
         """分析指标组合的效果"""
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        trades = self.trade_recorder.get_closed_trades(days)
         
         if not trades:
             return {}
@@ -248,50 +268,31 @@ class PatternLearner:
         
         return successful_combos
     
-    def analyze_market_states(self, days: int = 30) -> Dict[str, Any]:
+    def analyze_market_states(self, days: int = 30, groups: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """分析不同市场状态下的表现"""
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        if groups is None:
+            groups = self.trade_recorder.aggregate_closed_trades(days)
         
-        if not trades:
+        if groups.empty:
             return {}
         
-        # 按市场状态分组
-        market_stats = defaultdict(lambda: {
-            "wins": 0, 
-            "losses": 0, 
-            "total_pnl": 0,
-            "durations": []
-        })
-        
-        for trade in trades:
-            market_state = trade.get('entry_market_state', 'unknown')
-            pnl = trade.get('exit_pnl', 0)
-            duration = trade.get('exit_duration', 0)
-            
-            if pnl > 0:
-                market_stats[market_state]["wins"] += 1
-            else:
-                market_stats[market_state]["losses"] += 1
-            
-            market_stats[market_state]["total_pnl"] += pnl
-            market_stats[market_state]["durations"].append(duration)
+        # 按市场状态汇总
+        market_stats = self._sum_by(groups, "entry_market_state",
+                                    ["trades", "wins", "total_pnl", "total_duration"])
         
         # 分析结果
         patterns = {}
-        for state, stats in market_stats.items():
-            total = stats["wins"] + stats["losses"]
-            if total == 0:
-                continue
-            
+        for state, stats in market_stats.iterrows():
+            state = self._group_key(state)
+            total = int(stats["trades"])
             success_rate = stats["wins"] / total
-            avg_duration = np.mean(stats["durations"]) if stats["durations"] else 0
             
             patterns[state] = {
                 "success_rate": success_rate,
                 "total_trades": total,
                 "total_pnl": stats["total_pnl"],
                 "avg_pnl": stats["total_pnl"] / total,
-                "avg_duration": avg_duration
+                "avg_duration": stats["total_duration"] / total
             }
             
             # 保存有意义的模式
@@ -315,56 +316,34 @@ class PatternLearner:
         
         return patterns
     
-    def analyze_time_patterns(self, days: int = 30) -> Dict[str, Any]:
+    def analyze_time_patterns(self, days: int = 30, groups: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """分析时间模式"""
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        if groups is None:
+            groups = self.trade_recorder.aggregate_closed_trades(days)
         
-        if not trades:
+        # 跳过入场时间缺失或无法解析的交易
+        timed = groups[groups["entry_weekday"].notna()]
+        if timed.empty:
             return {}
         
-        # 按时间段分组
-        time_stats = defaultdict(lambda: {"wins": 0, "losses": 0, "total_pnl": 0})
+        hours = timed["entry_hour"].astype(int)
+        # 按小时、星期、时段分组
+        hour_keys = hours.map(lambda hour: f"hour_{hour:02d}")
+        dow_keys = timed["entry_weekday"].astype(int).map(lambda dow: f"dow_{dow}")
+        period_keys = pd.Series(
+            np.select([hours < 6, hours < 12, hours < 18], ["night", "morning", "afternoon"], "evening"),
+            index=timed.index
+        )
         
-        for trade in trades:
-            timestamp_str = trade.get('entry_timestamp', '')
-            if not timestamp_str:
-                continue
-            
-            try:
-                timestamp = datetime.fromisoformat(timestamp_str)
-                hour = timestamp.hour
-                day_of_week = timestamp.weekday()
-                
-                # 按小时分组
-                hour_key = f"hour_{hour:02d}"
-                # 按星期分组
-                dow_key = f"dow_{day_of_week}"
-                # 按时段分组
-                if 0 <= hour < 6:
-                    period_key = "night"
-                elif 6 <= hour < 12:
-                    period_key = "morning"
-                elif 12 <= hour < 18:
-                    period_key = "afternoon"
-                else:
-                    period_key = "evening"
-                
-                pnl = trade.get('exit_pnl', 0)
-                
-                for key in [hour_key, dow_key, period_key]:
-                    if pnl > 0:
-                        time_stats[key]["wins"] += 1
-                    else:
-                        time_stats[key]["losses"] += 1
-                    time_stats[key]["total_pnl"] += pnl
-            
-            except (ValueError, AttributeError):
-                continue
+        columns = ["trades", "wins", "total_pnl"]
+        time_stats = pd.concat([
+            self._sum_by(timed, keys, columns) for keys in (hour_keys, dow_keys, period_keys)
+        ])
         
         # 分析结果
         patterns = {}
-        for time_key, stats in time_stats.items():
-            total = stats["wins"] + stats["losses"]
+        for time_key, stats in time_stats.iterrows():
+            total = int(stats["trades"])
             if total < 5:  # 样本太少
                 continue
             
@@ -390,75 +369,60 @@ class PatternLearner:
         
         return patterns
     
-    def analyze_opportunity_patterns(self, days: int = 30) -> Dict[str, Any]:
+    def analyze_opportunity_patterns(self, days: int = 30, groups: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """分析机会识别模式"""
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        if groups is None:
+            groups = self.trade_recorder.aggregate_closed_trades(days)
         
-        if not trades:
+        # 只统计有入场价的交易
+        priced = groups[groups["opportunities"] > 0]
+        if priced.empty:
             return {}
         
-        opportunity_stats = defaultdict(lambda: {
-            "successful": [],
-            "failed": [],
-            "returns": [],
-            "risk_rewards": []
+        # 识别机会类型：每个(入场原因, 市场状态)组合只判断一次
+        opportunity_types = [
+            self._identify_opportunity_type({
+                "entry_reason": self._group_key(reason) or "",
+                "entry_market_state": self._group_key(state) or ""
+            })
+            for reason, state in zip(priced["entry_reason"], priced["entry_market_state"])
+        ]
+        opportunity_stats = priced.groupby(opportunity_types, sort=False).agg({
+            "opportunities": "sum",
+            "opportunity_wins": "sum",
+            "opportunity_return": "sum",
+            "winning_indicators": lambda lists: [item for items in lists for item in items]
         })
         
-        for trade in trades:
-            # 提取机会相关信息
-            entry_reason = trade.get('entry_reason', '')
-            pnl = trade.get('exit_pnl', 0)
-            entry_price = trade.get('entry_price', 0)
-            exit_price = trade.get('exit_price', 0)
-            
-            if not entry_price:
-                continue
-            
-            # 计算收益率
-            return_rate = (exit_price - entry_price) / entry_price if entry_price > 0 else 0
-            
-            # 识别机会类型
-            opportunity_type = self._identify_opportunity_type(trade)
-            
-            if pnl > 0:
-                opportunity_stats[opportunity_type]["successful"].append(trade)
-            else:
-                opportunity_stats[opportunity_type]["failed"].append(trade)
-            
-            opportunity_stats[opportunity_type]["returns"].append(return_rate)
-            
-            # 计算风险收益比
-            if 'stop_loss' in trade and 'take_profit' in trade:
-                risk = abs(entry_price - trade['stop_loss'])
-                reward = abs(trade['take_profit'] - entry_price)
-                if risk > 0:
-                    opportunity_stats[opportunity_type]["risk_rewards"].append(reward / risk)
-        
         # 分析并保存机会模式
         patterns = {}
-        for opp_type, stats in opportunity_stats.items():
-            total = len(stats["successful"]) + len(stats["failed"])
+        for opp_type, stats in opportunity_stats.iterrows():
+            total = int(stats["opportunities"])
             if total < 5:
                 continue
             
-            success_rate = len(stats["successful"]) / total
-            avg_return = np.mean(stats["returns"]) if stats["returns"] else 0
-            avg_risk_reward = np.mean(stats["risk_rewards"]) if stats["risk_rewards"] else 0
+            successful = int(stats["opportunity_wins"])
+            success_rate = successful / total
+            avg_return = stats["opportunity_return"] / total
+            # trades表不记录止损/止盈价，风险收益比无从计算
+            avg_risk_reward = 0
             
             patterns[opp_type] = {
                 "success_rate": success_rate,
                 "total_opportunities": total,
                 "avg_return": avg_return,
                 "avg_risk_reward": avg_risk_reward,
-                "successful_examples": len(stats["successful"]),
-                "failed_examples": len(stats["failed"])
+                "successful_examples": successful,
+                "failed_examples": total - successful
             }
             
-            # 保存有价值的机会模式
+            # 保存有价值的机会模式，只在此时解析成功交易的指标
             if total >= 10 and success_rate >= 0.5:
                 self._save_opportunity_pattern(
                     opportunity_type=opp_type,
-                    trigger_conditions=self._extract_trigger_conditions(stats["successful"]),
+                    trigger_conditions=self._extract_trigger_conditions(
+                        [{"entry_indicators": indicators} for indicators in stats["winning_indicators"]]
+                    ),
                     success_rate=success_rate,
                     avg_return=avg_return,
                     risk_reward_ratio=avg_risk_reward,
@@ -507,18 +471,19 @@ class PatternLearner:
         trigger_conditions = {}
         for key, values in common_indicators.items():
             if values:
+                # 转为Python float，整数指标的np.int64无法JSON序列化
                 trigger_conditions[key] = {
-                    "mean": np.mean(values),
-                    "std": np.std(values),
-                    "min": np.min(values),
-                    "max": np.max(values)
+                    "mean": float(np.mean(values)),
+                    "std": float(np.std(values)),
+                    "min": float(np.min(values)),
+                    "max": float(np.max(values))
                 }
         
         return trigger_conditions
     
     def identify_common_mistakes(self, days: int = 30) -> List[Dict]:
         """识别常见错误"""
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        trades = self.trade_recorder.get_closed_trades(days)
         
         # 筛选亏损交易
         losing_trades = [t for t in trades if t.get('exit_pnl', 0) < 0]
@@ -571,88 +536,58 @@ class PatternLearner:
         return mistakes
     
     def mine_association_rules(self, days: int = 30) -> List[Dict]:
-        """挖掘关联规则"""
-        trades = self.trade_recorder.get_recent_trades(days=days, status='closed')
+        """
+        挖掘关联规则
+        
+        项集计数保存在rule_miner中，每次只加入新平仓的交易、移出滑出时间窗口的交易
+        """
+        trades = self.trade_recorder.get_closed_trades(days)
         
         if len(trades) < 20:
             logger.warning("Not enough trades for association rule mining")
             return []
         
-        # 准备数据
-        transactions = []
-        for trade in trades:
-            transaction = []
-            
-            # 添加成功/失败标签
-            if trade.get('exit_pnl', 0) > 0:
-                transaction.append('profitable')
-            else:
-                transaction.append('loss')
-            
-            # 添加市场状态
-            market_state = trade.get('entry_market_state', '')
-            if market_state:
-                transaction.append(f"market_{market_state}")
-            
-            # 添加入场原因
-            entry_reason = trade.get('entry_reason', '')
-            if entry_reason:
-                transaction.append(f"reason_{entry_reason}")
-            
-            # 添加时间特征
-            timestamp_str = trade.get('entry_timestamp', '')
-            if timestamp_str:
-                try:
-                    timestamp = datetime.fromisoformat(timestamp_str)
-                    transaction.append(f"hour_{timestamp.hour // 6}")  # 分成4个时段
-                except ValueError:
-                    pass
-            
-            transactions.append(transaction)
-        
-        # 转换为适合关联规则挖掘的格式
-        unique_items = set(item for transaction in transactions for item in transaction)
-        encoded_transactions = []
+        added, removed = self.rule_miner.sync({trade['id']: trade for trade in trades}, self._trade_items)
+        logger.debug(f"Association rule miner: +{added} / -{removed} trades")
         
-        for transaction in transactions:
-            encoded_transaction = {item: (item in transaction) for item in unique_items}
-            encoded_transactions.append(encoded_transaction)
+        # 筛选有价值的规则
+        return self.rule_miner.rules(
+            min_support=self.association_config["min_support"],
+            min_confidence=self.association_config["min_confidence"],
+            consequent='profitable'
+        )
+    
+    @staticmethod
+    def _trade_items(trade: Dict) -> List[str]:
+        """交易的物品集合：盈亏标签、市场状态、入场原因、入场时段"""
+        transaction = []
+        
+        # 添加成功/失败标签
+        if trade.get('exit_pnl', 0) > 0:
+            transaction.append('profitable')
+        else:
+            transaction.append('loss')
         
-        df = pd.DataFrame(encoded_transactions)
+        # 添加市场状态
+        market_state = trade.get('entry_market_state', '')
+        if market_state:
+            transaction.append(f"market_{market_state}")
         
-        # 使用Apriori算法
-        try:
-            frequent_itemsets = apriori(
-                df, 
-                min_support=self.association_config["min_support"],
-                use_colnames=True
-            )
-            
-            if not frequent_itemsets.empty:
-                rules = association_rules(
-                    frequent_itemsets,
-                    metric="confidence",
-                    min_threshold=self.association_config["min_confidence"]
-                )
-                
-                # 筛选有价值的规则
-                valuable_rules = []
-                for _, rule in rules.iterrows():
-                    if 'profitable' in rule['consequents']:
-                        valuable_rules.append({
-                            "conditions": list(rule['antecedents']),
-                            "result": list(rule['consequents']),
-                            "confidence": rule['confidence'],
-                            "support": rule['support'],
-                            "lift": rule['lift']
-                        })
-                
-                return valuable_rules
+        # 添加入场原因
+        entry_reason = trade.get('entry_reason', '')
+        if entry_reason:
+            transaction.append(f"reason_{entry_reason}")
         
-        except Exception as e:
-            logger.error(f"Association rule mining failed: {e}")
+        # 添加时间特征
+        timestamp_str = trade.get('entry_timestamp', '')
+        if timestamp_str:
+            try:
+                timestamp = datetime.fromisoformat(timestamp_str)
+                transaction.append(f"hour_{timestamp.hour // 6}")  # 分成4个时段
+            except ValueError:
+                pass
         
-        return []
+        return transaction
     
     def _save_success_pattern(self, 
                              pattern_type: str,
@@ -662,7 +597,7 @@ class PatternLearner:
                              sample_size: int,
                              confidence: float = 0.95):
         """保存成功模式"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -694,7 +629,7 @@ class PatternLearner:
                             sample_size: int,
                             risk_level: str = "medium"):
         """保存失败模式"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -726,7 +661,7 @@ class PatternLearner:
                                  risk_reward_ratio: float,
                                  sample_size: int):
         """保存机会识别模式"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -755,7 +690,7 @@ class PatternLearner:
     
     def get_best_patterns(self, pattern_type: Optional[str] = None, limit: int = 10) -> List[Dict]:
         """获取最佳模式"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -786,7 +721,7 @@ class PatternLearner:
     
     def get_risk_patterns(self, limit: int = 10) -> List[Dict]:
         """获取风险模式"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -810,4 +745,5 @@ class PatternLearner:
     def cleanup(self):
         """清理资源"""
         self.pattern_cache.clear()
+        self.db.release()
         logger.info("PatternLearner cleanup completed")
\ No newline at end of file
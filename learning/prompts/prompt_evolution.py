@@ -13,6 +13,7 @@ import numpy as np
 from collections import defaultdict
 
 from ..config.config import PROMPT_CONFIG, DATABASE_CONFIG, LOG_DIR
+from ..storage.database import get_database
 
 # 配置日志
 logging.basicConfig(
@@ -32,6 +33,7 @@ class PromptEvolution:
     def __init__(self):
         self.config = PROMPT_CONFIG
         self.db_path = DATABASE_CONFIG["patterns"]["path"].parent / "prompts.db"
+        self.db = get_database(self.db_path)
         
         # 进化参数
         self.mutation_rate = self.config["mutation_rate"]
@@ -49,7 +51,7 @@ class PromptEvolution:
     
     def _init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 提示词表
@@ -89,7 +91,7 @@ class PromptEvolution:
     
     def _load_population(self) -> List[Dict]:
         """加载提示词种群"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -162,7 +164,7 @@ class PromptEvolution:
                     was_successful: Optional[bool] = None,
                     execution_time: Optional[float] = None):
         """记录提示词使用情况"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 记录性能
@@ -365,7 +367,7 @@ class PromptEvolution:
     
     def get_best_prompt(self, prompt_type: str, context: Optional[Dict] = None) -> Dict:
         """获取最佳提示词"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -440,7 +442,7 @@ class PromptEvolution:
     
     def _save_prompt(self, prompt: Dict):
         """保存提示词"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -467,7 +469,7 @@ class PromptEvolution:
     
     def get_statistics(self) -> Dict:
         """获取统计信息"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 总体统计
@@ -510,4 +512,5 @@ class PromptEvolution:
     def cleanup(self):
         """清理资源"""
         self.prompt_population.clear()
+        self.db.release()
         logger.info("PromptEvolution cleanup completed")
\ No newline at end of file
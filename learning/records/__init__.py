@@ -1,11 +1,13 @@
 """交易记录管理模块"""
 
 from .trade_recorder import TradeRecorder, TradeRecord, TradeEntry, TradeExit, TradeContext
+from .trade_archive import TradeArchive
 
 __all__ = [
     "TradeRecorder",
     "TradeRecord",
     "TradeEntry",
     "TradeExit",
-    "TradeContext"
+    "TradeContext",
+    "TradeArchive"
 ]
\ No newline at end of file
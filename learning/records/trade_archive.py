@@ -0,0 +1,160 @@
+"""
+交易归档
+按 year/month/symbol 分区的Parquet数据集（zstd压缩），支持增量追加，
+读取时下推时间和币种过滤，只扫描命中的分区和行组
+"""
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+logger = logging.getLogger(__name__)
+
+# SQLite声明类型到Arrow类型
+SQLITE_ARROW_TYPES = {
+    "INTEGER": pa.int64(),
+    "REAL": pa.float64(),
+    "TEXT": pa.string(),
+}
+
+# 分区字段（按ts的UTC年月）
+PARTITION_SCHEMA = pa.schema([
+    ("year", pa.int16()),
+    ("month", pa.int8()),
+    ("symbol", pa.string()),
+])
+
+
+class TradeArchive:
+    """交易Parquet归档"""
+
+    def __init__(self,
+                 root: Path,
+                 columns: Sequence[Tuple[str, str]],
+                 compression: str = "zstd",
+                 row_group_size: int = 64 * 1024):
+        """
+        Args:
+            root: 数据集根目录
+            columns: trades表的(列名, SQLite类型)，用于固定归档schema
+            compression: Parquet压缩算法
+            row_group_size: 每个行组的最大行数
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.row_group_size = row_group_size
+
+        fields = [(name, SQLITE_ARROW_TYPES.get(decl.upper(), pa.string()))
+                  for name, decl in columns if name not in ("year", "month")]
+        self.data_schema = pa.schema(fields)
+        self.schema = pa.schema(fields + [f for f in PARTITION_SCHEMA if f.name != "symbol"])
+        self.partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+
+    def append(self, df: pd.DataFrame) -> int:
+        """追加一批交易记录，每次写入独立的文件，返回写入行数"""
+        if df.empty:
+            return 0
+
+        df = df.reindex(columns=self.data_schema.names)
+        table = pa.Table.from_pandas(df, schema=self.data_schema, preserve_index=False)
+
+        # 分区列来自ts（epoch秒）
+        ts = pc.cast(table["ts"], pa.timestamp("s", tz="UTC"))
+        table = table.append_column("year", pc.cast(pc.year(ts), pa.int16()))
+        table = table.append_column("month", pc.cast(pc.month(ts), pa.int8()))
+
+        # 按时间排序，行组统计信息才能有效跳过
+        table = table.sort_by([("symbol", "ascending"), ("ts", "ascending")])
+
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=self.partitioning,
+            basename_template=f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+            max_rows_per_group=self.row_group_size,
+            min_rows_per_group=min(self.row_group_size, table.num_rows),
+        )
+        return table.num_rows
+
+    def dataset(self) -> ds.Dataset:
+        """打开数据集（每次调用重新发现文件）"""
+        return ds.dataset(self.root, schema=self.schema, format="parquet", partitioning=self.partitioning)
+
+    def read(self,
+             start_ts: Optional[int] = None,
+             end_ts: Optional[int] = None,
+             symbols: Optional[Iterable[str]] = None,
+             status: Optional[str] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        读取归档
+
+        Args:
+            start_ts: ts下界（含）
+            end_ts: ts上界（不含）
+            symbols: 币种列表
+            status: 交易状态
+            columns: 需要的列，默认全部数据列
+        """
+        columns = columns or self.data_schema.names
+        expression = self._filter(start_ts, end_ts, symbols, status)
+        table = self.dataset().to_table(columns=columns, filter=expression)
+        return table.to_pandas()
+
+    def read_trades(self,
+                    start_ts: Optional[int] = None,
+                    end_ts: Optional[int] = None,
+                    symbols: Optional[Iterable[str]] = None,
+                    status: Optional[str] = None) -> List[Dict]:
+        """读取归档交易，格式与TradeRecorder查询结果一致（按ts倒序）"""
+        expression = self._filter(start_ts, end_ts, symbols, status)
+        table = self.dataset().to_table(columns=self.data_schema.names, filter=expression)
+        return table.sort_by([("ts", "descending")]).to_pylist()
+
+    def count(self,
+              start_ts: Optional[int] = None,
+              end_ts: Optional[int] = None,
+              symbols: Optional[Iterable[str]] = None,
+              status: Optional[str] = None) -> int:
+        """统计满足过滤条件的行数"""
+        return self.dataset().count_rows(filter=self._filter(start_ts, end_ts, symbols, status))
+
+    def _filter(self,
+                start_ts: Optional[int],
+                end_ts: Optional[int],
+                symbols: Optional[Iterable[str]],
+                status: Optional[str]) -> Optional[ds.Expression]:
+        """构造过滤表达式：分区字段条件用于目录裁剪，ts条件用于行组统计裁剪"""
+        conditions = []
+        year, month = ds.field("year"), ds.field("month")
+
+        if start_ts is not None:
+            start = datetime.fromtimestamp(start_ts, timezone.utc)
+            conditions.append((year > start.year) | ((year == start.year) & (month >= start.month)))
+            conditions.append(ds.field("ts") >= start_ts)
+        if end_ts is not None:
+            end = datetime.fromtimestamp(end_ts, timezone.utc)
+            conditions.append((year < end.year) | ((year == end.year) & (month <= end.month)))
+            conditions.append(ds.field("ts") < end_ts)
+        if symbols is not None:
+            conditions.append(ds.field("symbol").isin(list(symbols)))
+        if status is not None:
+            conditions.append(ds.field("status") == status)
+
+        if not conditions:
+            return None
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression = expression & condition
+        return expression
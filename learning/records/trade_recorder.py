@@ -6,6 +6,7 @@
 import json
 import sqlite3
 import gzip
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any
@@ -14,6 +15,8 @@ from dataclasses import dataclass, asdict
 import pandas as pd
 
 from ..config.config import DATABASE_CONFIG, LOG_DIR
+from ..storage.database import get_database
+from .trade_archive import TradeArchive
 
 # 配置日志
 logging.basicConfig(
@@ -26,6 +29,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 组合索引：时间条件使用整数ts列，索引尾部带上聚合列以覆盖统计查询
+TRADE_INDEXES = {
+    "idx_status_symbol_ts": "trades(status, symbol, ts, exit_pnl, exit_duration)",
+    "idx_status_ts": "trades(status, ts, exit_pnl, exit_duration)",
+    "idx_symbol_ts": "trades(symbol, ts)",
+    "idx_ts": "trades(ts)",
+    # 只索引尚未写入Parquet归档的交易
+    "idx_unarchived": "trades(status, ts) WHERE archived = 0",
+    "idx_pnl": "trades(exit_pnl)",
+}
+
+# 已被组合索引取代的旧索引
+LEGACY_INDEXES = ("idx_symbol", "idx_timestamp", "idx_status")
+
+
+def _iso_to_epoch(value: Optional[str]) -> Optional[int]:
+    """ISO时间字符串转为epoch秒，无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
 
 @dataclass
 class TradeEntry:
@@ -73,10 +100,13 @@ class TradeRecord:
 class TradeRecorder:
     """交易记录器"""
     
-    def __init__(self):
-        self.db_path = DATABASE_CONFIG["trade_records"]["path"]
-        self.backup_path = DATABASE_CONFIG["trade_records"]["backup_path"]
-        self.retention_days = DATABASE_CONFIG["trade_records"]["retention_days"]
+    def __init__(self, db_path: Optional[Path] = None, archive_path: Optional[Path] = None):
+        config = DATABASE_CONFIG["trade_records"]
+        self.db_path = Path(db_path) if db_path else config["path"]
+        self.db = get_database(self.db_path)
+        self.backup_path = config["backup_path"]
+        self.retention_days = config["retention_days"]
+        self.archive_query_days = config["archive_query_days"]
         
         # 确保目录存在
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -84,11 +114,18 @@ class TradeRecorder:
         
         # 初始化数据库
         self._init_database()
+        
+        # Parquet归档，schema与trades表一致
+        self.archive = TradeArchive(
+            archive_path or config["archive_path"],
+            self._table_columns(),
+            compression=config["archive_compression"]
+        )
         logger.info(f"TradeRecorder initialized with db: {self.db_path}")
     
     def _init_database(self):
         """初始化数据库表"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 创建交易记录表
@@ -96,6 +133,7 @@ class TradeRecorder:
             CREATE TABLE IF NOT EXISTS trades (
                 id TEXT PRIMARY KEY,
                 timestamp TEXT NOT NULL,
+                ts INTEGER,
                 symbol TEXT NOT NULL,
                 direction TEXT NOT NULL,
                 entry_price REAL,
@@ -109,48 +147,91 @@ class TradeRecorder:
                 exit_duration REAL,
                 exit_pnl REAL,
                 exit_timestamp TEXT,
+                exit_ts INTEGER,
                 context_market_trend TEXT,
                 context_volatility REAL,
                 context_news_events TEXT,
                 context_trader_actions TEXT,
                 status TEXT,
+                archived INTEGER DEFAULT 0,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                 updated_at TEXT DEFAULT CURRENT_TIMESTAMP
             )
         ''')
         
+        # 旧库补充整数时间列和归档标记
+        self._migrate_time_columns(conn)
+        if 'archived' not in {row[1] for row in cursor.execute('PRAGMA table_info(trades)')}:
+            cursor.execute('ALTER TABLE trades ADD COLUMN archived INTEGER DEFAULT 0')
+        
         # 创建索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbol ON trades(symbol)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON trades(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON trades(status)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pnl ON trades(exit_pnl)')
+        for name in LEGACY_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        for name, definition in TRADE_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
         
         conn.commit()
         conn.close()
     
+    def _migrate_time_columns(self, conn: sqlite3.Connection):
+        """为旧表添加ts/exit_ts列并从ISO时间字符串回填"""
+        cursor = conn.cursor()
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(trades)')}
+        
+        for column in ("ts", "exit_ts"):
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE trades ADD COLUMN {column} INTEGER')
+        
+        # 按本地时间解析，与写入时datetime.now().isoformat()一致
+        conn.create_function("iso_to_epoch", 1, _iso_to_epoch, deterministic=True)
+        cursor.execute('UPDATE trades SET ts = iso_to_epoch(timestamp) WHERE ts IS NULL')
+        backfilled = cursor.rowcount
+        cursor.execute('''
+            UPDATE trades SET exit_ts = iso_to_epoch(exit_timestamp)
+            WHERE exit_ts IS NULL AND exit_timestamp IS NOT NULL
+        ''')
+        
+        if backfilled > 0:
+            logger.info(f"Backfilled epoch time columns for {backfilled} trades")
+    
+    def _table_columns(self) -> List[tuple]:
+        """trades表的(列名, 类型)，不含归档标记"""
+        conn = self.db.connect()
+        columns = [(row[1], row[2]) for row in conn.execute('PRAGMA table_info(trades)')
+                   if row[1] != 'archived']
+        conn.close()
+        return columns
+    
+    @staticmethod
+    def _cutoff(days: int) -> int:
+        """days天前的epoch秒"""
+        return int(time.time()) - int(days) * 86400
+    
     def record_trade_entry(self, 
                           symbol: str,
                           direction: str,
                           entry: TradeEntry,
                           context: TradeContext) -> str:
         """记录交易入场"""
-        trade_id = f"{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        now = datetime.now()
+        trade_id = f"{symbol}_{now.strftime('%Y%m%d_%H%M%S')}"
         
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
             INSERT INTO trades (
-                id, timestamp, symbol, direction,
+                id, timestamp, ts, symbol, direction,
                 entry_price, entry_reason, entry_indicators,
                 entry_market_state, entry_ai_analysis, entry_timestamp,
                 context_market_trend, context_volatility,
                 context_news_events, context_trader_actions,
                 status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             trade_id,
-            datetime.now().isoformat(),
+            now.isoformat(),
+            int(now.timestamp()),
             symbol,
             direction,
             entry.price,
@@ -176,7 +257,7 @@ class TradeRecorder:
                          trade_id: str,
                          exit_info: TradeExit):
         """记录交易出场"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -186,6 +267,7 @@ class TradeRecorder:
                 exit_duration = ?,
                 exit_pnl = ?,
                 exit_timestamp = ?,
+                exit_ts = ?,
                 status = ?,
                 updated_at = ?
             WHERE id = ?
@@ -195,6 +277,7 @@ class TradeRecorder:
             exit_info.duration,
             exit_info.pnl,
             exit_info.timestamp,
+            _iso_to_epoch(exit_info.timestamp) or int(time.time()),
             'closed',
             datetime.now().isoformat(),
             trade_id
@@ -207,7 +290,7 @@ class TradeRecorder:
     
     def get_trade_by_id(self, trade_id: str) -> Optional[Dict]:
         """根据ID获取交易记录"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -224,18 +307,18 @@ class TradeRecorder:
                             symbol: str,
                             status: Optional[str] = None) -> List[Dict]:
         """获取指定币种的交易记录"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         if status:
             cursor.execute(
-                'SELECT * FROM trades WHERE symbol = ? AND status = ? ORDER BY timestamp DESC',
-                (symbol, status)
+                'SELECT * FROM trades WHERE status = ? AND symbol = ? ORDER BY ts DESC',
+                (status, symbol)
             )
         else:
             cursor.execute(
-                'SELECT * FROM trades WHERE symbol = ? ORDER BY timestamp DESC',
+                'SELECT * FROM trades WHERE symbol = ? ORDER BY ts DESC',
                 (symbol,)
             )
         
@@ -248,36 +331,176 @@ class TradeRecorder:
                          days: int = 7,
                          status: Optional[str] = None) -> List[Dict]:
         """获取最近的交易记录"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        cutoff_date = datetime.now().isoformat()
+        cutoff = self._cutoff(days)
         
         if status:
             cursor.execute('''
-                SELECT * FROM trades 
-                WHERE datetime(timestamp) >= datetime('now', '-' || ? || ' days')
-                AND status = ?
-                ORDER BY timestamp DESC
-            ''', (days, status))
+                SELECT * FROM trades
+                WHERE status = ? AND ts >= ?
+                ORDER BY ts DESC
+            ''', (status, cutoff))
         else:
             cursor.execute('''
-                SELECT * FROM trades 
-                WHERE datetime(timestamp) >= datetime('now', '-' || ? || ' days')
-                ORDER BY timestamp DESC
-            ''', (days,))
+                SELECT * FROM trades
+                WHERE ts >= ?
+                ORDER BY ts DESC
+            ''', (cutoff,))
         
         rows = cursor.fetchall()
         conn.close()
         
         return [dict(row) for row in rows]
     
+    def get_closed_trades(self,
+                          days: int = 30,
+                          symbols: Optional[List[str]] = None) -> List[Dict]:
+        """
+        获取最近days天入场的已平仓交易（按ts倒序）
+        
+        超过archive_query_days的长周期查询从Parquet归档读取，
+        SQLite只补充尚未导出的交易
+        """
+        cutoff = self._cutoff(days)
+        symbol_clause = ""
+        params: List[Any] = ['closed', cutoff]
+        if symbols:
+            symbol_clause = f" AND symbol IN ({','.join('?' * len(symbols))})"
+            params.extend(symbols)
+        
+        conn = self.db.connect()
+        conn.row_factory = sqlite3.Row
+        
+        if days <= self.archive_query_days:
+            rows = conn.execute(f'''
+                SELECT * FROM trades
+                WHERE status = ? AND ts >= ?{symbol_clause}
+                ORDER BY ts DESC
+            ''', params).fetchall()
+            conn.close()
+            return [dict(row) for row in rows]
+        
+        # 尚未导出的交易只在SQLite中
+        rows = conn.execute(f'''
+            SELECT * FROM trades
+            WHERE status = ? AND ts >= ?{symbol_clause} AND archived = 0
+        ''', params).fetchall()
+        conn.close()
+        
+        pending = [dict(row) for row in rows]
+        archived = self.archive.read_trades(start_ts=cutoff, symbols=symbols, status='closed')
+        
+        trades = archived + pending
+        trades.sort(key=lambda t: t['ts'] or 0, reverse=True)
+        return trades
+
+    def aggregate_closed_trades(self,
+                                days: int = 30,
+                                symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        单次扫描把最近days天的已平仓交易聚合成紧凑的分组表，供模式分析共用
+
+        按 (entry_reason, entry_market_state, entry_hour, entry_weekday) 分组，
+        小时/星期直接取自entry_timestamp的字面值（与datetime.fromisoformat的本地时间一致），
+        时间戳缺失或无法解析时两者均为空。每组包含：
+            trades / wins / total_pnl / total_duration: 笔数、盈利笔数、盈亏和、持仓时长和
+            opportunities / opportunity_wins / opportunity_return: 有入场价的笔数、其中盈利笔数、收益率之和
+            winning_indicators: 有入场价的盈利交易的entry_indicators原文列表
+
+        SQLite端为一条GROUP BY；超过archive_query_days时Parquet归档只投影所需列，
+        用pandas按同样的口径聚合后与SQLite中未导出部分合并
+        """
+        cutoff = self._cutoff(days)
+        symbol_clause = ""
+        params: List[Any] = ['closed', cutoff]
+        if symbols:
+            symbol_clause = f" AND symbol IN ({','.join('?' * len(symbols))})"
+            params.extend(symbols)
+        if days > self.archive_query_days:
+            symbol_clause += " AND archived = 0"
+
+        conn = self.db.connect()
+        df = pd.read_sql_query(f'''
+            SELECT
+                entry_reason,
+                entry_market_state,
+                CASE WHEN weekday IS NOT NULL THEN CAST(substr(entry_timestamp, 12, 2) AS INTEGER) END AS entry_hour,
+                weekday AS entry_weekday,
+                COUNT(*) AS trades,
+                COUNT(*) FILTER (WHERE exit_pnl > 0) AS wins,
+                TOTAL(exit_pnl) AS total_pnl,
+                TOTAL(exit_duration) AS total_duration,
+                COUNT(*) FILTER (WHERE entry_price != 0) AS opportunities,
+                COUNT(*) FILTER (WHERE entry_price != 0 AND exit_pnl > 0) AS opportunity_wins,
+                TOTAL(CASE WHEN entry_price > 0 THEN (exit_price - entry_price) / entry_price ELSE 0 END)
+                    FILTER (WHERE entry_price != 0) AS opportunity_return,
+                json_group_array(entry_indicators)
+                    FILTER (WHERE entry_price != 0 AND exit_pnl > 0 AND entry_indicators IS NOT NULL) AS winning_indicators
+            FROM (
+                SELECT *,
+                       -- strftime的%w以周日为0，换算为weekday()的周一为0
+                       (CAST(strftime('%w', substr(entry_timestamp, 1, 10)) AS INTEGER) + 6) % 7 AS weekday
+                FROM trades
+                WHERE status = ? AND ts >= ?{symbol_clause}
+            )
+            GROUP BY entry_reason, entry_market_state, entry_hour, entry_weekday
+        ''', conn, params=params)
+        conn.close()
+        df["winning_indicators"] = df["winning_indicators"].map(json.loads)
+
+        if days <= self.archive_query_days:
+            return df
+
+        archived = self.archive.read(
+            start_ts=cutoff, symbols=symbols, status='closed',
+            columns=["entry_reason", "entry_market_state", "entry_timestamp", "entry_price",
+                     "entry_indicators", "exit_price", "exit_pnl", "exit_duration"]
+        )
+        if archived.empty:
+            return df
+
+        keys = ["entry_reason", "entry_market_state", "entry_hour", "entry_weekday"]
+        timestamps = archived["entry_timestamp"].fillna("")
+        weekday = pd.to_datetime(timestamps.str[:10], format="%Y-%m-%d", errors="coerce").dt.weekday
+        hour = pd.to_numeric(timestamps.str[11:13], errors="coerce").fillna(0)
+        priced = archived["entry_price"].fillna(0) != 0
+        won = archived["exit_pnl"] > 0
+        positive = archived["entry_price"] > 0
+        rates = (archived["exit_price"] - archived["entry_price"]) / archived["entry_price"].where(positive)
+
+        frame = pd.DataFrame({
+            "entry_reason": archived["entry_reason"],
+            "entry_market_state": archived["entry_market_state"],
+            "entry_hour": hour.where(weekday.notna()),
+            "entry_weekday": weekday,
+            "trades": 1,
+            "wins": won.astype(int),
+            "total_pnl": archived["exit_pnl"].fillna(0),
+            "total_duration": archived["exit_duration"].fillna(0),
+            "opportunities": priced.astype(int),
+            "opportunity_wins": (priced & won).astype(int),
+            "opportunity_return": rates.where(positive, 0).where(priced, 0),
+            # 归档中的空值读出为NaN而非None，只保留字符串原文
+            "winning_indicators": [
+                [indicators] if flag and isinstance(indicators, str) else []
+                for flag, indicators in zip(priced & won, archived["entry_indicators"])
+            ]
+        })
+
+        # 数值列求和，指标原文列表拼接
+        combined = pd.concat([frame, df], ignore_index=True)
+        aggregations = {column: "sum" for column in combined.columns if column not in keys}
+        aggregations["winning_indicators"] = lambda lists: [item for items in lists for item in items]
+        return combined.groupby(keys, dropna=False, sort=False).agg(aggregations).reset_index()
+
     def calculate_statistics(self, 
                             symbol: Optional[str] = None,
                             days: Optional[int] = None) -> Dict:
         """计算交易统计信息"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         # 构建查询条件
@@ -289,14 +512,14 @@ class TradeRecorder:
             params.append(symbol)
         
         if days:
-            conditions.append("datetime(timestamp) >= datetime('now', '-' || ? || ' days')")
-            params.append(days)
+            conditions.append("ts >= ?")
+            params.append(self._cutoff(days))
         
         where_clause = " AND ".join(conditions)
         
-        # 获取统计数据
+        # 单次扫描覆盖索引完成全部聚合
         cursor.execute(f'''
-            SELECT 
+            SELECT
                 COUNT(*) as total_trades,
                 SUM(CASE WHEN exit_pnl > 0 THEN 1 ELSE 0 END) as winning_trades,
                 SUM(CASE WHEN exit_pnl < 0 THEN 1 ELSE 0 END) as losing_trades,
@@ -304,7 +527,9 @@ class TradeRecorder:
                 AVG(exit_pnl) as avg_pnl,
                 MAX(exit_pnl) as max_profit,
                 MIN(exit_pnl) as max_loss,
-                AVG(exit_duration) as avg_duration
+                AVG(exit_duration) as avg_duration,
+                SUM(CASE WHEN exit_pnl > 0 THEN exit_pnl ELSE 0 END) as total_profit,
+                SUM(CASE WHEN exit_pnl < 0 THEN -exit_pnl ELSE 0 END) as total_loss
             FROM trades
             WHERE {where_clause}
         ''', params)
@@ -327,21 +552,7 @@ class TradeRecorder:
         win_rate = stats[1] / stats[0] if stats[0] > 0 else 0
         
         # 计算盈亏比
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-        
-        cursor.execute(f'''
-            SELECT 
-                SUM(CASE WHEN exit_pnl > 0 THEN exit_pnl ELSE 0 END) as total_profit,
-                SUM(CASE WHEN exit_pnl < 0 THEN ABS(exit_pnl) ELSE 0 END) as total_loss
-            FROM trades
-            WHERE {where_clause}
-        ''', params)
-        
-        pnl_stats = cursor.fetchone()
-        conn.close()
-        
-        profit_factor = pnl_stats[0] / pnl_stats[1] if pnl_stats[1] > 0 else float('inf')
+        profit_factor = stats[8] / stats[9] if stats[9] > 0 else float('inf')
         
         return {
             "total_trades": stats[0],
@@ -356,47 +567,166 @@ class TradeRecorder:
             "avg_duration": stats[7]
         }
     
-    def export_to_parquet(self, output_path: Optional[Path] = None) -> Path:
-        """导出交易记录到Parquet格式"""
-        if output_path is None:
-            output_path = self.backup_path / f"trades_{datetime.now().strftime('%Y%m%d')}.parquet"
-        
-        conn = sqlite3.connect(str(self.db_path))
-        df = pd.read_sql_query("SELECT * FROM trades", conn)
-        conn.close()
+    def export_to_parquet(self) -> Path:
+        """增量导出尚未归档的已平仓交易到Parquet归档，返回归档目录"""
+        conn = self.db.connect()
+        df = pd.read_sql_query(
+            "SELECT * FROM trades WHERE status = 'closed' AND archived = 0",
+            conn
+        )
         
-        # 压缩并保存
-        df.to_parquet(output_path, compression='gzip')
-        logger.info(f"Exported {len(df)} trades to {output_path}")
+        if len(df) > 0:
+            # 标记与写入放在同一事务中，写入失败则回滚标记
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS export_ids (id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM export_ids")
+            conn.executemany("INSERT INTO export_ids VALUES (?)", ((i,) for i in df['id']))
+            conn.execute("UPDATE trades SET archived = 1 WHERE id IN (SELECT id FROM export_ids)")
+            self.archive.append(df.drop(columns=['archived']))
+            conn.commit()
+            logger.info(f"Exported {len(df)} trades to {self.archive.root}")
         
-        return output_path
+        conn.close()
+        return self.archive.root
     
     def archive_old_trades(self):
-        """归档旧交易记录"""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
+        """归档旧交易记录：确保已写入Parquet归档后从SQLite删除"""
+        # 已平仓交易通过增量导出进入归档
+        self.export_to_parquet()
         
-        # 导出旧数据
-        cutoff_date = f"datetime('now', '-{self.retention_days} days')"
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cutoff = self._cutoff(self.retention_days)
         
-        # 先导出到备份
-        old_trades = pd.read_sql_query(
-            f"SELECT * FROM trades WHERE datetime(timestamp) < {cutoff_date}",
-            conn
+        # 未平仓的旧交易不会被增量导出，单独写入
+        remaining = pd.read_sql_query(
+            "SELECT * FROM trades WHERE ts < ? AND archived = 0",
+            conn,
+            params=(cutoff,)
         )
+        self.archive.append(remaining.drop(columns=['archived']))
         
-        if len(old_trades) > 0:
-            archive_path = self.backup_path / f"archive_{datetime.now().strftime('%Y%m%d')}.parquet.gz"
-            old_trades.to_parquet(archive_path, compression='gzip')
-            
-            # 删除旧数据
-            cursor.execute(f"DELETE FROM trades WHERE datetime(timestamp) < {cutoff_date}")
-            conn.commit()
-            
-            logger.info(f"Archived {len(old_trades)} old trades to {archive_path}")
-        
+        cursor.execute("DELETE FROM trades WHERE ts < ?", (cutoff,))
+        deleted = cursor.rowcount
+        conn.commit()
         conn.close()
+        
+        if deleted > 0:
+            logger.info(f"Archived {deleted} old trades to {self.archive.root}")
     
     def cleanup(self):
         """清理资源"""
-        logger.info("TradeRecorder cleanup completed")
\ No newline at end of file
+        self.db.release()
+        logger.info("TradeRecorder cleanup completed")
+
+# 性能测试
+def benchmark_trade_queries(n_trades: int = 1_000_000, db_dir: Optional[str] = None) -> Dict:
+    """对比旧查询（datetime()包裹列 + 单列索引）与整数时间列 + 组合覆盖索引的耗时"""
+    import random
+    import tempfile
+
+    def best_of(func, repeat=3):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return round(min(timings) * 1000, 2)
+
+    with tempfile.TemporaryDirectory(dir=db_dir) as tmp:
+        db_path = Path(tmp) / "trades.db"
+        recorder = TradeRecorder(db_path=db_path)
+
+        # 构造旧版索引布局，并写入未回填ts的数据
+        conn = sqlite3.connect(str(db_path))
+        for name in TRADE_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+        conn.execute('CREATE INDEX idx_symbol ON trades(symbol)')
+        conn.execute('CREATE INDEX idx_timestamp ON trades(timestamp)')
+        conn.execute('CREATE INDEX idx_status ON trades(status)')
+        conn.execute('CREATE INDEX idx_pnl ON trades(exit_pnl)')
+
+        rng = random.Random(42)
+        now = time.time()
+        symbols = [f"SYM{i}USDT" for i in range(50)]
+
+        def rows():
+            for i in range(n_trades):
+                opened = datetime.fromtimestamp(now - rng.random() * 3 * 365 * 86400)
+                closed = rng.random() < 0.95
+                yield (
+                    f"T{i}", opened.isoformat(), rng.choice(symbols), rng.choice(("long", "short")),
+                    rng.gauss(5, 100) if closed else None, rng.uniform(0.1, 48) if closed else None,
+                    "closed" if closed else "open"
+                )
+
+        conn.executemany('''
+            INSERT INTO trades (id, timestamp, symbol, direction, exit_pnl, exit_duration, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows())
+        conn.commit()
+
+        def legacy_statistics(symbol=None, days=None):
+            conditions = ["status = 'closed'"]
+            params = []
+            if symbol:
+                conditions.append("symbol = ?")
+                params.append(symbol)
+            if days:
+                conditions.append("datetime(timestamp) >= datetime('now', '-' || ? || ' days')")
+                params.append(days)
+            where_clause = " AND ".join(conditions)
+            conn.execute(f'''
+                SELECT COUNT(*), SUM(CASE WHEN exit_pnl > 0 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN exit_pnl < 0 THEN 1 ELSE 0 END), SUM(exit_pnl), AVG(exit_pnl),
+                       MAX(exit_pnl), MIN(exit_pnl), AVG(exit_duration)
+                FROM trades WHERE {where_clause}
+            ''', params).fetchone()
+            conn.execute(f'''
+                SELECT SUM(CASE WHEN exit_pnl > 0 THEN exit_pnl ELSE 0 END),
+                       SUM(CASE WHEN exit_pnl < 0 THEN ABS(exit_pnl) ELSE 0 END)
+                FROM trades WHERE {where_clause}
+            ''', params).fetchone()
+
+        def legacy_recent(days, status):
+            conn.execute('''
+                SELECT * FROM trades
+                WHERE datetime(timestamp) >= datetime('now', '-' || ? || ' days')
+                AND status = ?
+                ORDER BY timestamp DESC
+            ''', (days, status)).fetchall()
+
+        cases = {
+            "stats_7d": (lambda: legacy_statistics(days=7),
+                         lambda: recorder.calculate_statistics(days=7)),
+            "stats_symbol_30d": (lambda: legacy_statistics(symbols[0], 30),
+                                 lambda: recorder.calculate_statistics(symbols[0], 30)),
+            "stats_symbol_all": (lambda: legacy_statistics(symbols[0]),
+                                 lambda: recorder.calculate_statistics(symbols[0])),
+            "recent_closed_7d": (lambda: legacy_recent(7, "closed"),
+                                 lambda: recorder.get_recent_trades(7, "closed")),
+        }
+
+        results = {"trades": n_trades}
+        for name, (legacy, _) in cases.items():
+            results[name] = {"legacy_ms": best_of(legacy)}
+        conn.close()
+
+        # 迁移：回填ts并重建索引
+        start = time.perf_counter()
+        recorder = TradeRecorder(db_path=db_path)
+        results["migration_s"] = round(time.perf_counter() - start, 2)
+
+        for name, (_, current) in cases.items():
+            results[name]["indexed_ms"] = best_of(current)
+        recorder.db.close()
+
+    print(f"{n_trades:,}笔交易，迁移耗时 {results['migration_s']}s")
+    for name in cases:
+        r = results[name]
+        print(f"  {name:>18}: 旧 {r['legacy_ms']:>9}ms  新 {r['indexed_ms']:>7}ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_trade_queries()
@@ -0,0 +1,5 @@
+"""SQLite访问层"""
+
+from .database import SQLiteDatabase, PooledConnection, get_database, close_all
+
+__all__ = ["SQLiteDatabase", "PooledConnection", "get_database", "close_all"]
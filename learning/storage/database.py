@@ -0,0 +1,207 @@
+"""
+SQLite访问层
+learning包内各存储共用：每个线程对每个数据库文件保持一个持久连接，
+开启WAL并设置PRAGMA，依靠连接级语句缓存复用预编译语句
+"""
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from ..config.config import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    线程持久连接
+
+    close()只释放连接：回滚未提交的事务并恢复row_factory，不关闭底层连接，
+    因此沿用"connect -> 执行 -> commit -> close"写法的代码无需改动
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        self.row_factory = None
+
+    def _close(self):
+        """真正关闭连接"""
+        super().close()
+
+
+class SQLiteDatabase:
+    """单个数据库文件的线程本地连接管理"""
+
+    def __init__(self, path: Union[str, Path], pragmas: Optional[Dict] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        config = DATABASE_CONFIG["sqlite"]
+        self.pragmas = {**config["pragmas"], **(pragmas or {})}
+        self.cached_statements = config["cached_statements"]
+
+        self._local = threading.local()
+        self._connections = []  # 所有线程的连接，用于统一关闭
+        self._lock = threading.Lock()
+
+    def connect(self) -> PooledConnection:
+        """获取当前线程的持久连接（不支持同一线程嵌套获取）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        elif conn.in_transaction:
+            # 上一次使用因异常未释放
+            conn.rollback()
+        return conn
+
+    def _open(self) -> PooledConnection:
+        # 连接只在创建它的线程中使用；关闭检查放开是为了close()能在任意线程统一关闭
+        conn = sqlite3.connect(
+            str(self.path),
+            factory=PooledConnection,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def release(self):
+        """
+        关闭当前线程的连接，其他线程（以及共用同一文件的其他存储）的连接不受影响；
+        之后再connect()会重新打开。各存储的cleanup()使用此方法
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        del self._local.conn
+        with self._lock:
+            self._connections.remove(conn)
+        conn._close()
+
+    def close(self):
+        """关闭所有线程的连接（进程退出前调用，调用时其他线程不应再使用该数据库）"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn._close()
+        self._local = threading.local()
+
+
+_databases: Dict[Path, SQLiteDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path: Union[str, Path]) -> SQLiteDatabase:
+    """按文件路径获取共享的SQLiteDatabase"""
+    key = Path(path).resolve()
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = SQLiteDatabase(key)
+        return database
+
+
+def close_all():
+    """关闭所有数据库连接"""
+    with _databases_lock:
+        databases = list(_databases.values())
+        _databases.clear()
+    for database in databases:
+        database.close()
+
+
+# 性能测试
+class _PerCallConnections:
+    """旧方式：每次调用新建连接（默认回滚日志）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path))
+
+    def close(self):
+        pass
+
+
+def benchmark_recorder(n_trades: int = 2000, db_dir: Optional[str] = None) -> Dict:
+    """对比每次新建连接与线程持久连接+WAL下record_trade_entry/exit的吞吐，并统计并发读"""
+    import tempfile
+    import time
+    from datetime import datetime
+
+    from ..records.trade_recorder import TradeRecorder, TradeEntry, TradeExit, TradeContext
+
+    entry = TradeEntry(100.0, "benchmark", {"rsi": 55}, "range", {}, datetime.now().isoformat())
+    context = TradeContext("up", 0.02, [], [])
+
+    def run(recorder: TradeRecorder) -> Dict:
+        stop = threading.Event()
+        read_latencies = []
+        locked = [0]
+
+        def reader():
+            # 与写入并发的读取
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    recorder.calculate_statistics(days=1)
+                    read_latencies.append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    locked[0] += 1
+                time.sleep(0.005)
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+
+        start = time.perf_counter()
+        trade_ids = [recorder.record_trade_entry(f"B{i}", "long", entry, context) for i in range(n_trades)]
+        entry_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for trade_id in trade_ids:
+            recorder.record_trade_exit(trade_id, TradeExit(101.0, "tp", 1.0, 1.0, datetime.now().isoformat()))
+        exit_elapsed = time.perf_counter() - start
+
+        stop.set()
+        thread.join()
+        read_latencies.sort()
+        return {
+            "entry_per_sec": round(n_trades / entry_elapsed),
+            "exit_per_sec": round(n_trades / exit_elapsed),
+            "read_p50_ms": round(read_latencies[len(read_latencies) // 2] * 1000, 2) if read_latencies else 0.0,
+            "read_p95_ms": round(read_latencies[int(0.95 * (len(read_latencies) - 1))] * 1000, 2)
+            if read_latencies else 0.0,
+            "reads_locked": locked[0]
+        }
+
+    results = {"trades": n_trades}
+    with tempfile.TemporaryDirectory(dir=db_dir) as tmp:
+        legacy_path = Path(tmp) / "legacy.db"
+        recorder = TradeRecorder(db_path=legacy_path)
+        recorder.db.close()
+        conn = sqlite3.connect(str(legacy_path))
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+        recorder.db = _PerCallConnections(legacy_path)
+        results["per_call_connection"] = run(recorder)
+
+        recorder = TradeRecorder(db_path=Path(tmp) / "pooled.db")
+        results["pooled_wal"] = run(recorder)
+        recorder.db.close()
+
+    for name in ("per_call_connection", "pooled_wal"):
+        r = results[name]
+        print(f"{name:>20}: 入场 {r['entry_per_sec']:>6}/s  出场 {r['exit_per_sec']:>6}/s  "
+              f"并发读 p50 {r['read_p50_ms']}ms p95 {r['read_p95_ms']}ms (锁冲突 {r['reads_locked']})")
+
+    return results
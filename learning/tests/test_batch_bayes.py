@@ -0,0 +1,114 @@
+"""
+批量贝叶斯优化单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import math
+import unittest
+
+from skopt.space import Categorical, Integer
+
+from learning.optimizer.batch_bayes import BatchBayesSearch, FAILED_SCORE, _score_point
+
+NAMES = ["fast", "slow"]
+
+
+def peak_score(params):
+    """fast=10, slow=60时最高"""
+    return -abs(params["fast"] - 10) - abs(params["slow"] - 60) / 10
+
+
+class CountingScore:
+    """记录每次打分的参数点"""
+
+    def __init__(self, func=peak_score):
+        self.func = func
+        self.calls = []
+
+    def __call__(self, params):
+        self.calls.append((params["fast"], params["slow"]))
+        return self.func(params)
+
+
+class TestBatchBayesSearch(unittest.TestCase):
+    """测试批量ask/tell循环、缓存和失败打分"""
+
+    def make_search(self, scoring_func, dimensions=None, **kwargs):
+        dimensions = dimensions or [Integer(5, 20), Integer(20, 100)]
+        kwargs.setdefault("n_initial_points", 4)
+        return BatchBayesSearch(dimensions, NAMES, scoring_func, random_state=0, **kwargs)
+
+    def test_batch_loop(self):
+        """测试每轮提出batch_size个点，最后一轮补足n_calls"""
+        scoring = CountingScore()
+        search = self.make_search(scoring, n_calls=10, batch_size=4)
+        result = search.run()
+
+        self.assertEqual(len(result["trace"]), 3)
+        self.assertEqual(len(search.optimizer.Xi), 10)
+        self.assertEqual(result["evaluations"] + result["cache_hits"], 10)
+        self.assertEqual(len(scoring.calls), result["evaluations"])
+
+        # 告知skopt的是负分，最优结果与缓存一致
+        for point, y in zip(search.optimizer.Xi, search.optimizer.yi):
+            self.assertEqual(y, -search.cache[tuple(point)])
+        self.assertEqual(result["best_score"], max(search.cache.values()))
+        self.assertEqual(result["best_score"], peak_score(result["best_params"]))
+        scores = [row["best_score"] for row in result["trace"]]
+        self.assertEqual(scores, sorted(scores))
+
+    def test_cache_reuses_scores(self):
+        """测试离散空间中重复提出的参数点只评估一次"""
+        scoring = CountingScore()
+        dimensions = [Categorical([5, 10, 15]), Categorical([40, 60])]
+        search = self.make_search(scoring, dimensions, n_calls=12, batch_size=3, n_initial_points=3)
+        result = search.run()
+
+        self.assertLessEqual(result["evaluations"], 6)
+        self.assertEqual(result["cache_hits"], 12 - result["evaluations"])
+        self.assertEqual(len(scoring.calls), len(set(scoring.calls)))
+
+    def test_duplicates_within_batch(self):
+        """测试同一批中重复的点和已缓存的点不重复打分"""
+        scoring = CountingScore()
+        search = self.make_search(scoring)
+        search.cache[(10, 60)] = 0.0
+
+        scores = search._evaluate(None, [[5, 20], [10, 60], [5, 20], [15, 80]])
+
+        self.assertEqual(scoring.calls, [(5, 20), (15, 80)])
+        self.assertEqual(scores, [peak_score({"fast": 5, "slow": 20}), 0.0,
+                                  peak_score({"fast": 5, "slow": 20}), peak_score({"fast": 15, "slow": 80})])
+
+    def test_failed_scores_penalized(self):
+        """测试打分异常或NaN记为有限的惩罚分，搜索继续进行"""
+        def flaky(params):
+            if params["fast"] < 8:
+                raise ValueError("backtest failed")
+            return float("nan") if params["slow"] > 90 else peak_score(params)
+
+        self.assertEqual(_score_point((flaky, NAMES, (5, 60))), FAILED_SCORE)
+        self.assertEqual(_score_point((flaky, NAMES, (10, 95))), FAILED_SCORE)
+        self.assertEqual(_score_point((flaky, NAMES, (10, 60))), 0.0)
+
+        search = self.make_search(flaky, n_calls=12, batch_size=4)
+        result = search.run()
+
+        self.assertEqual(len(search.optimizer.yi), 12)
+        self.assertTrue(all(math.isfinite(y) for y in search.optimizer.yi))
+        self.assertGreater(result["best_score"], FAILED_SCORE)
+
+    def test_unpicklable_scoring_runs_in_process(self):
+        """测试lambda等无法pickle的打分函数退回当前进程执行"""
+        with self.assertLogs("learning.optimizer.sweep", level="WARNING"):
+            search = self.make_search(lambda params: peak_score(params), n_calls=4, batch_size=2, n_jobs=2)
+        self.assertEqual(search.n_jobs, 1)
+        result = search.run()
+        self.assertEqual(len(search.optimizer.Xi), 4)
+        self.assertEqual(result["best_score"], peak_score(result["best_params"]))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
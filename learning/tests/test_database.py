@@ -0,0 +1,155 @@
+"""
+SQLite连接池单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from learning.storage.database import SQLiteDatabase, get_database
+
+
+def run_in_thread(func):
+    """在新线程中执行func并返回结果（异常在调用线程重新抛出）"""
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result.get("value")
+
+
+class TestSQLiteDatabase(unittest.TestCase):
+    """测试线程本地连接管理"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.db = SQLiteDatabase(self.tmp / "pool.db")
+        conn = self.db.connect()
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _count(self) -> int:
+        conn = self.db.connect()
+        count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_thread_local_reuse(self):
+        """测试同一线程复用连接、不同线程各自持有连接"""
+        first = self.db.connect()
+        first.close()
+        self.assertIs(self.db.connect(), first)
+
+        other = run_in_thread(self.db.connect)
+        self.assertIsNot(other, first)
+        self.assertEqual(len(self.db._connections), 2)
+
+    def test_pragmas_applied(self):
+        """测试新连接设置WAL"""
+        mode = self.db.connect().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_close_rolls_back(self):
+        """测试close()只释放连接：回滚未提交的写入并恢复row_factory"""
+        conn = self.db.connect()
+        conn.row_factory = sqlite3.Row
+        conn.execute("INSERT INTO items (name) VALUES ('uncommitted')")
+        conn.close()
+
+        self.assertIsNone(conn.row_factory)
+        self.assertEqual(self._count(), 0)
+
+        conn = self.db.connect()
+        conn.execute("INSERT INTO items (name) VALUES ('committed')")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self._count(), 1)
+
+    def test_connect_rolls_back_leftover_transaction(self):
+        """测试上一次使用因异常未释放时，下次获取先回滚"""
+        conn = self.db.connect()
+        conn.execute("INSERT INTO items (name) VALUES ('abandoned')")
+
+        self.assertIs(self.db.connect(), conn)
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(self._count(), 0)
+
+    def test_release_only_current_thread(self):
+        """测试release()只关闭当前线程的连接"""
+        ready, done = threading.Event(), threading.Event()
+        counts = []
+
+        def worker():
+            conn = self.db.connect()
+            ready.set()
+            done.wait()
+            # 主线程release之后该线程的连接仍可用
+            counts.append(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+            conn.close()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        ready.wait()
+
+        main_conn = self.db.connect()
+        self.db.release()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            main_conn.execute("SELECT 1")
+        self.assertEqual(len(self.db._connections), 1)
+
+        done.set()
+        thread.join()
+        self.assertEqual(counts, [0])
+
+        # 再次获取时重新打开
+        self.assertIsNot(self.db.connect(), main_conn)
+        self.assertEqual(self._count(), 0)
+
+    def test_close_all_threads(self):
+        """测试close()关闭包括其他线程创建的全部连接"""
+        other = run_in_thread(self.db.connect)
+        conn = self.db.connect()
+
+        self.db.close()
+
+        self.assertEqual(self.db._connections, [])
+        for closed in (conn, other):
+            with self.assertRaises(sqlite3.ProgrammingError):
+                closed.execute("SELECT 1")
+        self.assertEqual(self._count(), 0)
+
+    def test_shared_instance(self):
+        """测试同一文件共用一个实例，一个存储cleanup不影响其他线程的使用者"""
+        path = self.tmp / "shared.db"
+        first, second = get_database(path), get_database(str(path))
+        self.assertIs(first, second)
+
+        other = run_in_thread(first.connect)
+        first.connect()
+        first.release()
+        self.assertEqual(other.execute("SELECT 1").fetchone()[0], 1)
+        first.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
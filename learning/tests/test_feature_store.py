@@ -0,0 +1,196 @@
+"""
+特征存储单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from learning.config.config import ML_CONFIG
+from learning.ml.feature_store import FEATURE_SETS, FeatureStore, _GrowableArray, compute_features
+
+SYMBOL, TIMEFRAME = "AAA/USDT", "1h"
+
+
+def synthetic_bars(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=n, freq="h")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"close": close, "volume": rng.lognormal(10, 1, n)}, index=index)
+
+
+def chunks(bars: pd.DataFrame, sizes):
+    """按给定大小依次切分K线，最后一块取剩余全部"""
+    start = 0
+    for size in sizes:
+        yield bars.iloc[start:start + size]
+        start += size
+    if start < len(bars):
+        yield bars.iloc[start:]
+
+
+class TestGrowableArray(unittest.TestCase):
+    """测试内存映射数组的翻倍扩容"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_doubling_preserves_rows(self):
+        """测试容量不足时翻倍到足够大，扩容前的行原样保留在新文件中"""
+        path = self.tmp / "values.npy"
+        array = _GrowableArray(path, np.float32, 3, rows=0, capacity=4)
+        self.assertEqual(array.capacity, 4)
+
+        expected = np.empty((0, 3), dtype=np.float32)
+        capacities = []
+        for size in (3, 1, 1, 10, 1, 30):
+            values = np.arange(size * 3, dtype=np.float32).reshape(size, 3) + len(expected) * 3
+            array.append(values)
+            expected = np.vstack([expected, values])
+            capacities.append(array.capacity)
+
+        self.assertEqual(capacities, [4, 4, 8, 16, 16, 64])
+        self.assertEqual(array.rows, 46)
+        np.testing.assert_array_equal(array.view(), expected)
+        np.testing.assert_array_equal(array.view(10, 20), expected[10:20])
+
+        # 文件按容量预分配，已写入的行落盘
+        array.flush()
+        on_disk = np.load(path)
+        self.assertEqual(on_disk.shape, (64, 3))
+        np.testing.assert_array_equal(on_disk[:46], expected)
+        self.assertFalse(path.with_suffix(".tmp.npy").exists())
+
+        # 按有效行数重新打开
+        reopened = _GrowableArray(path, np.float32, 3, rows=46, capacity=4)
+        self.assertEqual(reopened.capacity, 64)
+        np.testing.assert_array_equal(reopened.view(), expected)
+
+    def test_view_is_read_only(self):
+        """测试切片视图不可写"""
+        array = _GrowableArray(self.tmp / "index.npy", np.int64, 0, rows=0, capacity=2)
+        array.append(np.arange(5))
+        self.assertEqual(array.capacity, 8)
+        view = array.view()
+        np.testing.assert_array_equal(view, np.arange(5))
+        with self.assertRaises(ValueError):
+            view[0] = 1
+
+
+class TestFeatureStore(unittest.TestCase):
+    """测试增量写入、重新打开和与整段计算的一致性"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.bars = synthetic_bars(300)
+        # 小初始容量，使写入过程中多次扩容
+        self.config = patch.dict(ML_CONFIG["feature_store"], {"initial_capacity": 8})
+        self.config.start()
+        self.store = FeatureStore(self.tmp)
+
+    def tearDown(self):
+        self.store.close()
+        self.config.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def assert_matches_full(self, store: FeatureStore, bars: pd.DataFrame):
+        """存储内容与对全部K线一次性compute_features的结果一致"""
+        expected = compute_features(bars, "technical")
+        index, features, carry = store.get(SYMBOL, TIMEFRAME, "technical")
+
+        self.assertEqual(store.columns(SYMBOL, TIMEFRAME, "technical"), list(expected.columns))
+        np.testing.assert_array_equal(index, expected.index.as_unit("ns").asi8)
+        np.testing.assert_array_equal(features, expected.to_numpy(dtype=np.float32))
+        np.testing.assert_array_equal(carry[:, 0], bars["close"].reindex(expected.index).to_numpy())
+
+    def test_incremental_matches_full_computation(self):
+        """测试按不同大小分批（含逐根）追加，跨多次扩容后与整段计算一致"""
+        sizes = [5, 14, 1, 1, 3, 40, 1, 90]
+        added = [self.store.update(SYMBOL, TIMEFRAME, "technical", chunk) for chunk in chunks(self.bars, sizes)]
+
+        # 前19根K线不足20根窗口，不产生特征行
+        self.assertEqual(added[:3], [0, 0, 1])
+        self.assertEqual(sum(added), len(self.bars) - 19)
+        entry = self.store._entries[(SYMBOL, TIMEFRAME, "technical")]
+        self.assertEqual(entry["features"].capacity, 512)
+        self.assertEqual(entry["index"].capacity, 512)
+        self.assert_matches_full(self.store, self.bars)
+
+        np.testing.assert_array_equal(self.store.latest(SYMBOL, TIMEFRAME, "technical", 3),
+                                      compute_features(self.bars, "technical").iloc[-3:].to_numpy(dtype=np.float32))
+
+    def test_already_stored_bars_skipped(self):
+        """测试与已写入部分重叠的K线只追加更晚的部分"""
+        self.store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[:150])
+        self.assertEqual(self.store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[100:150]), 0)
+        self.assertEqual(self.store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[120:]), 150)
+        self.assert_matches_full(self.store, self.bars)
+
+    def test_reopen_from_meta(self):
+        """测试关闭后按meta.json重新打开，保存的尾部K线补足窗口继续增量计算"""
+        warmup = FEATURE_SETS["technical"].warmup
+        self.store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[:130])
+        self.store.close()
+
+        meta_path = self.tmp / "AAA_USDT" / TIMEFRAME / "technical_v1" / "meta.json"
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.assertEqual(meta["rows"], 130 - 19)
+        self.assertEqual(meta["last_ts"], self.bars.index[129].value)
+        self.assertEqual(meta["inputs"], ["close", "volume"])
+        np.testing.assert_array_equal(meta["tail"], self.bars.iloc[130 - warmup:130].to_numpy())
+
+        store = FeatureStore(self.tmp)
+        try:
+            self.assert_matches_full(store, self.bars.iloc[:130])
+            # 新实例只有尾部K线可用，逐根追加结果仍与整段计算一致
+            for i in range(130, 140):
+                self.assertEqual(store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[i:i + 1]), 1)
+            store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[140:])
+            self.assert_matches_full(store, self.bars)
+        finally:
+            store.close()
+
+    def test_reopen_short_history(self):
+        """测试K线不足warmup时重新打开，尾部保存全部已有K线"""
+        self.store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[:7])
+        self.store.close()
+
+        store = FeatureStore(self.tmp)
+        try:
+            self.assertEqual(len(store.get(SYMBOL, TIMEFRAME, "technical")[0]), 0)
+            store.update(SYMBOL, TIMEFRAME, "technical", self.bars.iloc[7:])
+            self.assert_matches_full(store, self.bars)
+        finally:
+            store.close()
+
+    def test_time_range_and_timestamp_column(self):
+        """测试按时间范围[start, end)切片，以及时间戳来自timestamp列"""
+        bars = self.bars.reset_index(names="timestamp")
+        self.store.update(SYMBOL, TIMEFRAME, "technical", bars)
+
+        start, end = self.bars.index[50].value, self.bars.index[60].value
+        index, features, carry = self.store.get(SYMBOL, TIMEFRAME, "technical", start, end)
+        expected = compute_features(self.bars, "technical").loc[self.bars.index[50]:self.bars.index[59]]
+        np.testing.assert_array_equal(index, expected.index.as_unit("ns").asi8)
+        np.testing.assert_array_equal(features, expected.to_numpy(dtype=np.float32))
+        self.assertEqual(len(carry), 10)
+
+        empty_index, empty_features, empty_carry = self.store.get("BBB/USDT", TIMEFRAME, "technical")
+        self.assertEqual((len(empty_index), empty_features.shape, empty_carry), (0, (0, 0), None))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
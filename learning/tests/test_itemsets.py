@@ -0,0 +1,142 @@
+"""
+增量关联规则挖掘单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import unittest
+
+from learning.patterns.itemsets import IncrementalRuleMiner
+
+# 5笔交易，下面的支持度/置信度/提升度均按此手工计算
+TRANSACTIONS = {
+    "T1": ["trend_up", "rsi_low", "win"],
+    "T2": ["trend_up", "rsi_low", "win"],
+    "T3": ["trend_up", "loss"],
+    "T4": ["rsi_low", "win"],
+    "T5": ["trend_up", "rsi_low", "loss"],
+}
+
+
+def build(transactions):
+    miner = IncrementalRuleMiner()
+    for key, items in transactions.items():
+        miner.add(key, items)
+    return miner
+
+
+def by_names(miner, itemsets):
+    """{项集位掩码: 支持度} -> {物品名集合: 支持度}"""
+    return {frozenset(miner._names(mask)): support for mask, support in itemsets.items()}
+
+
+def rule_table(rules):
+    return {(frozenset(rule["conditions"]), frozenset(rule["result"])): rule for rule in rules}
+
+
+class TestIncrementalRuleMiner(unittest.TestCase):
+    """测试支持度、置信度、提升度和增删交易"""
+
+    def setUp(self):
+        self.miner = build(TRANSACTIONS)
+
+    def test_support(self):
+        """测试频繁项集及其支持度"""
+        itemsets = by_names(self.miner, self.miner.frequent_itemsets(0.4))
+
+        expected = {
+            frozenset({"trend_up"}): 0.8,
+            frozenset({"rsi_low"}): 0.8,
+            frozenset({"win"}): 0.6,
+            frozenset({"loss"}): 0.4,
+            frozenset({"trend_up", "rsi_low"}): 0.6,
+            frozenset({"rsi_low", "win"}): 0.6,
+            frozenset({"trend_up", "win"}): 0.4,
+            frozenset({"trend_up", "loss"}): 0.4,
+            frozenset({"trend_up", "rsi_low", "win"}): 0.4,
+        }
+        self.assertEqual(itemsets.keys(), expected.keys())
+        for itemset, support in expected.items():
+            self.assertAlmostEqual(itemsets[itemset], support)
+
+        # 只出现一次的项集低于0.4
+        self.assertNotIn(frozenset({"rsi_low", "loss"}), itemsets)
+        self.assertIn(frozenset({"rsi_low", "loss"}), by_names(self.miner, self.miner.frequent_itemsets(0.2)))
+
+    def test_confidence_and_lift(self):
+        """测试结论为win的规则：置信度=支持度(前件∪结论)/支持度(前件)，提升度=置信度/支持度(结论)"""
+        rules = rule_table(self.miner.rules(min_support=0.4, min_confidence=0.6, consequent="win"))
+
+        # trend_up→win (0.5)、trend_up→rsi_low,win (0.5)、rsi_low→trend_up,win (0.5) 低于最小置信度
+        self.assertEqual(set(rules), {
+            (frozenset({"rsi_low"}), frozenset({"win"})),
+            (frozenset({"trend_up", "rsi_low"}), frozenset({"win"})),
+        })
+
+        rule = rules[(frozenset({"rsi_low"}), frozenset({"win"}))]
+        self.assertAlmostEqual(rule["support"], 0.6)
+        self.assertAlmostEqual(rule["confidence"], 0.75)
+        self.assertAlmostEqual(rule["lift"], 1.25)
+
+        rule = rules[(frozenset({"trend_up", "rsi_low"}), frozenset({"win"}))]
+        self.assertAlmostEqual(rule["support"], 0.4)
+        self.assertAlmostEqual(rule["confidence"], 2 / 3)
+        self.assertAlmostEqual(rule["lift"], (2 / 3) / 0.6)
+
+    def test_rules_without_consequent(self):
+        """测试不限定结论时包含所有方向的规则"""
+        rules = rule_table(self.miner.rules(min_support=0.4, min_confidence=0.5))
+
+        rule = rules[(frozenset({"win"}), frozenset({"rsi_low"}))]
+        self.assertAlmostEqual(rule["confidence"], 1.0)
+        self.assertAlmostEqual(rule["lift"], 1.25)
+        self.assertIn((frozenset({"trend_up"}), frozenset({"rsi_low", "win"})), rules)
+        self.assertEqual(self.miner.rules(0.4, 0.5, consequent="unknown"), [])
+
+    def test_sync_adds_and_removes(self):
+        """测试sync只编码新交易，移出的交易从计数中减去"""
+        records = {key: TRANSACTIONS[key] for key in ("T1", "T2", "T3")}
+        records["T6"] = ["rsi_low", "loss"]
+        encoded = []
+
+        def to_transaction(record):
+            encoded.append(record)
+            return record
+
+        self.assertEqual(self.miner.sync(records, to_transaction), (1, 2))
+        self.assertEqual(encoded, [["rsi_low", "loss"]])
+        self.assertEqual(set(self.miner.transactions), {"T1", "T2", "T3", "T6"})
+
+        # 计数与直接用剩余交易构建的结果一致，只在被移出交易中出现的项集不再保留
+        self.assertEqual(self.miner.counts, build(records).counts)
+        itemsets = by_names(self.miner, self.miner.frequent_itemsets(0.0))
+        self.assertNotIn(frozenset({"trend_up", "rsi_low", "loss"}), itemsets)
+        self.assertAlmostEqual(itemsets[frozenset({"rsi_low"})], 0.75)
+
+        rules = rule_table(self.miner.rules(min_support=0.4, min_confidence=0.6, consequent="win"))
+        rule = rules[(frozenset({"rsi_low"}), frozenset({"win"}))]
+        self.assertAlmostEqual(rule["confidence"], 2 / 3)
+        self.assertAlmostEqual(rule["lift"], 4 / 3)
+
+        # 已同步的交易不会重复编码
+        self.assertEqual(self.miner.sync(records, to_transaction), (0, 0))
+        self.assertEqual(len(encoded), 1)
+
+    def test_add_replaces_existing_key(self):
+        """测试同一键重复加入时替换旧交易"""
+        self.miner.add("T4", ["trend_up", "loss"])
+
+        itemsets = by_names(self.miner, self.miner.frequent_itemsets(0.0))
+        self.assertAlmostEqual(itemsets[frozenset({"win"})], 0.4)
+        self.assertAlmostEqual(itemsets[frozenset({"trend_up", "loss"})], 0.6)
+        self.assertEqual(len(self.miner.transactions), 5)
+
+        for key in list(self.miner.transactions):
+            self.miner.remove(key)
+        self.assertEqual(self.miner.counts, {})
+        self.assertEqual(self.miner.frequent_itemsets(0.0), {})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
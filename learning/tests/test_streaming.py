@@ -0,0 +1,144 @@
+"""
+黑天鹅流式特征与评分单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import unittest
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from learning.black_swan.black_swan_learning import BlackSwanLearning
+from learning.black_swan.streaming import CRISIS_FEATURES, OnlineCrisisFeatures, RollingWindow, StreamingCrisisScorer
+
+
+def synthetic_ohlcv(n: int, seed: int, price: float = 60000.0) -> pd.DataFrame:
+    """BTC量级价格的随机游走K线"""
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    return pd.DataFrame({
+        "close": close,
+        "volume": rng.lognormal(5, 1, n),
+        "high": close * (1 + rng.uniform(0, 0.01, n)),
+        "low": close * (1 - rng.uniform(0, 0.01, n)),
+    })
+
+
+def online_features(bars: pd.DataFrame) -> pd.DataFrame:
+    """逐根推入K线，按行号收集可用的特征行"""
+    state = OnlineCrisisFeatures()
+    rows = {}
+    for i, (close, volume, high, low) in enumerate(bars[["close", "volume", "high", "low"]].to_numpy()):
+        row = state.update(close, volume, high, low)
+        if row is not None:
+            rows[i] = row
+    return pd.DataFrame.from_dict(rows, orient="index", columns=CRISIS_FEATURES)
+
+
+def pandas_features(bars: pd.DataFrame) -> pd.DataFrame:
+    # 方法不使用实例状态，直接调用避免初始化数据库
+    return BlackSwanLearning._extract_crisis_features(None, bars)[CRISIS_FEATURES]
+
+
+class TestRollingWindow(unittest.TestCase):
+    """测试滚动均值、样本标准差和最大值"""
+
+    def test_matches_numpy_windows(self):
+        """测试每次推入后与numpy对窗口内值的精确计算一致，长序列不漂移"""
+        rng = np.random.default_rng(5)
+        values = 60000 + np.cumsum(rng.normal(0, 50, 20000))
+        window = RollingWindow(24)
+        means, stds, maxima = [], [], []
+        for value in values:
+            window.push(value)
+            if window.full:
+                means.append(window.mean)
+                stds.append(window.std)
+                maxima.append(window.max)
+
+        windows = sliding_window_view(values, 24)
+        np.testing.assert_array_equal(maxima, windows.max(axis=1))
+        np.testing.assert_allclose(means, windows.mean(axis=1), rtol=1e-13)
+        np.testing.assert_allclose(stds, windows.std(axis=1, ddof=1), rtol=1e-10)
+
+    def test_partial_window(self):
+        """测试窗口未满时按已有值计算"""
+        window = RollingWindow(5)
+        for value in (3.0, 1.0, 2.0):
+            window.push(value)
+        self.assertFalse(window.full)
+        self.assertEqual((window.count, window.mean, window.max), (3, 2.0, 3.0))
+        self.assertAlmostEqual(window.std, 1.0)
+
+
+class TestOnlineCrisisFeatures(unittest.TestCase):
+    """测试在线特征与pandas批量特征一致"""
+
+    def test_long_series_matches_pandas(self):
+        """20万根BTC量级K线：可用的行与pandas dropna后相同，取值在舍入误差内"""
+        bars = synthetic_ohlcv(200_000, seed=0)
+        expected = pandas_features(bars)
+        online = online_features(bars)
+
+        self.assertEqual(list(online.index), list(expected.index))
+        # pandas滚动标准差本身有约1e-9的相对误差，绝对容差用于ma_deviation等接近0的特征
+        np.testing.assert_allclose(online.to_numpy(), expected.to_numpy(), rtol=1e-7, atol=1e-12)
+
+        # 与精确计算比较，确认在线结果没有随K线数累积漂移
+        close = bars["close"].to_numpy()
+        rows = online.index.to_numpy()
+        exact_std = sliding_window_view(close, 24).std(axis=1, ddof=1)[rows - 23]
+        exact_ma = close[rows] / sliding_window_view(close, 50).mean(axis=1)[rows - 49] - 1
+        np.testing.assert_allclose(online["price_volatility"].to_numpy(), exact_std, rtol=1e-10)
+        np.testing.assert_allclose(online["ma_deviation"].to_numpy(), exact_ma, rtol=0, atol=1e-14)
+        tail = slice(-1000, None)
+        np.testing.assert_allclose(online["price_volatility"].to_numpy()[tail], exact_std[tail], rtol=1e-11)
+
+    def test_rsi_edge_cases(self):
+        """测试窗口内无下跌时RSI为100，价格不变（0/0）时与pandas一样不产生特征行"""
+        n = 80
+        flat = pd.DataFrame({"close": np.full(n, 100.0), "volume": np.full(n, 10.0),
+                             "high": np.full(n, 101.0), "low": np.full(n, 99.0)})
+        rising = flat.assign(close=np.linspace(100, 180, n))
+        bars = pd.concat([rising, flat.assign(close=180.0)], ignore_index=True)
+
+        expected = pandas_features(bars)
+        online = online_features(bars)
+        self.assertEqual(list(online.index), list(expected.index))
+        self.assertTrue((online["rsi"] == 100).all())
+        np.testing.assert_allclose(online.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+class TestStreamingCrisisScorer(unittest.TestCase):
+    """测试多币种小批次打分"""
+
+    def test_batch_matches_single_rows(self):
+        """测试一次对多个币种打分与逐行标准化后打分一致，窗口未满的币种不返回"""
+        history = pandas_features(synthetic_ohlcv(2000, seed=1))
+        scaler = StandardScaler().fit(history)
+        detector = IsolationForest(random_state=0).fit(scaler.transform(history))
+        scorer = StreamingCrisisScorer(scaler, detector)
+
+        streams = {"BTC/USDT": synthetic_ohlcv(120, seed=2), "ETH/USDT": synthetic_ohlcv(120, seed=3, price=3000.0)}
+        late = synthetic_ohlcv(120, seed=4, price=150.0)
+        for i in range(120):
+            bars = {symbol: frame.iloc[i].to_dict() for symbol, frame in streams.items()}
+            if i >= 100:
+                bars["SOL/USDT"] = late.iloc[i - 100].to_dict()
+            scores = scorer.update(bars)
+
+        self.assertEqual(set(scores), {"BTC/USDT", "ETH/USDT"})
+        self.assertEqual(set(scorer.latest), {"BTC/USDT", "ETH/USDT"})
+        for symbol, frame in streams.items():
+            row = online_features(frame).iloc[[-1]]
+            expected = StreamingCrisisScorer.probability(detector.score_samples(scaler.transform(row)))[0]
+            self.assertAlmostEqual(scores[symbol], expected, places=12)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
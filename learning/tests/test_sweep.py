@@ -0,0 +1,120 @@
+"""
+网格扫描单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from learning.optimizer.sweep import GridSweep, combination_at, resolve_n_jobs
+from learning.storage.database import SQLiteDatabase
+
+PARAM_GRID = {"fast": [5, 10, 15], "slow": [20, 40, 60, 80]}
+
+
+def peak_score(params):
+    """fast=10, slow=60时最高"""
+    return -abs(params["fast"] - 10) - abs(params["slow"] - 60) / 10
+
+
+class Interrupted(BaseException):
+    """模拟扫描中途被终止（不会被单个组合的异常处理吞掉）"""
+
+
+class TestGridSweep(unittest.TestCase):
+    """测试检查点只在中断后续跑时复用"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.db = SQLiteDatabase(self.tmp / "sweep.db")
+        self.sweep_id = GridSweep.make_id("ma_cross", PARAM_GRID, None, 3)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def make_sweep(self, scoring_func, **kwargs):
+        return GridSweep(self.db, self.sweep_id, PARAM_GRID, scoring_func, chunk_size=2, **kwargs)
+
+    def checkpoint_rows(self) -> int:
+        conn = self.db.connect()
+        count = conn.execute('SELECT COUNT(*) FROM sweep_results WHERE sweep_id = ?',
+                             (self.sweep_id,)).fetchone()[0]
+        conn.close()
+        return count
+
+    def test_combination_order(self):
+        """测试组合序号与itertools.product顺序一致"""
+        self.assertEqual(combination_at(PARAM_GRID, 0), {"fast": 5, "slow": 20})
+        self.assertEqual(combination_at(PARAM_GRID, 6), {"fast": 10, "slow": 60})
+        self.assertEqual(combination_at(PARAM_GRID, 11), {"fast": 15, "slow": 80})
+
+    def test_completed_sweep_not_reused(self):
+        """测试完整跑完后清除检查点，再次扫描重新评估而不是返回旧结果"""
+        result = self.make_sweep(peak_score).run()
+        self.assertEqual(result["best_params"], {"fast": 10, "slow": 60})
+        self.assertEqual(result["evaluations"], 12)
+        self.assertEqual(self.checkpoint_rows(), 0)
+
+        # 打分函数变化后（如行情数据更新）得到新的最优参数
+        result = self.make_sweep(lambda params: params["fast"] + params["slow"]).run()
+        self.assertEqual(result["resumed"], 0)
+        self.assertEqual(result["evaluations"], 12)
+        self.assertEqual(result["best_params"], {"fast": 15, "slow": 80})
+
+    def test_interrupted_sweep_resumes(self):
+        """测试中断的扫描从检查点继续，只评估剩余的组合"""
+        calls = []
+
+        def interrupted(params):
+            if len(calls) == 5:
+                raise Interrupted()
+            calls.append(params)
+            return peak_score(params)
+
+        with self.assertRaises(Interrupted):
+            self.make_sweep(interrupted).run()
+        # 前两块已写入检查点，第三块在评估中被打断
+        self.assertEqual(self.checkpoint_rows(), 4)
+
+        result = self.make_sweep(peak_score).run()
+        self.assertEqual(result["resumed"], 4)
+        self.assertEqual(result["evaluations"], 8)
+        self.assertEqual(result["best_params"], {"fast": 10, "slow": 60})
+        self.assertEqual(self.checkpoint_rows(), 0)
+
+    def test_halving_rungs(self):
+        """测试按预算逐级淘汰，每级保留前1/eta"""
+        result = self.make_sweep(lambda params, budget: peak_score(params), budgets=[10, 100]).run()
+
+        self.assertEqual([rung["candidates"] for rung in result["rungs"]], [12, 4])
+        self.assertEqual(result["evaluations"], 16)
+        self.assertEqual(result["best_params"], {"fast": 10, "slow": 60})
+
+    def test_failed_scores_ranked_last(self):
+        """测试打分异常或NaN的组合不会被选为最优"""
+        def flaky(params):
+            if params["slow"] == 60:
+                raise ValueError("backtest failed")
+            return float("nan") if params["fast"] == 10 else peak_score(params)
+
+        result = self.make_sweep(flaky).run()
+        self.assertEqual(result["best_params"], {"fast": 5, "slow": 40})
+
+    def test_unpicklable_scoring_runs_in_process(self):
+        """测试lambda等无法pickle的打分函数退回当前进程执行"""
+        with self.assertLogs("learning.optimizer.sweep", level="WARNING"):
+            sweep = self.make_sweep(lambda params: peak_score(params), n_jobs=2)
+        self.assertEqual(sweep.n_jobs, 1)
+        self.assertEqual(sweep.run()["best_params"], {"fast": 10, "slow": 60})
+
+        self.assertEqual(resolve_n_jobs(2, peak_score), 2)
+        self.assertEqual(resolve_n_jobs(1, lambda params: 0), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
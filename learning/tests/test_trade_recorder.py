@@ -0,0 +1,406 @@
+"""
+交易记录器单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import json
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+from unittest.mock import patch
+
+import pandas as pd
+
+from learning.config.config import DATABASE_CONFIG
+from learning.records.trade_recorder import (
+    TradeRecorder, TradeEntry, TradeExit, TradeContext, TRADE_INDEXES, LEGACY_INDEXES
+)
+
+# 引入ts/exit_ts列之前的trades表
+OLD_SCHEMA = '''
+    CREATE TABLE trades (
+        id TEXT PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        entry_price REAL,
+        entry_reason TEXT,
+        entry_indicators TEXT,
+        entry_market_state TEXT,
+        entry_ai_analysis TEXT,
+        entry_timestamp TEXT,
+        exit_price REAL,
+        exit_reason TEXT,
+        exit_duration REAL,
+        exit_pnl REAL,
+        exit_timestamp TEXT,
+        context_market_trend TEXT,
+        context_volatility REAL,
+        context_news_events TEXT,
+        context_trader_actions TEXT,
+        status TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+class TestTimeColumnMigration(unittest.TestCase):
+    """测试旧库迁移到epoch时间列"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.db_path = self.tmp / "trades.db"
+        now = datetime.now().replace(microsecond=0)
+
+        # (id, 入场时间, 平仓时间, 状态, 盈亏)
+        self.trades = [
+            ("T1", now - timedelta(days=1), now - timedelta(hours=20), "closed", 120.0),
+            ("T2", now - timedelta(days=3), now - timedelta(days=2), "closed", -40.0),
+            ("T3", now - timedelta(days=20), now - timedelta(days=19), "closed", 75.0),
+            ("T4", now - timedelta(hours=2), None, "open", None),
+        ]
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(OLD_SCHEMA)
+        conn.execute('CREATE INDEX idx_symbol ON trades(symbol)')
+        conn.execute('CREATE INDEX idx_timestamp ON trades(timestamp)')
+        conn.execute('CREATE INDEX idx_status ON trades(status)')
+        conn.executemany('''
+            INSERT INTO trades (id, timestamp, symbol, direction, entry_price, entry_timestamp,
+                                exit_timestamp, exit_pnl, exit_duration, status)
+            VALUES (?, ?, 'BTCUSDT', 'long', 100.0, ?, ?, ?, 60.0, ?)
+        ''', [
+            (trade_id, opened.isoformat(), opened.isoformat(),
+             closed.isoformat() if closed else None, pnl, status)
+            for trade_id, opened, closed, status, pnl in self.trades
+        ])
+        conn.commit()
+        conn.close()
+
+        self.recorder = TradeRecorder(db_path=self.db_path, archive_path=self.tmp / "archive")
+
+    def tearDown(self):
+        self.recorder.cleanup()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _query(self, sql: str):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(sql).fetchall()
+        conn.close()
+        return rows
+
+    def test_epoch_columns_backfilled(self):
+        """测试ts/exit_ts按本地时间从ISO字符串回填"""
+        rows = {row[0]: row[1:] for row in self._query('SELECT id, ts, exit_ts FROM trades')}
+
+        for trade_id, opened, closed, _, _ in self.trades:
+            ts, exit_ts = rows[trade_id]
+            self.assertEqual(ts, int(opened.timestamp()))
+            self.assertEqual(exit_ts, int(closed.timestamp()) if closed else None)
+
+    def test_indexes_replaced(self):
+        """测试旧索引被删除、组合索引已建立"""
+        indexes = {row[0] for row in self._query(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'trades'")}
+
+        self.assertTrue(set(TRADE_INDEXES) <= indexes)
+        self.assertFalse(set(LEGACY_INDEXES) & indexes)
+        columns = {row[1] for row in self._query('PRAGMA table_info(trades)')}
+        self.assertTrue({"ts", "exit_ts", "archived"} <= columns)
+
+    def test_queries_after_migration(self):
+        """测试迁移后的时间条件查询"""
+        self.assertEqual([t["id"] for t in self.recorder.get_closed_trades(days=7)], ["T1", "T2"])
+        self.assertEqual([t["id"] for t in self.recorder.get_recent_trades(days=7)], ["T4", "T1", "T2"])
+        self.assertEqual([t["id"] for t in self.recorder.get_trades_by_symbol("BTCUSDT", "closed")],
+                         ["T1", "T2", "T3"])
+
+        stats = self.recorder.calculate_statistics(days=7)
+        self.assertEqual(stats["total_trades"], 2)
+        self.assertEqual(stats["winning_trades"], 1)
+        self.assertAlmostEqual(stats["total_pnl"], 80.0)
+        self.assertEqual(self.recorder.calculate_statistics()["total_trades"], 3)
+
+    def test_migration_idempotent(self):
+        """测试重复打开已迁移的库不改变数据"""
+        before = self._query('SELECT id, ts, exit_ts FROM trades ORDER BY id')
+        TradeRecorder(db_path=self.db_path, archive_path=self.tmp / "archive")
+        self.assertEqual(self._query('SELECT id, ts, exit_ts FROM trades ORDER BY id'), before)
+
+    def test_new_trades_use_epoch_columns(self):
+        """测试迁移后新记录的交易写入ts/exit_ts"""
+        now = datetime.now().isoformat()
+        trade_id = self.recorder.record_trade_entry(
+            "ETHUSDT", "long",
+            TradeEntry(2000.0, "breakout", {"rsi": 55}, "uptrend", {}, now),
+            TradeContext("up", 0.02, [], [])
+        )
+        self.recorder.record_trade_exit(trade_id, TradeExit(2100.0, "take_profit", 1.0, 50.0, now))
+
+        trade = self.recorder.get_trade_by_id(trade_id)
+        self.assertIsNotNone(trade["ts"])
+        self.assertIsNotNone(trade["exit_ts"])
+        self.assertIn(trade_id, [t["id"] for t in self.recorder.get_closed_trades(days=1)])
+
+
+GROUP_KEYS = ["entry_reason", "entry_market_state", "entry_hour", "entry_weekday"]
+GROUP_SUMS = ["trades", "wins", "total_pnl", "total_duration",
+              "opportunities", "opportunity_wins", "opportunity_return"]
+
+
+def random_trades(rng: random.Random, n: int, max_age_days: int, prefix: str = "T") -> List[dict]:
+    """随机交易记录：包含缺失的入场原因/时间戳/指标、零入场价和无法解析的时间戳"""
+    now = int(time.time())
+    trades = []
+    for i in range(n):
+        opened = datetime.now() - timedelta(days=rng.uniform(0, 40), hours=rng.randrange(24))
+        entry_price = rng.choice([0.0, None, rng.uniform(50, 150), rng.uniform(50, 150)])
+        trades.append({
+            "id": f"{prefix}{i:04d}",
+            "timestamp": opened.isoformat(),
+            "ts": now - rng.randrange(max_age_days * 86400),
+            "symbol": rng.choice(["BTCUSDT", "ETHUSDT", "SOLUSDT"]),
+            "direction": "long",
+            "entry_price": entry_price,
+            "entry_reason": rng.choice(["breakout", "reversal", "momentum", None]),
+            "entry_indicators": rng.choice([json.dumps({"rsi": rng.randrange(20, 80)}), None]),
+            "entry_market_state": rng.choice(["uptrend", "range", None]),
+            "entry_timestamp": rng.choice([opened.isoformat(), opened.isoformat(), None, "unknown"]),
+            "exit_price": rng.uniform(50, 150),
+            "exit_duration": rng.uniform(0.5, 48),
+            "exit_pnl": rng.uniform(-100, 100),
+            "status": rng.choice(["closed", "closed", "closed", "open"]),
+        })
+    return trades
+
+
+def insert_trades(db_path: Path, trades: List[dict]):
+    columns = list(trades[0])
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        f"INSERT INTO trades ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [tuple(trade[column] for column in columns) for trade in trades]
+    )
+    conn.commit()
+    conn.close()
+
+
+def group_table(df: pd.DataFrame) -> dict:
+    """{分组键: 聚合值}，缺失键统一为None，指标原文列表排序后比较"""
+    table = {}
+    for row in df.to_dict("records"):
+        key = tuple(None if pd.isna(row[column]) else row[column] for column in GROUP_KEYS[:2]) + \
+            tuple(None if pd.isna(row[column]) else int(row[column]) for column in GROUP_KEYS[2:])
+        table[key] = {column: float(row[column]) for column in GROUP_SUMS}
+        table[key]["winning_indicators"] = sorted(row["winning_indicators"])
+    return table
+
+
+class TestAggregateClosedTrades(unittest.TestCase):
+    """测试SQLite与Parquet归档两条聚合路径逐组一致"""
+
+    DAYS = 120
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.db_path = self.tmp / "trades.db"
+        self.recorder = TradeRecorder(db_path=self.db_path, archive_path=self.tmp / "archive")
+        self.rng = random.Random(7)
+        insert_trades(self.db_path, random_trades(self.rng, 300, max_age_days=150))
+
+    def tearDown(self):
+        self.recorder.cleanup()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def sqlite_groups(self) -> dict:
+        """只用SQLite GROUP BY（已导出的行仍在SQLite中）"""
+        with patch.object(self.recorder, "archive_query_days", self.DAYS):
+            return group_table(self.recorder.aggregate_closed_trades(self.DAYS))
+
+    def archive_groups(self) -> dict:
+        self.assertGreater(self.DAYS, self.recorder.archive_query_days)
+        df = self.recorder.aggregate_closed_trades(self.DAYS)
+        table = group_table(df)
+        self.assertEqual(len(table), len(df), "分组键重复")
+        return table
+
+    def assert_groups_equal(self, actual: dict, expected: dict):
+        self.assertEqual(actual.keys(), expected.keys())
+        for key, values in expected.items():
+            for column in GROUP_SUMS:
+                self.assertAlmostEqual(actual[key][column], values[column], msg=f"{key} {column}")
+            self.assertEqual(actual[key]["winning_indicators"], values["winning_indicators"], msg=str(key))
+
+    def test_paths_match_before_and_after_export(self):
+        """测试导出前、全部导出后、部分导出时两条路径结果一致"""
+        expected = self.sqlite_groups()
+        self.assertTrue(any(key[0] is None for key in expected))
+        self.assertTrue(any(key[2] is None for key in expected))
+        self.assert_groups_equal(self.archive_groups(), expected)
+
+        self.recorder.export_to_parquet()
+        self.assert_groups_equal(self.archive_groups(), expected)
+
+        # 导出之后新增的交易只在SQLite中
+        insert_trades(self.db_path, random_trades(self.rng, 100, max_age_days=150, prefix="N"))
+        expected = self.sqlite_groups()
+        self.assert_groups_equal(self.archive_groups(), expected)
+
+    def test_archived_winners_without_indicators(self):
+        """测试归档中entry_indicators为空的盈利交易不进入指标原文列表"""
+        self.recorder.export_to_parquet()
+        groups = self.recorder.aggregate_closed_trades(self.DAYS)
+
+        indicators = [item for items in groups["winning_indicators"] for item in items]
+        self.assertTrue(indicators)
+        self.assertTrue(all(isinstance(item, str) for item in indicators))
+
+    def test_analyze_closed_trades_over_archive(self):
+        """测试长周期模式分析读取归档（含无指标的盈利交易）"""
+        from learning.patterns.pattern_learner import PatternLearner
+
+        self.recorder.export_to_parquet()
+        with patch.dict(DATABASE_CONFIG["patterns"], {"path": self.tmp / "patterns.db"}):
+            learner = PatternLearner(self.recorder)
+        try:
+            results = learner.analyze_closed_trades(self.DAYS)
+        finally:
+            learner.cleanup()
+
+        with patch.object(self.recorder, "archive_query_days", self.DAYS):
+            groups = self.recorder.aggregate_closed_trades(self.DAYS)
+        opportunities = results["opportunity_patterns"]
+        self.assertTrue(opportunities)
+        self.assertEqual(sum(p["total_opportunities"] for p in opportunities.values()),
+                         groups["opportunities"].sum())
+
+
+class TestTradeArchive(unittest.TestCase):
+    """测试Parquet归档的增量导出、旧交易归档和长周期查询"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.db_path = self.tmp / "trades.db"
+        self.recorder = TradeRecorder(db_path=self.db_path, archive_path=self.tmp / "archive")
+        self.trades = random_trades(random.Random(11), 200, max_age_days=150)
+        insert_trades(self.db_path, self.trades)
+        self.closed = {t["id"]: t for t in self.trades if t["status"] == "closed"}
+
+    def tearDown(self):
+        self.recorder.cleanup()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def archived_ids(self, **filters) -> List[str]:
+        return list(self.recorder.archive.read(columns=["id"], **filters)["id"])
+
+    def sqlite_ids(self, where: str = "1") -> set:
+        conn = sqlite3.connect(self.db_path)
+        ids = {row[0] for row in conn.execute(f"SELECT id FROM trades WHERE {where}")}
+        conn.close()
+        return ids
+
+    def test_incremental_export(self):
+        """测试导出两次不产生重复行，只有新平仓的交易被追加"""
+        root = self.recorder.export_to_parquet()
+        self.assertEqual(root, self.recorder.archive.root)
+        self.assertEqual(sorted(self.archived_ids()), sorted(self.closed))
+        self.assertEqual(self.sqlite_ids("archived = 1"), set(self.closed))
+
+        self.recorder.export_to_parquet()
+        self.assertEqual(len(self.archived_ids()), len(self.closed))
+
+        # 新平仓的交易在下一次导出时追加
+        open_id = next(t["id"] for t in self.trades if t["status"] == "open")
+        self.recorder.record_trade_exit(open_id, TradeExit(110.0, "take_profit", 2.0, 10.0,
+                                                           datetime.now().isoformat()))
+        self.recorder.export_to_parquet()
+        ids = self.archived_ids()
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(self.closed) | {open_id})
+
+        # 归档行与SQLite中的记录一致（除归档标记外）
+        for row in self.recorder.archive.read_trades(symbols=["BTCUSDT"]):
+            stored = self.recorder.get_trade_by_id(row["id"])
+            del stored["archived"]
+            self.assertEqual(row, stored)
+
+    def test_archive_old_trades(self):
+        """测试超过保留期的交易从SQLite删除，未平仓的旧交易也写入归档"""
+        self.recorder.retention_days = 100
+        cutoff = int(time.time()) - 100 * 86400
+        old = {t["id"] for t in self.trades if t["ts"] < cutoff}
+        old_open = {t["id"] for t in self.trades if t["ts"] < cutoff and t["status"] == "open"}
+        self.assertTrue(old_open)
+
+        self.recorder.archive_old_trades()
+
+        self.assertEqual(self.sqlite_ids(), {t["id"] for t in self.trades} - old)
+        ids = self.archived_ids()
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(self.closed) | old_open)
+        self.assertEqual(set(self.archived_ids(status="open")), old_open)
+
+        # 再次执行不重复写入
+        self.recorder.archive_old_trades()
+        self.assertEqual(len(self.archived_ids()), len(ids))
+
+    def test_long_window_merges_archive(self):
+        """测试超过archive_query_days的查询合并归档与未导出交易，每笔恰好一次"""
+        days = 120
+        self.assertGreater(days, self.recorder.archive_query_days)
+        cutoff = int(time.time()) - days * 86400
+        expected = {i for i, t in self.closed.items() if t["ts"] >= cutoff}
+
+        def closed_ids(**kwargs):
+            trades = self.recorder.get_closed_trades(days=days, **kwargs)
+            ids = [t["id"] for t in trades]
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertEqual([t["ts"] for t in trades], sorted((t["ts"] for t in trades), reverse=True))
+            return set(ids)
+
+        self.assertEqual(closed_ids(), expected)
+
+        # 一部分导出后再新增交易：归档与SQLite各提供一部分
+        self.recorder.export_to_parquet()
+        extra = random_trades(random.Random(12), 50, max_age_days=150, prefix="N")
+        insert_trades(self.db_path, extra)
+        expected |= {t["id"] for t in extra if t["status"] == "closed" and t["ts"] >= cutoff}
+        self.assertEqual(closed_ids(), expected)
+
+        symbols = ["ETHUSDT"]
+        by_symbol = {t["id"] for t in self.trades + extra
+                     if t["id"] in expected and t["symbol"] in symbols}
+        self.assertEqual(closed_ids(symbols=symbols), by_symbol)
+
+    def test_filter_pushdown(self):
+        """测试币种过滤只扫描对应分区，时间过滤结果与逐行筛选一致"""
+        self.recorder.export_to_parquet()
+        archive = self.recorder.archive
+
+        expression = archive._filter(None, None, ["BTCUSDT"], None)
+        fragments = list(archive.dataset().get_fragments(filter=expression))
+        self.assertTrue(fragments)
+        self.assertTrue(all("symbol=BTCUSDT" in fragment.path for fragment in fragments))
+        self.assertLess(len(fragments), len(list(archive.dataset().get_fragments())))
+
+        start = int(time.time()) - 60 * 86400
+        end = int(time.time()) - 10 * 86400
+        expected = {i for i, t in self.closed.items()
+                    if start <= t["ts"] < end and t["symbol"] in ("BTCUSDT", "SOLUSDT")}
+        ids = self.archived_ids(start_ts=start, end_ts=end, symbols=["BTCUSDT", "SOLUSDT"])
+        self.assertEqual(set(ids), expected)
+        self.assertEqual(archive.count(start_ts=start, end_ts=end, symbols=["BTCUSDT", "SOLUSDT"]),
+                         len(expected))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,166 @@
+"""
+walk-forward训练流水线单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from learning.config.config import ML_CONFIG
+from learning.ml.feature_store import FeatureStore, compute_features
+from learning.ml.ml_models import MLModels
+from learning.ml.training import build_estimator, build_xy, run_training_task, walk_forward_splits
+
+
+def synthetic_bars(n: int, seed: int, start: str = "2024-01-01") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n, freq="h")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"close": close, "volume": rng.lognormal(10, 1, n)}, index=index)
+
+
+class TestWalkForwardSplits(unittest.TestCase):
+    """测试扩展窗口切分"""
+
+    def test_chronological_without_overlap(self):
+        """测试集按时间相连、互不重叠，训练集只在测试集之前且留出gap"""
+        n_samples, n_splits, min_train, gap = 1003, 5, 100, 1
+        splits = walk_forward_splits(n_samples, n_splits, min_train, gap)
+
+        self.assertEqual(len(splits), n_splits)
+        test_size = (n_samples - min_train) // n_splits
+        for train_end, test_start, test_end in splits:
+            self.assertEqual(test_start - train_end, gap)
+            self.assertEqual(test_end - test_start, test_size)
+            # 最后一个训练样本的标签来自第train_end根K线，早于第一个测试样本
+            self.assertLess(train_end, test_start)
+        self.assertGreaterEqual(splits[0][0], min_train - gap)
+        self.assertEqual(splits[-1][2], n_samples)
+        for (_, _, previous_end), (train_end, test_start, _) in zip(splits, splits[1:]):
+            self.assertEqual(test_start, previous_end)
+            self.assertGreater(train_end, splits[0][0])
+
+    def test_gap(self):
+        """测试更大的gap只缩短训练集"""
+        splits = walk_forward_splits(600, 5, 100, gap=5)
+        self.assertEqual([s[1:] for s in splits], [s[1:] for s in walk_forward_splits(600, 5, 100)])
+        self.assertTrue(all(test_start - train_end == 5 for train_end, test_start, _ in splits))
+
+    def test_insufficient_samples(self):
+        """测试样本不足以切出超过gap的测试集时不切分"""
+        self.assertEqual(walk_forward_splits(105, 5, 100), [])
+        self.assertEqual(walk_forward_splits(50, 5, 100), [])
+
+    def test_fold_uses_only_training_rows(self):
+        """测试一折的标准化和模型只用训练区间，测试区间异常值不影响得分"""
+        bars = synthetic_bars(400, seed=1)
+        features = compute_features(bars, "technical")
+        close = bars["close"].reindex(features.index).to_numpy()
+        X = features.to_numpy(dtype=np.float32)
+        train_end, test_start, test_end = walk_forward_splits(len(X) - 1, 3, 100)[0]
+
+        task = {"model_name": "price_prediction", "symbol": "T", "kind": "fold", "train_end": train_end,
+                "test_start": test_start, "test_end": test_end, "source": {"arrays": (X, close)}}
+        result = run_training_task(task)
+
+        X_all, y = build_xy("price_prediction", X, close)
+        scaler = StandardScaler().fit(X_all[:train_end])
+        model = build_estimator("price_prediction").fit(scaler.transform(X_all[:train_end]), y[:train_end])
+        expected = model.score(scaler.transform(X_all[test_start:test_end]), y[test_start:test_end])
+        self.assertAlmostEqual(result["test_score"], expected)
+        self.assertEqual((result["train_size"], result["test_size"]), (train_end, test_end - test_start))
+
+        # 测试区间之后的数据被篡改，得分不变
+        X_tampered = X.copy()
+        X_tampered[test_end + 1:] *= 1000
+        tampered = run_training_task({**task, "source": {"arrays": (X_tampered, close)}})
+        self.assertAlmostEqual(tampered["test_score"], result["test_score"])
+
+
+class TestMLModelsTraining(unittest.TestCase):
+    """测试按币种walk-forward训练和增量更新"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.models = MLModels(feature_store=FeatureStore(self.tmp / "features"))
+        self.models.model_dir = self.tmp / "models"
+        self.models.model_dir.mkdir()
+        self.data = {"AAA/USDT": synthetic_bars(420, seed=2), "BBB/USDT": synthetic_bars(360, seed=3)}
+
+    def tearDown(self):
+        self.models.cleanup()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_process_pool_matches_in_process(self):
+        """测试进程池与当前进程执行得到相同的折得分和全量模型"""
+        symbols = list(self.data)
+        serial = self.models.train_walk_forward("price_prediction", symbols, data=self.data, n_splits=3, n_jobs=1)
+        serial_models = {key: model for key, model in self.models.models.items()}
+        parallel = self.models.train_walk_forward("price_prediction", symbols, n_splits=3, n_jobs=2)
+
+        self.assertEqual(serial["status"], "success")
+        self.assertEqual(serial["tasks"], parallel["tasks"])
+        self.assertEqual(serial["tasks"], 2 * (3 + 1))
+        for symbol in symbols:
+            serial_report, parallel_report = serial["symbols"][symbol], parallel["symbols"][symbol]
+            strip = lambda folds: [{k: v for k, v in fold.items() if k != "wall_s"} for fold in folds]
+            self.assertEqual(strip(serial_report["folds"]), strip(parallel_report["folds"]))
+            self.assertEqual(serial_report["mean_test_score"], parallel_report["mean_test_score"])
+            self.assertEqual(serial_report["final"]["train_score"], parallel_report["final"]["train_score"])
+
+            # 折的训练集逐折扩大，最后一折的测试集到数据末尾
+            folds = serial_report["folds"]
+            n_samples = len(self.models.feature_store.get(symbol, "1h", "technical")[1]) - 1
+            self.assertEqual([f["train_size"] for f in folds],
+                             [s[0] for s in walk_forward_splits(n_samples, 3, 100)])
+            self.assertEqual(serial_report["final"]["train_size"], n_samples)
+
+            key = MLModels.model_key("price_prediction", symbol)
+            X, _ = build_xy("price_prediction", *self._arrays(symbol))
+            np.testing.assert_array_equal(serial_models[key].predict(X[-5:]),
+                                          self.models.models[key].predict(X[-5:]))
+            self.assertTrue((self.models.model_dir / f"{key}_model.pkl").exists())
+
+    def _arrays(self, symbol):
+        _, features, carry = self.models.feature_store.get(symbol, "1h", "technical")
+        return np.asarray(features), np.asarray(carry[:, 0])
+
+    def test_update_model_truncates_to_max_estimators(self):
+        """测试增量更新追加树，超过max_estimators时保留最新的树"""
+        symbol = "AAA/USDT"
+        self.models.train_walk_forward("price_prediction", [symbol], data=self.data, n_splits=2, n_jobs=1)
+        key = MLModels.model_key("price_prediction", symbol)
+        self.assertEqual(len(self.models.models[key].estimators_), 100)
+
+        with patch.dict(ML_CONFIG["training"], {"max_estimators": 130, "update_trees": 20, "update_window": 200}):
+            first = self.models.update_model("price_prediction", symbol)
+            self.assertEqual(first["n_estimators"], 120)
+            self.assertEqual(first["update_size"], 200)
+
+            before = list(self.models.models[key].estimators_)
+            more = synthetic_bars(30, seed=4, start=str(self.data[symbol].index[-1] + pd.Timedelta(hours=1)))
+            second = self.models.update_model("price_prediction", symbol, bars=more)
+
+        model = self.models.models[key]
+        self.assertEqual(second["n_estimators"], 130)
+        self.assertEqual(len(model.estimators_), 130)
+        self.assertEqual(model.n_estimators, 130)
+        # 丢弃最早的10棵，保留其余110棵并追加20棵新树
+        self.assertEqual([id(tree) for tree in model.estimators_[:110]], [id(tree) for tree in before[10:]])
+        self.assertFalse({id(tree) for tree in model.estimators_[110:]} & {id(tree) for tree in before})
+
+        X, _ = build_xy("price_prediction", *self._arrays(symbol))
+        self.assertEqual(self.models.predict(key, pd.DataFrame(X[-3:])).shape, (3,))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,337 @@
+"""
+多渠道并行分发器
+每个渠道一个有界优先级队列和一个工作线程，慢渠道不会阻塞其他渠道
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ChannelQueue:
+    """有界优先级队列（数值越小越优先），队列满时淘汰优先级最低的消息"""
+
+    def __init__(self, maxsize: int = 500):
+        self.maxsize = maxsize
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, priority: int, item: Any) -> tuple:
+        """
+        加入队列
+
+        Returns:
+            (是否加入, 被淘汰的消息或None)
+        """
+        with self._cond:
+            entry = (priority, next(self._counter), item)
+            evicted = None
+
+            if len(self._heap) >= self.maxsize:
+                worst = max(self._heap)
+                if priority >= worst[0]:
+                    return False, None
+                # 只在溢出时发生，队列有界，线性查找可以接受
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                evicted = worst[2]
+
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+            return True, evicted
+
+    def get(self) -> Optional[Any]:
+        """取出优先级最高的消息，队列关闭后返回None"""
+        with self._cond:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)[2]
+
+    def close(self):
+        """关闭队列，唤醒等待的工作线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class ChannelMetrics:
+    """单个渠道的发送统计"""
+
+    def __init__(self, sample_size: int = 1000):
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=sample_size)  # 发送耗时（秒）
+        self.queue_waits = deque(maxlen=sample_size)  # 排队耗时（秒）
+
+    def record(self, success: bool, latency: float, queue_wait: float):
+        """记录一次发送"""
+        if success:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.latencies.append(latency)
+        self.queue_waits.append(queue_wait)
+
+    @staticmethod
+    def _percentile_ms(samples: List[float], pct: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 2)
+
+    def snapshot(self, queued: int = 0) -> Dict:
+        """导出统计快照（毫秒）"""
+        latencies = list(self.latencies)
+        waits = list(self.queue_waits)
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "queued": queued,
+            "latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            "latency_p50_ms": self._percentile_ms(latencies, 0.5),
+            "latency_p95_ms": self._percentile_ms(latencies, 0.95),
+            "latency_max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+            "queue_wait_p95_ms": self._percentile_ms(waits, 0.95)
+        }
+
+
+class _Delivery:
+    """一条通知在多个渠道上的投递进度"""
+    __slots__ = ("notification", "remaining", "success", "lock")
+
+    def __init__(self, notification: Any, remaining: int):
+        self.notification = notification
+        self.remaining = remaining
+        self.success = 0
+        self.lock = threading.Lock()
+
+    def done(self, success: bool) -> bool:
+        """记录一个渠道完成，返回是否为最后一个"""
+        with self.lock:
+            self.remaining -= 1
+            if success:
+                self.success += 1
+            return self.remaining == 0
+
+
+class ParallelDispatcher:
+    """并行多渠道分发器"""
+
+    def __init__(self,
+                 send_func: Callable[[str, str, Any], bool],
+                 on_complete: Optional[Callable[[Any, int], None]] = None,
+                 queue_size: int = 500):
+        """
+        初始化分发器
+
+        Args:
+            send_func: 渠道发送函数 (channel, message, notification) -> 是否成功
+            on_complete: 通知在所有渠道完成后的回调 (notification, 成功渠道数)
+            queue_size: 每个渠道的队列容量
+        """
+        self.logger = logging.getLogger(__name__)
+        self.send_func = send_func
+        self.on_complete = on_complete
+        self.queue_size = queue_size
+
+        self.queues: Dict[str, ChannelQueue] = {}
+        self.metrics: Dict[str, ChannelMetrics] = {}
+        self.workers: Dict[str, threading.Thread] = {}
+
+        # 未完成的投递数，用于join
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+
+    def add_channel(self, channel: str):
+        """添加渠道并启动工作线程"""
+        if channel in self.queues:
+            return
+
+        self.queues[channel] = ChannelQueue(self.queue_size)
+        self.metrics[channel] = ChannelMetrics()
+        worker = threading.Thread(target=self._worker, args=(channel,),
+                                  name=f"notify-{channel}", daemon=True)
+        self.workers[channel] = worker
+        worker.start()
+
+    def submit(self, channels: List[str], priority: int, message: str, notification: Any) -> int:
+        """
+        提交通知到多个渠道
+
+        Returns:
+            成功入队的渠道数
+        """
+        channels = [ch for ch in channels if ch in self.queues]
+        delivery = _Delivery(notification, len(channels))
+
+        if not channels:
+            self._complete(delivery)
+            return 0
+
+        with self._pending_cond:
+            self._pending += len(channels)
+
+        accepted = 0
+        for channel in channels:
+            item = (delivery, message, time.perf_counter())
+            ok, evicted = self.queues[channel].put(priority, item)
+
+            if ok:
+                accepted += 1
+            else:
+                evicted = item
+
+            if evicted is not None:
+                self.metrics[channel].dropped += 1
+                self.logger.warning(f"{channel}渠道队列已满，丢弃低优先级通知")
+                self._finish(evicted[0], False)
+
+        return accepted
+
+    def _worker(self, channel: str):
+        """渠道工作线程"""
+        queue = self.queues[channel]
+        metrics = self.metrics[channel]
+
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+
+            delivery, message, enqueued_at = item
+            start = time.perf_counter()
+            try:
+                success = bool(self.send_func(channel, message, delivery.notification))
+            except Exception as e:
+                self.logger.error(f"发送到{channel}失败: {e}")
+                success = False
+
+            end = time.perf_counter()
+            metrics.record(success, end - start, start - enqueued_at)
+            self._finish(delivery, success)
+
+    def _finish(self, delivery: _Delivery, success: bool):
+        """记录渠道完成"""
+        if delivery.done(success):
+            self._complete(delivery)
+
+        with self._pending_cond:
+            self._pending -= 1
+            if self._pending == 0:
+                self._pending_cond.notify_all()
+
+    def _complete(self, delivery: _Delivery):
+        """通知投递完成回调"""
+        if self.on_complete:
+            try:
+                self.on_complete(delivery.notification, delivery.success)
+            except Exception as e:
+                self.logger.error(f"投递完成回调失败: {e}")
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """等待所有已提交的通知投递完成"""
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """获取各渠道统计"""
+        return {ch: m.snapshot(len(self.queues[ch])) for ch, m in self.metrics.items()}
+
+    def stop(self, timeout: float = 2):
+        """停止所有工作线程"""
+        for queue in self.queues.values():
+            queue.close()
+        for worker in self.workers.values():
+            if worker.is_alive():
+                worker.join(timeout=timeout)
+
+
+# 性能测试
+class _StubHandler:
+    """模拟固定延迟的渠道"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.received = []
+
+    def send(self, message: str, notification: Any = None) -> bool:
+        time.sleep(self.latency)
+        self.received.append((time.perf_counter(), notification))
+        return True
+
+
+def benchmark_dispatch(count: int = 20) -> Dict:
+    """对比串行分发与并行分发的端到端耗时（使用本地模拟渠道）"""
+    from .notification_system import NotificationSystem, NotificationLevel
+
+    latencies = {"telegram": 0.02, "email": 0.3, "webhook": 0.05}
+    levels = [NotificationLevel.CRITICAL, NotificationLevel.URGENT]
+
+    system = NotificationSystem()
+    system.quiet_hours["enabled"] = False
+    system.deduplication["enabled"] = False
+    system.rate_limit["max_per_minute"] = system.rate_limit["max_per_hour"] = count * 10
+    system.channels["terminal"]["enabled"] = False
+
+    def channels_for(level):
+        return [ch for ch in system.levels[level]["channels"] if ch in latencies]
+
+    # 原串行方式：每条通知依次发送到各渠道
+    handlers = {ch: _StubHandler(lat) for ch, lat in latencies.items()}
+    start = time.perf_counter()
+    for i in range(count):
+        for channel in channels_for(levels[i % len(levels)]):
+            handlers[channel].send(f"msg {i}")
+    serial_total = time.perf_counter() - start
+    serial_telegram_last = handlers["telegram"].received[-1][0] - start
+
+    # 并行分发
+    handlers = {ch: _StubHandler(lat) for ch, lat in latencies.items()}
+    for channel, handler in handlers.items():
+        system.register_channel_handler(channel, handler)
+
+    start = time.perf_counter()
+    for i in range(count):
+        system.send(levels[i % len(levels)], f"benchmark {i}", "content", source="benchmark")
+    system.dispatcher.join(timeout=count * 2)
+    parallel_total = time.perf_counter() - start
+    parallel_telegram_last = handlers["telegram"].received[-1][0] - start
+
+    metrics = system.dispatcher.get_metrics()
+    system.shutdown()
+
+    results = {
+        "notifications": count,
+        "serial_total_s": round(serial_total, 3),
+        "parallel_total_s": round(parallel_total, 3),
+        "serial_telegram_done_s": round(serial_telegram_last, 3),
+        "parallel_telegram_done_s": round(parallel_telegram_last, 3),
+        "channel_metrics": metrics
+    }
+
+    print(f"{count}条通知: 串行 {serial_total:.2f}s, 并行 {parallel_total:.2f}s")
+    print(f"Telegram全部送达: 串行 {serial_telegram_last:.2f}s, 并行 {parallel_telegram_last:.2f}s")
+    for channel, m in metrics.items():
+        print(f"  {channel}: 发送{m['sent']} p50 {m['latency_p50_ms']}ms p95 {m['latency_p95_ms']}ms "
+              f"排队p95 {m['queue_wait_p95_ms']}ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    benchmark_dispatch()
@@ -5,6 +5,8 @@
 
 import smtplib
 import logging
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -35,9 +37,15 @@ class EmailSender:
             "smtp_port": smtp_port,
             "username": username or "",
             "password": password or "",
-            "use_tls": True
+            "use_tls": True,
+            "idle_timeout": 60  # 复用连接的最长空闲时间（秒）
         }
         
+        # 复用的已认证SMTP连接
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_last_used = 0.0
+        self._smtp_lock = threading.Lock()
+        
         # 邮件模板
         self.templates = {
             "alert": """
@@ -181,16 +189,9 @@ class EmailSender:
                 for file_path in attachments:
                     self._attach_file(msg, file_path)
             
-            # 发送邮件
-            with smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"]) as server:
-                if self.config["use_tls"]:
-                    server.starttls()
-                
-                if self.config["username"] and self.config["password"]:
-                    server.login(self.config["username"], self.config["password"])
-                
-                all_recipients = to_emails + (cc_emails or []) + (bcc_emails or [])
-                server.send_message(msg, to_addrs=all_recipients)
+            # 发送邮件（复用连接）
+            all_recipients = to_emails + (cc_emails or []) + (bcc_emails or [])
+            self._send_with_connection(msg, all_recipients)
             
             self.stats["sent"] += 1
             self.logger.info(f"邮件发送成功: {subject}")
@@ -201,6 +202,61 @@ class EmailSender:
             self.logger.error(f"邮件发送失败: {e}")
             return False
     
+    def _send_with_connection(self, msg: MIMEMultipart, recipients: List[str]):
+        """通过复用的SMTP连接发送，连接失效时重连一次"""
+        with self._smtp_lock:
+            try:
+                self._get_connection().send_message(msg, to_addrs=recipients)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self.logger.info(f"SMTP连接失效，重新连接: {e}")
+                self._close_connection()
+                self._get_connection().send_message(msg, to_addrs=recipients)
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code != 421:  # 421: 服务器关闭连接
+                    raise
+                self._close_connection()
+                self._get_connection().send_message(msg, to_addrs=recipients)
+            
+            self._smtp_last_used = time.monotonic()
+    
+    def _get_connection(self) -> smtplib.SMTP:
+        """获取已认证的SMTP连接，空闲超时则重建"""
+        if self._smtp is not None and \
+                time.monotonic() - self._smtp_last_used > self.config["idle_timeout"]:
+            self._close_connection()
+        
+        if self._smtp is None:
+            server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"], timeout=30)
+            try:
+                if self.config["use_tls"]:
+                    server.starttls()
+                
+                if self.config["username"] and self.config["password"]:
+                    server.login(self.config["username"], self.config["password"])
+            except Exception:
+                server.close()
+                raise
+            
+            self._smtp = server
+            self._smtp_last_used = time.monotonic()
+        
+        return self._smtp
+    
+    def _close_connection(self):
+        """关闭SMTP连接"""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+    
+    def close(self):
+        """关闭复用的连接"""
+        with self._smtp_lock:
+            self._close_connection()
+    
     def send_alert_email(self, 
                         alert_type: str,
                         alert_level: str,
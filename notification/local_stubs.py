@@ -0,0 +1,273 @@
+"""
+本地模拟服务器
+提供HTTP和SMTP模拟服务，用于在不访问外部服务的情况下测试和压测通知渠道
+"""
+
+import json
+import logging
+import smtplib
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import requests
+
+
+class StubHTTPServer:
+    """模拟HTTP接收端，支持keep-alive，记录收到的请求"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, connect_delay: float = 0.0):
+        """
+        Args:
+            connect_delay: 每个新连接的握手延迟（秒），模拟TCP/TLS建连开销
+        """
+        self.requests: List[Dict] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                if connect_delay:
+                    time.sleep(connect_delay)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                with stub._lock:
+                    stub.requests.append({"path": self.path, "body": body})
+                status, payload = stub.respond(self.path, body)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def respond(self, path: str, body: bytes) -> tuple:
+        """生成响应 (状态码, 响应体)，子类可覆盖"""
+        return 200, b'{"ok": true}'
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubHTTPServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeBotAPIServer(StubHTTPServer):
+    """模拟Telegram Bot API的sendMessage，可注入429限流和5xx失败"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 flood_responses: int = 0, retry_after: int = 1, error_responses: int = 0):
+        """
+        Args:
+            flood_responses: 前N次请求返回429
+            retry_after: 429响应中的retry_after秒数
+            error_responses: 之后N次请求返回500
+        """
+        super().__init__(host, port)
+        self.flood_responses = flood_responses
+        self.retry_after = retry_after
+        self.error_responses = error_responses
+        self.messages: List[Dict] = []  # 成功接收的消息（含接收时间）
+
+    def respond(self, path: str, body: bytes) -> tuple:
+        if not path.endswith("/sendMessage"):
+            return 404, b'{"ok": false, "error_code": 404, "description": "Not Found"}'
+
+        with self._lock:
+            if self.flood_responses > 0:
+                self.flood_responses -= 1
+                payload = {"ok": False, "error_code": 429,
+                           "description": f"Too Many Requests: retry after {self.retry_after}",
+                           "parameters": {"retry_after": self.retry_after}}
+                return 429, json.dumps(payload).encode()
+            if self.error_responses > 0:
+                self.error_responses -= 1
+                return 500, b'{"ok": false, "error_code": 500, "description": "Internal Server Error"}'
+
+            message = json.loads(body)
+            message["received_at"] = time.monotonic()
+            self.messages.append(message)
+
+        return 200, json.dumps({"ok": True, "result": {"message_id": len(self.messages)}}).encode()
+
+
+class StubSMTPServer:
+    """模拟SMTP服务器，接受任意认证，记录收到的邮件（不支持STARTTLS）"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, connect_delay: float = 0.0):
+        """
+        Args:
+            connect_delay: 每个新连接的握手延迟（秒），模拟TLS协商和登录开销
+        """
+        self.messages: List[bytes] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def reply(self, line: str):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                with stub._lock:
+                    stub.connections += 1
+                if connect_delay:
+                    time.sleep(connect_delay)
+                self.reply("220 stub ESMTP")
+
+                for raw in self.rfile:
+                    command = raw.decode(errors="replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+
+                    if verb == "EHLO":
+                        self.reply("250-stub")
+                        self.reply("250 AUTH PLAIN LOGIN")
+                    elif verb == "HELO":
+                        self.reply("250 stub")
+                    elif verb == "AUTH":
+                        self.reply("235 2.7.0 Authentication successful")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        for data_line in self.rfile:
+                            if data_line in (b".\r\n", b".\n"):
+                                break
+                            lines.append(data_line)
+                        with stub._lock:
+                            stub.messages.append(b"".join(lines))
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        # MAIL / RCPT / RSET / NOOP
+                        self.reply("250 OK")
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> tuple:
+        return self._server.server_address[:2]
+
+    def start(self) -> "StubSMTPServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# 性能测试
+def _summary(samples: List[float]) -> Dict:
+    """单条消息耗时统计（毫秒）"""
+    ordered = sorted(samples)
+    return {
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 2)
+    }
+
+
+def benchmark_transports(count: int = 200, connect_delay: float = 0.005) -> Dict:
+    """对比每条消息新建连接与复用连接的单条发送耗时"""
+    from .webhook.webhook_sender import WebhookSender
+    from .email.email_sender import EmailSender
+
+    results = {}
+
+    # Webhook：原方式每次requests.post新建连接
+    http = StubHTTPServer(connect_delay=connect_delay).start()
+    url = f"{http.url}/hook"
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        requests.post(url, json={"text": f"msg {i}"},
+                      headers={"Content-Type": "application/json"}, timeout=10)
+        samples.append(time.perf_counter() - start)
+    results["webhook_per_message"] = {**_summary(samples), "connections": http.connections}
+
+    http.connections = 0
+    sender = WebhookSender()
+    sender.add_webhook("bench", url)
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        sender.send_to_webhook("bench", f"msg {i}")
+        samples.append(time.perf_counter() - start)
+    results["webhook_session"] = {**_summary(samples), "connections": http.connections}
+    sender.close()
+    http.stop()
+
+    # 邮件：原方式每封邮件新建连接并登录
+    smtp = StubSMTPServer(connect_delay=connect_delay).start()
+    host, port = smtp.address
+    email_count = max(1, count // 4)
+
+    sender = EmailSender(host, port, "bench@localhost", "secret")
+    sender.config["use_tls"] = False
+
+    # 复用EmailSender的邮件构造，只替换连接方式
+    samples = []
+
+    def send_with_new_connection(msg, recipients):
+        with smtplib.SMTP(host, port) as server:
+            server.login("bench@localhost", "secret")
+            server.send_message(msg, to_addrs=recipients)
+
+    sender._send_with_connection = send_with_new_connection
+    for i in range(email_count):
+        start = time.perf_counter()
+        sender.send_email(["ops@localhost"], f"bench {i}", "body")
+        samples.append(time.perf_counter() - start)
+    results["email_per_message"] = {**_summary(samples), "connections": smtp.connections}
+
+    smtp.connections = 0
+    del sender._send_with_connection
+    samples = []
+    for i in range(email_count):
+        start = time.perf_counter()
+        sender.send_email(["ops@localhost"], f"bench {i}", "body")
+        samples.append(time.perf_counter() - start)
+    results["email_reused"] = {**_summary(samples), "connections": smtp.connections}
+    sender.close()
+    smtp.stop()
+
+    for name, result in results.items():
+        print(f"{name:>20}: avg {result['avg_ms']}ms p50 {result['p50_ms']}ms "
+              f"p95 {result['p95_ms']}ms 连接数 {result['connections']}")
+
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    benchmark_transports()
@@ -13,6 +13,9 @@ import asyncio
 import threading
 from dataclasses import dataclass, asdict
 
+from .dispatcher import ParallelDispatcher
+from .scheduler import DelayedDeliveryScheduler
+
 class NotificationLevel(Enum):
     """通知级别枚举"""
     INFO = "INFO"
@@ -20,6 +23,14 @@ class NotificationLevel(Enum):
     URGENT = "URGENT"
     CRITICAL = "CRITICAL"
 
+# 分发优先级（数值越小越优先）
+LEVEL_PRIORITY = {
+    NotificationLevel.CRITICAL: 0,
+    NotificationLevel.URGENT: 1,
+    NotificationLevel.IMPORTANT: 2,
+    NotificationLevel.INFO: 3
+}
+
 @dataclass
 class Notification:
     """通知消息数据类"""
@@ -84,8 +95,7 @@ class NotificationSystem:
             "sms": {"enabled": False, "handler": None}
         }
         
-        # 消息队列和历史记录
-        self.message_queue = deque(maxlen=1000)
+        # 历史记录
         self.sent_history = deque(maxlen=10000)
         
         # 限流控制
@@ -122,16 +132,25 @@ class NotificationSystem:
             "deduplicated": 0,
             "rate_limited": 0
         }
+        self._stats_lock = threading.Lock()
         
         # 加载配置
         if config_path:
             self.load_config(config_path)
             
-        # 启动后台处理线程
+        # 每个渠道一个有界优先级队列和工作线程
         self.running = True
-        self.process_thread = threading.Thread(target=self._process_queue)
-        self.process_thread.daemon = True
-        self.process_thread.start()
+        self.dispatcher = ParallelDispatcher(
+            send_func=self._deliver_to_channel,
+            on_complete=self._on_delivered,
+            queue_size=1000
+        )
+        for channel in self.channels:
+            self.dispatcher.add_channel(channel)
+        
+        # 限流通知的延迟投递（单线程调度，同级别同来源合并为摘要）
+        self.defer_seconds = 60
+        self.scheduler = DelayedDeliveryScheduler(self._flush_deferred)
     
     def send(self, 
              level: NotificationLevel,
@@ -180,58 +199,90 @@ class NotificationSystem:
             self.stats["rate_limited"] += 1
             self.logger.warning(f"触发限流，通知被延迟: {title}")
             # 延迟发送而不是丢弃
-            threading.Timer(60, lambda: self.send(
-                level, title, content, source, metadata, force=True
-            )).start()
+            self.scheduler.defer((level, source), notification, self.defer_seconds)
             return False
         
-        # 加入队列
-        self.message_queue.append(notification)
+        # 提交到各渠道队列
+        self._dispatch_notification(notification)
         self.logger.info(f"通知已加入队列: [{level.value}] {title}")
         return True
     
-    def _process_queue(self):
-        """后台处理消息队列"""
-        while self.running:
-            try:
-                if self.message_queue:
-                    notification = self.message_queue.popleft()
-                    self._dispatch_notification(notification)
-                else:
-                    # 队列为空，等待
-                    import time
-                    time.sleep(0.1)
-            except Exception as e:
-                self.logger.error(f"处理通知时出错: {e}")
-    
     def _dispatch_notification(self, notification: Notification):
-        """分发通知到各个渠道"""
+        """按通知级别提交到各个渠道的队列"""
         level_config = self.levels[notification.level]
-        channels_to_use = level_config["channels"]
+        channels_to_use = [
+            channel for channel in level_config["channels"]
+            if self.channels[channel]["enabled"]
+        ]
         
         # 格式化消息
         formatted_message = self._format_message(notification)
         
-        success_count = 0
-        for channel in channels_to_use:
-            if self.channels[channel]["enabled"]:
-                try:
-                    if self._send_to_channel(channel, formatted_message, notification):
-                        success_count += 1
-                        self.stats["by_channel"][channel] += 1
-                except Exception as e:
-                    self.logger.error(f"发送到{channel}失败: {e}")
-                    self.stats["failed"] += 1
+        self.dispatcher.submit(
+            channels_to_use,
+            LEVEL_PRIORITY[notification.level],
+            formatted_message,
+            notification
+        )
+    
+    def _deliver_to_channel(self, channel: str, message: str, notification: Notification) -> bool:
+        """渠道工作线程中发送单条消息"""
+        try:
+            success = self._send_to_channel(channel, message, notification)
+        except Exception as e:
+            self.logger.error(f"发送到{channel}失败: {e}")
+            with self._stats_lock:
+                self.stats["failed"] += 1
+            return False
+        
+        if success:
+            with self._stats_lock:
+                self.stats["by_channel"][channel] += 1
+        return success
+    
+    def _on_delivered(self, notification: Notification, success_count: int):
+        """通知在所有渠道完成后更新统计"""
+        with self._stats_lock:
+            if success_count > 0:
+                self.stats["total_sent"] += 1
+                self.stats["by_level"][notification.level.value] += 1
+                self.sent_history.append(notification)
+            else:
+                self.stats["failed"] += 1
         
         if success_count > 0:
-            self.stats["total_sent"] += 1
-            self.stats["by_level"][notification.level.value] += 1
-            self.sent_history.append(notification)
             self.logger.info(f"通知发送成功: {notification.title} (渠道数: {success_count})")
         else:
-            self.stats["failed"] += 1
             self.logger.error(f"通知发送失败: {notification.title}")
     
+    def _flush_deferred(self, key: tuple, notifications: List[Notification]):
+        """延迟通知到期，多条合并为一条摘要"""
+        level, source = key
+        
+        if len(notifications) == 1:
+            original = notifications[0]
+            notification = Notification(
+                level=level,
+                title=original.title,
+                content=original.content,
+                source=source,
+                timestamp=datetime.now(),
+                metadata=original.metadata
+            )
+        else:
+            lines = [f"• {n.timestamp.strftime('%H:%M:%S')} {n.title}: {n.content}" for n in notifications]
+            notification = Notification(
+                level=level,
+                title=f"{source} 延迟通知汇总（{len(notifications)}条）",
+                content="\n".join(lines),
+                source=source,
+                timestamp=datetime.now(),
+                metadata={"digest_count": len(notifications)}
+            )
+        
+        self._dispatch_notification(notification)
+        self.logger.info(f"延迟通知已投递: {notification.title}")
+    
     def _format_message(self, notification: Notification) -> str:
         """格式化消息"""
         icon = self.levels[notification.level]["icon"]
@@ -347,7 +398,11 @@ class NotificationSystem:
     
     def get_stats(self) -> Dict:
         """获取统计信息"""
-        return self.stats.copy()
+        with self._stats_lock:
+            stats = self.stats.copy()
+        stats["channel_metrics"] = self.dispatcher.get_metrics()
+        stats["deferred"] = dict(self.scheduler.stats, pending=self.scheduler.pending())
+        return stats
     
     def get_recent_notifications(self, count: int = 10) -> List[Dict]:
         """获取最近的通知"""
@@ -373,6 +428,6 @@ class NotificationSystem:
     def shutdown(self):
         """关闭通知系统"""
         self.running = False
-        if self.process_thread.is_alive():
-            self.process_thread.join(timeout=2)
+        self.scheduler.stop()
+        self.dispatcher.stop(timeout=2)
         self.logger.info("通知系统已关闭")
\ No newline at end of file
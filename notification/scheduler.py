@@ -0,0 +1,120 @@
+"""
+延迟投递调度器
+单线程 + 最小堆管理所有延迟通知，同一(级别, 来源)的延迟通知合并为摘要
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class DelayedDeliveryScheduler:
+    """基于堆的延迟投递调度器，线程数不随延迟消息数量增长"""
+
+    def __init__(self, flush_func: Callable[[Hashable, List[Any]], None]):
+        """
+        初始化调度器
+
+        Args:
+            flush_func: 到期回调 (合并键, 该键下积累的消息列表)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.flush_func = flush_func
+
+        self._heap = []  # (到期时间, 序号, 合并键)
+        self._buckets: Dict[Hashable, List[Any]] = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+
+        self.stats = {
+            "deferred": 0,
+            "coalesced": 0,
+            "flushed_batches": 0
+        }
+
+        self._thread = threading.Thread(target=self._run, name="notify-scheduler", daemon=True)
+        self._thread.start()
+
+    def defer(self, key: Hashable, item: Any, delay: float):
+        """
+        延迟投递
+
+        Args:
+            key: 合并键，到期前相同键的消息合并为一批
+            item: 消息
+            delay: 延迟秒数（仅对该键的第一条消息生效）
+        """
+        with self._cond:
+            self.stats["deferred"] += 1
+
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.append(item)
+                self.stats["coalesced"] += 1
+                return
+
+            self._buckets[key] = [item]
+            due = time.monotonic() + delay
+            heapq.heappush(self._heap, (due, next(self._counter), key))
+
+            # 新的最早到期项需要唤醒调度线程重新计算等待时间
+            if self._heap[0][2] == key:
+                self._cond.notify()
+
+    def pending(self) -> int:
+        """等待投递的消息数"""
+        with self._cond:
+            return sum(len(bucket) for bucket in self._buckets.values())
+
+    def _run(self):
+        """调度线程"""
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+
+                if not self._running:
+                    return
+
+                _, _, key = heapq.heappop(self._heap)
+                items = self._buckets.pop(key)
+                self.stats["flushed_batches"] += 1
+
+            try:
+                self.flush_func(key, items)
+            except Exception as e:
+                self.logger.error(f"延迟投递失败: {e}")
+
+    def flush_all(self):
+        """立即投递所有等待中的消息"""
+        with self._cond:
+            batches = list(self._buckets.items())
+            self._buckets.clear()
+            self._heap.clear()
+            self.stats["flushed_batches"] += len(batches)
+
+        for key, items in batches:
+            try:
+                self.flush_func(key, items)
+            except Exception as e:
+                self.logger.error(f"延迟投递失败: {e}")
+
+    def stop(self, flush: bool = False, timeout: float = 2):
+        """停止调度器"""
+        if flush:
+            self.flush_all()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
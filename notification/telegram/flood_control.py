@@ -0,0 +1,210 @@
+"""
+Telegram限流调度
+按聊天和全局预算安排发送，同一聊天排队中的消息合并发送，遵守429返回的retry_after
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import replace
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Telegram单条消息最大长度
+MAX_MESSAGE_LENGTH = 4096
+MERGE_SEPARATOR = "\n\n"
+
+
+def split_text(text: str, max_length: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """按换行优先把超长文本切分为不超过max_length的片段"""
+    chunks = []
+    while len(text) > max_length:
+        cut = text.rfind("\n", 0, max_length)
+        if cut <= 0:
+            cut = max_length
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+class FloodControlScheduler:
+    """
+    Telegram发送调度器（线程安全）
+
+    - 每个聊天: 两次发送间隔至少per_chat_interval秒，且每分钟不超过per_chat_per_minute条
+    - 全局: 每秒不超过global_per_second条
+    - 同一聊天排队中的消息按FIFO合并成不超过4096字符的一条
+    """
+
+    def __init__(self,
+                 per_chat_interval: float = 1.0,
+                 per_chat_per_minute: int = 20,
+                 global_per_second: int = 30,
+                 max_queue_per_chat: int = 500,
+                 max_length: int = MAX_MESSAGE_LENGTH):
+        self.per_chat_interval = per_chat_interval
+        self.per_chat_per_minute = per_chat_per_minute
+        self.global_per_second = global_per_second
+        self.max_queue_per_chat = max_queue_per_chat
+        self.max_length = max_length
+
+        # 有待发消息的聊天，按轮转顺序排列
+        self.queues: "OrderedDict[str, Deque[Any]]" = OrderedDict()
+        self.chat_next: Dict[str, float] = {}  # 聊天下次允许发送的时间
+        self.chat_window: Dict[str, Deque[float]] = {}  # 聊天最近一分钟的发送时间
+        self.global_window: Deque[float] = deque()  # 最近一秒的发送时间
+
+        # 退避中的消息 (可发送时间, 序号, 消息)
+        self._delayed = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "enqueued": 0,
+            "merged": 0,
+            "dropped": 0,
+            "flood_waits": 0
+        }
+
+    def enqueue(self, message: Any, delay: float = 0.0, now: Optional[float] = None):
+        """
+        加入发送队列
+
+        Args:
+            message: TelegramMessage
+            delay: 延迟秒数（失败重试退避）
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.stats["enqueued"] += 1
+            if delay > 0:
+                heapq.heappush(self._delayed, (now + delay, next(self._counter), message))
+                return
+            for part in self._split(message):
+                self._append(part)
+
+    def requeue(self, message: Any, retry_after: float, now: Optional[float] = None):
+        """收到429时把消息放回队首，并暂停该聊天retry_after秒"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.stats["flood_waits"] += 1
+            queue = self.queues.get(message.chat_id)
+            if queue is None:
+                queue = self.queues[message.chat_id] = deque()
+            queue.appendleft(message)
+            self.chat_next[message.chat_id] = max(self.chat_next.get(message.chat_id, 0.0),
+                                                  now + retry_after)
+
+    def next_ready(self, now: Optional[float] = None) -> Tuple[Optional[Any], float]:
+        """
+        取出下一条可以立即发送的（合并后）消息
+
+        Returns:
+            (消息, 0) 或 (None, 距离下一条可发送的秒数；无待发消息时为None)
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._release_delayed(now)
+
+            wait = self._global_wait(now)
+            earliest = None
+            for chat_id, queue in self.queues.items():
+                ready_at = self._chat_ready_at(chat_id, now)
+                if ready_at <= now:
+                    if wait > 0:
+                        return None, wait
+                    message = self._pop_merged(chat_id, queue)
+                    self._record_send(chat_id, now)
+                    return message, 0.0
+                earliest = ready_at if earliest is None else min(earliest, ready_at)
+
+            if self._delayed:
+                due = self._delayed[0][0]
+                earliest = due if earliest is None else min(earliest, due)
+
+            if earliest is None:
+                return None, None
+            return None, max(earliest - now, wait)
+
+    def pending(self) -> int:
+        """待发消息数（合并前）"""
+        with self._lock:
+            return sum(len(q) for q in self.queues.values()) + len(self._delayed)
+
+    def _split(self, message: Any) -> List[Any]:
+        """超长消息切分为多条"""
+        if len(message.text) <= self.max_length:
+            return [message]
+        return [replace(message, text=part) for part in split_text(message.text, self.max_length)]
+
+    def _append(self, message: Any):
+        queue = self.queues.get(message.chat_id)
+        if queue is None:
+            queue = self.queues[message.chat_id] = deque()
+        if len(queue) >= self.max_queue_per_chat:
+            queue.popleft()
+            self.stats["dropped"] += 1
+        queue.append(message)
+
+    def _release_delayed(self, now: float):
+        """把退避到期的消息移入发送队列"""
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, message = heapq.heappop(self._delayed)
+            for part in self._split(message):
+                self._append(part)
+
+    def _global_wait(self, now: float) -> float:
+        window = self.global_window
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        if len(window) < self.global_per_second:
+            return 0.0
+        return window[0] + 1.0 - now
+
+    def _chat_ready_at(self, chat_id: str, now: float) -> float:
+        ready_at = self.chat_next.get(chat_id, 0.0)
+        window = self.chat_window.get(chat_id)
+        if window:
+            while window and now - window[0] >= 60.0:
+                window.popleft()
+            if len(window) >= self.per_chat_per_minute:
+                ready_at = max(ready_at, window[0] + 60.0)
+        return ready_at
+
+    def _pop_merged(self, chat_id: str, queue: Deque[Any]) -> Any:
+        """合并同一聊天中格式相同的连续消息"""
+        first = queue.popleft()
+        texts = [first.text]
+        length = len(first.text)
+        silent = first.disable_notification
+        merged = 0
+
+        while queue and first.reply_markup is None:
+            candidate = queue[0]
+            if (candidate.parse_mode != first.parse_mode or candidate.reply_markup is not None
+                    or length + len(MERGE_SEPARATOR) + len(candidate.text) > self.max_length):
+                break
+            queue.popleft()
+            texts.append(candidate.text)
+            silent = silent and candidate.disable_notification
+            length += len(MERGE_SEPARATOR) + len(candidate.text)
+            merged += 1
+
+        # 轮转到队尾，保证多聊天之间公平
+        if queue:
+            self.queues.move_to_end(chat_id)
+        else:
+            del self.queues[chat_id]
+
+        if not merged:
+            return first
+        self.stats["merged"] += merged
+        return replace(first, text=MERGE_SEPARATOR.join(texts), disable_notification=silent)
+
+    def _record_send(self, chat_id: str, now: float):
+        self.chat_next[chat_id] = max(self.chat_next.get(chat_id, 0.0), now + self.per_chat_interval)
+        self.chat_window.setdefault(chat_id, deque()).append(now)
+        self.global_window.append(now)
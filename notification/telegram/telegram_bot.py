@@ -14,6 +14,8 @@ from collections import deque
 import threading
 import time
 
+from .flood_control import FloodControlScheduler
+
 @dataclass
 class TelegramMessage:
     """Telegram消息数据类"""
@@ -22,6 +24,7 @@ class TelegramMessage:
     parse_mode: str = "Markdown"
     disable_notification: bool = False
     reply_markup: Optional[Dict] = None
+    attempts: int = 0  # 已失败次数
 
 class TelegramBot:
     """Telegram Bot处理器"""
@@ -121,19 +124,17 @@ _⚠️ 独立仓位，严格管理_""",
 _⚠️ 立即执行风控措施_"""
         }
         
-        # 发送控制
-        self.rate_limit = {
-            "max_per_minute": 10,
-            "max_per_hour": 100,
-            "current_minute_count": 0,
-            "current_hour_count": 0,
-            "last_minute_reset": datetime.now(),
-            "last_hour_reset": datetime.now(),
-            "cooldown_seconds": 30
+        # 发送控制：按聊天/全局预算排队合并，不再直接丢弃
+        self.flood_control = FloodControlScheduler()
+        
+        # 失败重试退避
+        self.retry_policy = {
+            "base_delay": 2.0,
+            "max_delay": 300.0,
+            "max_attempts": 5
         }
         
-        # 消息队列
-        self.message_queue = deque(maxlen=100)
+        # 失败队列
         self.failed_queue = deque(maxlen=50)
         
         # 统计信息
@@ -142,6 +143,8 @@ _⚠️ 立即执行风控措施_"""
             "failed": 0,
             "queued": 0,
             "rate_limited": 0,
+            "retried": 0,
+            "abandoned": 0,
             "by_type": {}
         }
         
@@ -177,15 +180,18 @@ _⚠️ 立即执行风控措施_"""
     
     async def _async_processor(self):
         """异步消息处理器"""
-        async with aiohttp.ClientSession() as session:
+        # 单个会话复用到api.telegram.org的keep-alive连接
+        connector = aiohttp.TCPConnector(limit_per_host=4, keepalive_timeout=60)
+        async with aiohttp.ClientSession(connector=connector) as session:
             self.session = session
             while self.running:
                 try:
-                    if self.message_queue:
-                        message = self.message_queue.popleft()
+                    message, wait = self.flood_control.next_ready()
+                    if message is not None:
                         await self._send_message_async(message)
                     else:
-                        await asyncio.sleep(0.1)
+                        # 等待期间到达的同聊天消息会在下次发送时合并
+                        await asyncio.sleep(0.1 if wait is None else min(wait, 0.1))
                 except Exception as e:
                     self.logger.error(f"异步处理错误: {e}")
     
@@ -205,12 +211,6 @@ _⚠️ 立即执行风控措施_"""
             self.logger.error("Telegram未配置")
             return False
         
-        # 检查限流
-        if not self._check_rate_limit():
-            self.stats["rate_limited"] += 1
-            self.logger.warning("Telegram消息被限流")
-            return False
-        
         # 创建消息对象
         telegram_message = TelegramMessage(
             chat_id=self.config["chat_id"],
@@ -219,7 +219,7 @@ _⚠️ 立即执行风控措施_"""
         )
         
         # 加入队列
-        self.message_queue.append(telegram_message)
+        self.flood_control.enqueue(telegram_message)
         self.stats["queued"] += 1
         
         return True
@@ -264,7 +264,7 @@ _⚠️ 立即执行风控措施_"""
         )
         
         # 加入队列
-        self.message_queue.append(telegram_message)
+        self.flood_control.enqueue(telegram_message)
         self.stats["queued"] += 1
         
         # 更新统计
@@ -300,48 +300,33 @@ _⚠️ 立即执行风控措施_"""
                     self.stats["sent"] += 1
                     self.logger.debug(f"Telegram消息发送成功")
                     return True
+                elif response.status == 429:
+                    # 触发Telegram限流：按retry_after暂停该聊天后重发
+                    body = await response.json(content_type=None)
+                    retry_after = body.get("parameters", {}).get("retry_after", 1)
+                    self.flood_control.requeue(message, retry_after)
+                    self.stats["rate_limited"] += 1
+                    self.logger.warning(f"Telegram限流，{retry_after}秒后重发")
+                    return False
                 else:
                     error_text = await response.text()
                     self.logger.error(f"Telegram API错误: {response.status} - {error_text}")
-                    self.failed_queue.append(message)
-                    self.stats["failed"] += 1
+                    self._mark_failed(message)
                     return False
         except asyncio.TimeoutError:
             self.logger.error("Telegram发送超时")
-            self.failed_queue.append(message)
-            self.stats["failed"] += 1
+            self._mark_failed(message)
             return False
         except Exception as e:
             self.logger.error(f"Telegram发送失败: {e}")
-            self.failed_queue.append(message)
-            self.stats["failed"] += 1
+            self._mark_failed(message)
             return False
     
-    def _check_rate_limit(self) -> bool:
-        """检查限流"""
-        now = datetime.now()
-        
-        # 重置分钟计数器
-        if (now - self.rate_limit["last_minute_reset"]).seconds >= 60:
-            self.rate_limit["current_minute_count"] = 0
-            self.rate_limit["last_minute_reset"] = now
-        
-        # 重置小时计数器
-        if (now - self.rate_limit["last_hour_reset"]).seconds >= 3600:
-            self.rate_limit["current_hour_count"] = 0
-            self.rate_limit["last_hour_reset"] = now
-        
-        # 检查限制
-        if self.rate_limit["current_minute_count"] >= self.rate_limit["max_per_minute"]:
-            return False
-        if self.rate_limit["current_hour_count"] >= self.rate_limit["max_per_hour"]:
-            return False
-        
-        # 增加计数
-        self.rate_limit["current_minute_count"] += 1
-        self.rate_limit["current_hour_count"] += 1
-        
-        return True
+    def _mark_failed(self, message: TelegramMessage):
+        """记录发送失败的消息"""
+        message.attempts += 1
+        self.failed_queue.append(message)
+        self.stats["failed"] += 1
     
     def send_signal(self, symbol: str, direction: str, entry: float, 
                    stop: float, targets: List[float], size: float, 
@@ -402,17 +387,28 @@ _⚠️ 立即执行风控措施_"""
     
     def get_stats(self) -> Dict:
         """获取统计信息"""
-        return self.stats.copy()
+        stats = self.stats.copy()
+        stats["pending"] = self.flood_control.pending()
+        stats["flood_control"] = self.flood_control.stats.copy()
+        return stats
     
     def retry_failed(self) -> int:
-        """重试失败的消息"""
+        """按指数退避重新排队失败的消息，超过最大重试次数的放弃"""
+        policy = self.retry_policy
         retry_count = 0
         while self.failed_queue:
             message = self.failed_queue.popleft()
-            self.message_queue.append(message)
+            if message.attempts >= policy["max_attempts"]:
+                self.stats["abandoned"] += 1
+                self.logger.error(f"Telegram消息重试{message.attempts}次仍失败，放弃")
+                continue
+            
+            delay = min(policy["base_delay"] * 2 ** (message.attempts - 1), policy["max_delay"])
+            self.flood_control.enqueue(message, delay=delay)
             retry_count += 1
         
         if retry_count > 0:
+            self.stats["retried"] += retry_count
             self.logger.info(f"重新加入{retry_count}条失败消息到队列")
         
         return retry_count
@@ -420,8 +416,6 @@ _⚠️ 立即执行风控措施_"""
     def shutdown(self):
         """关闭Bot"""
         self.running = False
-        if self.loop:
-            self.loop.call_soon_threadsafe(self.loop.stop)
         if hasattr(self, 'process_thread') and self.process_thread.is_alive():
             self.process_thread.join(timeout=2)
         self.logger.info("Telegram Bot已关闭")
\ No newline at end of file
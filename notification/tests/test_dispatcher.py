@@ -0,0 +1,194 @@
+"""
+并行多渠道分发器单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import threading
+import time
+import unittest
+
+from notification.dispatcher import ChannelQueue, ParallelDispatcher
+
+
+class TestChannelQueue(unittest.TestCase):
+    """测试有界优先级队列"""
+
+    def test_priority_order(self):
+        """数值小的先出，同优先级按入队顺序"""
+        queue = ChannelQueue(maxsize=10)
+        for priority, item in [(2, "a"), (0, "b"), (1, "c"), (0, "d"), (2, "e")]:
+            self.assertEqual(queue.put(priority, item), (True, None))
+
+        self.assertEqual([queue.get() for _ in range(5)], ["b", "d", "c", "a", "e"])
+        self.assertEqual(len(queue), 0)
+
+    def test_evicts_lowest_priority_when_full(self):
+        """队列满时淘汰优先级最低（同级中最晚入队）的消息，不高于它的新消息被拒绝"""
+        queue = ChannelQueue(maxsize=3)
+        queue.put(1, "a")
+        queue.put(3, "b")
+        queue.put(3, "c")
+
+        self.assertEqual(queue.put(3, "d"), (False, None))
+        self.assertEqual(queue.put(0, "e"), (True, "c"))
+        self.assertEqual(queue.put(2, "f"), (True, "b"))
+        self.assertEqual(queue.put(2, "g"), (False, None))
+
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.get() for _ in range(3)], ["e", "a", "f"])
+
+    def test_close_drains_then_returns_none(self):
+        """关闭后先取完剩余消息，再返回None，并唤醒等待中的消费者"""
+        queue = ChannelQueue()
+        queue.put(0, "left")
+        queue.close()
+        self.assertEqual(queue.get(), "left")
+        self.assertIsNone(queue.get())
+
+        queue = ChannelQueue()
+        result = []
+        consumer = threading.Thread(target=lambda: result.append(queue.get()))
+        consumer.start()
+        time.sleep(0.05)
+        queue.close()
+        consumer.join(timeout=1)
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(result, [None])
+
+
+class TestParallelDispatcher(unittest.TestCase):
+    """测试多渠道投递、完成回调和停止"""
+
+    def setUp(self):
+        self.completed = []
+        self.sent = []
+        self.lock = threading.Lock()
+        self.dispatcher = None
+
+    def tearDown(self):
+        if self.dispatcher is not None:
+            self.dispatcher.stop(timeout=1)
+
+    def on_complete(self, notification, success_count):
+        with self.lock:
+            self.completed.append((notification, success_count))
+
+    def make_dispatcher(self, send_func, channels, queue_size=500):
+        self.dispatcher = ParallelDispatcher(send_func, on_complete=self.on_complete, queue_size=queue_size)
+        for channel in channels:
+            self.dispatcher.add_channel(channel)
+        return self.dispatcher
+
+    def test_on_complete_once_per_notification(self):
+        """每条通知在所有渠道完成后回调一次，成功数不计失败和异常的渠道"""
+        def send(channel, message, notification):
+            with self.lock:
+                self.sent.append((channel, notification))
+            if channel == "broken":
+                raise RuntimeError("boom")
+            return channel == "ok"
+
+        dispatcher = self.make_dispatcher(send, ["ok", "failing", "broken"])
+        for i in range(20):
+            accepted = dispatcher.submit(["ok", "failing", "broken", "unknown"], 1, f"msg {i}", i)
+            self.assertEqual(accepted, 3)
+
+        self.assertTrue(dispatcher.join(timeout=5))
+        self.assertEqual(sorted(self.completed), [(i, 1) for i in range(20)])
+        self.assertEqual(len(self.sent), 60)
+
+        metrics = dispatcher.get_metrics()
+        self.assertEqual((metrics["ok"]["sent"], metrics["ok"]["failed"]), (20, 0))
+        self.assertEqual((metrics["failing"]["sent"], metrics["failing"]["failed"]), (0, 20))
+        self.assertEqual((metrics["broken"]["sent"], metrics["broken"]["failed"]), (0, 20))
+
+    def test_no_channels_completes_immediately(self):
+        """没有可用渠道时立即以0个成功渠道回调"""
+        dispatcher = self.make_dispatcher(lambda *args: True, ["ok"])
+        self.assertEqual(dispatcher.submit(["unknown"], 0, "msg", "n"), 0)
+        self.assertEqual(self.completed, [("n", 0)])
+        self.assertTrue(dispatcher.join(timeout=0.1))
+
+    def test_full_queue_drops_lowest_priority(self):
+        """渠道阻塞、队列满时被拒绝或被淘汰的通知以0个成功渠道回调，高优先级先发送"""
+        started, release = threading.Event(), threading.Event()
+
+        def send(channel, message, notification):
+            started.set()
+            release.wait(5)
+            with self.lock:
+                self.sent.append(notification)
+            return True
+
+        dispatcher = self.make_dispatcher(send, ["slow"], queue_size=2)
+        dispatcher.submit(["slow"], 3, "msg", "n0")
+        self.assertTrue(started.wait(1))  # n0已被工作线程取出
+
+        self.assertEqual(dispatcher.submit(["slow"], 3, "msg", "n1"), 1)
+        self.assertEqual(dispatcher.submit(["slow"], 3, "msg", "n2"), 1)
+        self.assertEqual(dispatcher.submit(["slow"], 3, "msg", "n3"), 0)  # 被拒绝
+        self.assertEqual(dispatcher.submit(["slow"], 0, "msg", "n4"), 1)  # 淘汰n2
+        self.assertEqual(self.completed, [("n3", 0), ("n2", 0)])
+        self.assertFalse(dispatcher.join(timeout=0.05))
+
+        release.set()
+        self.assertTrue(dispatcher.join(timeout=5))
+        self.assertEqual(self.sent, ["n0", "n4", "n1"])
+        self.assertEqual(sorted(self.completed), [("n0", 1), ("n1", 1), ("n2", 0), ("n3", 0), ("n4", 1)])
+        self.assertEqual(dispatcher.get_metrics()["slow"]["dropped"], 2)
+
+    def test_slow_channel_does_not_block_others(self):
+        """慢渠道不影响快渠道的投递"""
+        release = threading.Event()
+
+        def send(channel, message, notification):
+            if channel == "slow":
+                release.wait(5)
+            with self.lock:
+                self.sent.append((channel, notification))
+            return True
+
+        dispatcher = self.make_dispatcher(send, ["fast", "slow"])
+        for i in range(5):
+            dispatcher.submit(["fast", "slow"], 1, "msg", i)
+
+        deadline = time.monotonic() + 2
+        while len(self.sent) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.sent, [("fast", i) for i in range(5)])
+        self.assertEqual(self.completed, [])
+
+        release.set()
+        self.assertTrue(dispatcher.join(timeout=5))
+        self.assertEqual(sorted(self.completed), [(i, 2) for i in range(5)])
+
+    def test_stop_does_not_hang(self):
+        """stop()关闭队列后工作线程退出，重复stop无副作用"""
+        dispatcher = self.make_dispatcher(lambda *args: True, ["a", "b"])
+        dispatcher.submit(["a", "b"], 0, "msg", "n")
+        self.assertTrue(dispatcher.join(timeout=2))
+
+        start = time.monotonic()
+        dispatcher.stop(timeout=2)
+        dispatcher.stop(timeout=2)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(any(worker.is_alive() for worker in dispatcher.workers.values()))
+
+    def test_join_timeout(self):
+        """投递未完成时join按超时返回False，不会一直阻塞"""
+        release = threading.Event()
+        dispatcher = self.make_dispatcher(lambda *args: release.wait(5), ["slow"])
+        dispatcher.submit(["slow"], 0, "msg", "n")
+
+        start = time.monotonic()
+        self.assertFalse(dispatcher.join(timeout=0.1))
+        self.assertLess(time.monotonic() - start, 1)
+
+        release.set()
+        self.assertTrue(dispatcher.join(timeout=2))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,212 @@
+"""
+日汇总合并与落盘单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import date as Date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+from notification.report_generator import DailyRollup, ReportGenerator, TradeRecord
+
+START = Date(2024, 3, 1)
+
+
+def make_trade(day: Date, minute: int, pnl: float, symbol: str = "BTC", strategy: str = "trend") -> TradeRecord:
+    return TradeRecord(
+        timestamp=datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute),
+        symbol=symbol, side="LONG", entry_price=100.0, exit_price=100.0 + pnl, size=1.0,
+        pnl=pnl, pnl_percent=pnl, duration=timedelta(minutes=5), strategy=strategy
+    )
+
+
+def random_days(seed: int, n_days: int) -> Dict[Date, List[TradeRecord]]:
+    """随机生成若干天的成交，含空日，日内成交时间乱序"""
+    rng = random.Random(seed)
+    days = {}
+    for i in range(n_days):
+        day = START + timedelta(days=i)
+        count = rng.choice([0, 1, 2, 5, 12])
+        days[day] = [make_trade(day, rng.randrange(24 * 60), round(rng.gauss(0, 50), 2),
+                                rng.choice(["BTC", "ETH", "SOL"]), rng.choice(["trend", "grid"]))
+                     for _ in range(count)]
+    return days
+
+
+def single_pass(trades: List[TradeRecord]) -> Dict:
+    """直接扫描区间内全部成交的参考结果"""
+    trades = sorted(trades, key=lambda t: t.timestamp)
+    equity = peak = max_drawdown = 0.0
+    by_symbol, by_strategy = {}, {}
+    for trade in trades:
+        equity += trade.pnl
+        peak = max(peak, equity)
+        max_drawdown = min(max_drawdown, equity - peak)
+        for groups, key in ((by_symbol, trade.symbol), (by_strategy, trade.strategy)):
+            group = groups.setdefault(key, {"trades": 0, "wins": 0, "pnl": 0.0})
+            group["trades"] += 1
+            group["wins"] += trade.pnl > 0
+            group["pnl"] += trade.pnl
+    wins = [t.pnl for t in trades if t.pnl > 0]
+    losses = [t.pnl for t in trades if t.pnl < 0]
+    return {
+        "total_trades": len(trades),
+        "winning_trades": len(wins),
+        "losing_trades": len(losses),
+        "total_pnl": sum(t.pnl for t in trades),
+        "max_drawdown": max_drawdown,
+        "average_win": sum(wins) / len(wins) if wins else 0,
+        "average_loss": sum(losses) / len(losses) if losses else 0,
+        "best_pnl": max((t.pnl for t in trades), default=None),
+        "worst_pnl": min((t.pnl for t in trades), default=None),
+        "by_symbol": by_symbol,
+        "by_strategy": by_strategy,
+    }
+
+
+class TestCombineRollups(unittest.TestCase):
+    """测试日汇总合并结果与单次扫描全部成交一致"""
+
+    def assert_matches_single_pass(self, days: Dict[Date, List[TradeRecord]]):
+        rollups = [DailyRollup.from_trades(day, trades) for day, trades in sorted(days.items())]
+        data = ReportGenerator._combine_rollups(rollups, min(days), max(days))
+        expected = single_pass([t for trades in days.values() for t in trades])
+
+        for name in ("total_trades", "winning_trades", "losing_trades"):
+            self.assertEqual(getattr(data, name), expected[name], name)
+        for name in ("total_pnl", "max_drawdown", "average_win", "average_loss"):
+            self.assertAlmostEqual(getattr(data, name), expected[name], places=9, msg=name)
+        self.assertEqual(data.best_trade.pnl if data.best_trade else None, expected["best_pnl"])
+        self.assertEqual(data.worst_trade.pnl if data.worst_trade else None, expected["worst_pnl"])
+        for name in ("by_symbol", "by_strategy"):
+            merged = getattr(data, name)
+            self.assertEqual(merged.keys(), expected[name].keys())
+            for key, group in expected[name].items():
+                self.assertEqual((merged[key]["trades"], merged[key]["wins"]), (group["trades"], group["wins"]))
+                self.assertAlmostEqual(merged[key]["pnl"], group["pnl"], places=9)
+        self.assertEqual(len(data.daily), len(days))
+
+    def test_seeded_days(self):
+        """测试多组随机种子的多日成交"""
+        for seed in range(200):
+            with self.subTest(seed=seed):
+                self.assert_matches_single_pass(random_days(seed, n_days=random.Random(seed).randint(1, 12)))
+
+    def test_simulated_month(self):
+        """测试默认模拟数据源生成的一个月"""
+        # 模拟数据只依赖日期，不使用实例状态
+        days = [START + timedelta(days=i) for i in range(31)]
+        self.assert_matches_single_pass({day: ReportGenerator._simulate_trades(None, day) for day in days})
+
+    def test_drawdown_across_days(self):
+        """测试跨日回撤：峰值在前一天，最低点在后一天且日内先涨后跌"""
+        days = {
+            START: [make_trade(START, 60, 100.0), make_trade(START, 120, -30.0)],  # 峰值100，收于70
+            START + timedelta(days=1): [],
+            START + timedelta(days=2): [make_trade(START + timedelta(days=2), 10, 20.0),  # 90，未创新高
+                                        make_trade(START + timedelta(days=2), 20, -110.0),  # -20
+                                        make_trade(START + timedelta(days=2), 30, 200.0)],  # 180
+            START + timedelta(days=3): [make_trade(START + timedelta(days=3), 5, -50.0)],  # 130
+        }
+        rollups = [DailyRollup.from_trades(day, trades) for day, trades in sorted(days.items())]
+        self.assertEqual(rollups[2].max_drawdown, -110.0)  # 日内只看相对日初的峰值
+        self.assertEqual(ReportGenerator._combine_rollups(rollups, START, START + timedelta(days=3)).max_drawdown,
+                         -120.0)
+        self.assert_matches_single_pass(days)
+
+    def test_intraday_low_before_high(self):
+        """测试日内先创新低再创新高时，不会把当日高点当作低点之前的峰值"""
+        days = {
+            START: [make_trade(START, 0, 50.0)],
+            START + timedelta(days=1): [make_trade(START + timedelta(days=1), 0, -80.0),
+                                        make_trade(START + timedelta(days=1), 1, 500.0),
+                                        make_trade(START + timedelta(days=1), 2, -10.0)],
+        }
+        self.assert_matches_single_pass(days)
+
+    def test_no_trades(self):
+        """测试区间内没有成交"""
+        data = ReportGenerator._combine_rollups([DailyRollup(START)], START, START)
+        self.assertEqual((data.total_trades, data.total_pnl, data.max_drawdown, data.win_rate), (0, 0.0, 0.0, 0))
+        self.assertIsNone(data.best_trade)
+
+
+class TestPersistedRollups(unittest.TestCase):
+    """测试已收盘日期的日汇总落盘与重新加载"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.days = random_days(seed=7, n_days=10)
+        self.calls: List[Date] = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def source(self, day: Date) -> List[TradeRecord]:
+        self.calls.append(day)
+        return self.days.get(day, [])
+
+    def test_round_trip(self):
+        """测试落盘后新实例只读取汇总文件，合并结果与首次计算和单次扫描一致"""
+        end = START + timedelta(days=9)
+        first = ReportGenerator(output_dir=self.tmp, trade_source=self.source)._collect_period_data(START, end)
+        self.assertEqual(sorted(self.calls), sorted(self.days))
+        self.assertEqual(len(list((self.tmp / "rollups").glob("*.json"))), 10)
+
+        def no_source(day):
+            raise AssertionError(f"unexpected trade scan for {day}")
+
+        generator = ReportGenerator(output_dir=self.tmp, trade_source=no_source)
+        second = generator._collect_period_data(START, end)
+        self.assertEqual(second.daily, first.daily)
+        for name in ("total_trades", "winning_trades", "losing_trades", "total_pnl", "max_drawdown",
+                     "average_win", "average_loss", "best_trade", "worst_trade", "by_symbol", "by_strategy"):
+            self.assertEqual(getattr(second, name), getattr(first, name), name)
+
+        expected = single_pass([t for trades in self.days.values() for t in trades])
+        self.assertAlmostEqual(second.max_drawdown, expected["max_drawdown"], places=9)
+        self.assertAlmostEqual(second.total_pnl, expected["total_pnl"], places=9)
+
+        # 已加载的汇总保留在缓存中
+        self.assertIs(generator.get_daily_rollup(START), generator.stats_cache[START])
+
+    def test_dict_round_trip(self):
+        """测试to_dict/from_dict保持全部字段，包括最佳/最差成交"""
+        for day, trades in self.days.items():
+            rollup = DailyRollup.from_trades(day, trades)
+            self.assertEqual(DailyRollup.from_dict(rollup.to_dict()), rollup)
+
+    def test_corrupt_file_recomputed(self):
+        """测试损坏的汇总文件被重新计算并覆盖"""
+        generator = ReportGenerator(output_dir=self.tmp, trade_source=self.source)
+        expected = generator.get_daily_rollup(START)
+        path = generator._rollup_path(START)
+        path.write_text("{not json", encoding="utf-8")
+
+        generator = ReportGenerator(output_dir=self.tmp, trade_source=self.source)
+        with self.assertLogs("notification.report_generator", level="WARNING"):
+            self.assertEqual(generator.get_daily_rollup(START), expected)
+        self.assertEqual(self.calls, [START, START])
+        self.assertEqual(generator._load_rollup(START), expected)
+
+    def test_today_not_persisted(self):
+        """测试当天未收盘，每次重新计算且不落盘"""
+        today = datetime.now().date()
+        self.days = {today: [make_trade(today, 0, 5.0)]}
+        generator = ReportGenerator(output_dir=self.tmp, trade_source=self.source)
+
+        self.assertEqual(generator.get_daily_rollup(today).total_pnl, 5.0)
+        self.days[today].append(make_trade(today, 1, -2.0))
+        self.assertEqual(generator.get_daily_rollup(today).total_pnl, 3.0)
+        self.assertEqual(self.calls, [today, today])
+        self.assertFalse(generator._rollup_path(today).exists())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
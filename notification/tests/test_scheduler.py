@@ -0,0 +1,172 @@
+"""
+延迟投递调度器单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import threading
+import time
+import unittest
+
+from notification.notification_system import NotificationSystem, NotificationLevel
+from notification.scheduler import DelayedDeliveryScheduler
+
+
+class TestDelayedDeliveryScheduler(unittest.TestCase):
+    """测试合并、唤醒和立即投递"""
+
+    def setUp(self):
+        self.flushed = []
+        self.flushed_event = threading.Event()
+        self.scheduler = DelayedDeliveryScheduler(self.flush)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def flush(self, key, items):
+        self.flushed.append((key, list(items), time.monotonic()))
+        self.flushed_event.set()
+
+    def wait_for_batches(self, count: int, timeout: float = 2) -> bool:
+        deadline = time.monotonic() + timeout
+        while len(self.flushed) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.flushed) >= count
+
+    def test_same_key_coalesced(self):
+        """到期前同一键的消息合并为一批，延迟从第一条开始计算"""
+        start = time.monotonic()
+        for i in range(3):
+            self.scheduler.defer("A", i, 0.1)
+        self.scheduler.defer("B", "b", 0.1)
+        self.assertEqual(self.scheduler.pending(), 4)
+
+        self.assertTrue(self.wait_for_batches(2))
+        time.sleep(0.05)
+        self.assertEqual(sorted((key, items) for key, items, _ in self.flushed), [("A", [0, 1, 2]), ("B", ["b"])])
+        self.assertGreaterEqual(self.flushed[0][2] - start, 0.1)
+        self.assertEqual(self.scheduler.pending(), 0)
+        self.assertEqual(self.scheduler.stats, {"deferred": 4, "coalesced": 2, "flushed_batches": 2})
+
+        # 投递之后同一键重新开始一批
+        self.scheduler.defer("A", 3, 0.05)
+        self.assertTrue(self.wait_for_batches(3))
+        self.assertEqual(self.flushed[-1][:2], ("A", [3]))
+
+    def test_earlier_key_wakes_thread(self):
+        """调度线程在等待较晚的到期时，新的更早到期项会唤醒它"""
+        self.scheduler.defer("late", "x", 5)
+        time.sleep(0.05)  # 调度线程已开始等待late
+
+        start = time.monotonic()
+        self.scheduler.defer("early", "y", 0.05)
+        self.assertTrue(self.flushed_event.wait(1))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual([(key, items) for key, items, _ in self.flushed], [("early", ["y"])])
+        self.assertEqual(self.scheduler.pending(), 1)
+
+    def test_flush_all(self):
+        """flush_all立即投递全部等待中的批次，之后不再重复投递"""
+        self.scheduler.defer("A", 1, 5)
+        self.scheduler.defer("A", 2, 5)
+        self.scheduler.defer("B", 3, 5)
+
+        self.scheduler.flush_all()
+        self.assertEqual(sorted((key, items) for key, items, _ in self.flushed), [("A", [1, 2]), ("B", [3])])
+        self.assertEqual(self.scheduler.pending(), 0)
+
+        self.scheduler.defer("C", 4, 0.05)
+        self.assertTrue(self.wait_for_batches(3))
+        time.sleep(0.1)
+        self.assertEqual([key for key, _, _ in self.flushed], ["A", "B", "C"])
+
+    def test_stop_with_flush(self):
+        """stop(flush=True)投递等待中的消息并结束调度线程；不flush时丢弃"""
+        self.scheduler.defer("A", 1, 5)
+        self.scheduler.stop(flush=True)
+        self.assertEqual([(key, items) for key, items, _ in self.flushed], [("A", [1])])
+        self.assertFalse(self.scheduler._thread.is_alive())
+
+        scheduler = DelayedDeliveryScheduler(self.flush)
+        scheduler.defer("B", 2, 0.05)
+        scheduler.stop()
+        time.sleep(0.1)
+        self.assertEqual(len(self.flushed), 1)
+        self.assertFalse(scheduler._thread.is_alive())
+
+    def test_flush_error_does_not_stop_thread(self):
+        """回调异常不影响后续批次"""
+        calls = []
+
+        def flaky(key, items):
+            calls.append(key)
+            if key == "bad":
+                raise RuntimeError("boom")
+
+        scheduler = DelayedDeliveryScheduler(flaky)
+        try:
+            scheduler.defer("bad", 1, 0.01)
+            scheduler.defer("good", 2, 0.05)
+            deadline = time.monotonic() + 2
+            while len(calls) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(calls, ["bad", "good"])
+        finally:
+            scheduler.stop()
+
+
+class _Recorder:
+    """记录收到的通知"""
+
+    def __init__(self):
+        self.received = []
+
+    def send(self, message, notification=None) -> bool:
+        self.received.append(notification)
+        return True
+
+
+class TestDeferredNotifications(unittest.TestCase):
+    """测试限流通知延迟后按(级别, 来源)合并为摘要"""
+
+    def setUp(self):
+        self.system = NotificationSystem()
+        self.system.quiet_hours["enabled"] = False
+        self.system.deduplication["enabled"] = False
+        self.system.channels["terminal"]["enabled"] = False
+        self.system.rate_limit["max_per_minute"] = 0
+        self.system.defer_seconds = 0.1
+        self.telegram = _Recorder()
+        self.system.register_channel_handler("telegram", self.telegram)
+
+    def tearDown(self):
+        self.system.shutdown()
+
+    def test_rate_limited_notifications_digest(self):
+        """同级别同来源的延迟通知合并为一条摘要，其他来源单独投递"""
+        for i in range(3):
+            self.assertFalse(self.system.send(NotificationLevel.IMPORTANT, f"信号{i}", f"内容{i}", source="策略"))
+        self.system.send(NotificationLevel.IMPORTANT, "新闻", "内容", source="新闻")
+        self.assertEqual(self.system.stats["rate_limited"], 4)
+        self.assertEqual(self.telegram.received, [])
+
+        deadline = time.monotonic() + 3
+        while len(self.telegram.received) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(self.system.dispatcher.join(timeout=2))
+
+        received = {n.source: n for n in self.telegram.received}
+        self.assertEqual(len(self.telegram.received), 2)
+        digest = received["策略"]
+        self.assertEqual(digest.metadata, {"digest_count": 3})
+        self.assertEqual(digest.level, NotificationLevel.IMPORTANT)
+        self.assertEqual([line.split(" ", 2)[2] for line in digest.content.split("\n")],
+                         [f"信号{i}: 内容{i}" for i in range(3)])
+        self.assertEqual(received["新闻"].title, "新闻")
+        self.assertEqual(self.system.get_stats()["deferred"],
+                         {"deferred": 4, "coalesced": 2, "flushed_batches": 2, "pending": 0})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,172 @@
+"""
+Telegram限流调度单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import time
+import unittest
+
+from notification.telegram.telegram_bot import TelegramBot, TelegramMessage
+from notification.telegram.flood_control import FloodControlScheduler, MAX_MESSAGE_LENGTH
+from notification.local_stubs import FakeBotAPIServer
+
+
+class TestFloodControlScheduler(unittest.TestCase):
+    """测试发送调度（注入时间）"""
+
+    def setUp(self):
+        self.scheduler = FloodControlScheduler(per_chat_interval=1.0, per_chat_per_minute=3,
+                                               global_per_second=2)
+
+    def test_merge_same_chat(self):
+        """同一聊天排队中的消息合并为一条"""
+        for i in range(5):
+            self.scheduler.enqueue(TelegramMessage("A", f"msg {i}"), now=0)
+
+        message, wait = self.scheduler.next_ready(now=0)
+        self.assertEqual(wait, 0)
+        self.assertEqual(message.text.split("\n\n"), [f"msg {i}" for i in range(5)])
+        self.assertEqual(self.scheduler.stats["merged"], 4)
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_merge_respects_max_length(self):
+        """合并不超过4096字符，超长消息被切分"""
+        chunk = "x" * 3000
+        self.scheduler.enqueue(TelegramMessage("A", chunk), now=0)
+        self.scheduler.enqueue(TelegramMessage("A", chunk), now=0)
+        self.scheduler.enqueue(TelegramMessage("B", "y" * 10000), now=0)
+
+        self.scheduler.per_chat_interval = 0
+        self.scheduler.global_per_second = 100
+        texts = []
+        while True:
+            message, _ = self.scheduler.next_ready(now=0)
+            if message is None:
+                break
+            texts.append(message.text)
+
+        self.assertTrue(all(len(t) <= MAX_MESSAGE_LENGTH for t in texts))
+        self.assertEqual(sum(len(t) for t in texts), 16000)
+
+    def test_per_chat_and_global_budget(self):
+        """聊天间隔、每分钟上限与全局每秒上限"""
+        for chat in ("A", "B", "C"):
+            self.scheduler.enqueue(TelegramMessage(chat, "hello"), now=0)
+
+        first, _ = self.scheduler.next_ready(now=0)
+        second, _ = self.scheduler.next_ready(now=0)
+        self.assertEqual({first.chat_id, second.chat_id}, {"A", "B"})
+
+        # 全局每秒2条已用完
+        message, wait = self.scheduler.next_ready(now=0.5)
+        self.assertIsNone(message)
+        self.assertAlmostEqual(wait, 0.5)
+        message, _ = self.scheduler.next_ready(now=1.0)
+        self.assertEqual(message.chat_id, "C")
+
+        # 同一聊天1秒内不会再次发送
+        self.scheduler.enqueue(TelegramMessage("A", "again"), now=1.0)
+        self.scheduler.enqueue(TelegramMessage("C", "again"), now=1.0)
+        message, wait = self.scheduler.next_ready(now=1.5)
+        self.assertEqual(message.chat_id, "A")
+        message, wait = self.scheduler.next_ready(now=1.5)
+        self.assertIsNone(message)
+        self.assertAlmostEqual(wait, 0.5)
+
+    def test_retry_after(self):
+        """429后暂停该聊天retry_after秒，消息保持在队首"""
+        self.scheduler.enqueue(TelegramMessage("A", "second"), now=0)
+        self.scheduler.requeue(TelegramMessage("A", "first"), retry_after=5, now=0)
+
+        message, wait = self.scheduler.next_ready(now=0)
+        self.assertIsNone(message)
+        self.assertAlmostEqual(wait, 5)
+
+        message, _ = self.scheduler.next_ready(now=5)
+        self.assertEqual(message.text, "first\n\nsecond")
+
+    def test_delayed_enqueue(self):
+        """退避中的消息到期后才可发送"""
+        self.scheduler.enqueue(TelegramMessage("A", "retry"), delay=4, now=0)
+        message, wait = self.scheduler.next_ready(now=0)
+        self.assertIsNone(message)
+        self.assertAlmostEqual(wait, 4)
+        message, _ = self.scheduler.next_ready(now=4)
+        self.assertEqual(message.text, "retry")
+
+
+class TestTelegramBotFakeAPI(unittest.TestCase):
+    """使用本地模拟Bot API测试端到端发送"""
+
+    def setUp(self):
+        self.server = FakeBotAPIServer().start()
+        self.bot = TelegramBot()
+        self.bot.config.update({"bot_token": "TEST", "chat_id": "1001", "api_base": self.server.url})
+        self.bot.flood_control = FloodControlScheduler(per_chat_interval=0.3)
+        self.bot.retry_policy["base_delay"] = 0.2
+        self.bot.initialize()
+
+    def tearDown(self):
+        self.bot.shutdown()
+        self.server.stop()
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return False
+
+    def received_texts(self):
+        return [part for m in self.server.messages for part in m["text"].split("\n\n")]
+
+    def test_burst_is_merged_not_dropped(self):
+        """突发消息全部送达且合并为少量请求"""
+        for i in range(30):
+            self.assertTrue(self.bot.send(f"alert {i}"))
+
+        self.assertTrue(self.wait_for(lambda: len(self.received_texts()) == 30))
+        self.assertEqual(self.received_texts(), [f"alert {i}" for i in range(30)])
+        self.assertLess(len(self.server.messages), 30)
+
+        times = [m["received_at"] for m in self.server.messages]
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        self.assertTrue(all(gap >= 0.25 for gap in gaps))
+
+    def test_honors_retry_after(self):
+        """收到429后等待retry_after再重发"""
+        self.server.flood_responses = 1
+        start = time.monotonic()
+        self.bot.send("flooded")
+
+        self.assertTrue(self.wait_for(lambda: self.server.messages))
+        self.assertGreaterEqual(self.server.messages[0]["received_at"] - start, 1.0)
+        self.assertEqual(self.bot.get_stats()["rate_limited"], 1)
+        self.assertEqual(self.bot.get_stats()["failed"], 0)
+
+    def test_retry_failed_with_backoff(self):
+        """失败消息按退避重新投递，超过次数放弃"""
+        self.server.error_responses = 2
+        self.bot.send("first")
+        self.assertTrue(self.wait_for(lambda: self.bot.failed_queue))
+
+        self.assertEqual(self.bot.retry_failed(), 1)
+        self.assertTrue(self.wait_for(lambda: len(self.bot.failed_queue) == 1))
+        self.assertEqual(self.bot.failed_queue[0].attempts, 2)
+
+        start = time.monotonic()
+        self.bot.retry_failed()
+        self.assertTrue(self.wait_for(lambda: self.server.messages))
+        # 第二次重试退避 base_delay * 2
+        self.assertGreaterEqual(self.server.messages[0]["received_at"] - start, 0.4)
+
+        self.bot.failed_queue.append(TelegramMessage("1001", "hopeless", attempts=5))
+        self.assertEqual(self.bot.retry_failed(), 0)
+        self.assertEqual(self.bot.get_stats()["abandoned"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,10 +5,13 @@ Webhook发送模块
 
 import json
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
+from urllib.parse import urlsplit
 
 @dataclass
 class WebhookConfig:
@@ -28,6 +31,10 @@ class WebhookSender:
         # Webhook配置
         self.webhooks = {}
         
+        # 每个主机一个keep-alive会话
+        self.sessions: Dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+        
         # 消息格式化器
         self.formatters = {
             "discord": self._format_discord,
@@ -108,10 +115,9 @@ class WebhookSender:
         
         # 发送请求
         try:
-            response = requests.post(
+            response = self._get_session(webhook_config.url).post(
                 webhook_config.url,
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=10
             )
             
@@ -135,6 +141,31 @@ class WebhookSender:
             self.stats["failed"] += 1
             return False
     
+    def _get_session(self, url: str) -> requests.Session:
+        """获取目标主机的复用会话"""
+        host = urlsplit(url).netloc
+        session = self.sessions.get(host)
+        if session is not None:
+            return session
+        
+        with self._sessions_lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"Content-Type": "application/json"})
+                self.sessions[host] = session
+        return session
+    
+    def close(self):
+        """关闭所有会话"""
+        with self._sessions_lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+    
     def _format_discord(self, message: str, notification: Any) -> Dict:
         """格式化Discord消息"""
         # Discord Webhook格式
@@ -268,22 +268,24 @@ class RiskAssessment:
         
         Args:
             portfolio_value: 组合价值
-            returns: 历史收益率
+            returns: 历史收益率（列表或数组）
             confidence_level: 置信水平
             
         Returns:
             VaR值
+            
+        组合层面的VaR/ES见 assessment.portfolio_risk.PortfolioRiskEngine
         """
-        if not returns:
+        if len(returns) == 0:
             return 0
         
         # 使用历史模拟法
-        returns_array = np.array(returns)
+        returns_array = np.asarray(returns, dtype=float)
         var_percentile = (1 - confidence_level) * 100
         var_return = np.percentile(returns_array, var_percentile)
         var_value = portfolio_value * abs(var_return)
         
-        logger.info(f"VaR计算: {confidence_level*100}%置信度, VaR={var_value:.2f}")
+        logger.debug(f"VaR计算: {confidence_level*100}%置信度, VaR={var_value:.2f}")
         
         return var_value
     
@@ -293,16 +295,16 @@ class RiskAssessment:
         
         Args:
             portfolio_value: 组合价值
-            returns: 历史收益率
+            returns: 历史收益率（列表或数组）
             confidence_level: 置信水平
             
         Returns:
             ES值
         """
-        if not returns:
+        if len(returns) == 0:
             return 0
         
-        returns_array = np.array(returns)
+        returns_array = np.asarray(returns, dtype=float)
         var_percentile = (1 - confidence_level) * 100
         var_threshold = np.percentile(returns_array, var_percentile)
         
@@ -314,7 +316,7 @@ class RiskAssessment:
         else:
             es_value = 0
         
-        logger.info(f"ES计算: {confidence_level*100}%置信度, ES={es_value:.2f}")
+        logger.debug(f"ES计算: {confidence_level*100}%置信度, ES={es_value:.2f}")
         
         return es_value
     
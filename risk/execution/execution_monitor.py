@@ -11,7 +11,13 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
+from pathlib import Path
 import statistics
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from core.running_stats import RunningStats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -66,136 +72,68 @@ class PerformanceMetrics:
     max_drawdown: float = 0
     recovery_time: int = 0  # 天数
     
+    _stats: RunningStats = field(default_factory=RunningStats, repr=False, compare=False)
+    _trough_time: Optional[datetime] = field(default=None, repr=False, compare=False)
+
     def calculate_metrics(self, trades: List[Dict]):
-        """计算绩效指标"""
+        """按完整交易列表重新计算绩效指标"""
         if not trades:
             return
-            
-        self.total_trades = len(trades)
-        
-        # 计算胜率
-        wins = [t for t in trades if t["pnl"] > 0]
-        losses = [t for t in trades if t["pnl"] < 0]
-        
-        self.winning_trades = len(wins)
-        self.losing_trades = len(losses)
-        
-        if self.total_trades > 0:
-            self.win_rate = self.winning_trades / self.total_trades
-            
+
+        self._stats.reset()
+        self._trough_time = None
+        self.recovery_time = 0
+        for trade in trades:
+            self.add_trade(trade)
+
+    def add_trade(self, trade: Dict):
+        """记录一笔平仓交易，O(1)增量更新全部指标"""
+        previous_peak = self._stats.peak
+        self._stats.update(trade["pnl"], trade["pnl"] / trade.get("capital", 10000))
+        self._update_recovery_time(previous_peak, trade.get("time", datetime.now()))
+
+        stats = self._stats
+        self.total_trades = stats.count
+        self.winning_trades = stats.wins
+        self.losing_trades = stats.losses
+        self.win_rate = stats.win_rate
+        self.total_pnl = stats.total_pnl
+
         # 计算平均盈亏
-        if wins:
-            self.avg_win = sum(t["pnl"] for t in wins) / len(wins)
-        if losses:
-            self.avg_loss = abs(sum(t["pnl"] for t in losses) / len(losses))
-            
+        if stats.wins:
+            self.avg_win = stats.avg_win
+        if stats.losses:
+            self.avg_loss = stats.avg_loss
+
         # 计算盈亏比
         if self.avg_loss > 0:
             self.profit_factor = self.avg_win / self.avg_loss
-            
-        # 计算总盈亏
-        self.total_pnl = sum(t["pnl"] for t in trades)
-        
-        # 计算夏普比率
-        self.sharpe_ratio = self._calculate_sharpe_ratio(trades)
-        
-        # 计算最大回撤
-        self.max_drawdown = self._calculate_max_drawdown(trades)
-        
-        # 计算恢复时间
-        self.recovery_time = self._calculate_recovery_time(trades)
-    
-    def _calculate_sharpe_ratio(self, trades: List[Dict]) -> float:
-        """计算夏普比率"""
-        if len(trades) < 2:
-            return 0
-            
-        returns = [t["pnl"] / t.get("capital", 10000) for t in trades]
-        
-        if not returns:
-            return 0
-            
-        avg_return = statistics.mean(returns)
-        std_return = statistics.stdev(returns) if len(returns) > 1 else 0
-        
-        if std_return == 0:
-            return 0
-            
-        # 假设无风险利率为0
-        sharpe = (avg_return * 252) / (std_return * (252 ** 0.5))  # 年化
-        
-        return sharpe
-    
-    def _calculate_max_drawdown(self, trades: List[Dict]) -> float:
-        """计算最大回撤"""
-        if not trades:
-            return 0
-            
-        cumulative_pnl = []
-        cum_sum = 0
-        
-        for trade in trades:
-            cum_sum += trade["pnl"]
-            cumulative_pnl.append(cum_sum)
-            
-        if not cumulative_pnl:
-            return 0
-            
-        peak = cumulative_pnl[0]
-        max_dd = 0
-        
-        for value in cumulative_pnl:
-            if value > peak:
-                peak = value
-            drawdown = (peak - value) / peak if peak > 0 else 0
-            max_dd = max(max_dd, drawdown)
-            
-        return max_dd
-    
-    def _calculate_recovery_time(self, trades: List[Dict]) -> int:
-        """计算回撤恢复时间"""
-        if not trades:
-            return 0
-            
-        # 简化计算：找到最大回撤后恢复到新高的时间
-        cumulative_pnl = []
-        cum_sum = 0
-        
-        for i, trade in enumerate(trades):
-            cum_sum += trade["pnl"]
-            cumulative_pnl.append((i, cum_sum, trade.get("time", datetime.now())))
-            
-        if not cumulative_pnl:
-            return 0
-            
-        peak_idx = 0
-        peak_value = cumulative_pnl[0][1]
-        max_dd_idx = 0
-        recovery_days = 0
-        
-        for i, (idx, value, time) in enumerate(cumulative_pnl):
-            if value > peak_value:
-                peak_value = value
-                peak_idx = i
-                
-                # 计算从最低点恢复的时间
-                if max_dd_idx > 0:
-                    recovery_time = cumulative_pnl[i][2] - cumulative_pnl[max_dd_idx][2]
-                    recovery_days = max(recovery_days, recovery_time.days)
-                    
-            elif value < peak_value:
-                max_dd_idx = i
-                
-        return recovery_days
+
+        # 夏普比率按单笔收益率年化（252），假设无风险利率为0
+        self.sharpe_ratio = stats.sharpe(252)
+        self.max_drawdown = stats.max_drawdown
+
+    def _update_recovery_time(self, previous_peak: Optional[float], time: datetime):
+        """回撤恢复时间：创新高时距最近一次低于峰值的天数，取最大值"""
+        if previous_peak is None:
+            return
+
+        equity = self._stats.equity
+        if equity > previous_peak:
+            if self._trough_time is not None:
+                self.recovery_time = max(self.recovery_time, (time - self._trough_time).days)
+        elif equity < previous_peak:
+            self._trough_time = time
 
 
 class ExecutionMonitor:
     """执行监控系统 - 跟踪每一个建议的执行情况"""
     
-    def __init__(self):
+    def __init__(self, rolling_window: int = 50):
         self.active_suggestions = {}  # 活跃的建议
         self.execution_history = []  # 执行历史
         self.performance_metrics = PerformanceMetrics()
+        self.rolling_stats = RunningStats(window=rolling_window)  # 最近N笔交易
         self.slippage_stats = {
             "total_slippage": 0,
             "avg_slippage": 0,
@@ -275,17 +213,32 @@ class ExecutionMonitor:
             
         return True
     
-    def calculate_performance(self, trades: List[Dict]) -> Dict:
+    def record_trade(self, trade: Dict):
+        """
+        记录一笔平仓交易，增量更新累计和滚动绩效
+
+        Args:
+            trade: 交易，包含pnl，可选capital和time
+        """
+        self.performance_metrics.add_trade(trade)
+        self.rolling_stats.update(trade["pnl"], trade["pnl"] / trade.get("capital", 10000))
+
+    def calculate_performance(self, trades: Optional[List[Dict]] = None) -> Dict:
         """
         计算绩效指标
         
         Args:
-            trades: 交易列表
+            trades: 交易列表，给出时按完整列表重新计算；
+                为None时直接使用 record_trade 增量维护的指标
             
         Returns:
             绩效报告
         """
-        self.performance_metrics.calculate_metrics(trades)
+        if trades is not None:
+            self.performance_metrics.calculate_metrics(trades)
+            self.rolling_stats.reset()
+            for trade in trades[-self.rolling_stats.window:]:
+                self.rolling_stats.update(trade["pnl"], trade["pnl"] / trade.get("capital", 10000))
         
         return {
             "timestamp": datetime.now().isoformat(),
@@ -302,6 +255,14 @@ class ExecutionMonitor:
                 "max_drawdown": f"{self.performance_metrics.max_drawdown:.2%}",
                 "recovery_days": self.performance_metrics.recovery_time
             },
+            "rolling_metrics": {
+                "window": self.rolling_stats.window,
+                "trades": self.rolling_stats.count,
+                "win_rate": f"{self.rolling_stats.win_rate:.2%}",
+                "total_pnl": self.rolling_stats.total_pnl,
+                "sharpe_ratio": round(self.rolling_stats.sharpe(252), 2),
+                "max_drawdown": f"{self.rolling_stats.max_drawdown:.2%}"
+            },
             "rating": self._get_performance_rating()
         }
     
@@ -8,12 +8,14 @@ Tiger系统 - 机会发现系统
 import logging
 import json
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import asyncio
 
+import numpy as np
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -64,25 +66,29 @@ class OpportunityScanner:
                 "rsi": {"threshold": 20, "operator": "<"},
                 "price_drop": {"threshold": 0.15, "period": "24h", "operator": ">"},
                 "volume": {"multiplier": 3, "operator": ">"},
-                "confidence_required": 7
+                "confidence_required": 7,
+                "potential_return": 0.15  # 预期15%反弹
             },
             OpportunityType.SUPPORT_BOUNCE: {
                 "support_distance": {"threshold": 0.02, "operator": "<"},
                 "test_count": {"threshold": 3, "operator": ">="},
                 "volume_trend": {"pattern": "decreasing"},
-                "confidence_required": 6
+                "confidence_required": 6,
+                "potential_return": 0.10  # 预期10%反弹
             },
             OpportunityType.WHALE_ACCUMULATION: {
                 "on_chain_buys": {"threshold": 1000000, "operator": ">"},
                 "exchange_outflow": {"trend": "increasing"},
                 "price_action": {"pattern": "consolidating"},
-                "confidence_required": 7
+                "confidence_required": 7,
+                "potential_return": 0.20  # 预期20%上涨
             },
             OpportunityType.PANIC_SELLING: {
                 "liquidations": {"threshold": 100000000, "operator": ">"},
                 "funding_rate": {"threshold": -0.001, "operator": "<"},
                 "fear_index": {"threshold": 20, "operator": "<"},
-                "confidence_required": 8
+                "confidence_required": 8,
+                "potential_return": 0.30  # 预期30%反弹（恐慌后反弹通常很猛）
             }
         }
         
@@ -134,6 +140,129 @@ class OpportunityScanner:
         
         return opportunities
     
+    def scan_universe(self, snapshot) -> List[OpportunitySignal]:
+        """
+        全市场批量扫描
+        
+        所有机会规则以向量化掩码一次性评估，按 置信度×预期收益 用argpartition在全市场取前max_concurrent个，
+        只对入选的(币种, 机会类型)调用对应的 _check_* 生成信号；单个币种的快照与scan_market结果相同
+        
+        Args:
+            snapshot: 列式行情快照 {字段: 数组}（或DataFrame），必须包含symbol列，
+                其余字段与scan_market的market_data相同，缺失的字段按scan_market的默认值处理
+            
+        Returns:
+            机会信号列表（按 置信度×预期收益 降序）
+        """
+        symbols = np.asarray(snapshot["symbol"])
+        n = len(symbols)
+        if n == 0:
+            return []
+        
+        def column(name: str, default) -> np.ndarray:
+            if name not in snapshot:
+                return np.full(n, default)
+            values = np.asarray(snapshot[name])
+            return values.astype(float) if isinstance(default, (int, float)) else values
+        
+        risk_score = (
+            np.minimum(column("volatility", 0) * 10, 10) +
+            (10 - np.minimum(column("volume_ratio", 1) * 2, 10)) +
+            np.where(column("trend", "") == "down", 5, 3)
+        ) / 3
+        
+        # 各类机会的 (类型, 触发掩码, 置信度)
+        candidates = []
+        for opp_type, mask, confidence in self._vectorized_rules(column):
+            triggers = self.triggers[opp_type]
+            # 与 scan_market 的置信度要求和 _filter_opportunities 的过滤条件相同
+            if triggers["potential_return"] < 0.05:
+                continue
+            keep = mask & (confidence >= triggers["confidence_required"]) & (confidence >= 6) & (risk_score <= 8)
+            candidates.append((opp_type, keep, confidence * triggers["potential_return"]))
+        
+        if not candidates:
+            return []
+        
+        # 候选按 (类型, 币种) 展平，顺序与scan_market遍历OpportunityType的顺序一致
+        scores = np.concatenate([np.where(keep, score, -np.inf) for _, keep, score in candidates])
+        valid = np.flatnonzero(scores > -np.inf)
+        if len(valid) == 0:
+            return []
+        
+        k = min(self.position_rules["max_concurrent"], len(valid))
+        top = valid[np.argpartition(-scores[valid], k - 1)[:k]] if len(valid) > k else valid
+        # 同分时按币种、再按类型的顺序排列
+        top = sorted(top, key=lambda i: (-scores[i], i % n, i // n))
+        
+        opportunities = []
+        for index in top:
+            opp_type = candidates[index // n][0]
+            row = index % n
+            market_data = {}
+            for name in snapshot.keys():
+                value = np.asarray(snapshot[name])[row]
+                market_data[name] = value.item() if hasattr(value, "item") else value
+            signal = self._check_opportunity_type(opp_type, market_data)
+            if signal is not None:
+                opportunities.append(signal)
+                logger.info(f"发现机会: {opp_type.value} - {signal.symbol} (置信度: {signal.confidence})")
+        
+        return opportunities
+    
+    def _vectorized_rules(self, column: Callable[[str, object], np.ndarray]):
+        """机会触发条件和置信度的向量化版本，与 _check_* 逐项对应"""
+        def confidence(*factors: np.ndarray) -> np.ndarray:
+            # 运算顺序与 _calculate_confidence 相同，保证阈值比较逐位一致
+            return np.clip(sum(factors) / (len(factors) * 10) * 10, 0, 10)
+        
+        # 极度超卖
+        triggers = self.triggers[OpportunityType.EXTREME_OVERSOLD]
+        rsi = column("rsi", 50)
+        price_drop = column("price_drop_24h", 0)
+        volume_ratio = column("volume_ratio", 1)
+        mask = ((rsi < triggers["rsi"]["threshold"]) &
+                (price_drop > triggers["price_drop"]["threshold"]) &
+                (volume_ratio > triggers["volume"]["multiplier"]))
+        yield OpportunityType.EXTREME_OVERSOLD, mask, confidence(
+            10 - rsi / 2, np.minimum(price_drop * 20, 10), np.minimum(volume_ratio, 10))
+        
+        # 支撑位反弹
+        triggers = self.triggers[OpportunityType.SUPPORT_BOUNCE]
+        price = column("price", 0)
+        support_level = column("support_level", 0)
+        test_count = column("support_test_count", 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distance = np.abs(price - support_level) / support_level
+        mask = ((support_level != 0) &
+                (distance < triggers["support_distance"]["threshold"]) &
+                (test_count >= triggers["test_count"]["threshold"]) &
+                (column("volume_trend", "stable") == "decreasing"))
+        yield OpportunityType.SUPPORT_BOUNCE, mask, confidence(
+            np.minimum(test_count * 2, 10), 10 - distance * 100, np.full(len(price), 7.0))
+        
+        # 巨鲸吸筹
+        triggers = self.triggers[OpportunityType.WHALE_ACCUMULATION]
+        whale_buys = column("whale_buys", 0)
+        exchange_outflow = column("exchange_outflow", 0)
+        volatility = column("volatility", 1)
+        mask = ((whale_buys > triggers["on_chain_buys"]["threshold"]) &
+                (exchange_outflow > 0) &
+                (volatility < 0.5))
+        yield OpportunityType.WHALE_ACCUMULATION, mask, confidence(
+            np.minimum(whale_buys / 1000000, 10), np.minimum(exchange_outflow / 100000, 10), 10 - volatility * 10)
+        
+        # 恐慌抛售
+        triggers = self.triggers[OpportunityType.PANIC_SELLING]
+        liquidations = column("liquidations", 0)
+        funding_rate = column("funding_rate", 0)
+        fear_index = column("fear_greed_index", 50)
+        mask = ((liquidations > triggers["liquidations"]["threshold"]) &
+                (funding_rate < triggers["funding_rate"]["threshold"]) &
+                (fear_index < triggers["fear_index"]["threshold"]))
+        yield OpportunityType.PANIC_SELLING, mask, confidence(
+            np.minimum(liquidations / 100000000, 10), np.minimum(np.abs(funding_rate) * 1000, 10), 10 - fear_index / 10)
+    
     def _check_opportunity_type(self, opp_type: OpportunityType, market_data: Dict) -> Optional[OpportunitySignal]:
         """检查特定类型的机会"""
         if opp_type == OpportunityType.EXTREME_OVERSOLD:
@@ -176,7 +305,7 @@ class OpportunityScanner:
                 price=current_price,
                 confidence=confidence,
                 risk_score=self._calculate_risk_score(market_data),
-                potential_return=0.15,  # 预期15%反弹
+                potential_return=triggers["potential_return"],
                 suggested_size=self._calculate_position_size(confidence),
                 stop_loss=current_price * 0.98,  # 2%止损
                 targets=[
@@ -226,7 +355,7 @@ class OpportunityScanner:
                 price=current_price,
                 confidence=confidence,
                 risk_score=self._calculate_risk_score(market_data),
-                potential_return=0.10,  # 预期10%反弹
+                potential_return=triggers["potential_return"],
                 suggested_size=self._calculate_position_size(confidence),
                 stop_loss=support_level * 0.98,  # 支撑位下方2%
                 targets=[
@@ -272,7 +401,7 @@ class OpportunityScanner:
                 price=current_price,
                 confidence=confidence,
                 risk_score=self._calculate_risk_score(market_data),
-                potential_return=0.20,  # 预期20%上涨
+                potential_return=triggers["potential_return"],
                 suggested_size=self._calculate_position_size(confidence),
                 stop_loss=current_price * 0.95,  # 5%止损（给更多空间）
                 targets=[
@@ -318,7 +447,7 @@ class OpportunityScanner:
                 price=current_price,
                 confidence=confidence,
                 risk_score=self._calculate_risk_score(market_data),
-                potential_return=0.30,  # 预期30%反弹（恐慌后反弹通常很猛）
+                potential_return=triggers["potential_return"],
                 suggested_size=self._calculate_position_size(confidence) * 1.5,  # 可以稍微激进
                 stop_loss=current_price * 0.97,  # 3%止损
                 targets=[
@@ -582,6 +711,66 @@ class OpportunityScanner:
         }
 
 
+
+def _random_snapshot(n_symbols: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """基准测试用的列式快照，约几个百分点的币种满足某类机会条件"""
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(0.1, 70000, n_symbols)
+    return {
+        "symbol": np.array([f"PERP{i}" for i in range(n_symbols)]),
+        "price": price,
+        "rsi": rng.uniform(5, 80, n_symbols),
+        "price_drop_24h": rng.uniform(0, 0.3, n_symbols),
+        "volume_ratio": rng.uniform(0.5, 6, n_symbols),
+        "support_level": price * rng.uniform(0.97, 1.0, n_symbols),
+        "support_test_count": rng.integers(0, 6, n_symbols),
+        "volume_trend": rng.choice(["decreasing", "stable", "increasing"], n_symbols),
+        "whale_buys": rng.uniform(0, 5000000, n_symbols),
+        "exchange_outflow": rng.uniform(-500000, 800000, n_symbols),
+        "volatility": rng.uniform(0.05, 1.0, n_symbols),
+        "liquidations": rng.uniform(0, 300000000, n_symbols),
+        "funding_rate": rng.uniform(-0.003, 0.001, n_symbols),
+        "fear_greed_index": rng.uniform(0, 100, n_symbols),
+        "trend": rng.choice(["down", "up", "sideways"], n_symbols)
+    }
+
+
+def benchmark_scanner(small: int = 10, large: int = 1000, repeats: int = 20) -> Dict:
+    """逐币种scan_market扫描small个币种 vs scan_universe扫描large个币种的单次耗时"""
+    scanner = OpportunityScanner()
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        snapshot = _random_snapshot(small)
+        rows = [{name: (values[i].item() if hasattr(values[i], "item") else values[i])
+                 for name, values in snapshot.items()} for i in range(small)]
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for market_data in rows:
+                scanner.scan_market(market_data)
+        per_symbol_ms = (time.perf_counter() - start) / repeats * 1000
+
+        snapshot = _random_snapshot(large)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            top = scanner.scan_universe(snapshot)
+        universe_ms = (time.perf_counter() - start) / repeats * 1000
+    finally:
+        logger.setLevel(level)
+
+    report = {
+        "scan_market_symbols": small,
+        "scan_market_ms": round(per_symbol_ms, 3),
+        "scan_universe_symbols": large,
+        "scan_universe_ms": round(universe_ms, 3),
+        "top": [(signal.symbol, signal.type.value, round(signal.confidence * signal.potential_return, 3))
+                for signal in top]
+    }
+    print(f"scan_market x{small}: {report['scan_market_ms']}ms, "
+          f"scan_universe({large}): {report['scan_universe_ms']}ms, 入选 {report['top']}")
+    return report
+
+
 if __name__ == "__main__":
     # 测试代码
     scanner = OpportunityScanner()
@@ -5,8 +5,11 @@ Tiger系统 - 止损系统
 作者：Window-7 Risk Control Officer
 """
 
+import heapq
 import logging
-from typing import Dict, Optional, List, Tuple
+import random
+import time
+from typing import Callable, Dict, Optional, List, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import math
@@ -29,11 +32,61 @@ class Position:
     resistance_level: float
 
 
+class StopBook:
+    """
+    单个币种的止损簿
+
+    多头止损在价格跌到止损价及以下时触发，按止损价从高到低出堆；
+    空头止损在价格涨到止损价及以上时触发，按止损价从低到高出堆。
+    堆元素为 (排序键, 版本号, 止损ID)，止损移动或撤销时旧元素留在堆中，
+    出堆时按版本号识别并丢弃，过期元素多于有效元素时整体重建
+    """
+
+    __slots__ = ("long", "short", "stale")
+
+    def __init__(self):
+        self.long: List[Tuple[float, int, str]] = []  # (-止损价, 版本, ID)
+        self.short: List[Tuple[float, int, str]] = []  # (止损价, 版本, ID)
+        self.stale = 0
+
+    def __len__(self) -> int:
+        return len(self.long) + len(self.short) - self.stale
+
+    def push(self, side: str, stop_price: float, version: int, stop_id: str):
+        if side == "short":
+            heapq.heappush(self.short, (stop_price, version, stop_id))
+        else:
+            heapq.heappush(self.long, (-stop_price, version, stop_id))
+
+    def pop_crossed(self, price: float) -> List[Tuple[int, str]]:
+        """弹出价格穿越的全部堆元素（含过期元素），O(k log n)"""
+        crossed = []
+        while self.long and -self.long[0][0] >= price:
+            _, version, stop_id = heapq.heappop(self.long)
+            crossed.append((version, stop_id))
+        while self.short and self.short[0][0] <= price:
+            _, version, stop_id = heapq.heappop(self.short)
+            crossed.append((version, stop_id))
+        return crossed
+
+    def compact(self, is_valid: Callable[[int, str], bool]):
+        """丢弃过期元素并重建堆"""
+        self.long = [item for item in self.long if is_valid(item[1], item[2])]
+        self.short = [item for item in self.short if is_valid(item[1], item[2])]
+        heapq.heapify(self.long)
+        heapq.heapify(self.short)
+        self.stale = 0
+
+
 class StopLossSystem:
     """止损系统 - 铁律执行，绝不妥协"""
     
-    def __init__(self):
-        self.active_stops = {}  # 活跃的止损订单
+    def __init__(self, clock: Optional[Callable[[], datetime]] = None):
+        self.clock = clock or datetime.now  # 回测时注入模拟时钟
+        self.active_stops = {}  # 活跃的止损订单 {止损ID: 止损信息}，需经update_stop/remove_stop修改
+        self.stop_books: Dict[str, StopBook] = {}  # 按币种索引的止损簿
+        self._stop_versions: Dict[str, int] = {}  # 止损ID -> 当前有效的堆元素版本
+        self._version = 0
         self.stop_history = []  # 止损历史记录
         self.protection_mode = False  # 保护模式标志
         
@@ -136,7 +189,7 @@ class StopLossSystem:
         Returns:
             (是否触发止损, 止损原因)
         """
-        current_time = datetime.now()
+        current_time = self.clock()
         holding_days = (current_time - position.entry_time).days
         
         # 无盈利时间止损
@@ -253,9 +306,9 @@ class StopLossSystem:
         logger.critical(f"紧急止损触发: {reason}")
         
         stop_orders = []
-        for symbol, stop_info in self.active_stops.items():
+        for stop_id, stop_info in self.active_stops.items():
             stop_orders.append({
-                "symbol": symbol,
+                "symbol": stop_info.get("symbol", stop_id),
                 "action": "EMERGENCY_CLOSE",
                 "reason": reason,
                 "timestamp": datetime.now().isoformat()
@@ -266,68 +319,123 @@ class StopLossSystem:
         
         # 清空活跃止损
         self.active_stops.clear()
+        self.stop_books.clear()
+        self._stop_versions.clear()
         
         # 启动保护模式
         self.protection_mode = True
         
         return stop_orders
     
-    def update_stop(self, symbol: str, new_stop: Dict) -> bool:
+    def update_stop(self, symbol: str, new_stop: Dict, stop_id: Optional[str] = None) -> bool:
         """
         更新止损订单
         
         Args:
             symbol: 币种
-            new_stop: 新止损信息
+            new_stop: 新止损信息，side为"long"（默认）或"short"
+            stop_id: 止损ID，默认与币种相同（每个币种一个止损）
             
         Returns:
             是否成功
         """
         try:
-            old_stop = self.active_stops.get(symbol)
+            stop_id = symbol if stop_id is None else stop_id
+            side = new_stop.get("side", "long")
+            old_stop = self.active_stops.get(stop_id)
+            
+            # 止损只能朝保护利润的方向移动：多头上移，空头下移（换币种时价格不可比，不限制）
+            if old_stop and old_stop["symbol"] == symbol and old_stop.get("side", "long") == side:
+                if (new_stop["stop_price"] < old_stop["stop_price"] if side == "long"
+                        else new_stop["stop_price"] > old_stop["stop_price"]):
+                    logger.warning(f"{symbol} 止损价不能回撤: {old_stop['stop_price']} -> {new_stop['stop_price']}")
+                    return False
+            
+            stop = dict(new_stop, symbol=symbol, side=side)
+            self.active_stops[stop_id] = stop
             
-            # 止损只能上移，不能下移（保护利润）
-            if old_stop and new_stop["stop_price"] < old_stop["stop_price"]:
-                logger.warning(f"{symbol} 止损价不能下移: {old_stop['stop_price']} -> {new_stop['stop_price']}")
-                return False
+            # 止损价和方向不变时堆元素仍然有效，无需重新入堆
+            if (old_stop is None or old_stop["symbol"] != symbol or old_stop.get("side", "long") != side
+                    or old_stop["stop_price"] != stop["stop_price"]):
+                # 先切换版本再标记过期，重建时旧元素才会被识别为过期
+                self._version += 1
+                self._stop_versions[stop_id] = self._version
+                if old_stop is not None:
+                    self._mark_stale(old_stop["symbol"])
+                book = self.stop_books.setdefault(symbol, StopBook())
+                book.push(side, stop["stop_price"], self._version, stop_id)
             
-            self.active_stops[symbol] = new_stop
-            logger.info(f"{symbol} 止损更新: {new_stop['stop_price']:.2f} ({new_stop['reason']})")
+            logger.info(f"{symbol} 止损更新: {stop['stop_price']:.2f} ({stop['reason']})")
             
             return True
         except Exception as e:
             logger.error(f"止损更新失败: {e}")
             return False
     
+    def remove_stop(self, stop_id: str) -> Optional[Dict]:
+        """撤销止损订单，返回被撤销的止损信息"""
+        stop = self.active_stops.pop(stop_id, None)
+        if stop is not None:
+            self._stop_versions.pop(stop_id, None)
+            self._mark_stale(stop["symbol"])
+        return stop
+    
+    def _mark_stale(self, symbol: str):
+        """记录一个过期堆元素，过期元素多于有效元素时重建该币种的止损簿"""
+        book = self.stop_books.get(symbol)
+        if book is None:
+            return
+        book.stale += 1
+        if book.stale > 64 and book.stale > len(book):
+            book.compact(self._is_current)
+    
+    def _is_current(self, version: int, stop_id: str) -> bool:
+        return self._stop_versions.get(stop_id) == version
+    
     def check_stop_triggers(self, market_data: Dict) -> List[Dict]:
         """
         检查止损触发
         
+        只查看有行情更新的币种，每个币种只弹出价格穿越的止损，
+        触发的止损移出活跃止损并记入历史
+        
         Args:
-            market_data: 市场数据
+            market_data: 市场数据 {币种: {"price": 最新价}}
             
         Returns:
             触发的止损列表
         """
         triggered_stops = []
         
-        for symbol, stop_info in self.active_stops.items():
-            current_price = market_data.get(symbol, {}).get("price")
+        for symbol, data in market_data.items():
+            book = self.stop_books.get(symbol)
+            if not book:
+                continue
+            current_price = data.get("price") if data else None
             if not current_price:
                 continue
             
-            if current_price <= stop_info["stop_price"]:
+            for version, stop_id in book.pop_crossed(current_price):
+                if self._stop_versions.get(stop_id) != version:
+                    book.stale -= 1
+                    continue
+                
+                stop_info = self.active_stops.pop(stop_id)
+                del self._stop_versions[stop_id]
                 triggered_stops.append({
                     "symbol": symbol,
+                    "stop_id": stop_id,
+                    "side": stop_info["side"],
                     "stop_price": stop_info["stop_price"],
                     "trigger_price": current_price,
                     "reason": stop_info["reason"],
                     "type": stop_info["stop_type"],
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": self.clock().isoformat()
                 })
                 
                 logger.warning(f"止损触发: {symbol} @ {current_price:.2f} (止损价: {stop_info['stop_price']:.2f})")
         
+        self.stop_history.extend(triggered_stops)
         return triggered_stops
     
     def _is_sideways(self, position: Position) -> bool:
@@ -346,6 +454,118 @@ class StopLossSystem:
         }
 
 
+
+def benchmark_stop_books(n_stops: int = 50000,
+                         n_symbols: int = 500,
+                         updates_per_sec: int = 10000,
+                         seconds: int = 5,
+                         batch_size: int = 50,
+                         trail_ratio: float = 0.2,
+                         verify_batches: int = 20,
+                         seed: int = 7) -> Dict:
+    """
+    止损簿基准测试
+
+    n_stops个止损（多空各半）挂在n_symbols个币种上，回放 updates_per_sec*seconds 次
+    逐币种的随机游走价格更新，每batch_size次更新合成一次 check_stop_triggers 调用；
+    按trail_ratio的概率顺带上移一个多头追踪止损，触发的止损立即补挂新的，保持挂单总数不变。
+    前verify_batches批同时用全量扫描计算触发集合做对照
+
+    Returns:
+        吞吐（次更新/秒）、触发数、追踪更新数和全量扫描的单批耗时
+    """
+    rng = random.Random(seed)
+    system = StopLossSystem()
+    prices = {f"SYM{i}": rng.uniform(1, 1000) for i in range(n_symbols)}
+    symbols = list(prices)
+    stop_ids = {symbol: [] for symbol in symbols}
+    counter = 0
+
+    def place(symbol: str):
+        nonlocal counter
+        side = "long" if counter % 2 == 0 else "short"
+        distance = rng.uniform(0.005, 0.05)
+        stop_price = prices[symbol] * (1 - distance if side == "long" else 1 + distance)
+        stop_id = f"{symbol}-{counter}"
+        counter += 1
+        system.update_stop(symbol, {"stop_price": stop_price, "side": side,
+                                    "stop_type": "fixed", "reason": "benchmark"}, stop_id)
+        stop_ids[symbol].append(stop_id)
+
+    def scan(market_data: Dict) -> set:
+        """全量扫描：逐个止损比较（原实现的做法，补上空头方向）"""
+        crossed = set()
+        for stop_id, stop in system.active_stops.items():
+            price = market_data.get(stop["symbol"], {}).get("price")
+            if price and (price <= stop["stop_price"] if stop["side"] == "long" else price >= stop["stop_price"]):
+                crossed.add(stop_id)
+        return crossed
+
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        for i in range(n_stops):
+            place(symbols[i % n_symbols])
+
+        total_updates = updates_per_sec * seconds
+        triggered = trailed = 0
+        scan_time = book_time = 0.0
+        for batch_start in range(0, total_updates, batch_size):
+            market_data = {}
+            trails = []
+            for _ in range(min(batch_size, total_updates - batch_start)):
+                symbol = symbols[rng.randrange(n_symbols)]
+                prices[symbol] *= math.exp(rng.gauss(0, 0.002))
+                market_data[symbol] = {"price": prices[symbol]}
+                if rng.random() < trail_ratio:
+                    trails.append((symbol, rng.choice(stop_ids[symbol])))
+
+            verify = batch_start // batch_size < verify_batches
+            if verify:
+                start = time.perf_counter()
+                expected = scan(market_data)
+                scan_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            fired = system.check_stop_triggers(market_data)
+            for symbol, stop_id in trails:
+                stop = system.active_stops.get(stop_id)
+                if stop is not None and stop["side"] == "long":
+                    trail_price = prices[symbol] * 0.97
+                    if trail_price > stop["stop_price"]:
+                        system.update_stop(symbol, dict(stop, stop_price=trail_price), stop_id)
+                        trailed += 1
+            book_time += time.perf_counter() - start
+
+            if verify and {stop["stop_id"] for stop in fired} != expected:
+                raise AssertionError("止损簿触发结果与全量扫描不一致")
+
+            triggered += len(fired)
+            for stop in fired:
+                stop_ids[stop["symbol"]].remove(stop["stop_id"])
+                place(stop["symbol"])
+        system.stop_history.clear()
+    finally:
+        logger.setLevel(level)
+
+    batches = math.ceil(total_updates / batch_size)
+    report = {
+        "stops": len(system.active_stops),
+        "symbols": n_symbols,
+        "updates": total_updates,
+        "triggered": triggered,
+        "trailing_updates": trailed,
+        "updates_per_sec": round(total_updates / book_time) if book_time > 0 else float("inf"),
+        "target_updates_per_sec": updates_per_sec,
+        "scan_ms_per_batch": round(scan_time / min(verify_batches, batches) * 1000, 2) if verify_batches else None,
+        "book_ms_per_batch": round(book_time / batches * 1000, 3)
+    }
+    print(f"{report['stops']}个止损/{n_symbols}个币种: {report['updates_per_sec']} 次更新/秒 "
+          f"(目标 {updates_per_sec})，触发 {triggered}，追踪上移 {trailed}；"
+          f"每批{batch_size}次更新 止损簿 {report['book_ms_per_batch']}ms vs 全量扫描 {report['scan_ms_per_batch']}ms")
+    return report
+
+
 if __name__ == "__main__":
     # 测试代码
     sl = StopLossSystem()
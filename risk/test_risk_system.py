@@ -18,6 +18,7 @@ from position.position_manager import PositionManager
 from stoploss.stoploss_system import StopLossSystem, Position
 from money.money_management import MoneyManagement, TradingRecord
 from assessment.risk_assessment import RiskAssessment, MarketData
+from assessment.portfolio_risk import PortfolioRiskEngine
 from execution.execution_monitor import ExecutionMonitor
 from opportunity.opportunity_scanner import OpportunityScanner
 from emergency.black_swan_opportunity import BlackSwanOpportunitySystem
@@ -101,6 +102,101 @@ def test_stoploss_system():
     return True
 
 
+def _stop(stop_price, side="long"):
+    """构造止损信息"""
+    return {"stop_price": stop_price, "side": side, "stop_type": "fixed", "reason": "测试止损"}
+
+
+def test_stop_books():
+    """测试止损簿：多空触发、不重复触发、只能单向移动、撤销、换币种和过期元素重建"""
+    print("\n" + "="*50)
+    print("测试止损簿")
+    print("="*50)
+    
+    # 多空方向的触发
+    sl = StopLossSystem()
+    assert sl.update_stop("BTC", _stop(95), "BTC-long")
+    assert sl.update_stop("BTC", _stop(105, "short"), "BTC-short")
+    assert sl.check_stop_triggers({"BTC": {"price": 100}}) == []
+    triggers = sl.check_stop_triggers({"BTC": {"price": 95}})
+    assert [(t["stop_id"], t["side"], t["trigger_price"]) for t in triggers] == [("BTC-long", "long", 95)]
+    triggers = sl.check_stop_triggers({"BTC": {"price": 106}})
+    assert [(t["stop_id"], t["side"]) for t in triggers] == [("BTC-short", "short")]
+    print("✅ 多头跌破、空头涨破各自触发")
+    
+    # 触发后移出活跃止损，不再重复触发
+    assert sl.active_stops == {}
+    assert sl.check_stop_triggers({"BTC": {"price": 90}}) == []
+    assert sl.check_stop_triggers({"BTC": {"price": 110}}) == []
+    assert [t["stop_id"] for t in sl.stop_history] == ["BTC-long", "BTC-short"]
+    print("✅ 触发的止损记入历史且不再触发")
+    
+    # 多头只能上移，空头只能下移；旧止损价不再生效
+    sl = StopLossSystem()
+    sl.update_stop("ETH", _stop(95), "ETH-long")
+    sl.update_stop("ETH", _stop(105, "short"), "ETH-short")
+    assert not sl.update_stop("ETH", _stop(94), "ETH-long")
+    assert not sl.update_stop("ETH", _stop(106, "short"), "ETH-short")
+    assert sl.active_stops["ETH-long"]["stop_price"] == 95
+    assert sl.active_stops["ETH-short"]["stop_price"] == 105
+    assert sl.update_stop("ETH", _stop(97), "ETH-long")
+    assert sl.update_stop("ETH", _stop(103, "short"), "ETH-short")
+    assert [t["stop_price"] for t in sl.check_stop_triggers({"ETH": {"price": 96}})] == [97]
+    assert [t["stop_price"] for t in sl.check_stop_triggers({"ETH": {"price": 104}})] == [103]
+    assert sl.check_stop_triggers({"ETH": {"price": 94}}) == []
+    assert sl.check_stop_triggers({"ETH": {"price": 106}}) == []
+    print("✅ 止损价不能回撤，移动后按新止损价触发")
+    
+    # 同一币种多个止损，撤销其中一个
+    sl = StopLossSystem()
+    sl.update_stop("SOL", _stop(90), "SOL-1")
+    sl.update_stop("SOL", _stop(92), "SOL-2")
+    removed = sl.remove_stop("SOL-2")
+    assert removed["stop_price"] == 92
+    assert sl.remove_stop("SOL-2") is None
+    assert [t["stop_id"] for t in sl.check_stop_triggers({"SOL": {"price": 91}})] == []
+    assert [t["stop_id"] for t in sl.check_stop_triggers({"SOL": {"price": 89}})] == ["SOL-1"]
+    print("✅ 撤销的止损不再触发")
+    
+    # 止损移到另一个币种
+    sl = StopLossSystem()
+    sl.update_stop("BTC", _stop(95), "moving")
+    sl.update_stop("ETH", _stop(50), "moving")
+    assert sl.check_stop_triggers({"BTC": {"price": 90}}) == []
+    assert len(sl.stop_books["BTC"]) == 0
+    assert [t["symbol"] for t in sl.check_stop_triggers({"ETH": {"price": 49}})] == ["ETH"]
+    print("✅ 换币种后按新币种行情触发")
+    
+    # 大量移动产生的过期元素被重建，触发结果与逐个比较一致
+    sl = StopLossSystem()
+    for i in range(10):
+        sl.update_stop("BNB", _stop(100 - i), f"long-{i}")
+        sl.update_stop("BNB", _stop(200 + i, "short"), f"short-{i}")
+    for step in range(1, 50):
+        for i in range(10):
+            sl.update_stop("BNB", _stop(100 - i + step * 0.01), f"long-{i}")
+        sl.update_stop("BNB", _stop(200 - step * 0.01, "short"), "short-0")
+    book = sl.stop_books["BNB"]
+    assert book.stale <= 64
+    assert len(book.long) + len(book.short) < 20 + 64 * 2
+    assert len(book) == 20
+    
+    # 触发按最新止损价，与逐个比较的结果一致
+    for price in (96.0, 199.6, 90.0, 250.0):
+        latest = {stop_id: stop["stop_price"] for stop_id, stop in sl.active_stops.items()}
+        expected = {stop_id for stop_id, stop in sl.active_stops.items()
+                    if (price <= stop["stop_price"] if stop["side"] == "long" else price >= stop["stop_price"])}
+        triggers = sl.check_stop_triggers({"BNB": {"price": price}})
+        assert {t["stop_id"] for t in triggers} == expected
+        assert all(t["stop_price"] == latest[t["stop_id"]] for t in triggers)
+        assert len(sl.stop_books["BNB"]) == len(sl.active_stops)
+    assert sl.active_stops == {}
+    assert book.stale == 0
+    print("✅ 过期元素重建后触发正确")
+    
+    return True
+
+
 def test_money_management():
     """测试资金管理"""
     print("\n" + "="*50)
@@ -197,6 +293,17 @@ def test_risk_assessment():
     var_95 = ra.calculate_var(100000, returns, 0.95)
     print(f"✅ VaR (95%置信度): ${var_95:.2f}")
     
+    # 组合VaR：单币种历史模拟与calculate_var一致，成分VaR之和等于参数法VaR
+    engine = PortfolioRiskEngine(["BTC", "ETH"], window=len(returns))
+    engine.load_history([returns, [r * 1.5 for r in returns[::-1]]])
+    portfolio = engine.calculate({"BTC": 60000, "ETH": 40000})
+    btc_only = PortfolioRiskEngine(["BTC"], window=len(returns))
+    btc_only.load_history([returns])
+    assert abs(btc_only.calculate({"BTC": 100000})["historical"]["var"] - var_95) < 1e-6
+    assert abs(sum(portfolio["component_var"].values()) - portfolio["parametric"]["var"]) < 1e-6
+    print(f"✅ 组合VaR (95%): 历史 ${portfolio['historical']['var']:.2f}, "
+          f"参数 ${portfolio['parametric']['var']:.2f}, 蒙特卡洛 ${portfolio['monte_carlo']['var']:.2f}")
+    
     return True
 
 
@@ -297,6 +404,14 @@ def test_opportunity_scanner():
         result = scanner.notify_ai_system(opp)
         print(f"   AI通知: {result['status']}")
     
+    # 全市场批量扫描：同样的行情放进列式快照，结果与scan_market一致
+    neutral_market = dict(oversold_market, symbol="ETH", rsi=50, price_drop_24h=0.01, volume_ratio=1.0,
+                          support_test_count=0, whale_buys=0, liquidations=0, fear_greed_index=55)
+    snapshot = {key: [oversold_market[key], neutral_market[key]] for key in oversold_market}
+    universe = scanner.scan_universe(snapshot)
+    assert [(o.symbol, o.type) for o in universe] == [(o.symbol, o.type) for o in opportunities]
+    print(f"\n✅ 全市场扫描: {len(universe)} 个机会，与单币种扫描一致")
+    
     return True
 
 
@@ -447,6 +562,7 @@ def run_all_tests():
     tests = [
         ("仓位管理", test_position_manager),
         ("止损系统", test_stoploss_system),
+        ("止损簿", test_stop_books),
         ("资金管理", test_money_management),
         ("风险评估", test_risk_assessment),
         ("执行监控", test_execution_monitor),
@@ -0,0 +1,184 @@
+"""
+增量交易统计RunningStats单元测试
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from core.running_stats import RunningStats
+from learning.optimizer.strategy_optimizer import StrategyOptimizer
+from risk.execution.execution_monitor import PerformanceMetrics
+
+
+def brute_drawdowns(equity: np.ndarray) -> np.ndarray:
+    """逐点相对累计峰值的回撤，峰值不为正时为0"""
+    peak = np.maximum.accumulate(equity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(peak > 0, (peak - equity) / peak, 0.0)
+
+
+def fixture_trades():
+    """固定种子生成的80笔交易，FIXTURE_METRICS由改为增量计算前的列表实现算出"""
+    rng = random.Random(2024)
+    start = datetime(2024, 1, 1)
+    trades = []
+    for i in range(80):
+        pnl = round(rng.gauss(15, 120), 2)
+        if i % 17 == 5:
+            pnl = 0.0
+        trades.append({"pnl": pnl, "capital": rng.choice([5000, 10000, 20000]),
+                       "time": start + timedelta(days=i, hours=rng.randrange(24))})
+    return trades
+
+
+FIXTURE_METRICS = {
+    "total_trades": 80,
+    "winning_trades": 39,
+    "losing_trades": 36,
+    "total_pnl": 209.48,
+    "win_rate": 0.4875,
+    "avg_win": 87.26153846153846,
+    "avg_loss": 88.71444444444444,
+    "profit_factor": 0.9836226671766419,
+    "sharpe_ratio": 0.754380153888047,
+    "max_drawdown": 0.5155187566492437,
+    "recovery_time": 4,
+}
+
+
+class TestRunningStats(unittest.TestCase):
+    """每次更新后与numpy对前缀/窗口的暴力计算比较"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.pnls = np.round(rng.normal(5, 100, 400), 2)
+        self.pnls[::23] = 0.0
+        self.returns = self.pnls / rng.choice([5000.0, 10000.0], len(self.pnls))
+
+    def assert_counts(self, stats: RunningStats, pnls: np.ndarray):
+        wins, losses = pnls[pnls > 0], pnls[pnls < 0]
+        self.assertEqual((stats.count, stats.wins, stats.losses), (len(pnls), len(wins), len(losses)))
+        self.assertAlmostEqual(stats.total_pnl, pnls.sum(), delta=1e-8)
+        self.assertAlmostEqual(stats.win_sum, wins.sum(), delta=1e-8)
+        self.assertAlmostEqual(stats.loss_sum, -losses.sum(), delta=1e-8)
+
+    def test_full_history(self):
+        """测试全量统计：均值、样本/总体标准差、当前与最大回撤"""
+        stats, population = RunningStats(), RunningStats(ddof=0)
+        for i, (pnl, ret) in enumerate(zip(self.pnls, self.returns), start=1):
+            stats.update(pnl, ret)
+            population.update(pnl, ret)
+            returns = self.returns[:i]
+
+            self.assertAlmostEqual(stats.mean, returns.mean(), delta=1e-15)
+            if i > 1:
+                self.assertAlmostEqual(stats.std, returns.std(ddof=1), delta=1e-12)
+            self.assertAlmostEqual(population.std, returns.std(ddof=0), delta=1e-12)
+
+            drawdowns = brute_drawdowns(np.cumsum(self.pnls[:i]))
+            self.assertAlmostEqual(stats.drawdown, drawdowns[-1], delta=1e-12)
+            self.assertAlmostEqual(stats.max_drawdown, drawdowns.max(), delta=1e-12)
+        self.assert_counts(stats, self.pnls)
+
+        self.assertAlmostEqual(stats.sharpe(252), self.returns.mean() / self.returns.std(ddof=1) * np.sqrt(252))
+        wins, losses = self.pnls[self.pnls > 0], self.pnls[self.pnls < 0]
+        self.assertAlmostEqual(stats.profit_factor, wins.sum() / -losses.sum())
+        self.assertAlmostEqual(stats.avg_win, wins.mean())
+        self.assertAlmostEqual(stats.avg_loss, -losses.mean())
+
+    def test_rolling_window(self):
+        """测试滚动窗口：移出旧交易后的Welford均值/方差，窗口内权益峰值与回撤"""
+        window = 25
+        stats = RunningStats(window=window)
+        equity = np.cumsum(self.pnls)
+        for i, (pnl, ret) in enumerate(zip(self.pnls, self.returns), start=1):
+            stats.update(pnl, ret)
+            lo = max(0, i - window)
+            returns, pnls, window_equity = self.returns[lo:i], self.pnls[lo:i], equity[lo:i]
+
+            self.assertAlmostEqual(stats.mean, returns.mean(), delta=1e-12)
+            if len(returns) > 1:
+                self.assertAlmostEqual(stats.std, returns.std(ddof=1), delta=1e-10)
+            self.assert_counts(stats, pnls)
+
+            # 峰值只取窗口内的累计盈亏，权益本身仍是全部交易的累计
+            self.assertAlmostEqual(stats.equity, equity[i - 1], delta=1e-8)
+            self.assertEqual(stats.peak, window_equity.max())
+            peak = window_equity.max()
+            self.assertAlmostEqual(stats.drawdown, (peak - equity[i - 1]) / peak if peak > 0 else 0.0, delta=1e-12)
+            self.assertAlmostEqual(stats.max_drawdown, brute_drawdowns(window_equity).max(), delta=1e-12)
+            self.assertLessEqual(len(stats._peaks), window)
+
+    def test_rolling_window_large_offset(self):
+        """测试量级远大于波动的取值经过多次移出后方差不漂移"""
+        rng = np.random.default_rng(11)
+        values = 1e6 + rng.normal(0, 1, 5000)
+        stats = RunningStats(window=50)
+        for value in values:
+            stats.update(value)
+        self.assertAlmostEqual(stats.mean, values[-50:].mean(), delta=1e-8)
+        self.assertAlmostEqual(stats.std, values[-50:].std(ddof=1), delta=1e-6)
+
+    def test_window_of_one_and_reset(self):
+        """测试窗口为1时只保留最近一笔，reset后回到初始状态"""
+        stats = RunningStats(window=1)
+        for pnl in (10.0, -4.0, 7.0):
+            stats.update(pnl)
+        self.assertEqual((stats.count, stats.mean, stats.std, stats.wins), (1, 7.0, 0.0, 1))
+        self.assertEqual(stats.peak, 13.0)
+
+        stats.reset()
+        self.assertEqual(stats.snapshot()["total_trades"], 0)
+        self.assertEqual((stats.equity, stats.peak, stats.max_drawdown), (0.0, None, 0.0))
+        self.assertEqual(stats.profit_factor, float("inf"))
+
+    def test_drawdown_ignores_non_positive_peak(self):
+        """测试累计盈亏峰值不为正时不计回撤（策略优化器沿用此定义）"""
+        stats = RunningStats()
+        for pnl in (-5.0, -3.0, 2.0, -1.0):
+            stats.update(pnl)
+        self.assertEqual(stats.max_drawdown, 0.0)
+
+        stats.update(20.0)  # 峰值13
+        stats.update(-6.5)
+        self.assertAlmostEqual(stats.max_drawdown, 0.5)
+
+        returns = [0.02, -0.01, 0.03, -0.04, 0.01]
+        optimizer_stats = StrategyOptimizer._trade_stats(returns)
+        self.assertAlmostEqual(optimizer_stats.max_drawdown, brute_drawdowns(np.cumsum(returns)).max())
+        self.assertAlmostEqual(optimizer_stats.std, np.std(returns))
+        self.assertEqual(StrategyOptimizer._trade_stats([-0.01, -0.02]).max_drawdown, 0.0)
+
+
+class TestPerformanceMetrics(unittest.TestCase):
+    """测试增量计算的绩效指标与改动前的结果一致"""
+
+    def assert_fixture(self, metrics: PerformanceMetrics):
+        for name, expected in FIXTURE_METRICS.items():
+            self.assertAlmostEqual(getattr(metrics, name), expected, places=9, msg=name)
+
+    def test_calculate_metrics_matches_fixture(self):
+        """测试calculate_metrics与保存的结果一致，重复计算不累加"""
+        metrics = PerformanceMetrics()
+        metrics.calculate_metrics(fixture_trades())
+        self.assert_fixture(metrics)
+
+        metrics.calculate_metrics(fixture_trades())
+        self.assert_fixture(metrics)
+
+    def test_add_trade_matches_fixture(self):
+        """测试逐笔add_trade与一次性计算结果一致"""
+        metrics = PerformanceMetrics()
+        for trade in fixture_trades():
+            metrics.add_trade(trade)
+        self.assert_fixture(metrics)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)